@@ -8,42 +8,44 @@ import hailo
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.depth.depth_pipeline import GStreamerDepthApp
 
+from basic_pipelines.depth_stats import DepthStats, DepthGrid
+from basic_pipelines.frame_pipeline import FramePipeline, PipelineBackend, Stage, ANALYTICS, print_lines
+
 # User-defined class to be used in the callback function: Inheritance from the app_callback_class
 class user_app_callback_class(app_callback_class):
 
     def __init__(self):
         super().__init__()
+        self.timer = PIPELINE.timer  # Per-stage callback latency (HAILO_STAGE_TIMING=N reports every N seconds)
+        self.depth_stats = DepthStats()  # Partition-based statistics with a reused work buffer
+        self.depth_grid = DepthGrid.from_env()  # Per-region depth (HAILO_DEPTH_GRID=ROWSxCOLS), None when off
 
     def calculate_average_depth(self, depth_mat):
-        depth_values = np.array(depth_mat).flatten()  # Flatten the array and filter out outlier pixels
-        try:
-            m_depth_values = depth_values[depth_values <= np.percentile(depth_values, 95)]  # drop 5% of highest values (outliers)          
-        except Exception as e:
-            m_depth_values = np.array([])
-        if len(m_depth_values) > 0:
-            average_depth = np.mean(m_depth_values)  # Calculate the average depth of the pixels
-        else:
-            average_depth = 0  # Default value if no valid pixels are found
-        return average_depth
-
-# User-defined callback function: This is the callback function that will be called when data is available from the pipeline
-def app_callback(pad, info, user_data):
-    user_data.increment()  # Using the user_data to count the number of frames
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
-    buffer = info.get_buffer()  # Get the GstBuffer from the probe info
-    if buffer is None:  # Check if the buffer is valid
-        return Gst.PadProbeReturn.OK
-
-    roi = hailo.get_roi_from_buffer(buffer)
-    depth_mat = roi.get_objects_typed(hailo.HAILO_DEPTH_MASK)
+        # Mean of the pixels after dropping the 5% highest values (outliers), 0 if there are none
+        return self.depth_stats.trimmed_mean(depth_mat, upper=0.95)
+
+# User-defined stage: called with the frame context for every frame
+def depth_statistics(ctx):
+    user_data = ctx.user_data
+    depth_mat = ctx.roi.get_objects_typed(hailo.HAILO_DEPTH_MASK)
     if len(depth_mat) > 0:
-        detection_average_depth = user_data.calculate_average_depth(depth_mat[0].get_data())
+        depth_data = depth_mat[0].get_data()
+        detection_average_depth = user_data.calculate_average_depth(depth_data)
     else:
         detection_average_depth = 0
-    string_to_print += (f"average depth: {detection_average_depth:.2f}\n")
-    print(string_to_print)
-
-    return Gst.PadProbeReturn.OK
+    ctx.lines.append(f"average depth: {detection_average_depth:.2f}")
+    if user_data.depth_grid is not None and len(depth_mat) > 0:
+        # Nearest (low quantile) depth of each region, top row first
+        near = user_data.depth_grid.reduce(depth_data, depth_mat[0].get_width(), depth_mat[0].get_height())[0]
+        for row in near:
+            ctx.lines.append(" ".join(f"{value:6.2f}" for value in row.tolist()))
+
+# The callback: depth statistics, then print
+PIPELINE = FramePipeline([
+    Stage("depth", depth_statistics, ANALYTICS),
+    print_lines(),
+], PipelineBackend(hailo, None, None, Gst.PadProbeReturn.OK))  # No stage reads the caps or the frame
+app_callback = PIPELINE.callback
 
 if __name__ == "__main__":
     project_root = Path(__file__).resolve().parent.parent
@@ -0,0 +1,160 @@
+"""
+Robust depth statistics without sorting, for the depth pad-probe callbacks.
+
+calculate_average_depth used to copy the depth mask with np.array(), run
+np.percentile over it to drop the top 5%, and then filter and average the
+whole array, for every frame and every detection. DepthStats copies the values
+into a work buffer that is reused across calls and selects only the order
+statistics it needs with single-index np.partition calls (O(n) each, and much
+cheaper than the multi-index partition np.percentile does); the trimmed mean
+then only filters the top 5% tail. Quantiles interpolate linearly between
+order statistics like np.percentile / np.quantile, so results match.
+
+DepthGrid reduces a whole depth map to a coarse rows x cols grid of per-cell
+quantiles (e.g. a robust "nearest" value and the median), selecting along
+one axis for all cells at once, for obstacle and proximity checks:
+
+    grid = DepthGrid(3, 4, quantiles=(0.1, 0.5))
+    near, median = grid.reduce(mask.get_data(), mask.get_width(), mask.get_height())   # (3, 4) each
+
+Set the HAILO_DEPTH_GRID environment variable (e.g. "3x4") to have
+basic_pipelines/depth.py print the grid every frame.
+"""
+import os
+
+import numpy as np
+
+
+def _order_statistics(quantiles, n):
+    """Lower and upper order statistic indices and interpolation weights for quantiles of n values."""
+    positions = np.asarray(quantiles, dtype=np.float64) * (n - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, n - 1)
+    return lower, upper, positions - lower
+
+
+def _select(work, kth, axis=-1):
+    """
+    Partition work in place so that work[..., k] is the k-th smallest value for every k in kth.
+
+    ndarray.partition with several kth is much slower than one selection per
+    index; selecting each one in the suffix left by the previous one costs
+    about one pass over the data in total.
+    """
+    start = 0
+    for k in sorted(set(int(k) for k in kth)):
+        work[..., start:].partition(k - start, axis=axis)
+        start = k + 1
+
+
+class DepthStats:
+    """
+    Trimmed mean, median and quantiles of depth values with a reusable work buffer.
+
+    Every method copies its input into the work buffer (the caller's array is
+    never reordered) and returns 0.0, or zeros, when there are no values.
+    """
+
+    def __init__(self, capacity=0):
+        self._work = np.empty(capacity, dtype=np.float32)
+
+    def _load(self, values):
+        values = np.asarray(values, dtype=np.float32).reshape(-1)
+        if values.size > self._work.size:
+            self._work = np.empty(max(values.size, 2 * self._work.size), dtype=np.float32)
+        work = self._work[:values.size]
+        np.copyto(work, values)
+        return work
+
+    def trimmed_mean(self, values, upper=0.95):
+        """Mean of the values at or below the `upper` quantile (drops the highest outliers)."""
+        work = self._load(values)
+        n = len(work)
+        if n == 0:
+            return 0.0
+        position = upper * (n - 1)
+        lower_index = int(position)
+        weight = position - lower_index
+        work.partition(lower_index)
+        # Everything up to lower_index is <= low <= threshold; only the tail needs a check
+        tail = work[lower_index + 1:]
+        low = float(work[lower_index])
+        high = float(tail.min()) if len(tail) else low  # The next order statistic
+        threshold = low + weight * (high - low)
+        kept = tail[tail <= threshold]
+        total = work[:lower_index + 1].sum(dtype=np.float64) + kept.sum(dtype=np.float64)
+        return float(total / (lower_index + 1 + len(kept)))
+
+    def quantiles(self, values, quantiles):
+        """Quantiles (fractions in [0, 1]) of the values, interpolated like np.quantile."""
+        work = self._load(values)
+        if len(work) == 0:
+            return np.zeros(len(quantiles))
+        lower, upper, weight = _order_statistics(quantiles, len(work))
+        _select(work, np.union1d(lower, upper))
+        low = work[lower].astype(np.float64)
+        return low + weight * (work[upper] - low)
+
+    def median(self, values):
+        return float(self.quantiles(values, (0.5,))[0])
+
+
+class DepthGrid:
+    """
+    Per-cell depth quantiles over a rows x cols grid, computed in one vectorized pass.
+
+    Args:
+        rows, cols: grid size. Pixels beyond the last whole cell (when the map
+            size is not a multiple of the grid) are ignored.
+        quantiles: fractions in [0, 1] to compute for every cell.
+    """
+
+    def __init__(self, rows=3, cols=4, quantiles=(0.1, 0.5)):
+        if rows < 1 or cols < 1:
+            raise ValueError("rows and cols must be at least 1")
+        self.rows = rows
+        self.cols = cols
+        self.quantiles = tuple(quantiles)
+        self._cells = np.empty((rows, cols, 0), dtype=np.float32)
+        self._plan = None  # (cell_height, cell_width, lower, upper, weight, kth) for the current map size
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """A grid sized by HAILO_DEPTH_GRID ("ROWSxCOLS"), or None if it is not set."""
+        value = os.environ.get("HAILO_DEPTH_GRID")
+        if not value:
+            return None
+        rows, cols = (int(n) for n in value.lower().split("x"))
+        return cls(rows, cols, **kwargs)
+
+    def reduce(self, depth, width=None, height=None):
+        """
+        Per-cell quantiles of a depth map.
+
+        Args:
+            depth: (height, width) array, or flat values with width and height.
+
+        Returns:
+            float array (len(quantiles), rows, cols).
+        """
+        depth = np.asarray(depth, dtype=np.float32)
+        if depth.ndim == 1:
+            depth = depth.reshape(height, width)
+        rows, cols = self.rows, self.cols
+        cell_height, cell_width = depth.shape[0] // rows, depth.shape[1] // cols
+        if cell_height == 0 or cell_width == 0:
+            raise ValueError(f"depth map {depth.shape} is smaller than the {rows}x{cols} grid")
+        if self._plan is None or self._plan[:2] != (cell_height, cell_width):
+            lower, upper, weight = _order_statistics(self.quantiles, cell_height * cell_width)
+            self._plan = (cell_height, cell_width, lower, upper, weight, np.union1d(lower, upper))
+            self._cells = np.empty((rows, cols, cell_height * cell_width), dtype=np.float32)
+        _, _, lower, upper, weight, kth = self._plan
+
+        # Gather every cell's pixels into one contiguous row, then select along that axis for all cells
+        cropped = depth[:rows * cell_height, :cols * cell_width]
+        np.copyto(self._cells.reshape(rows, cols, cell_height, cell_width),
+                  cropped.reshape(rows, cell_height, cols, cell_width).transpose(0, 2, 1, 3))
+        _select(self._cells, kth)
+        low = self._cells[..., lower].astype(np.float64)
+        result = low + weight * (self._cells[..., upper] - low)
+        return np.moveaxis(result, -1, 0)
@@ -11,6 +11,10 @@ from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_p
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.detection.detection_pipeline import GStreamerDetectionApp
 
+from basic_pipelines.frame_pipeline import (FramePipeline, PipelineBackend, Stage, ANALYTICS, RENDER, DETECTIONS, FRAME,
+                                            keep_labels, publish_frame)
+from basic_pipelines.stats_sink import StatsSink
+
 # -----------------------------------------------------------------------------------------------
 # User-defined class to be used in the callback function
 # -----------------------------------------------------------------------------------------------
@@ -19,66 +23,46 @@ class user_app_callback_class(app_callback_class):
     def __init__(self):
         super().__init__()
         self.new_variable = 42  # New variable example
+        # Per-stage callback latency (set HAILO_STAGE_TIMING=N to print a report every N seconds)
+        self.timer = PIPELINE.timer
+        # Detection statistics, printed once per second by a background thread instead of on every frame
+        self.stats = StatsSink(interval=1.0)
+        self.stats.add_source(lambda: {"Frame count": self.get_count()})
 
     def new_function(self):  # New function example
         return "The meaning of life is: "
 
 # -----------------------------------------------------------------------------------------------
-# User-defined callback function
+# User-defined callback stages
 # -----------------------------------------------------------------------------------------------
 
-# This is the callback function that will be called when data is available from the pipeline
-def app_callback(pad, info, user_data):
-    # Get the GstBuffer from the probe info
-    buffer = info.get_buffer()
-    # Check if the buffer is valid
-    if buffer is None:
-        return Gst.PadProbeReturn.OK
-
-    # Using the user_data to count the number of frames
-    user_data.increment()
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
-
-    # Get the caps from the pad
-    format, width, height = get_caps_from_pad(pad)
-
-    # If the user_data.use_frame is set to True, we can get the video frame from the buffer
-    frame = None
-    if user_data.use_frame and format is not None and width is not None and height is not None:
-        # Get video frame
-        frame = get_numpy_from_buffer(buffer, format, width, height)
-
-    # Get the detections from the buffer
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+# Called for every frame with ctx.batch holding the persons (NumPy columns: labels, confidences, bboxes, track ids)
+def count_people(ctx):
+    detection_count = len(ctx.batch)
+    # e.g. ctx.batch.track_ids are the track IDs of the persons, ctx.batch.centers() their positions
+    # Only plain values are stored here; the stats thread does the formatting
+    ctx.user_data.stats.set("Persons", detection_count)
+    ctx.user_data.stats.add("Person detections", detection_count)
+    ctx.data["detection_count"] = detection_count
 
-    # Parse the detections
-    detection_count = 0
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        if label == "person":
-            # Get track ID
-            track_id = 0
-            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-            if len(track) == 1:
-                track_id = track[0].get_id()
-            string_to_print += (f"Detection: ID: {track_id} Label: {label} Confidence: {confidence:.2f}\n")
-            detection_count += 1
-    if user_data.use_frame:
-        # Note: using imshow will not work here, as the callback function is not running in the main thread
-        # Let's print the detection count to the frame
-        cv2.putText(frame, f"Detections: {detection_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        # Example of how to use the new_variable and new_function from the user_data
-        # Let's print the new_variable and the result of the new_function to the frame
-        cv2.putText(frame, f"{user_data.new_function()} {user_data.new_variable}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        # Convert the frame to BGR
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        user_data.set_frame(frame)
+# Only called when the user_data.use_frame is set to True (ctx.frame holds the RGB video frame)
+def draw(ctx):
+    # Note: using imshow will not work here, as the callback function is not running in the main thread
+    # Let's print the detection count to the frame
+    cv2.putText(ctx.frame, f"Detections: {ctx.data['detection_count']}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    # Example of how to use the new_variable and new_function from the user_data
+    # Let's print the new_variable and the result of the new_function to the frame
+    user_data = ctx.user_data
+    cv2.putText(ctx.frame, f"{user_data.new_function()} {user_data.new_variable}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-    print(string_to_print)
-    return Gst.PadProbeReturn.OK
+# The callback: keep the persons, count them, draw, then convert the frame to BGR and hand it to the display
+PIPELINE = FramePipeline([
+    keep_labels("person"),
+    Stage("count", count_people, ANALYTICS, needs=(DETECTIONS,)),
+    Stage("draw", draw, RENDER, needs=(FRAME,)),
+    publish_frame(),
+], PipelineBackend(hailo, get_caps_from_pad, get_numpy_from_buffer, Gst.PadProbeReturn.OK))
+app_callback = PIPELINE.callback
 
 if __name__ == "__main__":
     project_root = Path(__file__).resolve().parent.parent
@@ -88,4 +72,8 @@ if __name__ == "__main__":
     # Create an instance of the user app callback class
     user_data = user_app_callback_class()
     app = GStreamerDetectionApp(app_callback, user_data)
-    app.run()
+    user_data.stats.start()
+    try:
+        app.run()
+    finally:
+        user_data.stats.stop()
@@ -0,0 +1,144 @@
+"""
+Columnar extraction of a frame's Hailo detections into NumPy arrays.
+
+Callbacks usually loop over roi.get_objects_typed(hailo.HAILO_DETECTION) and,
+for every detection, call get_label(), get_bbox(), get_confidence() and
+get_objects_typed(HAILO_UNIQUE_ID), often calling the bbox accessors several
+times and comparing label strings inside the loop. extract_detections() walks
+the detections once, calls each accessor once, and returns a DetectionBatch
+whose columns can be filtered and used for geometry with vectorized NumPy:
+
+    PERSON = LabelIds("person")  # Once, at module level
+
+    batch = extract_detections(roi.get_objects_typed(hailo.HAILO_DETECTION), hailo.HAILO_UNIQUE_ID)
+    people = PERSON.match(batch) & (batch.confidences > 0.5)
+    centers = batch.centers()[people]
+    for i in np.flatnonzero(people):
+        detection = batch.detections[i]  # The original object, e.g. for landmarks or masks
+
+LabelIds compares label strings only until a frame shows which class id each
+label has; after that it filters on the int class_ids column.
+"""
+import numpy as np
+
+NO_TRACK = -1  # Track id of detections without a HAILO_UNIQUE_ID
+
+
+class DetectionBatch:
+    """
+    One frame's detections as parallel columns.
+
+    Attributes:
+        detections: the original detection objects (the list passed in).
+        labels: (N,) object array of label strings (compares with == like a str array,
+            but is much cheaper to build).
+        class_ids: (N,) int32 array.
+        confidences: (N,) float32 array.
+        bboxes: (N, 4) float64 array of normalized xmin, ymin, xmax, ymax (float64 like the Python
+            floats the bbox accessors return, so pixel coordinates round exactly as before).
+        track_ids: (N,) int64 array, NO_TRACK unless the detection has exactly one HAILO_UNIQUE_ID.
+    """
+    __slots__ = ('detections', 'labels', 'class_ids', 'confidences', 'bboxes', 'track_ids')
+
+    def __init__(self, detections, labels, class_ids, confidences, bboxes, track_ids):
+        self.detections = detections
+        self.labels = labels
+        self.class_ids = class_ids
+        self.confidences = confidences
+        self.bboxes = bboxes
+        self.track_ids = track_ids
+
+    def __len__(self):
+        return len(self.detections)
+
+    def centers(self):
+        """(N, 2) float64 array of normalized bbox centers."""
+        bboxes = self.bboxes
+        return (bboxes[:, :2] + bboxes[:, 2:]) / 2
+
+    def pixel_boxes(self, width, height):
+        """(N, 4) int array of bboxes in pixels (truncated like int())."""
+        return (self.bboxes * np.array([width, height, width, height], dtype=np.float64)).astype(np.int32)
+
+    def select(self, index):
+        """A new batch with the rows picked by a boolean mask or an index array."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        detections = self.detections
+        return DetectionBatch([detections[i] for i in index.tolist()], self.labels[index], self.class_ids[index],
+                              self.confidences[index], self.bboxes[index], self.track_ids[index])
+
+
+def extract_detections(detections, unique_id_type):
+    """
+    Read a frame's detections into a DetectionBatch, calling each accessor once per detection.
+
+    Args:
+        detections: result of roi.get_objects_typed(hailo.HAILO_DETECTION).
+        unique_id_type: hailo.HAILO_UNIQUE_ID.
+    """
+    if not detections:
+        return empty_batch()
+    labels = []
+    class_ids = []
+    confidences = []
+    coords = []  # Flat xmin, ymin, xmax, ymax, ...: one list converts faster than a list of tuples
+    track_ids = []
+    for detection in detections:
+        bbox = detection.get_bbox()
+        labels.append(detection.get_label())
+        class_ids.append(detection.get_class_id())
+        confidences.append(detection.get_confidence())
+        coords += (bbox.xmin(), bbox.ymin(), bbox.xmax(), bbox.ymax())
+        track = detection.get_objects_typed(unique_id_type)
+        track_ids.append(track[0].get_id() if len(track) == 1 else NO_TRACK)
+    label_array = np.empty(len(labels), dtype=object)
+    label_array[:] = labels
+    return DetectionBatch(
+        detections,
+        label_array,
+        np.array(class_ids, dtype=np.int32),
+        np.array(confidences, dtype=np.float32),
+        np.array(coords, dtype=np.float64).reshape(-1, 4),
+        np.array(track_ids, dtype=np.int64),
+    )
+
+
+class LabelIds:
+    """
+    Filter a DetectionBatch by label through its class ids.
+
+    A model always gives a label the same class id, so each label is compared
+    as a string only until the first frame that has it; from then on match()
+    compares batch.class_ids with the learned id.
+
+    Args:
+        labels: label strings to keep, e.g. "person".
+    """
+
+    def __init__(self, *labels):
+        if not labels:
+            raise ValueError("LabelIds needs at least one label")
+        self.labels = labels
+        self.class_ids = {}  # label -> class id, filled as the labels are seen
+
+    def match(self, batch):
+        """(N,) bool array, True for the rows with one of the labels."""
+        selected = None
+        for label in self.labels:
+            class_id = self.class_ids.get(label)
+            if class_id is None:
+                rows = batch.labels == label
+                if rows.any():
+                    self.class_ids[label] = int(batch.class_ids[rows.argmax()])
+            else:
+                rows = batch.class_ids == class_id
+            selected = rows if selected is None else selected | rows
+        return selected
+
+
+def empty_batch():
+    """A DetectionBatch with no detections."""
+    return DetectionBatch([], np.empty(0, dtype=object), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32),
+                          np.zeros((0, 4), dtype=np.float64), np.zeros(0, dtype=np.int64))
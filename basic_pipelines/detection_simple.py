@@ -7,22 +7,25 @@ import hailo
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.detection_simple.detection_pipeline_simple import GStreamerDetectionApp
 
+from basic_pipelines.frame_pipeline import FramePipeline, PipelineBackend, Stage, ANALYTICS, DETECTIONS, print_lines
+
 # User-defined class to be used in the callback function: Inheritance from the app_callback_class
 class user_app_callback_class(app_callback_class):
     def __init__(self):
         super().__init__()
+        self.timer = PIPELINE.timer  # Per-stage callback latency (HAILO_STAGE_TIMING=N reports every N seconds)
+
+# User-defined stage: called with the frame context for every frame, after the detections are read
+def list_detections(ctx):
+    for label, confidence in zip(ctx.batch.labels.tolist(), ctx.batch.confidences.tolist()):
+        ctx.lines.append(f"Detection: {label} Confidence: {confidence:.2f}")
 
-# User-defined callback function: This is the callback function that will be called when data is available from the pipeline
-def app_callback(pad, info, user_data):
-    user_data.increment()  # Using the user_data to count the number of frames
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
-    buffer = info.get_buffer()  # Get the GstBuffer from the probe info
-    if buffer is None:  # Check if the buffer is valid
-        return Gst.PadProbeReturn.OK
-    for detection in hailo.get_roi_from_buffer(buffer).get_objects_typed(hailo.HAILO_DETECTION):  # Get the detections from the buffer & Parse the detections
-        string_to_print += (f"Detection: {detection.get_label()} Confidence: {detection.get_confidence():.2f}\n")
-    print(string_to_print)
-    return Gst.PadProbeReturn.OK
+# The callback: read the detections, list them, then print
+PIPELINE = FramePipeline([
+    Stage("list", list_detections, ANALYTICS, needs=(DETECTIONS,)),
+    print_lines(),
+], PipelineBackend(hailo, None, None, Gst.PadProbeReturn.OK))  # No stage reads the caps or the frame
+app_callback = PIPELINE.callback
 
 if __name__ == "__main__":
     project_root = Path(__file__).resolve().parent.parent
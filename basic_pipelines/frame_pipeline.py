@@ -0,0 +1,365 @@
+"""
+Composable per-frame stage pipeline for the pad-probe callbacks.
+
+Every basic pipeline callback used to repeat the same body: get the buffer,
+increment the frame count, read the caps, optionally map the frame, get the
+ROI and its detections, loop over them, convert the frame to BGR and hand it
+to set_frame. A FramePipeline runs that body once for a list of stages, each
+declaring what it needs from the frame:
+
+    BACKEND = PipelineBackend(hailo, get_caps_from_pad, get_numpy_from_buffer, Gst.PadProbeReturn.OK)
+
+    def count_people(ctx):
+        ctx.data["people"] = len(ctx.batch)
+        ctx.lines.append(f"Persons: {ctx.data['people']}")
+
+    def draw_count(ctx):
+        cv2.putText(ctx.frame, f"Detections: {ctx.data['people']}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+    PIPELINE = FramePipeline([
+        keep_labels("person"),
+        Stage("count", count_people, ANALYTICS, needs=(DETECTIONS,)),
+        Stage("draw", draw_count, RENDER, needs=(FRAME,)),
+        publish_frame(),
+        print_lines(),
+    ], BACKEND)
+    app = GStreamerDetectionApp(PIPELINE.callback, user_data)
+
+Stages run by kind (DECODE, FILTER, ANALYTICS, RENDER, PUBLISH), and in the
+order given within a kind. Before them the pipeline reads only what some
+stage needs: the caps (for FRAME, MASKS and LANDMARKS), the frame pixels
+(FRAME, and only when user_data.use_frame is set) and the detections as a
+DetectionBatch (DETECTIONS, also implied by MASKS and LANDMARKS). Stages that need the frame
+are skipped when there is none, so the pixels are never mapped or converted
+when nothing draws. A FILTER stage that returns False ends the frame; filters
+that need nothing run before the caps are read, so skipped frames cost almost
+nothing.
+
+Every stage is timed with a StageTimer (HAILO_STAGE_TIMING=N prints a report
+every N seconds), next to the built-in "caps", "frame" and "detections".
+
+Pass an AdaptiveFrameSkip as skip= to process fewer frames when the stages
+take longer than the stream allows (see basic_pipelines/frame_skip.py).
+
+Stages declared with worker=True run after the callback returns, on a thread
+pool (FramePipeline(workers=N)), so slow analytics do not block the streaming
+thread. The buffer and its Hailo objects are only valid inside the probe, so
+they get a detached context: the frame copied, the landmarks already decoded
+for ctx.keypoints(), and ctx.batch without its detection objects (ctx.roi
+raises); they cannot need MASKS. They are dropped, and counted in `dropped`,
+when max_pending frames are already queued. An exception in a worker stage ends
+that frame's worker stages and is counted in `failures` (the first one is
+printed with its traceback, `last_error` keeps the latest). With workers=0
+they run inline, in kind order like any other stage, and exceptions propagate.
+"""
+import sys
+import threading
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from basic_pipelines.detection_batch import DetectionBatch, LabelIds, extract_detections, empty_batch
+from basic_pipelines.pose_keypoints import extract_keypoints
+from basic_pipelines.stage_timing import StageTimer
+
+# What a stage needs from the frame
+FRAME = "frame"  # ctx.frame, the video frame pixels
+DETECTIONS = "detections"  # ctx.batch, a DetectionBatch
+MASKS = "masks"  # ctx.mask(i), instance segmentation masks
+LANDMARKS = "landmarks"  # ctx.keypoints(), pose landmarks
+NEEDS = (FRAME, DETECTIONS, MASKS, LANDMARKS)
+PIXEL_NEEDS = frozenset((FRAME, MASKS, LANDMARKS))  # Needs that read the caps (frame size)
+
+# Stage kinds, in the order they run
+DECODE, FILTER, ANALYTICS, RENDER, PUBLISH = KINDS = ("decode", "filter", "analytics", "render", "publish")
+
+# Built-in stages, timed before the declared ones
+BUILTIN_STAGES = ("caps", "frame", "detections")
+STAGE_CAPS, STAGE_FRAME, STAGE_DETECTIONS = range(len(BUILTIN_STAGES))
+
+# hailo module, caps and frame readers and the probe return value (same fields as contador.callback.CallbackBackend)
+PipelineBackend = namedtuple('PipelineBackend', ['hailo', 'get_caps_from_pad', 'get_numpy_from_buffer', 'probe_ok'])
+
+
+class Stage:
+    """
+    One step of a FramePipeline.
+
+    Args:
+        name: stage name, used in the timing report.
+        fn: function called with the FrameContext. FILTER stages return False to drop the frame.
+        kind: one of KINDS.
+        needs: what fn reads from the context, a subset of NEEDS.
+        worker: run on the pipeline's thread pool after the callback returns
+            (ANALYTICS, RENDER or PUBLISH stages that do not need MASKS).
+    """
+    __slots__ = ('name', 'fn', 'kind', 'needs', 'worker')
+
+    def __init__(self, name, fn, kind=ANALYTICS, needs=(), worker=False):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown stage kind {kind!r}; expected one of {', '.join(KINDS)}")
+        unknown = set(needs) - set(NEEDS)
+        if unknown:
+            raise ValueError(f"Unknown needs {sorted(unknown)}; expected some of {', '.join(NEEDS)}")
+        if worker and kind in (DECODE, FILTER):
+            raise ValueError(f"{kind} stages cannot run on a worker")
+        if worker and MASKS in needs:
+            # The masks are Hailo objects of the buffer's ROI, only valid inside the probe
+            raise ValueError("Worker stages cannot read masks; decode them in an inline stage into ctx.data")
+        needs = frozenset(needs)
+        if needs & {MASKS, LANDMARKS}:
+            needs |= {DETECTIONS}
+        self.name = name
+        self.fn = fn
+        self.kind = kind
+        self.needs = needs
+        self.worker = worker
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, kind={self.kind!r}, needs={sorted(self.needs)}, worker={self.worker})"
+
+
+class FrameContext:
+    """
+    What the stages of one frame share.
+
+    Attributes:
+        user_data: the app callback class instance.
+        count: frame count after incrementing.
+        format, width, height: caps of the pad (None if unknown or no stage needs pixels).
+        frame: frame pixels (RGB), or None when no stage needs them or use_frame is off.
+            Stages may replace it (e.g. with a resized copy).
+        batch: DetectionBatch of the frame (filters may replace it with a selection).
+        lines: text to print at the end of the frame (see print_lines).
+        data: free-form results passed from one stage to the next.
+    """
+    __slots__ = ('pad', 'buffer', 'user_data', 'backend', 'count', 'format', 'width', 'height', 'frame', 'batch',
+                 'lines', 'data', '_roi', '_keypoints')
+
+    def __init__(self, pad, buffer, user_data, backend):
+        self.pad = pad
+        self.buffer = buffer
+        self.user_data = user_data
+        self.backend = backend
+        self.count = user_data.get_count()
+        self.format = self.width = self.height = None
+        self.frame = None
+        self.batch = None
+        self.lines = []
+        self.data = {}
+        self._roi = None
+        self._keypoints = None  # (keypoints, present), decoded by detach() for worker stages
+
+    @property
+    def roi(self):
+        if self._roi is None:
+            if self.buffer is None:
+                raise RuntimeError("ctx.roi is only available inside the probe, not in worker stages")
+            self._roi = self.backend.hailo.get_roi_from_buffer(self.buffer)
+        return self._roi
+
+    def mask(self, index):
+        """Instance segmentation mask of batch row `index`, or None."""
+        masks = self.batch.detections[index].get_objects_typed(self.backend.hailo.HAILO_CONF_CLASS_MASK)
+        return masks[0] if masks else None
+
+    def keypoints(self, joints=None, return_present=False):
+        """
+        Pose keypoints of every batch row in frame pixels, (N, K, 3), and with
+        return_present the (N,) mask of rows that have landmarks (see pose_keypoints.extract_keypoints).
+        """
+        if self._keypoints is not None:
+            keypoints, present = self._keypoints
+            if joints is not None:
+                keypoints = keypoints[:, joints]
+            return (keypoints, present) if return_present else keypoints
+        return extract_keypoints(self.batch.detections, self.batch.bboxes, self.backend.hailo.HAILO_LANDMARKS,
+                                 self.width or 1, self.height or 1, joints=joints, return_present=return_present)
+
+    def detach(self, copy_frame, decode_landmarks=False):
+        """
+        Drop what is only valid inside the probe before handing the context to a worker.
+
+        The frame is copied when copy_frame is set, the landmarks are decoded
+        for keypoints() when decode_landmarks is set, and the batch keeps its
+        columns but not the detection objects.
+        """
+        if copy_frame and self.frame is not None:
+            self.frame = self.frame.copy()
+        else:
+            self.frame = None
+        batch = self.batch
+        if batch is not None:
+            if decode_landmarks:
+                self._keypoints = self.keypoints(return_present=True)
+            self.batch = DetectionBatch([None] * len(batch), batch.labels, batch.class_ids, batch.confidences,
+                                        batch.bboxes, batch.track_ids)
+        self.pad = self.buffer = self._roi = None
+
+
+class FramePipeline:
+    """
+    Runs a list of stages as a pad-probe callback.
+
+    Args:
+        stages: Stage objects (any order; they run by kind).
+        backend: PipelineBackend (or contador.callback.CallbackBackend).
+        workers: threads for worker stages (0 runs them inline, in kind order like the other stages).
+        max_pending: frames queued for the workers before new ones are dropped (default 2 * workers).
+        timer: StageTimer to use; by default one from HAILO_STAGE_TIMING with the built-in and inline stage names.
+        skip: AdaptiveFrameSkip deciding which frames run the stages (the frame count is always incremented).
+    """
+
+    def __init__(self, stages, backend, workers=0, max_pending=None, timer=None, skip=None):
+        stages = sorted(stages, key=lambda stage: KINDS.index(stage.kind))
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names) or set(names) & set(BUILTIN_STAGES):
+            raise ValueError(f"Stage names must be unique and not one of {', '.join(BUILTIN_STAGES)}")
+        self.backend = backend
+        self.skip = skip
+        offload = workers > 0
+        # Filters that need nothing run before the caps are read
+        self.early = [stage for stage in stages if stage.kind == FILTER and not stage.needs]
+        self.inline = [stage for stage in stages if stage not in self.early and not (offload and stage.worker)]
+        self.offloaded = [stage for stage in stages if offload and stage.worker]
+        self.needs = frozenset().union(*(stage.needs for stage in stages))
+        self.worker_needs = frozenset().union(*(stage.needs for stage in self.offloaded))
+
+        self.timer = timer if timer is not None else StageTimer.from_env(
+            BUILTIN_STAGES + tuple(stage.name for stage in self.inline))
+        self._inline = [(stage, self.timer.index(stage.name)) for stage in self.inline]
+        self.worker_timer = StageTimer([stage.name for stage in self.offloaded]) if self.offloaded else None
+        self._lock = threading.Lock()  # Worker timer and failure counters
+
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="frame-stage") if self.offloaded else None
+        self._pending = threading.BoundedSemaphore(max_pending or 2 * workers) if self.offloaded else None
+        self.dropped = 0
+        self.failures = 0
+        self.last_error = None
+
+    def callback(self, pad, info, user_data):
+        """The pad-probe callback: pass it to the GStreamer app instead of app_callback."""
+        backend = self.backend
+        buffer = info.get_buffer()
+        if buffer is None:
+            return backend.probe_ok
+        user_data.increment()
+        skip = self.skip
+        if skip is None:
+            return self._process(pad, buffer, user_data)
+        if not skip.tick(pad):
+            return backend.probe_ok
+        result = self._process(pad, buffer, user_data)
+        skip.done()
+        return result
+
+    def _process(self, pad, buffer, user_data):
+        backend = self.backend
+        ctx = FrameContext(pad, buffer, user_data, backend)
+        for stage in self.early:
+            if stage.fn(ctx) is False:
+                return backend.probe_ok
+
+        timer = self.timer
+        t = timer.begin()
+        needs = self.needs
+        if needs & PIXEL_NEEDS:
+            ctx.format, ctx.width, ctx.height = backend.get_caps_from_pad(pad)
+            t = timer.lap(STAGE_CAPS, t)
+        if FRAME in needs and user_data.use_frame and None not in (ctx.format, ctx.width, ctx.height):
+            ctx.frame = backend.get_numpy_from_buffer(buffer, ctx.format, ctx.width, ctx.height)
+            t = timer.lap(STAGE_FRAME, t)
+        if DETECTIONS in needs:
+            detections = ctx.roi.get_objects_typed(backend.hailo.HAILO_DETECTION)
+            ctx.batch = extract_detections(detections, backend.hailo.HAILO_UNIQUE_ID) if detections else empty_batch()
+            t = timer.lap(STAGE_DETECTIONS, t)
+
+        for stage, index in self._inline:
+            if FRAME in stage.needs and ctx.frame is None:
+                continue
+            keep = stage.fn(ctx)
+            t = timer.lap(index, t)
+            if keep is False and stage.kind == FILTER:
+                timer.end_frame()
+                return backend.probe_ok
+        timer.end_frame()
+
+        if self.offloaded:
+            if self._pending.acquire(blocking=False):
+                ctx.detach(FRAME in self.worker_needs, LANDMARKS in self.worker_needs)
+                self._executor.submit(self._run_offloaded, ctx).add_done_callback(self._finished)
+            else:
+                self.dropped += 1
+        return backend.probe_ok
+
+    def _run_offloaded(self, ctx):
+        timer = self.worker_timer
+        for index, stage in enumerate(self.offloaded):
+            if FRAME in stage.needs and ctx.frame is None:
+                continue
+            t = timer.begin()
+            stage.fn(ctx)
+            with self._lock:
+                timer.lap(index, t)
+
+    def _finished(self, future):
+        """Done-callback of the worker futures: account for failures, then free the slot."""
+        try:
+            error = None if future.cancelled() else future.exception()
+            if error is not None:
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = error
+                    first = self.failures == 1
+                if first:
+                    print("Worker stage failed (further failures are only counted in FramePipeline.failures):",
+                          file=sys.stderr)
+                    traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+        finally:
+            self._pending.release()
+
+    def close(self, wait=True):
+        """Stop the worker pool (after finishing the queued frames when wait is True)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+# -- Common stages -------------------------------------------------------------------------------
+
+def skip_frames(n):
+    """FILTER: process one frame in n (before anything is decoded)."""
+    return Stage("skip", lambda ctx: ctx.count % n == 0, FILTER)
+
+
+def keep_labels(*labels, min_confidence=0.0):
+    """FILTER: keep only the detections with these labels (and at least min_confidence) in ctx.batch."""
+    label_ids = LabelIds(*labels)
+
+    def keep(ctx):
+        batch = ctx.batch
+        selected = label_ids.match(batch)
+        if min_confidence:
+            selected &= batch.confidences >= min_confidence
+        ctx.batch = batch.select(selected)
+
+    return Stage("labels", keep, FILTER, needs=(DETECTIONS,))
+
+
+def publish_frame():
+    """PUBLISH: convert the frame to BGR and hand it to user_data.set_frame."""
+    def publish(ctx):
+        ctx.user_data.set_frame(cv2.cvtColor(ctx.frame, cv2.COLOR_RGB2BGR))
+
+    return Stage("publish", publish, PUBLISH, needs=(FRAME,))
+
+
+def print_lines():
+    """PUBLISH: print the frame count and the lines the stages collected in ctx.lines."""
+    def print_frame(ctx):
+        ctx.lines.insert(0, f"Frame count: {ctx.count}")
+        print("\n".join(ctx.lines) + "\n")
+
+    return Stage("print", print_frame, PUBLISH)
+
@@ -0,0 +1,182 @@
+"""
+Adaptive frame skipping driven by the measured callback latency.
+
+Callbacks that cannot keep up with the stream used a fixed decimation
+(frame_skip = 2, update_rate = 4): too much work on a busy scene stalls the
+streaming thread, and too little wastes frames on an empty one.
+AdaptiveFrameSkip measures how long each processed frame takes (smoothed) and
+compares it with the time available for it: `skip` frame intervals, the frame
+interval coming from the caps framerate. When processing needs more than
+`budget` of that time for `patience` frames in a row, the decimation goes up
+(straight to the level the cost needs); when it would fit in
+`lower * budget` one level down, it goes down one step. The gap between the
+two thresholds is the hysteresis that keeps it from flapping.
+
+    frame_skip = AdaptiveFrameSkip(skip=2, max_skip=8)
+
+    def app_callback(pad, info, user_data):
+        user_data.increment()              # Bookkeeping runs on every frame
+        if not frame_skip.tick(pad):       # Skipped frame
+            return Gst.PadProbeReturn.OK
+        ...                                # Heavy processing
+        frame_skip.done()
+        return Gst.PadProbeReturn.OK
+
+FramePipeline(stages, backend, skip=frame_skip) does the tick/done calls
+itself. The current decimation is in `skip`, and stats() / metrics() expose it
+for a StatsSink or a MetricsServer. Not thread-safe: tick and done must be
+called from the streaming thread.
+"""
+import math
+from time import perf_counter
+
+from basic_pipelines.metrics_server import Metric, COUNTER, GAUGE, sample
+
+
+def pad_framerate(pad):
+    """Framerate of the pad's current caps in frames per second, or None (unknown or variable)."""
+    get_current_caps = getattr(pad, "get_current_caps", None)
+    caps = get_current_caps() if get_current_caps is not None else None
+    if caps is None or caps.get_size() == 0:
+        return None
+    found, numerator, denominator = caps.get_structure(0).get_fraction("framerate")
+    if not found or numerator <= 0 or denominator <= 0:
+        return None
+    return numerator / denominator
+
+
+class AdaptiveFrameSkip:
+    """
+    Per-frame processing decimation that follows the callback cost.
+
+    Args:
+        skip: initial decimation (process one frame in `skip`).
+        min_skip, max_skip: bounds of the decimation.
+        budget: fraction of the available time (skip x frame interval) the processing may use.
+        lower: the decimation goes down only if the cost fits in lower x budget one level down.
+        patience: processed frames in a row over (or under) the thresholds before changing.
+        smoothing: weight of the newest sample in the moving averages.
+        fps: frame rate of the stream; by default read from the caps on the first tick,
+            or measured from the frame arrivals when the caps have none.
+        clock: time source in seconds.
+    """
+
+    def __init__(self, skip=1, min_skip=1, max_skip=8, budget=0.8, lower=0.7, patience=3, smoothing=0.2, fps=None,
+                 clock=perf_counter):
+        if not 1 <= min_skip <= max_skip:
+            raise ValueError("min_skip and max_skip must satisfy 1 <= min_skip <= max_skip")
+        if not 0 < lower < 1 or budget <= 0:
+            raise ValueError("budget must be positive and lower between 0 and 1")
+        self.skip = min(max(int(skip), min_skip), max_skip)
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.budget = budget
+        self.lower = lower
+        self.patience = patience
+        self.smoothing = smoothing
+        self.clock = clock
+        self.frame_interval = 1.0 / fps if fps else None  # Seconds between frames
+        self._measured_interval = fps is None  # Until the caps give a framerate
+        self._caps_checked = fps is not None
+        self.cost = 0.0  # Smoothed processing seconds per processed frame
+        self._last_arrival = None
+        self._phase = 0
+        self._start = None
+        self._over = self._under = 0
+        self._samples = 0
+        self.frames = 0
+        self.processed = 0
+        self.changes = 0
+
+    @property
+    def skipped(self):
+        return self.frames - self.processed
+
+    @property
+    def load(self):
+        """Smoothed cost over the time available per processed frame (1.0 = no time left)."""
+        if not self.frame_interval:
+            return 0.0
+        return self.cost / (self.skip * self.frame_interval)
+
+    def tick(self, pad=None):
+        """Count a frame; True if this one should be processed (then call done() when finished)."""
+        now = self.clock()
+        if not self._caps_checked and pad is not None:
+            self._caps_checked = True
+            fps = pad_framerate(pad)
+            if fps:
+                self.frame_interval = 1.0 / fps
+                self._measured_interval = False
+        if self._measured_interval and self._last_arrival is not None:
+            # Arrivals also slow down when the callback blocks the stream, so this is only a fallback
+            interval = now - self._last_arrival
+            if self.frame_interval is None:
+                self.frame_interval = interval
+            else:
+                self.frame_interval += self.smoothing * (interval - self.frame_interval)
+        self._last_arrival = now
+        self.frames += 1
+
+        self._phase += 1
+        if self._phase < self.skip:
+            return False
+        self._phase = 0
+        self._start = now
+        self.processed += 1
+        return True
+
+    def done(self):
+        """Record the cost of the frame admitted by the last tick() and adapt the decimation."""
+        if self._start is None:
+            return
+        elapsed = self.clock() - self._start
+        self._start = None
+        self._samples += 1
+        if self._samples == 1:
+            self.cost = elapsed
+        else:
+            self.cost += self.smoothing * (elapsed - self.cost)
+        if not self.frame_interval:
+            return
+
+        available = self.budget * self.frame_interval
+        if self.cost > available * self.skip and self.skip < self.max_skip:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.patience:
+                needed = math.ceil(self.cost / available)
+                self._set_skip(min(max(needed, self.skip + 1), self.max_skip))
+        elif self.skip > self.min_skip and self.cost < self.lower * available * (self.skip - 1):
+            self._under += 1
+            self._over = 0
+            if self._under >= self.patience:
+                self._set_skip(self.skip - 1)
+        else:
+            self._over = self._under = 0
+
+    def _set_skip(self, skip):
+        self.skip = skip
+        self._over = self._under = 0
+        self.changes += 1
+
+    def stats(self):
+        """Plain values for a StatsSink source."""
+        return {
+            "Frame skip": self.skip,
+            "Callback cost ms": round(self.cost * 1000, 2),
+            "Callback load": round(self.load, 2),
+        }
+
+    def metrics(self, prefix="frame_skip"):
+        """List of Metric for a MetricsServer."""
+        return [
+            Metric(f"{prefix}_decimation", GAUGE, "Frames per processed frame", [sample(self.skip)]),
+            Metric(f"{prefix}_cost_seconds", GAUGE, "Smoothed processing time per processed frame",
+                   [sample(self.cost)]),
+            Metric(f"{prefix}_frame_interval_seconds", GAUGE, "Time between frames",
+                   [sample(self.frame_interval or 0.0)]),
+            Metric(f"{prefix}_frames_total", COUNTER, "Frames seen, processed or skipped", [
+                sample(self.processed, result="processed"), sample(self.skipped, result="skipped")]),
+            Metric(f"{prefix}_changes_total", COUNTER, "Decimation changes", [sample(self.changes)]),
+        ]
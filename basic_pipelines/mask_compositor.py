@@ -0,0 +1,101 @@
+"""
+Single-pass compositing of instance segmentation masks onto a frame.
+
+The segmentation callbacks used to allocate a full-frame np.zeros_like(frame)
+for every person, copy the mask with np.array(mask.get_data()), and run
+cv2.addWeighted over the whole frame once per detection, so the cost grew with
+people x frame size. MaskCompositor keeps one colour overlay buffer, reused
+across frames: add() resizes and thresholds each mask, and blend() writes the
+person's colour (from a track id -> colour lookup table) into the overlay only
+inside the mask's ROI and mixes that ROI into the frame, one mask at a time.
+
+    compositor = MaskCompositor(COLORS, alpha=0.5)    # Once, e.g. in user_data
+    compositor.begin(width, height)                   # Every frame
+    for i in people:
+        compositor.add(masks[0], batch.bboxes[i], track_id)
+    frame = compositor.blend(frame)
+
+Masks are blended one after the other, in the order they were added, with
+the same cv2.addWeighted(frame, 1, overlay, alpha, 0) as the per-mask loop, so
+the output is pixel-identical to it, also where masks overlap.
+"""
+import numpy as np
+import cv2
+
+
+class MaskCompositor:
+    """
+    Colour overlay buffer and track id -> colour lookup table for mask overlays.
+
+    Args:
+        colors: colours per track id (track_id % len(colors)), as (c0, c1, c2) in frame channel order.
+        alpha: weight of the mask colour added to the frame (like cv2.addWeighted(frame, 1, overlay, alpha, 0)).
+        threshold: mask confidence above which a pixel belongs to the person.
+    """
+
+    def __init__(self, colors, alpha=0.5, threshold=0.5):
+        if not colors:
+            raise ValueError("colors must not be empty")
+        # cv2 scalars, so writing a colour into an ROI is a single masked cv2.add
+        self.lut = [tuple(float(c) for c in color) + (0.0,) for color in colors]
+        self.alpha = alpha
+        self.threshold = threshold
+        self.overlay = np.zeros((0, 0, 3), dtype=np.uint8)
+        self._pending = []  # (y0, y1, x0, x1, inside, colour) per mask added since begin()
+
+    @property
+    def masks(self):
+        return len(self._pending)
+
+    @property
+    def shape(self):
+        return self.overlay.shape[:2]
+
+    def begin(self, width, height):
+        """Start a frame: drop the masks of the previous one (and reallocate if the size changed)."""
+        if self.overlay.shape[:2] != (height, width):
+            self.overlay = np.zeros((height, width, 3), dtype=np.uint8)
+        self._pending.clear()
+
+    def add(self, mask, bbox, track_id):
+        """
+        Queue a mask for the next blend().
+
+        Args:
+            mask: hailo mask object (get_width, get_height, get_data), bbox-relative.
+            bbox: normalized (xmin, ymin, xmax, ymax) of the detection.
+            track_id: selects the colour.
+
+        Returns:
+            False if the ROI is empty or outside the frame.
+        """
+        frame_height, frame_width = self.overlay.shape[:2]
+        xmin, ymin, xmax, ymax = bbox
+        roi_width = int((xmax - xmin) * frame_width)
+        roi_height = int((ymax - ymin) * frame_height)
+        x_min, y_min = int(xmin * frame_width), int(ymin * frame_height)
+        # Clip the ROI to the frame; (dx, dy) is where the clipped part starts inside the resized mask
+        x0, y0 = max(x_min, 0), max(y_min, 0)
+        x1, y1 = min(x_min + roi_width, frame_width), min(y_min + roi_height, frame_height)
+        if roi_width <= 0 or roi_height <= 0 or x1 <= x0 or y1 <= y0:
+            return False
+        dx, dy = x0 - x_min, y0 - y_min
+
+        # No copy when the binding already returns a float32 array
+        data = np.asarray(mask.get_data(), dtype=np.float32).reshape(mask.get_height(), mask.get_width())
+        resized = cv2.resize(data, (roi_width, roi_height), interpolation=cv2.INTER_LINEAR)
+        inside = resized[dy:dy + y1 - y0, dx:dx + x1 - x0] > self.threshold
+        self._pending.append((y0, y1, x0, x1, inside.view(np.uint8), self.lut[track_id % len(self.lut)]))
+        return True
+
+    def blend(self, frame):
+        """Blend the masks added since begin() into frame (in place) and return it."""
+        overlay = self.overlay
+        for y0, y1, x0, x1, inside, colour in self._pending:
+            # Outside the mask the overlay is 0 and addWeighted leaves the frame as it was
+            roi = overlay[y0:y1, x0:x1]
+            roi[:] = 0
+            cv2.add(roi, colour, dst=roi, mask=inside)
+            region = frame[y0:y1, x0:x1]
+            cv2.addWeighted(region, 1, roi, self.alpha, 0, dst=region)
+        return frame
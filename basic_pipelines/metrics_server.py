@@ -0,0 +1,165 @@
+"""
+Minimal HTTP endpoint serving pipeline metrics in Prometheus text format and JSON.
+
+The server runs on its own thread (http.server.ThreadingHTTPServer). On each
+scrape it calls a `collect` function that reads the callback's plain counters
+directly: the callback never takes a lock or does any work for the endpoint,
+so a slow scrape cannot block the GStreamer streaming thread.
+
+    def collect():
+        return [Metric("frames_total", COUNTER, "Frames processed", [sample(user_data.get_count())])]
+
+    server = MetricsServer(collect, port=9100).start()
+
+Endpoints:
+    /metrics       Prometheus text exposition format (version 0.0.4)
+    /metrics.json  the same metrics as a JSON object
+"""
+import json
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# One metric family. samples is a list of (suffix, labels, value); suffix is ""
+# for counters and gauges and "_bucket", "_sum" or "_count" for histograms.
+Metric = namedtuple("Metric", ["name", "kind", "help", "samples"])
+
+# Default histogram bounds for callback latencies, in microseconds
+LATENCY_BOUNDS_US = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+def sample(value, **labels):
+    """A counter or gauge sample."""
+    return ("", labels, value)
+
+
+def stage_timer_metric(name, timer, bounds_us=LATENCY_BOUNDS_US, help="Callback stage duration in seconds"):
+    """Histogram metric family (one `stage` label per stage) from a StageTimer."""
+    samples = []
+    for stage, (counts, count, total_seconds) in timer.cumulative(bounds_us).items():
+        for bound, n in zip(bounds_us, counts):
+            samples.append(("_bucket", {"stage": stage, "le": _format_value(bound / 1e6)}, n))
+        samples.append(("_bucket", {"stage": stage, "le": "+Inf"}, count))
+        samples.append(("_sum", {"stage": stage}, total_seconds))
+        samples.append(("_count", {"stage": stage}, count))
+    return Metric(name, HISTOGRAM, help, samples)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        if value == float("-inf"):
+            return "-Inf"
+        return "NaN" if value != value else repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(metrics):
+    """Prometheus text exposition of a list of Metric."""
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in metric.samples:
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{metric.name}{suffix}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{metric.name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_json(metrics):
+    """
+    JSON-friendly dict of a list of Metric.
+
+    Unlabeled counters and gauges map to their value, labeled ones to a list of
+    {"labels", "value"}; histograms map to {label value: {"count", "sum", "buckets"}}.
+    """
+    result = {}
+    for metric in metrics:
+        if metric.kind == HISTOGRAM:
+            series = {}
+            for suffix, labels, value in metric.samples:
+                labels = dict(labels)
+                le = labels.pop("le", None)
+                key = ",".join(str(v) for v in labels.values())
+                entry = series.setdefault(key, {"count": 0, "sum": 0.0, "buckets": {}})
+                if suffix == "_bucket":
+                    entry["buckets"][le] = value
+                else:
+                    entry[suffix[1:]] = value
+            result[metric.name] = series
+        elif len(metric.samples) == 1 and not metric.samples[0][1]:
+            result[metric.name] = metric.samples[0][2]
+        else:
+            result[metric.name] = [{"labels": labels, "value": value} for _, labels, value in metric.samples]
+    return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set on the per-server subclass created by MetricsServer
+    collect = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = render_prometheus(self.collect()).encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(render_json(self.collect())).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+class MetricsServer:
+    """
+    Serves the metrics returned by `collect` over HTTP from a background thread.
+
+    Args:
+        collect: function returning a list of Metric; called once per scrape,
+            from the server thread.
+        host: address to bind.
+        port: port to bind (0 picks a free port, see the `port` attribute).
+    """
+
+    def __init__(self, collect, host="0.0.0.0", port=9100):
+        handler = type("MetricsHandler", (_Handler,), {"collect": staticmethod(collect)})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        """Start serving in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
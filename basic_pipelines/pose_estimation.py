@@ -11,6 +11,10 @@ from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_p
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline import GStreamerPoseEstimationApp
 
+from basic_pipelines.frame_pipeline import (FramePipeline, PipelineBackend, Stage, ANALYTICS, RENDER, FRAME, LANDMARKS,
+                                            keep_labels, publish_frame, print_lines)
+from basic_pipelines.pose_keypoints import EYES, KEYPOINTS
+
 # -----------------------------------------------------------------------------------------------
 # User-defined class to be used in the callback function
 # -----------------------------------------------------------------------------------------------
@@ -18,97 +22,49 @@ from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline i
 class user_app_callback_class(app_callback_class):
     def __init__(self):
         super().__init__()
+        # Per-stage callback latency (set HAILO_STAGE_TIMING=N to print a report every N seconds)
+        self.timer = PIPELINE.timer
 
 # -----------------------------------------------------------------------------------------------
-# User-defined callback function
+# User-defined callback stages
 # -----------------------------------------------------------------------------------------------
 
-# This is the callback function that will be called when data is available from the pipeline
-def app_callback(pad, info, user_data):
-    # Get the GstBuffer from the probe info
-    buffer = info.get_buffer()
-    # Check if the buffer is valid
-    if buffer is None:
-        return Gst.PadProbeReturn.OK
-
-    # Using the user_data to count the number of frames
-    user_data.increment()
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
-
-    # Get the caps from the pad
-    format, width, height = get_caps_from_pad(pad)
-
-    # If the user_data.use_frame is set to True, we can get the video frame from the buffer
-    frame = None
-    if user_data.use_frame and format is not None and width is not None and height is not None:
-        # Get video frame
-        frame = get_numpy_from_buffer(buffer, format, width, height)
-
-    # Get the detections from the buffer
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-
-    # Get the keypoints
-    keypoints = get_keypoints()
-
-    # Parse the detections
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        if label == "person":
-            # Get track ID
-            track_id = 0
-            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-            if len(track) == 1:
-                track_id = track[0].get_id()
-            string_to_print += (f"Detection: ID: {track_id} Label: {label} Confidence: {confidence:.2f}\n")
-
-            # Pose estimation landmarks from detection (if available)
-            landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
-            if len(landmarks) != 0:
-                points = landmarks[0].get_points()
-                for eye in ['left_eye', 'right_eye']:
-                    keypoint_index = keypoints[eye]
-                    point = points[keypoint_index]
-                    x = int((point.x() * bbox.width() + bbox.xmin()) * width)
-                    y = int((point.y() * bbox.height() + bbox.ymin()) * height)
-                    string_to_print += f"{eye}: x: {x:.2f} y: {y:.2f}\n"
-                    if user_data.use_frame:
-                        cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
-
-    if user_data.use_frame:
-        # Convert the frame to BGR
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        user_data.set_frame(frame)
-
-    print(string_to_print)
-    return Gst.PadProbeReturn.OK
+# Called for every frame with ctx.batch holding the persons
+def read_eyes(ctx):
+    people = ctx.batch
+    track_ids = np.maximum(people.track_ids, 0)  # 0 for detections without a track
+    # Pose estimation landmarks (if available) of every person at once, in frame pixels: (N, 2, 3)
+    eyes, has_pose = ctx.keypoints(joints=EYES, return_present=True)
+    has_pose = has_pose.tolist()
+    eye_pixels = eyes[..., :2].astype(np.int32).tolist()
+    for i in range(len(people)):
+        ctx.lines.append(f"Detection: ID: {int(track_ids[i])} Label: person Confidence: {people.confidences[i]:.2f}")
+        if not has_pose[i]:
+            continue
+        for eye, (x, y) in zip(('left_eye', 'right_eye'), eye_pixels[i]):
+            ctx.lines.append(f"{eye}: x: {x:.2f} y: {y:.2f}")
+    ctx.data["eyes"] = [pixels for pixels, pose in zip(eye_pixels, has_pose) if pose]
+
+# Only called when the user_data.use_frame is set to True
+def draw_eyes(ctx):
+    for person in ctx.data["eyes"]:
+        for x, y in person:
+            cv2.circle(ctx.frame, (x, y), 5, (0, 255, 0), -1)
+
+# The callback: keep the persons, read their eyes, draw them, then publish the frame and print
+PIPELINE = FramePipeline([
+    keep_labels("person"),
+    Stage("eyes", read_eyes, ANALYTICS, needs=(LANDMARKS,)),
+    Stage("draw", draw_eyes, RENDER, needs=(FRAME,)),
+    publish_frame(),
+    print_lines(),
+], PipelineBackend(hailo, get_caps_from_pad, get_numpy_from_buffer, Gst.PadProbeReturn.OK))
+app_callback = PIPELINE.callback
 
 # This function can be used to get the COCO keypoints coorespondence map
 def get_keypoints():
     """Get the COCO keypoints and their left/right flip coorespondence map."""
-    keypoints = {
-        'nose': 0,
-        'left_eye': 1,
-        'right_eye': 2,
-        'left_ear': 3,
-        'right_ear': 4,
-        'left_shoulder': 5,
-        'right_shoulder': 6,
-        'left_elbow': 7,
-        'right_elbow': 8,
-        'left_wrist': 9,
-        'right_wrist': 10,
-        'left_hip': 11,
-        'right_hip': 12,
-        'left_knee': 13,
-        'right_knee': 14,
-        'left_ankle': 15,
-        'right_ankle': 16,
-    }
-
-    return keypoints
+    return dict(KEYPOINTS)
 
 if __name__ == "__main__":
     project_root = Path(__file__).resolve().parent.parent
@@ -0,0 +1,146 @@
+"""
+Vectorized decoding of pose landmarks into one (N, K, 3) array per frame.
+
+Pose callbacks usually rebuild the COCO keypoint dict on every frame, then walk
+landmarks[0].get_points() per person and convert each bbox-relative point to
+pixels with scalar math. extract_keypoints() reads the points of every person
+once into a flat list and maps them to frame pixels with one broadcasted bbox
+transform:
+
+    batch = extract_detections(roi.get_objects_typed(hailo.HAILO_DETECTION), hailo.HAILO_UNIQUE_ID)
+    people = batch.select(PERSON.match(batch))       # PERSON = LabelIds("person")
+    keypoints = extract_keypoints(people.detections, people.bboxes, hailo.HAILO_LANDMARKS, width, height)
+    wrists = keypoints[:, WRISTS]                      # (N, 2, 3): x, y, confidence
+    visible = wrists[..., 2] >= 0.5
+
+Passing joints= reads only those points (the rest are never touched), which is
+what callbacks that only need a few joints should do:
+
+    wrists = extract_keypoints(people.detections, people.bboxes, hailo.HAILO_LANDMARKS, width, height, joints=WRISTS)
+"""
+import numpy as np
+
+# COCO keypoint order used by the pose estimation models
+KEYPOINT_NAMES = (
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow', 'left_wrist', 'right_wrist',
+    'left_hip', 'right_hip', 'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+)
+NUM_KEYPOINTS = len(KEYPOINT_NAMES)
+KEYPOINTS = {name: index for index, name in enumerate(KEYPOINT_NAMES)}
+
+# Index tables for slicing the keypoint axis
+EYES = np.array([KEYPOINTS['left_eye'], KEYPOINTS['right_eye']])
+WRISTS = np.array([KEYPOINTS['left_wrist'], KEYPOINTS['right_wrist']])
+ALL_KEYPOINTS = np.arange(NUM_KEYPOINTS)
+# FLIP[i] is the keypoint that i becomes when the image is mirrored (left <-> right)
+FLIP = np.array([KEYPOINTS[name.replace('left_', 'tmp_').replace('right_', 'left_').replace('tmp_', 'right_')]
+                 for name in KEYPOINT_NAMES])
+
+X, Y, CONFIDENCE = range(3)  # Last axis of the keypoint array
+
+# Up to this many joints the points go to pixels with scalar math: for a handful of
+# values per person the broadcasted transform costs more than it saves
+SCALAR_JOINTS = 4
+
+
+def extract_keypoints(detections, bboxes, landmarks_type, width=1, height=1, joints=None, return_present=False):
+    """
+    Read the pose landmarks of detections into a float32 (N, K, 3) array of x, y, confidence.
+
+    Args:
+        detections: detection objects, e.g. DetectionBatch.detections.
+        bboxes: (N, 4) normalized xmin, ymin, xmax, ymax of those detections (DetectionBatch.bboxes).
+        landmarks_type: hailo.HAILO_LANDMARKS.
+        width, height: frame size in pixels (1, 1 keeps normalized frame coordinates).
+        joints: keypoint indices to read (e.g. WRISTS); None reads all NUM_KEYPOINTS.
+        return_present: also return an (N,) bool array, True for the detections that have landmarks.
+
+    Detections without landmarks, or with fewer points than requested, get
+    zeros (confidence 0) in the missing rows; a detected point can also have
+    confidence 0, so use return_present to tell them apart. Pixel coordinates
+    stay float; .astype(np.int32) truncates them like the int() of the
+    per-point loop.
+    """
+    full = joints is None
+    wanted = list(range(NUM_KEYPOINTS)) if full else np.asarray(joints).tolist()
+    count = len(wanted)
+    if not len(detections):
+        keypoints, present = np.zeros((0, count, 3), dtype=np.float32), np.zeros(0, dtype=bool)
+    elif count <= SCALAR_JOINTS:
+        keypoints, present = _extract_few(detections, bboxes, landmarks_type, width, height, wanted)
+    else:
+        keypoints, present = _extract_many(detections, bboxes, landmarks_type, width, height, wanted, full)
+    return (keypoints, present) if return_present else keypoints
+
+
+def _extract_many(detections, bboxes, landmarks_type, width, height, wanted, full):
+    """extract_keypoints for many joints: one flat list, pixels with one broadcasted transform."""
+    count = len(wanted)
+    top = max(wanted)
+    values = []  # Flat x, y, confidence, ... of the rows in `rows`
+    rows = []
+    for row, detection in enumerate(detections):
+        landmarks = detection.get_objects_typed(landmarks_type)
+        if not landmarks:
+            continue
+        points = landmarks[0].get_points()
+        if full and len(points) == NUM_KEYPOINTS:
+            for point in points:
+                values += (point.x(), point.y(), point.confidence())
+        elif top < len(points):
+            for index in wanted:
+                point = points[index]
+                values += (point.x(), point.y(), point.confidence())
+        else:
+            for index in wanted:
+                if index < len(points):
+                    point = points[index]
+                    values += (point.x(), point.y(), point.confidence())
+                else:
+                    values += (0.0, 0.0, 0.0)
+        rows.append(row)
+    decoded = np.array(values, dtype=np.float32).reshape(len(rows), count, 3)
+    complete = len(rows) == len(detections)
+    present = np.zeros(len(detections), dtype=bool)
+    present[rows] = True
+
+    # Bbox-relative -> frame pixels for every point at once
+    boxes = np.asarray(bboxes, dtype=np.float32)
+    if not complete:
+        boxes = boxes[rows]
+    scale = np.array([width, height], dtype=np.float32)
+    origin = boxes[:, :2] * scale
+    size = boxes[:, 2:] * scale - origin
+    xy = decoded[..., :2]
+    xy *= size[:, None]
+    xy += origin[:, None]
+    if complete:
+        return decoded, present
+    keypoints = np.zeros((len(detections), count, 3), dtype=np.float32)
+    keypoints[rows] = decoded
+    return keypoints, present
+
+
+def _extract_few(detections, bboxes, landmarks_type, width, height, wanted):
+    """extract_keypoints for a few joints: pixels computed per point, one array at the end."""
+    values = []
+    present = []
+    missing = (0.0, 0.0, 0.0)
+    for detection, (xmin, ymin, xmax, ymax) in zip(detections, np.asarray(bboxes, dtype=np.float32).tolist()):
+        landmarks = detection.get_objects_typed(landmarks_type)
+        present.append(bool(landmarks))
+        if not landmarks:
+            values += missing * len(wanted)
+            continue
+        points = landmarks[0].get_points()
+        # Same origin + size form as the broadcasted transform
+        x0, y0 = xmin * width, ymin * height
+        x_size, y_size = xmax * width - x0, ymax * height - y0
+        for index in wanted:
+            if index < len(points):
+                point = points[index]
+                values += (point.x() * x_size + x0, point.y() * y_size + y0, point.confidence())
+            else:
+                values += missing
+    return np.array(values, dtype=np.float32).reshape(len(detections), len(wanted), 3), np.array(present, dtype=bool)
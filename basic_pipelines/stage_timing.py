@@ -0,0 +1,188 @@
+"""
+Per-stage latency instrumentation for the pad-probe callbacks.
+
+A StageTimer keeps one fixed-size log-linear histogram per stage (8 buckets
+per power of two, so any percentile is within ~12% of the true value) plus a
+running sum and max. Recording a stage is a perf_counter_ns() call and a few
+integer operations on preallocated lists, so it is cheap enough to leave on in
+production. Percentiles are only computed when a report is requested.
+
+Usage inside a callback:
+
+    timer = user_data.timer
+    t = timer.begin()
+    format, width, height = get_caps_from_pad(pad)
+    t = timer.lap(CAPS, t)
+    ...
+    timer.end_frame()
+
+Set the HAILO_STAGE_TIMING environment variable to a number of seconds to
+print a report periodically from the callback.
+"""
+import os
+from time import perf_counter_ns
+
+import numpy as np
+
+SUB_BUCKETS = 8  # Buckets per power of two
+NUM_BUCKETS = 40 * SUB_BUCKETS  # Up to ~2^40 ns (about 18 minutes)
+TOTAL = "total"
+
+
+def bucket_of(ns):
+    """Histogram bucket of a duration in nanoseconds."""
+    if ns < 2 * SUB_BUCKETS:
+        return ns if ns > 0 else 0
+    shift = ns.bit_length() - 4
+    bucket = (shift << 3) + (ns >> shift)
+    return bucket if bucket < NUM_BUCKETS else NUM_BUCKETS - 1
+
+
+def bucket_bounds(bucket):
+    """Lower and upper bound (ns) of a histogram bucket."""
+    if bucket < 2 * SUB_BUCKETS:
+        return bucket, bucket + 1
+    shift = (bucket >> 3) - 1
+    mantissa = (bucket & 7) + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+# Bucket midpoints, used to turn histogram counts into percentiles
+_BUCKET_MID_US = np.array([sum(bucket_bounds(b)) / 2 / 1000 for b in range(NUM_BUCKETS)])
+# Bucket upper bounds, used to regroup histograms into coarser cumulative buckets
+_BUCKET_HIGH_NS = np.array([bucket_bounds(b)[1] for b in range(NUM_BUCKETS)])
+
+
+class StageTimer:
+    """
+    Per-stage duration histograms for a callback.
+
+    Args:
+        stages: stage names, in the order they run. A "total" stage for the
+            whole callback is appended automatically.
+        report_every: seconds between periodic reports printed by end_frame
+            (None disables periodic reports).
+        report_fn: function that receives the summary dict; defaults to
+            printing one line per stage.
+    """
+
+    def __init__(self, stages, report_every=None, report_fn=None):
+        self.stages = tuple(stages) + (TOTAL,)
+        self.total_index = len(self.stages) - 1
+        self.report_every = report_every
+        self.report_fn = report_fn if report_fn is not None else print_summary
+        self._hist = [[0] * NUM_BUCKETS for _ in self.stages]
+        self._sum = [0] * len(self.stages)
+        self._max = [0] * len(self.stages)
+        self._count = [0] * len(self.stages)
+        self._frame_start = 0
+        self._next_report = None
+
+    @classmethod
+    def from_env(cls, stages, report_fn=None):
+        """Create a timer whose report interval comes from HAILO_STAGE_TIMING (seconds)."""
+        value = os.environ.get("HAILO_STAGE_TIMING")
+        return cls(stages, report_every=float(value) if value else None, report_fn=report_fn)
+
+    def index(self, name):
+        """Index of a stage name, for use with lap/record."""
+        return self.stages.index(name)
+
+    def begin(self):
+        """Start timing a frame; returns the start timestamp for the first lap."""
+        now = perf_counter_ns()
+        self._frame_start = now
+        return now
+
+    def record(self, stage, ns):
+        """Add one duration (in ns) to a stage."""
+        # bucket_of, inlined to keep the hot path to one call
+        if ns < 2 * SUB_BUCKETS:
+            bucket = ns if ns > 0 else 0
+        else:
+            shift = ns.bit_length() - 4
+            bucket = (shift << 3) + (ns >> shift)
+            if bucket >= NUM_BUCKETS:
+                bucket = NUM_BUCKETS - 1
+        self._hist[stage][bucket] += 1
+        self._sum[stage] += ns
+        self._count[stage] += 1
+        if ns > self._max[stage]:
+            self._max[stage] = ns
+
+    def lap(self, stage, start):
+        """Record the time since `start` for a stage; returns the new timestamp."""
+        now = perf_counter_ns()
+        self.record(stage, now - start)
+        return now
+
+    def end_frame(self):
+        """Record the whole callback duration and print a report if one is due."""
+        now = perf_counter_ns()
+        self.record(self.total_index, now - self._frame_start)
+        if self.report_every is not None:
+            if self._next_report is None:
+                self._next_report = now + int(self.report_every * 1e9)
+            elif now >= self._next_report:
+                self._next_report = now + int(self.report_every * 1e9)
+                self.report_fn(self.summary())
+
+    def summary(self):
+        """
+        Per-stage statistics in microseconds.
+
+        Returns:
+            {stage: {"count", "mean_us", "p50_us", "p95_us", "p99_us", "max_us"}}
+        """
+        result = {}
+        for i, name in enumerate(self.stages):
+            count = self._count[i]
+            stats = {"count": count, "mean_us": 0.0, "p50_us": 0.0, "p95_us": 0.0, "p99_us": 0.0,
+                     "max_us": self._max[i] / 1000}
+            if count:
+                cumulative = np.cumsum(self._hist[i])
+                p50, p95, p99 = np.searchsorted(cumulative, np.array([0.50, 0.95, 0.99]) * count)
+                stats["mean_us"] = self._sum[i] / count / 1000
+                stats["p50_us"] = float(_BUCKET_MID_US[p50])
+                stats["p95_us"] = float(_BUCKET_MID_US[p95])
+                stats["p99_us"] = float(_BUCKET_MID_US[p99])
+            result[name] = stats
+        return result
+
+    def cumulative(self, bounds_us):
+        """
+        Per-stage cumulative histograms over coarser bounds, Prometheus style.
+
+        Safe to call from another thread while the callback keeps recording:
+        each stage histogram is copied first, so the counts of a stage are
+        consistent with each other (the running sum may be a frame ahead).
+
+        Args:
+            bounds_us: increasing upper bounds in microseconds.
+
+        Returns:
+            {stage: (counts, count, sum_seconds)}, where counts[i] is the number
+            of durations in buckets that end at or below bounds_us[i].
+        """
+        edges = np.searchsorted(_BUCKET_HIGH_NS, np.asarray(bounds_us) * 1000, side="right")
+        result = {}
+        for i, name in enumerate(self.stages):
+            cumulative = np.cumsum(self._hist[i][:])
+            counts = [int(cumulative[edge - 1]) if edge else 0 for edge in edges]
+            result[name] = (counts, int(cumulative[-1]), self._sum[i] / 1e9)
+        return result
+
+    def reset(self):
+        """Clear all histograms."""
+        for hist in self._hist:
+            hist[:] = [0] * NUM_BUCKETS
+        for values in (self._sum, self._max, self._count):
+            values[:] = [0] * len(values)
+
+
+def print_summary(summary):
+    """Print a StageTimer summary, one line per stage."""
+    for name, stats in summary.items():
+        print(f"[timing] {name:>12}: n={stats['count']} mean={stats['mean_us']:.1f}us "
+              f"p50={stats['p50_us']:.1f}us p95={stats['p95_us']:.1f}us "
+              f"p99={stats['p99_us']:.1f}us max={stats['max_us']:.1f}us")
@@ -0,0 +1,153 @@
+"""
+Rate-limited, batched statistics output for the pad-probe callbacks.
+
+Printing from the callback blocks the GStreamer streaming thread on every
+frame (and floods journald). A StatsSink instead keeps counters and gauges in
+plain dictionaries that the callback updates without formatting anything; a
+background thread formats and writes them every `interval` seconds, or right
+away when the callback reports an event (for example a line crossing).
+Until start() is called nothing is written at all.
+
+    stats = StatsSink(interval=1.0, fmt="human")
+    stats.add_source(lambda: {"Frame count": user_data.get_count()})
+    stats.start()
+    ...
+    # In the callback
+    stats.add("Detections", detection_count)
+    stats.event(label="person", track_id=3)
+
+Output formats: "human" (one "key: value | key: value" line per flush) and
+"json" (one JSON object per line, with a "type" of "stats" or "event").
+"""
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+FORMATS = ("human", "json")
+
+
+class StatsSink:
+    """
+    Aggregates callback statistics in memory and writes them from a background thread.
+
+    Args:
+        interval: seconds between statistics lines.
+        fmt: "human" or "json".
+        stream: file-like object to write to (defaults to sys.stdout).
+        flush_on_event: write queued events as soon as they are reported
+            instead of waiting for the next interval.
+        max_events: events kept while waiting for a flush; older ones are
+            dropped and counted in dropped_events.
+    """
+
+    def __init__(self, interval=1.0, fmt="human", stream=None, flush_on_event=True, max_events=1000):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown stats format '{fmt}', expected one of {FORMATS}")
+        self.interval = interval
+        self.fmt = fmt
+        self.stream = stream
+        self.flush_on_event = flush_on_event
+        self.dropped_events = 0
+        self._counters = {}
+        self._gauges = {}
+        self._sources = []
+        self._events = deque()
+        self._max_events = max_events
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- Hot path (callback thread): no formatting, no I/O ------------------------
+
+    def add(self, name, value=1):
+        """Add to a cumulative counter."""
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Set a gauge to its latest value."""
+        self._gauges[name] = value
+
+    def event(self, **fields):
+        """Queue an event (e.g. a line crossing) to be written on the next flush."""
+        if len(self._events) >= self._max_events:
+            self._events.popleft()
+            self.dropped_events += 1
+        self._events.append((time.time(), fields))
+        if self.flush_on_event:
+            self._wake.set()
+
+    # -- Background side ---------------------------------------------------------
+
+    def add_source(self, source):
+        """Register a function returning a dict of values read at flush time."""
+        self._sources.append(source)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background writer thread."""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the writer thread after a final flush."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        next_stats = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            self._wake.wait(max(next_stats - time.monotonic(), 0))
+            self._wake.clear()
+            if time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + self.interval
+                self.flush()
+            else:
+                self.flush(stats=False)
+        self.flush()
+
+    def snapshot(self):
+        """Current counters, gauges and source values as one dict."""
+        values = {}
+        for source in self._sources:
+            values.update(source())
+        values.update(self._gauges)
+        values.update(self._counters)
+        return values
+
+    def flush(self, stats=True):
+        """Write queued events and, if `stats` is True, a statistics line."""
+        lines = []
+        while self._events:
+            timestamp, fields = self._events.popleft()
+            lines.append(self._format("event", timestamp, fields))
+        if stats:
+            lines.append(self._format("stats", time.time(), self.snapshot()))
+        if lines:
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+    def _format(self, kind, timestamp, values):
+        if self.fmt == "json":
+            return json.dumps({"type": kind, "time": round(timestamp, 3), **values}, default=str)
+        text = " | ".join(f"{key}: {value}" for key, value in values.items())
+        return f"Event: {text}" if kind == "event" else text
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,95 @@
+"""
+Capacidad del agregador de cruces del sitio en localhost.
+
+Simula varios contadores (pares de cámaras que cubren la misma puerta) que
+mandan cruces por UDP a un AggregatorServer y mide cuántos eventos por segundo
+procesa, cuántos lotes se pierden y si los totales sin duplicados coinciden con
+las personas simuladas. Con --direct se mide solo el Deduplicator, sin red.
+
+    python benchmarks/bench_aggregator.py
+    python benchmarks/bench_aggregator.py --doors 8 --events 20000
+"""
+import argparse
+from pathlib import Path
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.aggregator import AggregatorClient, AggregatorServer, Deduplicator
+
+
+def simulate(num_doors, events_per_door, seed=0):
+    """
+    Cruces de personas por puertas cubiertas por dos cámaras, con hasta 0.3 s de
+    diferencia entre cámaras.
+
+    Returns:
+        ({dispositivo: [(instante, nombre, sentido)]}, {puerta: [dispositivos]}, personas).
+    """
+    rng = np.random.default_rng(seed)
+    events = {}
+    doors = {}
+    for door in range(num_doors):
+        devices = [f"pi{2 * door}", f"pi{2 * door + 1}"]
+        doors[f"puerta{door}"] = [f"{device}/linea" for device in devices]
+        times = 1000.0 + np.cumsum(rng.uniform(0.5, 3.0, events_per_door))
+        directions = rng.integers(0, 2, events_per_door)
+        for device in devices:
+            jitter = rng.uniform(0.0, 0.3, events_per_door)
+            events[device] = [(float(t + j), "linea", ("entrada", "salida")[d])
+                              for t, j, d in zip(times, jitter, directions)]
+    return events, doors, num_doors * events_per_door
+
+
+def run_direct(events, doors, window):
+    dedup = Deduplicator(window, {name: door for door, names in doors.items() for name in names})
+    merged = sorted((t, device, name, direction) for device, items in events.items() for t, name, direction in items)
+    start = time.perf_counter()
+    for t, device, name, direction in merged:
+        dedup.add(device, t, name, direction)
+    return dedup, time.perf_counter() - start
+
+
+def run_udp(events, doors, window, batch_size):
+    dedup = Deduplicator(window, {name: door for door, names in doors.items() for name in names})
+    server = AggregatorServer(dedup, host="127.0.0.1", port=0).start()
+    clients = {device: AggregatorClient(("127.0.0.1", server.port), device, batch_size=batch_size).start()
+               for device in events}
+    total = sum(len(items) for items in events.values())
+    start = time.perf_counter()
+    # Los contadores mandan a la vez: un cruce de cada uno por vuelta
+    for items in zip(*events.values()):
+        for (device, client), (t, name, direction) in zip(clients.items(), items):
+            client.add("line", name, direction, timestamp=t)
+    for client in clients.values():
+        client.stop()
+    deadline = time.monotonic() + 10.0
+    while dedup.events < total and time.monotonic() < deadline:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    server.stop()
+    return dedup, elapsed, server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Capacidad del agregador de cruces')
+    parser.add_argument('--doors', type=int, default=4, help='Puertas, cada una cubierta por dos cámaras')
+    parser.add_argument('--events', type=int, default=5000, help='Personas por puerta')
+    parser.add_argument('--window', type=float, default=1.0, help='Ventana de deduplicación en segundos')
+    parser.add_argument('--batch-size', type=int, default=64, help='Cruces por datagrama')
+    parser.add_argument('--direct', action='store_true', help='Medir solo el Deduplicator, sin UDP')
+    args = parser.parse_args()
+
+    events, doors, people = simulate(args.doors, args.events)
+    total = sum(len(items) for items in events.values())
+    if args.direct:
+        dedup, elapsed = run_direct(events, doors, args.window)
+        print(f"Deduplicator: {total} eventos en {elapsed:.3f} s ({total / elapsed:,.0f} eventos/s)")
+    else:
+        dedup, elapsed, server = run_udp(events, doors, args.window, args.batch_size)
+        print(f"UDP: {dedup.events}/{total} eventos en {elapsed:.3f} s ({dedup.events / elapsed:,.0f} eventos/s) | "
+              f"{server.datagrams} lotes")
+    counted = sum(dedup.site_totals().values())
+    print(f"Personas: {people} | contadas: {counted} | duplicados descartados: {dedup.duplicates}")
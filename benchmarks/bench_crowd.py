@@ -0,0 +1,204 @@
+"""
+Escalabilidad de los callbacks con multitudes sintéticas (contador.synthetic).
+
+Para cada densidad de personas arma los frames con CrowdSimulator y los pasa
+por cada objetivo, midiendo frames por segundo, percentiles de la latencia por
+frame y el crecimiento de memoria (con tracemalloc, en una pasada aparte para
+no distorsionar los tiempos). Los resultados se escriben en JSON con el commit
+y la máquina, para comparar entre commits con --compare.
+
+Objetivos:
+    counting           contador.callback.counting_callback (app_callback de contador_personas.py)
+    counting-stitch    lo mismo con contador.stitching.TrackStitcher
+    counting-every3    lo mismo contando cada 3 frames (--count-every 3)
+    counting-trajectories  lo mismo con trayectorias (contador.trajectories, --trajectories)
+    detection          el trabajo por frame de basic_pipelines/detection.py: extract_detections,
+                       filtro de personas y StatsSink (el callback en sí necesita GStreamer y hailo)
+
+    python benchmarks/bench_crowd.py --people 10,50,200 --output resultados.json
+    python benchmarks/bench_crowd.py --output nuevo.json --compare resultados.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from basic_pipelines.detection_batch import extract_detections
+from basic_pipelines.stats_sink import StatsSink
+from contador.callback import counting_callback, configure_counter
+from contador.replay import ReplayCounter, ReplayHailo, REPLAY_BACKEND
+from contador.synthetic import CrowdSimulator
+
+PERCENTILES = (50, 90, 99)
+
+
+def counting_target(stitch=False, count_every=1, trajectories=False):
+    """Callback de conteo con un estado nuevo; devuelve (función por frame, estado)."""
+    user_data = configure_counter(ReplayCounter(), {"stitch": stitch, "count_every": count_every,
+                                                    "trajectories": trajectories})
+
+    def run(pad, info):
+        counting_callback(pad, info, user_data, REPLAY_BACKEND)
+
+    return run, user_data
+
+
+def detection_target():
+    """Lo que basic_pipelines/detection.py hace con las detecciones de cada frame."""
+    stats = StatsSink(interval=1.0)
+
+    def run(pad, info):
+        batch = extract_detections(info.get_buffer().get_objects_typed(ReplayHailo.HAILO_DETECTION),
+                                   ReplayHailo.HAILO_UNIQUE_ID)
+        detection_count = int(np.count_nonzero(batch.labels == "person"))
+        stats.set("Persons", detection_count)
+        stats.add("Person detections", detection_count)
+
+    return run, None
+
+
+TARGETS = {
+    "counting": lambda: counting_target(),
+    "counting-stitch": lambda: counting_target(stitch=True),
+    "counting-every3": lambda: counting_target(count_every=3),
+    "counting-trajectories": lambda: counting_target(trajectories=True),
+    "detection": detection_target,
+}
+
+
+def make_frames(args, people):
+    crowd = CrowdSimulator(people=people, occlusion=args.occlusion, id_switch=args.id_switch,
+                           speed=(args.speed * 0.5, args.speed * 1.5), clutter=args.clutter, seed=args.seed)
+    frames = list(crowd.frames(args.frames))
+    return frames, crowd
+
+
+def measure(target, frames, warmup):
+    """Tiempos por frame en segundos y el estado del objetivo."""
+    run, state = TARGETS[target]()
+    for pad, info in frames[:warmup]:
+        run(pad, info)
+    latencies = np.empty(len(frames) - warmup)
+    clock = time.perf_counter
+    for i, (pad, info) in enumerate(frames[warmup:]):
+        start = clock()
+        run(pad, info)
+        latencies[i] = clock() - start
+    return latencies, state
+
+
+def memory_growth(target, frames, warmup):
+    """Bytes que quedan asignados al terminar (y el pico), desde después del calentamiento."""
+    run, state = TARGETS[target]()
+    for pad, info in frames[:warmup]:
+        run(pad, info)
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for pad, info in frames[warmup:]:
+            run(pad, info)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return after - before, peak - before
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, path):
+    """Imprime la relación de fps y p99 contra un archivo de resultados anterior."""
+    with open(path) as f:
+        report = json.load(f)
+    previous = {(r["target"], r["people"]): r for r in report["results"]}
+    print(f"\nContra {path} (commit {report.get('commit')}):")
+    print(f"{'objetivo':>21} {'personas':>8} {'fps':>8} {'p99':>8}")
+    for result in results:
+        old = previous.get((result["target"], result["people"]))
+        if old is None:
+            continue
+        print(f"{result['target']:>21} {result['people']:>8} {result['fps'] / old['fps']:>7.2f}x "
+              f"{result['latency_us']['p99'] / old['latency_us']['p99']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Escalabilidad de los callbacks con multitudes sintéticas')
+    parser.add_argument('--people', type=str, default='10,50,200', help='Personas por frame, separadas por comas')
+    parser.add_argument('--frames', type=int, default=900, help='Frames por escenario')
+    parser.add_argument('--warmup', type=int, default=60, help='Frames iniciales que no se miden')
+    parser.add_argument('--speed', type=float, default=0.008, help='Velocidad media (fracción de la altura por frame)')
+    parser.add_argument('--occlusion', type=float, default=0.005, help='Probabilidad por persona y frame de quedar tapada')
+    parser.add_argument('--id-switch', type=float, default=0.001, help='Probabilidad por persona y frame de cambiar de ID')
+    parser.add_argument('--clutter', type=int, default=5, help='Detecciones de otras clases por frame')
+    parser.add_argument('--targets', type=str, default=','.join(TARGETS), help='Objetivos, separados por comas')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de la multitud')
+    parser.add_argument('--no-memory', action='store_true', help='No medir memoria (más rápido)')
+    parser.add_argument('--output', type=str, help='Archivo JSON donde escribir los resultados')
+    parser.add_argument('--compare', type=str, help='Resultados anteriores (JSON) contra los que comparar')
+    args = parser.parse_args()
+
+    targets = args.targets.split(',')
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"Objetivos desconocidos: {', '.join(sorted(unknown))}")
+
+    results = []
+    print(f"{'objetivo':>21} {'personas':>8} {'fps':>9} {'p50 us':>8} {'p90 us':>8} {'p99 us':>8} "
+          f"{'max us':>8} {'mem KB':>8} {'entradas':>9} {'salidas':>8}")
+    for people in (int(n) for n in args.people.split(',')):
+        frames, crowd = make_frames(args, people)
+        for target in targets:
+            latencies, state = measure(target, frames, args.warmup)
+            values = np.percentile(latencies, PERCENTILES) * 1e6
+            result = {
+                "target": target,
+                "people": people,
+                "frames": len(latencies),
+                "fps": len(latencies) / latencies.sum(),
+                "latency_us": dict({f"p{p}": float(v) for p, v in zip(PERCENTILES, values)},
+                                   mean=float(latencies.mean() * 1e6), max=float(latencies.max() * 1e6)),
+            }
+            if not args.no_memory:
+                growth, peak = memory_growth(target, frames, args.warmup)
+                result["memory_growth_bytes"] = growth
+                result["memory_peak_bytes"] = peak
+            if state is not None:
+                result["counts"] = {"entradas": state.entrada_count, "salidas": state.salida_count,
+                                    "real_entradas": crowd.entries, "real_salidas": crowd.exits}
+            results.append(result)
+            latency = result["latency_us"]
+            counts = result.get("counts", {})
+            print(f"{target:>21} {people:>8} {result['fps']:>9.0f} {latency['p50']:>8.1f} {latency['p90']:>8.1f} "
+                  f"{latency['p99']:>8.1f} {latency['max']:>8.1f} "
+                  f"{result.get('memory_growth_bytes', 0) / 1024:>8.1f} "
+                  f"{counts.get('entradas', ''):>9} {counts.get('salidas', ''):>8}")
+        print(f"{'real':>21} {people:>8} {'':>9} {'':>8} {'':>8} {'':>8} {'':>8} {'':>8} "
+              f"{crowd.entries:>9} {crowd.exits:>8}")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
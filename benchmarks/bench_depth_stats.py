@@ -0,0 +1,77 @@
+"""
+Estadísticas de profundidad con np.percentile frente a basic_pipelines.depth_stats.
+
+Compara el calculate_average_depth original (copia, np.percentile que ordena
+todo, filtro y media) con DepthStats.trimmed_mean (np.partition sobre un búfer
+reutilizado) para el mapa completo de basic_pipelines/depth.py y para varias
+detecciones por frame como en detection_cropper, y la grilla de DepthGrid
+frente a un np.percentile por celda.
+
+    python benchmarks/bench_depth_stats.py
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from basic_pipelines.depth_stats import DepthStats, DepthGrid
+
+
+def calculate_average_depth(depth_mat):
+    """Versión original de depth.py y detection_cropper/app.py."""
+    depth_values = np.array(depth_mat).flatten()
+    try:
+        m_depth_values = depth_values[depth_values <= np.percentile(depth_values, 95)]
+    except Exception:
+        m_depth_values = np.array([])
+    if len(m_depth_values) > 0:
+        return np.mean(m_depth_values)
+    return 0
+
+
+def per_cell(depth, rows, cols):
+    """Grilla con un np.percentile por celda."""
+    cell_height, cell_width = depth.shape[0] // rows, depth.shape[1] // cols
+    return np.array([[np.percentile(depth[r * cell_height:(r + 1) * cell_height, c * cell_width:(c + 1) * cell_width],
+                                    (10, 50)) for c in range(cols)] for r in range(rows)])
+
+
+def run(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Estadísticas de profundidad: percentil frente a partición')
+    parser.add_argument('--width', type=int, default=320, help='Ancho del mapa de profundidad')
+    parser.add_argument('--height', type=int, default=256, help='Alto del mapa de profundidad')
+    parser.add_argument('--repeat', type=int, default=300, help='Frames simulados por caso')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    depth = rng.gamma(2.0, 1.5, (args.height, args.width)).astype(np.float32)
+    stats = DepthStats()
+    assert abs(stats.trimmed_mean(depth) - calculate_average_depth(depth)) < 1e-4
+
+    print(f"{'caso':>28} {'percentil us':>13} {'partición us':>13} {'aceleración':>12}")
+    cases = [
+        (f"mapa {args.width}x{args.height}", [depth]),
+        ("10 detecciones 40x80", [rng.gamma(2.0, 1.5, 40 * 80).astype(np.float32) for _ in range(10)]),
+        ("10 detecciones (listas)", [rng.gamma(2.0, 1.5, 40 * 80).tolist() for _ in range(10)]),
+    ]
+    for name, masks in cases:
+        old = run(lambda: [calculate_average_depth(mask) for mask in masks], args.repeat)
+        new = run(lambda: [stats.trimmed_mean(mask) for mask in masks], args.repeat)
+        print(f"{name:>28} {old:>13.1f} {new:>13.1f} {old / new:>11.1f}x")
+
+    for rows, cols in ((3, 4), (8, 8)):
+        grid = DepthGrid(rows, cols, quantiles=(0.1, 0.5))
+        assert np.allclose(grid.reduce(depth), np.moveaxis(per_cell(depth, rows, cols), -1, 0), atol=1e-5)
+        old = run(lambda: per_cell(depth, rows, cols), args.repeat)
+        new = run(lambda: grid.reduce(depth), args.repeat)
+        print(f"{f'grilla {rows}x{cols} (p10, p50)':>28} {old:>13.1f} {new:>13.1f} {old / new:>11.1f}x")
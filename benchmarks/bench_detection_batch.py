@@ -0,0 +1,76 @@
+"""
+Lectura de detecciones objeto por objeto frente a basic_pipelines.detection_batch.
+
+Compara el patrón de los callbacks (get_label, get_bbox, get_confidence y
+get_objects_typed por detección, con el filtro y los centros calculados en el
+bucle) con extract_detections seguido de filtro y geometría vectorizados. Usa
+las detecciones de reproducción de contador.replay en lugar de objetos hailo.
+
+    python benchmarks/bench_detection_batch.py
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from basic_pipelines.detection_batch import extract_detections, NO_TRACK
+from contador.replay import ReplayDetection, ReplayBBox, ReplayHailo
+
+UNIQUE_ID = ReplayHailo.HAILO_UNIQUE_ID
+
+
+def make_detections(n, seed=0):
+    rng = np.random.default_rng(seed)
+    detections = []
+    for i in range(n):
+        x, y = rng.uniform(0.1, 0.9, 2)
+        label = "person" if i % 4 else "chair"
+        detections.append(ReplayDetection(label, float(rng.uniform(0.3, 1.0)),
+                                          ReplayBBox(x - 0.05, y - 0.1, x + 0.05, y + 0.1), i + 1))
+    return detections
+
+
+def per_object(detections, width, height):
+    """Patrón original: todo dentro del bucle, un objeto a la vez."""
+    ids, centers, boxes = [], [], []
+    for detection in detections:
+        label = detection.get_label()
+        bbox = detection.get_bbox()
+        confidence = detection.get_confidence()
+        if label == "person" and confidence > 0.5:
+            track = detection.get_objects_typed(UNIQUE_ID)
+            if len(track) == 1:
+                ids.append(track[0].get_id())
+                centers.append(((bbox.xmin() + bbox.xmax()) / 2, (bbox.ymin() + bbox.ymax()) / 2))
+                boxes.append((int(bbox.xmin() * width), int(bbox.ymin() * height),
+                              int(bbox.xmax() * width), int(bbox.ymax() * height)))
+    return ids, centers, boxes
+
+
+def columnar(detections, width, height):
+    """Una pasada a columnas y el resto vectorizado."""
+    batch = extract_detections(detections, UNIQUE_ID)
+    keep = np.flatnonzero((batch.labels == "person") & (batch.confidences > 0.5) & (batch.track_ids != NO_TRACK))
+    return batch.track_ids[keep].tolist(), batch.centers()[keep].tolist(), batch.pixel_boxes(width, height)[keep].tolist()
+
+
+def run(fn, detections, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(detections, 1920, 1080)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Lectura de detecciones por objeto frente a columnar')
+    parser.add_argument('--repeat', type=int, default=2000, help='Frames simulados por caso')
+    args = parser.parse_args()
+
+    print(f"{'detections':>10} {'per-object us':>14} {'columnar us':>12}")
+    for n in (1, 10, 50, 200):
+        detections = make_detections(n)
+        assert per_object(detections, 1920, 1080)[0] == columnar(detections, 1920, 1080)[0]
+        print(f"{n:>10} {run(per_object, detections, args.repeat):>14.1f} {run(columnar, detections, args.repeat):>12.1f}")
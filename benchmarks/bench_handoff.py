@@ -0,0 +1,58 @@
+"""
+Tiempo del probe contando en el callback frente al probe de --handoff, que solo
+copia las detecciones al anillo en memoria compartida (contador.handoff).
+
+    python benchmarks/bench_handoff.py --people 20
+"""
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from bench_overlay import write_log
+from contador.callback import counting_callback
+from contador.handoff import DetectionRing, handoff_callback, drain
+from contador.recorder import read_log
+from contador.replay import ReplayCounter, REPLAY_BACKEND, iter_frames
+
+
+def probe_us(frames, probe):
+    """us/frame de `probe(pad, info)` sobre los frames ya armados."""
+    t0 = time.perf_counter()
+    for pad, info in frames:
+        probe(pad, info)
+    return (time.perf_counter() - t0) / len(frames) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Costo del probe con y sin traspaso por memoria compartida')
+    parser.add_argument('--frames', type=int, default=2000, help='Frames simulados')
+    parser.add_argument('--people', type=int, default=20, help='Personas por frame')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pcdl")
+        write_log(path, args.frames, args.people, 1920, 1080)
+        frames = list(iter_frames(read_log(path)))
+
+    user_data = ReplayCounter()
+    counting_us = probe_us(frames, lambda pad, info: counting_callback(pad, info, user_data, REPLAY_BACKEND))
+
+    # El anillo tiene lugar para todos los frames: se mide solo el lado del productor
+    ring = DetectionRing.create(capacity=len(frames))
+    try:
+        handoff_us = probe_us(frames, lambda pad, info: handoff_callback(pad, info, ring, REPLAY_BACKEND))
+        t0 = time.perf_counter()
+        drained = drain(ring, ReplayCounter())
+        worker_us = (time.perf_counter() - t0) / drained * 1e6
+    finally:
+        ring.close()
+        ring.unlink()
+
+    print(f"{'probe':>10} {'us/frame':>10}")
+    print(f"{'callback':>10} {counting_us:>10.1f}")
+    print(f"{'handoff':>10} {handoff_us:>10.1f}")
+    print(f"Proceso de conteo: {worker_us:.1f} us/frame (fuera del hilo de GStreamer)")
@@ -0,0 +1,106 @@
+"""
+Superposición de máscaras una por una frente a basic_pipelines.mask_compositor.
+
+Compara el patrón original de instance_segmentation.py (un np.zeros_like del
+frame y un cv2.addWeighted sobre el frame completo por persona) con
+MaskCompositor, que escribe y mezcla cada máscara solo sobre su ROI, con un
+búfer de color reutilizado entre frames. Las máscaras son de
+reproducción (float32 de 160x160, como las del modelo de segmentación).
+
+    python benchmarks/bench_mask_compositor.py
+    python benchmarks/bench_mask_compositor.py --width 1280 --height 720
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from basic_pipelines.mask_compositor import MaskCompositor
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255), (0, 255, 255), (128, 0, 128),
+          (255, 165, 0), (0, 128, 128), (128, 128, 0)]
+
+
+class ReplayMask:
+    """Lo que usa el callback de un HailoConfClassMask."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def get_height(self):
+        return self._data.shape[0]
+
+    def get_width(self):
+        return self._data.shape[1]
+
+    def get_data(self):
+        return self._data.ravel()
+
+
+def make_masks(n, seed=0, size=160):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size] / size
+    people = []
+    for i in range(n):
+        x, y = rng.uniform(0.0, 0.85, 2)
+        w, h = rng.uniform(0.08, 0.15), rng.uniform(0.2, 0.4)
+        # Una elipse difusa, más o menos con forma de persona
+        data = (1 - ((xx - 0.5) / 0.35) ** 2 - ((yy - 0.5) / 0.48) ** 2).astype(np.float32)
+        people.append((ReplayMask(data), (x, y, min(x + w, 1.0), min(y + h, 1.0)), i + 1))
+    return people
+
+
+def per_mask(frame, people):
+    """Patrón original: un overlay del frame completo y una mezcla por persona."""
+    frame_height, frame_width = frame.shape[:2]
+    for mask, (xmin, ymin, xmax, ymax), track_id in people:
+        data = np.array(mask.get_data()).reshape((mask.get_height(), mask.get_width()))
+        roi_width = int((xmax - xmin) * frame_width)
+        roi_height = int((ymax - ymin) * frame_height)
+        resized_mask_data = cv2.resize(data, (roi_width, roi_height), interpolation=cv2.INTER_LINEAR)
+        x_min, y_min = int(xmin * frame_width), int(ymin * frame_height)
+        x_max, y_max = min(x_min + roi_width, frame_width), min(y_min + roi_height, frame_height)
+        mask_overlay = np.zeros_like(frame)
+        color = COLORS[track_id % len(COLORS)]
+        mask_overlay[y_min:y_max, x_min:x_max] = (resized_mask_data[:y_max-y_min, :x_max-x_min, np.newaxis] > 0.5) * color
+        frame = cv2.addWeighted(frame, 1, mask_overlay, 0.5, 0)
+    return frame
+
+
+def composited(frame, people, compositor):
+    compositor.begin(frame.shape[1], frame.shape[0])
+    for mask, bbox, track_id in people:
+        compositor.add(mask, bbox, track_id)
+    return compositor.blend(frame)
+
+
+def run(fn, frame, repeat, *args):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(frame.copy(), *args)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Superposición de máscaras una por una frente a una sola pasada')
+    parser.add_argument('--width', type=int, default=1920, help='Ancho del video (el callback lo reduce a 1/4)')
+    parser.add_argument('--height', type=int, default=1080, help='Alto del video (el callback lo reduce a 1/4)')
+    parser.add_argument('--repeat', type=int, default=300, help='Frames simulados por caso')
+    args = parser.parse_args()
+
+    frame = np.random.default_rng(1).integers(0, 255, (args.height // 4, args.width // 4, 3), dtype=np.uint8)
+    compositor = MaskCompositor(COLORS, alpha=0.5)
+    print(f"Frame reducido {frame.shape[1]}x{frame.shape[0]}")
+    print(f"{'máscaras':>8} {'por máscara us':>15} {'por ROI us':>14} {'aceleración':>12}")
+    for n in (1, 10, 30):
+        people = make_masks(n)
+        # Sin superposición los dos caminos dan exactamente el mismo frame
+        if n == 1:
+            assert np.array_equal(per_mask(frame.copy(), people), composited(frame.copy(), people, compositor))
+        old = run(per_mask, frame, args.repeat, people)
+        new = run(composited, frame, args.repeat, people, compositor)
+        print(f"{n:>8} {old:>15.1f} {new:>14.1f} {old / new:>11.1f}x")
@@ -0,0 +1,71 @@
+"""
+Tiempo del callback de conteo con el overlay apagado, dibujado en el callback
+y dibujado en un hilo aparte (contador.overlay.OverlayRenderer).
+
+    python benchmarks/bench_overlay.py --width 1920 --height 1080 --people 20
+"""
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.overlay import OverlayRenderer
+from contador.recorder import DetectionRecorder, record_detections
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayHailo, replay
+
+
+def write_log(path, num_frames, num_people, width, height, seed=0):
+    """Personas que bajan por la imagen a velocidades distintas."""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0.1, 0.9, num_people)
+    y = rng.uniform(0.0, 1.0, num_people)
+    vy = rng.uniform(0.002, 0.01, num_people)
+    with DetectionRecorder(path) as recorder:
+        for frame in range(1, num_frames + 1):
+            yc = (y + vy * frame) % 1.0
+            detections = [
+                ReplayDetection("person", 0.9, ReplayBBox(x[i] - 0.04, yc[i] - 0.08, x[i] + 0.04, yc[i] + 0.08), i + 1)
+                for i in range(num_people)
+            ]
+            record_detections(recorder, frame, frame * 33_333_333, width, height, detections, ReplayHailo.HAILO_UNIQUE_ID)
+
+
+def run(path, mode):
+    """Devuelve (us/frame del callback, us/frame obteniendo el frame, us/frame en el hilo de render, descartados)."""
+    user_data = ReplayCounter()
+    user_data.use_frame = mode != "off"
+    if mode == "thread":
+        user_data.renderer = OverlayRenderer(user_data.set_frame, user_data.line_color, user_data.line_thickness).start()
+    replay(path, user_data)
+    summary = user_data.timer.summary()
+    renderer = user_data.renderer
+    render_us = dropped = 0
+    if renderer is not None:
+        renderer.stop()
+        render_us = renderer.render_seconds / max(renderer.rendered, 1) * 1e6
+        dropped = renderer.dropped
+    return summary["total"]["mean_us"], summary["frame"]["mean_us"], render_us, dropped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Costo del overlay dentro y fuera del callback')
+    parser.add_argument('--frames', type=int, default=300, help='Frames simulados')
+    parser.add_argument('--people', type=int, default=20, help='Personas por frame')
+    parser.add_argument('--width', type=int, default=1920, help='Ancho del frame')
+    parser.add_argument('--height', type=int, default=1080, help='Alto del frame')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pcdl")
+        write_log(path, args.frames, args.people, args.width, args.height)
+        # "frame" es lo que cuesta obtener el frame (en la reproducción, crear uno en negro).
+        # La reproducción va mucho más rápido que una cámara, así que el hilo de render
+        # descarta casi todos los frames y compite por la CPU con el callback.
+        print(f"{'overlay':>8} {'callback us/frame':>18} {'frame us/frame':>15} {'render us/frame':>16} {'descartados':>12}")
+        for mode in ("off", "inline", "thread"):
+            callback_us, frame_us, render_us, dropped = run(path, mode)
+            print(f"{mode:>8} {callback_us:>18.1f} {frame_us:>15.1f} {render_us:>16.1f} {dropped:>12}")
@@ -0,0 +1,137 @@
+"""
+Decodificación de keypoints punto por punto frente a basic_pipelines.pose_keypoints.
+
+Compara el patrón de los callbacks de pose (get_points() por persona y cada
+punto pasado a píxeles con aritmética escalar) con extract_keypoints, que lee
+los puntos a una lista plana y hace la transformación de todas las cajas con
+una sola operación de NumPy. Mide dos casos: los 17 keypoints (sailted_fish) y
+solo las muñecas. Con tan pocos puntos por persona el bucle por punto sigue
+siendo más barato para pocas personas, por eso fruit_ninja y
+wled_pose_estimation lo conservan. Usa objetos de reproducción en lugar de
+objetos hailo.
+
+    python benchmarks/bench_pose_keypoints.py
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from basic_pipelines.pose_keypoints import extract_keypoints, NUM_KEYPOINTS, WRISTS, CONFIDENCE
+from contador.replay import ReplayDetection, ReplayBBox
+
+LANDMARKS = "landmarks"
+
+
+class Point:
+    __slots__ = ('_x', '_y', '_confidence')
+
+    def __init__(self, x, y, confidence):
+        self._x, self._y, self._confidence = x, y, confidence
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+    def confidence(self):
+        return self._confidence
+
+
+class Landmarks:
+    def __init__(self, points):
+        self._points = points
+
+    def get_points(self):
+        return self._points
+
+
+class PoseDetection(ReplayDetection):
+    def __init__(self, bbox, points, track_id):
+        super().__init__("person", 0.9, bbox, track_id)
+        self.landmarks = [Landmarks(points)]
+
+    def get_objects_typed(self, object_type):
+        if object_type == LANDMARKS:
+            return self.landmarks
+        return super().get_objects_typed(object_type)
+
+
+def make_people(n, seed=0):
+    rng = np.random.default_rng(seed)
+    people = []
+    for i in range(n):
+        x, y = rng.uniform(0.1, 0.7, 2)
+        points = [Point(*rng.uniform(0, 1, 3).tolist()) for _ in range(NUM_KEYPOINTS)]
+        people.append(PoseDetection(ReplayBBox(x, y, x + 0.2, y + 0.3), points, i + 1))
+    return people
+
+
+def per_point_all(people, bboxes, width, height):
+    """sailted_fish: los 17 puntos de cada persona, uno a uno."""
+    coords = []
+    for detection in people:
+        bbox = detection.get_bbox()
+        points = detection.get_objects_typed(LANDMARKS)[0].get_points()
+        coords.append([(int((point.x() * bbox.width() + bbox.xmin()) * width),
+                        int((point.y() * bbox.height() + bbox.ymin()) * height)) for point in points])
+    return coords
+
+
+def vectorized_all(people, bboxes, width, height):
+    return extract_keypoints(people, bboxes, LANDMARKS, width, height)[..., :2].astype(np.int32)
+
+
+def per_point_wrists(people, bboxes, width, height):
+    """fruit_ninja: muñecas con confianza suficiente, una a una."""
+    hands = {}
+    for detection in people:
+        track_id = detection.get_objects_typed("unique_id")[0].get_id()
+        bbox = detection.get_bbox()
+        points = detection.get_objects_typed(LANDMARKS)[0].get_points()
+        for i, wrist in enumerate(['left_wrist', 'right_wrist']):
+            point = points[{'left_wrist': 9, 'right_wrist': 10}[wrist]]
+            if point.confidence() < 0.5:
+                continue
+            hands[(track_id << 1) + i] = (int((point.x() * bbox.width() + bbox.xmin()) * width),
+                                          int((point.y() * bbox.height() + bbox.ymin()) * height))
+    return hands
+
+
+def vectorized_wrists(people, bboxes, width, height, track_ids=None):
+    wrists = extract_keypoints(people, bboxes, LANDMARKS, width, height, joints=WRISTS)
+    person, hand = np.nonzero(wrists[..., CONFIDENCE] >= 0.5)
+    hand_ids = (track_ids[person] << 1) + hand
+    positions = wrists[person, hand, :2].astype(np.int32)
+    return {hand_id: (x, y) for hand_id, (x, y) in zip(hand_ids.tolist(), positions.tolist())}
+
+
+def run(fn, repeat, *args):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decodificación de keypoints punto por punto frente a vectorizada')
+    parser.add_argument('--repeat', type=int, default=2000, help='Frames simulados por caso')
+    args = parser.parse_args()
+
+    print(f"{'personas':>8} {'17 pts us':>10} {'vect us':>8} {'muñecas us':>11} {'vect us':>8}")
+    for n in (1, 2, 5, 10, 20):
+        people = make_people(n)
+        bboxes = np.array([[d.get_bbox().xmin(), d.get_bbox().ymin(), d.get_bbox().xmax(), d.get_bbox().ymax()]
+                           for d in people], dtype=np.float32)
+        track_ids = np.arange(1, n + 1, dtype=np.int64)
+        # Los dos caminos dan los mismos píxeles (±1 por redondeo de float32)
+        assert np.abs(np.array(per_point_all(people, bboxes, 1920, 1080)) - vectorized_all(people, bboxes, 1920, 1080)).max() <= 1
+        assert per_point_wrists(people, bboxes, 1920, 1080).keys() == vectorized_wrists(people, bboxes, 1920, 1080, track_ids).keys()
+        print(f"{n:>8} {run(per_point_all, args.repeat, people, bboxes, 1920, 1080):>10.1f} "
+              f"{run(vectorized_all, args.repeat, people, bboxes, 1920, 1080):>8.1f} "
+              f"{run(per_point_wrists, args.repeat, people, bboxes, 1920, 1080):>11.1f} "
+              f"{run(vectorized_wrists, args.repeat, people, bboxes, 1920, 1080, track_ids):>8.1f}")
@@ -0,0 +1,105 @@
+"""
+Tasa de unión de fragmentos de track y su efecto en los conteos.
+
+Reproduce un log sin y con contador.stitching.TrackStitcher y compara tracks
+nuevos, uniones, entradas, salidas y costo del callback. Sin --log arma un log
+sintético de personas que cruzan la línea y quedan tapadas unos frames cerca
+de ella; al reaparecer tienen un ID nuevo, como hace el tracker. En ese caso
+también se muestra el conteo real.
+
+    python benchmarks/bench_stitching.py
+    python benchmarks/bench_stitching.py --log grabacion.pcdl
+"""
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.recorder import DetectionRecorder, record_detections
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayHailo, replay
+from contador.stitching import TrackStitcher
+
+
+def write_log(path, num_frames, num_people, occlusion, seed=0):
+    """
+    Personas que cruzan la mitad de la imagen a 30 fps; una fracción `occlusion`
+    desaparece de 3 a 15 frames cerca de la línea y vuelve con otro ID.
+
+    Returns:
+        (entradas, salidas) reales.
+    """
+    rng = np.random.default_rng(seed)
+    people = []
+    next_id = 1
+    truth = [0, 0]
+    for _ in range(num_people):
+        start = int(rng.integers(0, num_frames - 120))
+        down = bool(rng.integers(0, 2))
+        speed = rng.uniform(0.005, 0.012) * (1 if down else -1)
+        y0 = 0.5 - speed * rng.uniform(20, 60)
+        frames = int(abs((1.0 - 2 * y0) / speed)) if 0 < y0 < 1 else 80
+        x = rng.uniform(0.1, 0.9)
+        gap = None
+        if rng.uniform() < occlusion:
+            # Oclusión que empieza unos frames antes de la línea
+            gap_start = start + int((0.5 - y0) / speed) - int(rng.integers(0, 8))
+            gap = (gap_start, gap_start + int(rng.integers(3, 16)))
+        people.append((start, min(frames, 150), x, y0, speed, gap, next_id, next_id + 1))
+        next_id += 2
+        truth[0 if down else 1] += 1
+
+    with DetectionRecorder(path) as recorder:
+        for frame in range(1, num_frames + 1):
+            detections = []
+            for start, life, x, y0, speed, gap, first_id, second_id in people:
+                if not start <= frame < start + life:
+                    continue
+                track_id = first_id
+                if gap is not None:
+                    if gap[0] <= frame < gap[1]:
+                        continue
+                    if frame >= gap[1]:
+                        track_id = second_id
+                y = y0 + speed * (frame - start)
+                detections.append(ReplayDetection("person", 0.9, ReplayBBox(x - 0.03, y - 0.08, x + 0.03, y + 0.08), track_id))
+            record_detections(recorder, frame, frame * 33_333_333, 1920, 1080, detections, ReplayHailo.HAILO_UNIQUE_ID)
+    return tuple(truth)
+
+
+def run(path, stitch):
+    user_data = ReplayCounter()
+    if stitch:
+        user_data.stitcher = TrackStitcher()
+    result = replay(path, user_data)
+    return result, user_data.stitcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Efecto de unir fragmentos de track en los conteos')
+    parser.add_argument('--log', type=str, help='Log grabado con contador_personas.py --record (por defecto, uno sintético)')
+    parser.add_argument('--frames', type=int, default=9000, help='Frames del log sintético')
+    parser.add_argument('--people', type=int, default=400, help='Personas en el log sintético')
+    parser.add_argument('--occlusion', type=float, default=0.3, help='Fracción de personas tapadas cerca de la línea')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.log
+        truth = None
+        if path is None:
+            path = os.path.join(tmp, "bench.pcdl")
+            truth = write_log(path, args.frames, args.people, args.occlusion)
+        plain, _ = run(path, stitch=False)
+        stitched, stitcher = run(path, stitch=True)
+
+    stats = stitcher.stats()
+    print(f"Frames: {plain['frames']} | tracks nuevos: {stats['new_tracks']} | unidos: {stats['stitched']} "
+          f"({stats['stitch_rate']:.1%})")
+    print(f"{'':>12} {'entradas':>9} {'salidas':>8} {'us/frame':>9}")
+    if truth is not None:
+        print(f"{'real':>12} {truth[0]:>9} {truth[1]:>8}")
+    for name, result in (("sin unir", plain), ("uniendo", stitched)):
+        print(f"{name:>12} {result['entradas']:>9} {result['salidas']:>8} {result['callback_us_per_frame']:>9.1f}")
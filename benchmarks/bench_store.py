@@ -0,0 +1,61 @@
+"""
+Carga sostenida sobre contador.store.CountStore: encola cruces a un ritmo fijo
+y mide si el hilo de escritura acompaña.
+
+    python benchmarks/bench_store.py --rate 5000 --seconds 5
+"""
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.store import CountStore
+
+
+def run(path, rate, seconds, flush_interval):
+    store = CountStore(path, flush_interval=flush_interval).start()
+    names = ("puerta", "pasillo", "caja")
+    total = int(rate * seconds)
+    # Se encola en tandas de 1 ms para acercarse al ritmo pedido
+    per_tick = max(int(rate / 1000), 1)
+    add_seconds = 0.0
+    start = time.perf_counter()
+    for i in range(total):
+        t = time.perf_counter()
+        store.add("line", names[i % 3], "entrada" if i % 2 else "salida", i)
+        add_seconds += time.perf_counter() - t
+        if i % per_tick == per_tick - 1:
+            delay = start + (i + 1) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    produced = time.perf_counter() - start
+    backlog = store.pending
+    store.stop()
+    drained = time.perf_counter() - start
+    store.close()
+    return {
+        "events": total,
+        "produce_seconds": produced,
+        "drain_seconds": drained,
+        "backlog_at_end": backlog,
+        "max_pending": store.max_pending,
+        "batches": store.batches,
+        "add_us": add_seconds / total * 1e6,
+        "db_bytes": os.path.getsize(path),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Carga sostenida sobre el almacén de cruces')
+    parser.add_argument('--rate', type=float, default=5000, help='Eventos por segundo')
+    parser.add_argument('--seconds', type=float, default=5, help='Duración de la carga')
+    parser.add_argument('--flush-interval', type=float, default=1.0, help='Segundos entre escrituras')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(os.path.join(tmp, "bench.db"), args.rate, args.seconds, args.flush_interval)
+    for key, value in result.items():
+        print(f"{key:>16}: {value:.3f}" if isinstance(value, float) else f"{key:>16}: {value}")
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark del costo por frame de la tabla de seguimiento.
+
+Compara el patrón original de contador_personas.py (un diccionario nuevo por
+persona y por frame) con contador.tracks.TrackTable, incluyendo el barrido de
+expulsión, para 1, 50 y 500 personas simultáneas. No necesita hardware de Hailo:
+
+    python benchmarks/bench_track_table.py
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.tracks import TrackTable, ENTRY, EXIT
+
+
+def dict_frame(tracked_people, track_ids, ys, line_y):
+    """Lógica original de app_callback, sin la parte de GStreamer."""
+    entradas = salidas = 0
+    for track_id, y_center in zip(track_ids, ys):
+        if track_id in tracked_people:
+            last_y = tracked_people[track_id]["last_y"]
+            counted = tracked_people[track_id]["counted"]
+            if not counted:
+                if last_y < line_y and y_center >= line_y:
+                    entradas += 1
+                    tracked_people[track_id]["counted"] = True
+                elif last_y > line_y and y_center <= line_y:
+                    salidas += 1
+                    tracked_people[track_id]["counted"] = True
+        tracked_people[track_id] = {
+            "last_y": y_center,
+            "counted": tracked_people.get(track_id, {}).get("counted", False)
+        }
+    return entradas, salidas
+
+
+def table_frame(table, frame, track_ids, ys, line_y):
+    entradas = salidas = 0
+    table.tick(frame, frame / 30)
+    update = table.update
+    for track_id, y_center in zip(track_ids, ys):
+        crossing = update(track_id, y_center, line_y)
+        if crossing == ENTRY:
+            entradas += 1
+        elif crossing == EXIT:
+            salidas += 1
+    return entradas, salidas
+
+
+def make_frames(num_tracks, num_frames, height=1080, seed=0):
+    """Personas caminando verticalmente a velocidades distintas."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, height, num_tracks)
+    speed = rng.uniform(-8, 8, num_tracks)
+    track_ids = list(range(1, num_tracks + 1))
+    frames = []
+    for i in range(num_frames):
+        ys = ((start + speed * i) % height).tolist()
+        frames.append(ys)
+    return track_ids, frames
+
+
+def run(num_tracks, num_frames):
+    line_y = 540
+    track_ids, frames = make_frames(num_tracks, num_frames)
+
+    tracked_people = {}
+    t0 = time.perf_counter()
+    dict_counts = [0, 0]
+    for ys in frames:
+        e, s = dict_frame(tracked_people, track_ids, ys, line_y)
+        dict_counts[0] += e
+        dict_counts[1] += s
+    dict_us = (time.perf_counter() - t0) / num_frames * 1e6
+
+    table = TrackTable(max_age_frames=150, max_age_seconds=10.0)
+    t0 = time.perf_counter()
+    table_counts = [0, 0]
+    for frame, ys in enumerate(frames):
+        e, s = table_frame(table, frame, track_ids, ys, line_y)
+        table_counts[0] += e
+        table_counts[1] += s
+    table_us = (time.perf_counter() - t0) / num_frames * 1e6
+
+    assert dict_counts == table_counts, (dict_counts, table_counts)
+    return dict_us, table_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Costo por frame de la tabla de seguimiento')
+    parser.add_argument('--frames', type=int, default=2000, help='Frames simulados por caso')
+    parser.add_argument('--tracks', type=int, nargs='+', default=[1, 50, 500], help='Personas simultáneas')
+    args = parser.parse_args()
+
+    print(f"{'tracks':>8} {'dict (us/frame)':>16} {'TrackTable (us/frame)':>22}")
+    for num_tracks in args.tracks:
+        dict_us, table_us = run(num_tracks, args.frames)
+        print(f"{num_tracks:>8} {dict_us:>16.2f} {table_us:>22.2f}")
@@ -0,0 +1,56 @@
+"""
+Costo por frame de contador.zones.ZoneEngine según la cantidad de líneas y zonas.
+
+    python benchmarks/bench_zones.py --tracks 50
+"""
+import argparse
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from contador.zones import ZoneEngine, CountingLine, CountingZone
+
+
+def make_engine(num_lines, num_zones, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = [
+        CountingLine(f"l{i}", tuple(rng.uniform(0, 1, 2)), tuple(rng.uniform(0, 1, 2)), "entrada", "salida")
+        for i in range(num_lines)
+    ]
+    zones = []
+    for i in range(num_zones):
+        x, y = rng.uniform(0, 0.8, 2)
+        zones.append(CountingZone(f"z{i}", [(x, y), (x + 0.2, y), (x + 0.2, y + 0.2), (x, y + 0.2)], "entrada", "salida"))
+    return ZoneEngine(lines, zones)
+
+
+def run(num_tracks, num_lines, num_zones, num_frames):
+    engine = make_engine(num_lines, num_zones)
+    rng = np.random.default_rng(1)
+    start = rng.uniform(0, 1, (num_tracks, 2)).astype(np.float32)
+    speed = rng.uniform(-0.01, 0.01, (num_tracks, 2)).astype(np.float32)
+    slots = np.arange(num_tracks)
+    track_ids = slots + 1
+    fresh = np.ones(num_tracks, dtype=bool)
+    not_fresh = np.zeros(num_tracks, dtype=bool)
+    frames = [(start + speed * i) % 1.0 for i in range(num_frames)]
+
+    t0 = time.perf_counter()
+    for i, points in enumerate(frames):
+        engine.process(slots, track_ids, points, fresh if i == 0 else not_fresh)
+    return (time.perf_counter() - t0) / num_frames * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Costo por frame del motor de líneas y zonas')
+    parser.add_argument('--frames', type=int, default=2000, help='Frames simulados por caso')
+    parser.add_argument('--tracks', type=int, default=50, help='Personas simultáneas')
+    args = parser.parse_args()
+
+    print(f"{'lines':>6} {'zones':>6} {'us/frame':>10}")
+    for num_lines, num_zones in [(1, 0), (4, 0), (16, 0), (0, 1), (0, 8), (0, 32), (8, 8)]:
+        us = run(args.tracks, num_lines, num_zones, args.frames)
+        print(f"{num_lines:>6} {num_zones:>6} {us:>10.2f}")
@@ -12,6 +12,9 @@ from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_p
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.detection.detection_pipeline import GStreamerDetectionApp
 
+from basic_pipelines.detection_batch import LabelIds, extract_detections
+from basic_pipelines.frame_skip import AdaptiveFrameSkip
+
 # Based on https://github.com/vanshksingh/Pi5Neo
 # Pins connections:
 # Connect 5+ to 5V
@@ -30,7 +33,12 @@ class user_app_callback_class(app_callback_class):
         super().__init__()
         self.num_leds = 10
         self.neo = Pi5Neo('/dev/spidev0.0', self.num_leds, 800)
-        self.update_rate = 4
+        # Update every 4th frame to start with, more or fewer as the callback cost changes
+        self.update_rate = AdaptiveFrameSkip(skip=4, max_skip=8)
+
+# Person rows by class id (the id of "person" is learned from the first frame that has one)
+PERSON = LabelIds("person")
+
 # -----------------------------------------------------------------------------------------------
 # User-defined callback function
 # -----------------------------------------------------------------------------------------------
@@ -39,35 +47,33 @@ class user_app_callback_class(app_callback_class):
 def app_callback(pad, info, user_data):
     # Using the user_data to count the number of frames
     user_data.increment()
-    # run only every user_data.update_rate frames
-    if (user_data.get_count() % user_data.update_rate):
-        return Gst.PadProbeReturn.OK
     # Get the GstBuffer from the probe info
     buffer = info.get_buffer()
     # Check if the buffer is valid
     if buffer is None:
         return Gst.PadProbeReturn.OK
+    # run only every user_data.update_rate.skip frames
+    if not user_data.update_rate.tick(pad):
+        return Gst.PadProbeReturn.OK
 
     # Get the detections from the buffer
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
-    # Parse the detections
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        if label == "person":
-            # control leds according to person X location
-            x = (bbox.xmin() + bbox.xmax()) / 2
-            # select led to light
-            ind = int(user_data.num_leds * x)
-            print(f'setting led {ind}')
-            user_data.neo.fill_strip(0, 0, 0) # clear all leds
-            user_data.neo.set_led_color(ind, 0, 0, 255)
-            user_data.neo.update_strip()
-            # exit after first detection
-            return Gst.PadProbeReturn.OK
+    # Read the detections in one pass into NumPy columns
+    batch = extract_detections(detections, hailo.HAILO_UNIQUE_ID)
+    people = np.flatnonzero(PERSON.match(batch))
+    if len(people):
+        # control leds according to the X location of the first person
+        x = float(batch.centers()[people[0], 0])
+        # select led to light
+        ind = int(user_data.num_leds * x)
+        print(f'setting led {ind} (frame skip {user_data.update_rate.skip})')
+        user_data.neo.fill_strip(0, 0, 0) # clear all leds
+        user_data.neo.set_led_color(ind, 0, 0, 255)
+        user_data.neo.update_strip()
+    user_data.update_rate.done()
+    return Gst.PadProbeReturn.OK
 
 if __name__ == "__main__":
     # Create an instance of the user app callback class
@@ -5,22 +5,19 @@ import numpy as np
 import pathlib
 import hailo
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
+from basic_pipelines.depth_stats import DepthStats
 from pipeline import GStreamerDetectionCropperApp
 
 # User-defined class to be used in the callback function: Inheritance from the app_callback_class
 class user_app_callback_class(app_callback_class):
 
+    def __init__(self):
+        super().__init__()
+        self.depth_stats = DepthStats()  # Partition-based statistics with a reused work buffer
+
     def calculate_average_depth(self, depth_mat):
-        depth_values = np.array(depth_mat).flatten()  # Flatten the array and filter out outlier pixels
-        try:
-            m_depth_values = depth_values[depth_values <= np.percentile(depth_values, 95)]  # drop 5% of highest values (outliers)          
-        except Exception as e:
-            m_depth_values = np.array([])
-        if len(m_depth_values) > 0:
-            average_depth = np.mean(m_depth_values)  # Calculate the average depth of the pixels
-        else:
-            average_depth = 0  # Default value if no valid pixels are found
-        return average_depth
+        # Mean of the pixels after dropping the 5% highest values (outliers), 0 if there are none
+        return self.depth_stats.trimmed_mean(depth_mat, upper=0.95)
 
 # User-defined callback function: This is the callback function that will be called when data is available from the pipeline
 def app_callback(pad, info, user_data):
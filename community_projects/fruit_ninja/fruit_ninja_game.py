@@ -12,6 +12,7 @@ from hailo_apps.hailo_app_python.core.common.core import get_default_parser
 from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline import GStreamerPoseEstimationApp
 
 from community_projects.fruit_ninja.pygame_fruit_ninja import PygameFruitNinja
+from basic_pipelines.pose_keypoints import KEYPOINTS
 
 CONFIDENCE_THRESHOLD = 0.5  # Minimum confidence for wrist keypoints
 
@@ -82,6 +83,7 @@ def app_callback(pad: any, info: any, user_data: 'user_app_callback_class') -> G
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
     # Extract hand positions from pose estimation
+    # Only two points per person: a per-point loop is cheaper than batching them through NumPy
     hand_positions = {}
     for detection in detections:
         if detection.get_label() != "person":
@@ -104,8 +106,8 @@ def app_callback(pad: any, info: any, user_data: 'user_app_callback_class') -> G
         # bbox.xmin(), bbox.ymin(), bbox.width(), bbox.height() are normalized (0-1)
 
         # Extract wrist positions (left_wrist: index 9, right_wrist: index 10)
-        for i, wrist in enumerate(['left_wrist', 'right_wrist']):
-            keypoint_index = {'left_wrist': 9, 'right_wrist': 10}[wrist]
+        for i, wrist in enumerate(('left_wrist', 'right_wrist')):
+            keypoint_index = KEYPOINTS[wrist]
             if keypoint_index < len(landmarks):
                 point = landmarks[keypoint_index]
                 # Reason: Only use keypoints with sufficient confidence
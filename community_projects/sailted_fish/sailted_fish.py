@@ -17,6 +17,8 @@ import pyttsx3
 from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_pad, get_numpy_from_buffer
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline import GStreamerPoseEstimationApp
+from basic_pipelines.detection_batch import LabelIds, extract_detections
+from basic_pipelines.pose_keypoints import extract_keypoints, CONFIDENCE, KEYPOINTS
 
 # -----------------------------------------------------------------------------------------------
 # User-defined class to be used in the callback function
@@ -134,6 +136,10 @@ def game_loop():
     finally:
         pygame.mixer.music.stop()
         pygame.mixer.quit()
+
+# Person rows by class id (the id of "person" is learned from the first frame that has one)
+PERSON = LabelIds("person")
+
 # -----------------------------------------------------------------------------------------------
 # User-defined callback function
 # -----------------------------------------------------------------------------------------------
@@ -155,60 +161,43 @@ def app_callback(pad, info, user_data):
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
-    # Keypoints for COCO body parts
-    keypoints = get_keypoints()
-
-    # Process detections
-    for detection in detections:
-        if detection.get_label() == "person":
-            track_id = 0
-            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-            if len(track) == 1:
-                track_id = track[0].get_id()
-
-            person_id = track_id  # Unique ID for each detection
-            all_players.add(person_id)  # Add to the set of all players
-
-            # Get bounding box and landmarks
-            bbox = detection.get_bbox()
-            landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
-            if landmarks:
-                points = landmarks[0].get_points()
-                if person_id not in frame_history:
-                    frame_history[person_id] = []
-
-                # Extract keypoint coordinates
-                keypoint_coords = [
-                    (int((point.x() * bbox.width() + bbox.xmin()) * width),
-                     int((point.y() * bbox.height() + bbox.ymin()) * height))
-                    for point in points
-                ]
-
-                frame_history[person_id].append(keypoint_coords)
-
-                # Detect movement during "Red Light"
-                if game_state == "Red Light" and person_id not in moved_players:
-                    if len(frame_history[person_id]) > 1:
-                        prev_coords = frame_history[person_id][-2]
-                        curr_coords = frame_history[person_id][-1]
-
-                        # Calculate movement by summing the distance between keypoints
-                        movement = sum(np.linalg.norm(np.array(curr) - np.array(prev))
-                                       for prev, curr in zip(prev_coords, curr_coords))
-                        if movement > threshold:
-                            moved_players.add(person_id)
-                            print(f"\033[41mPlayer {person_id} moved during Red Light!\033[0m")  # Red background
-                            # tts_engine.say(f"Player {person_id} moved you salted fish")
-                            # tts_engine.runAndWait()
-                            # tts_engine.stop()
+    # Process detections: persons and all their keypoints in frame pixels, (N, 17, 3)
+    batch = extract_detections(detections, hailo.HAILO_UNIQUE_ID)
+    people = batch.select(PERSON.match(batch))
+    keypoints = extract_keypoints(people.detections, people.bboxes, hailo.HAILO_LANDMARKS, width, height)
+    keypoint_coords = keypoints[..., :2].astype(np.int32)
+    has_pose = keypoints[..., CONFIDENCE].any(axis=1).tolist()  # Rows without landmarks have confidence 0
+    for i, track_id in enumerate(np.maximum(people.track_ids, 0).tolist()):
+        person_id = track_id  # Unique ID for each detection
+        all_players.add(person_id)  # Add to the set of all players
+        if not has_pose[i]:
+            continue
+        if person_id not in frame_history:
+            frame_history[person_id] = []
+        frame_history[person_id].append(keypoint_coords[i])
+
+        # Detect movement during "Red Light"
+        if game_state == "Red Light" and person_id not in moved_players:
+            if len(frame_history[person_id]) > 1:
+                prev_coords = frame_history[person_id][-2]
+                curr_coords = frame_history[person_id][-1]
+
+                # Calculate movement by summing the distance between keypoints
+                movement = np.linalg.norm(curr_coords - prev_coords, axis=1).sum()
+                if movement > threshold:
+                    moved_players.add(person_id)
+                    print(f"\033[41mPlayer {person_id} moved during Red Light!\033[0m")  # Red background
+                    # tts_engine.say(f"Player {person_id} moved you salted fish")
+                    # tts_engine.runAndWait()
+                    # tts_engine.stop()
 
     # Draw keypoints on the frame (optional visualisation)
     if user_data.use_frame and frame is not None:
         frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
         for person_id, keypoints in frame_history.items():
             if keypoints:
-                for point in keypoints[-1]:  # Draw the most recent keypoints
-                    cv2.circle(frame, point, 5, (0, 255, 0), -1)
+                for point in keypoints[-1].tolist():  # Draw the most recent keypoints
+                    cv2.circle(frame, tuple(point), 5, (0, 255, 0), -1)
         user_data.set_frame(frame)
 
     return Gst.PadProbeReturn.OK
@@ -218,25 +207,7 @@ def app_callback(pad, info, user_data):
 # -----------------------------------------------------------------------------------------------
 def get_keypoints():
     """Get the COCO keypoints and their left/right flip correspondence map."""
-    return {
-        'nose': 0,
-        'left_eye': 1,
-        'right_eye': 2,
-        'left_ear': 3,
-        'right_ear': 4,
-        'left_shoulder': 5,
-        'right_shoulder': 6,
-        'left_elbow': 7,
-        'right_elbow': 8,
-        'left_wrist': 9,
-        'right_wrist': 10,
-        'left_hip': 11,
-        'right_hip': 12,
-        'left_knee': 13,
-        'right_knee': 14,
-        'left_ankle': 15,
-        'right_ankle': 16,
-    }
+    return dict(KEYPOINTS)
 
 # -----------------------------------------------------------------------------------------------
 # Main Function
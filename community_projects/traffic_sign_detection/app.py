@@ -6,9 +6,11 @@ import threading
 import asyncio
 import pathlib
 import csv
+import numpy as np
 import hailo
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.detection.detection_pipeline import GStreamerDetectionApp
+from basic_pipelines.detection_batch import extract_detections
 from get_usb_gps import get_usb_gps_devices
 from gps_calculations import gps_task, latest_gps_data
 
@@ -46,17 +48,15 @@ def app_callback(pad, info, user_data):
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
-    # Parse the detections
-    for detection in detections:
-        class_id = detection.get_class_id()
-        track_id = 0
-        track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-        if len(track) > 0:
-            track_id = track[0].get_id()
-        if class_id == 12:  # COCO 1 based, 12 - stop sign
-            with open(user_data.save_csv_path, 'a', newline='') as fd:
-                writer = csv.writer(fd)
-                writer.writerow([track_id, latest_gps_data['latitude'], latest_gps_data['longitude'], latest_gps_data['altitude']])
+    # Read the detections in one pass into NumPy columns and keep the stop signs
+    batch = extract_detections(detections, hailo.HAILO_UNIQUE_ID)
+    stop_signs = batch.class_ids == 12  # COCO 1 based, 12 - stop sign
+    if stop_signs.any():
+        track_ids = np.maximum(batch.track_ids[stop_signs], 0).tolist()  # 0 for detections without a track
+        with open(user_data.save_csv_path, 'a', newline='') as fd:
+            writer = csv.writer(fd)
+            writer.writerows([track_id, latest_gps_data['latitude'], latest_gps_data['longitude'], latest_gps_data['altitude']]
+                             for track_id in track_ids)
 
     return Gst.PadProbeReturn.OK
 
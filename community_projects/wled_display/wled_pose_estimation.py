@@ -12,6 +12,7 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callbac
 from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline import GStreamerPoseEstimationApp
 from hailo_apps.hailo_app_python.core.common.core import get_default_parser
 
+from basic_pipelines.pose_keypoints import KEYPOINTS
 from wled_display import WLEDDisplay, add_parser_args
 
 # -----------------------------------------------------------------------------------------------
@@ -40,27 +41,6 @@ COLORS = [
 
 CONFIDENCE_THRESHOLD = 0.5 # Confidence threshold for keypoints
 
-# Keypoints for pose estimation (example indices, adjust based on your model)
-keypoints = {
-    'nose': 0,
-    'left_eye': 1,
-    'right_eye': 2,
-    'left_ear': 3,
-    'right_ear': 4,
-    'left_shoulder': 5,
-    'right_shoulder': 6,
-    'left_elbow': 7,
-    'right_elbow': 8,
-    'left_wrist': 9,
-    'right_wrist': 10,
-    'left_hip': 11,
-    'right_hip': 12,
-    'left_knee': 13,
-    'right_knee': 14,
-    'left_ankle': 15,
-    'right_ankle': 16
-}
-
 # -----------------------------------------------------------------------------------------------
 # User-defined callback function
 # -----------------------------------------------------------------------------------------------
@@ -95,7 +75,7 @@ def app_callback(pad, info, user_data):
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
-    # Parse the detections
+    # Parse the detections (only two points per person: a per-point loop is cheaper than batching them through NumPy)
     for detection in detections:
         label = detection.get_label()
         bbox = detection.get_bbox()
@@ -112,9 +92,8 @@ def app_callback(pad, info, user_data):
             landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
             if len(landmarks) != 0:
                 points = landmarks[0].get_points()
-                for wrist in ['left_wrist', 'right_wrist']:
-                    keypoint_index = keypoints[wrist]
-                    point = points[keypoint_index]
+                for wrist in ('left_wrist', 'right_wrist'):
+                    point = points[KEYPOINTS[wrist]]
                     if point.confidence() < CONFIDENCE_THRESHOLD:
                         continue
                     x = int((point.x() * bbox.width() + bbox.xmin()) * reduced_width)
@@ -12,6 +12,9 @@ from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callbac
 from hailo_apps.hailo_app_python.apps.instance_segmentation.instance_segmentation_pipeline import GStreamerInstanceSegmentationApp
 from hailo_apps.hailo_app_python.core.common.core import get_default_parser
 
+from basic_pipelines.detection_batch import LabelIds, extract_detections
+from basic_pipelines.frame_skip import AdaptiveFrameSkip
+from basic_pipelines.mask_compositor import MaskCompositor
 from wled_display import WLEDDisplay, add_parser_args
 
 # -----------------------------------------------------------------------------------------------
@@ -22,7 +25,10 @@ class user_app_callback_class(app_callback_class):
     def __init__(self, parser):
         super().__init__()
         self.wled = WLEDDisplay(parser=parser)
-        self.frame_skip = 1  # Process every frame
+        # Process every frame while the callback keeps up, fewer when it falls behind
+        self.frame_skip = AdaptiveFrameSkip(skip=1, max_skip=8)
+        # Mask overlay buffers, reused across frames
+        self.compositor = MaskCompositor(COLORS, alpha=0.5)
 
 # Predefined colors (BGR format)
 COLORS = [
@@ -38,6 +44,9 @@ COLORS = [
     (128, 128, 0)   # Olive
 ]
 
+# Person rows by class id (the id of "person" is learned from the first frame that has one)
+PERSON = LabelIds("person")
+
 # -----------------------------------------------------------------------------------------------
 # User-defined callback function
 # -----------------------------------------------------------------------------------------------
@@ -48,16 +57,16 @@ def app_callback(pad, info, user_data):
     user_data.increment()
     string_to_print = f"Frame count: {user_data.get_count()}\n"
 
-    # Skip frames to reduce compute
-    if user_data.get_count() % user_data.frame_skip != 0:
-        return Gst.PadProbeReturn.OK
-
     # Get the GstBuffer from the probe info
     buffer = info.get_buffer()
     # Check if the buffer is valid
     if buffer is None:
         return Gst.PadProbeReturn.OK
 
+    # Skip frames to reduce compute
+    if not user_data.frame_skip.tick(pad):
+        return Gst.PadProbeReturn.OK
+
     # Get the caps from the pad
     format, width, height = get_caps_from_pad(pad)
 
@@ -72,56 +81,26 @@ def app_callback(pad, info, user_data):
     roi = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
 
-    # Parse the detections
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        if label == "person":
-            string_to_print += (f"Detection: {label} {confidence:.2f}\n")
-            # Get track ID
-            track_id = 0
-            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-            if len(track) == 1:
-                track_id = track[0].get_id()
-
-            # Instance segmentation mask from detection (if available)
-            masks = detection.get_objects_typed(hailo.HAILO_CONF_CLASS_MASK)
-            if len(masks) != 0:
-                mask = masks[0]
-                # Note that the mask is a 1D array, you need to reshape it to get the original shape
-                mask_height = mask.get_height()
-                mask_width = mask.get_width()
-                data = np.array(mask.get_data())
-                data = data.reshape((mask_height, mask_width))
-                # Resize the mask to the ROI size
-                roi_width = int(bbox.width() * reduced_width)
-                roi_height = int(bbox.height() * reduced_height)
-                resized_mask_data = cv2.resize(data, (roi_width, roi_height), interpolation=cv2.INTER_LINEAR)
-
-                # Calculate the ROI coordinates
-                x_min, y_min = int(bbox.xmin() * reduced_width), int(bbox.ymin() * reduced_height)
-                x_max, y_max = x_min + roi_width, y_min + roi_height
-
-                # Ensure the ROI dimensions are within the frame boundaries and handle negative values
-                y_min = max(y_min, 0)
-                x_min = max(x_min, 0)
-                y_max = min(y_max, reduced_frame.shape[0])
-                x_max = min(x_max, reduced_frame.shape[1])
-
-                # Ensure ROI dimensions are valid
-                if x_max > x_min and y_max > y_min:
-                    # Add mask overlay to the frame
-                    mask_overlay = np.zeros_like(reduced_frame)
-                    color = COLORS[track_id % len(COLORS)]  # Get color based on track_id
-                    mask_overlay[y_min:y_max, x_min:x_max] = np.dstack([(resized_mask_data[:y_max-y_min, :x_max-x_min] > 0.5) * c for c in color])
-                    reduced_frame = cv2.addWeighted(reduced_frame, 1, mask_overlay, 0.5, 0)
+    # Read the detections in one pass and keep the persons
+    batch = extract_detections(detections, hailo.HAILO_UNIQUE_ID)
+    track_ids = np.maximum(batch.track_ids, 0)  # 0 for detections without a track
+    user_data.compositor.begin(reduced_width, reduced_height)
+    for i in np.flatnonzero(PERSON.match(batch)).tolist():
+        string_to_print += (f"Detection: person {batch.confidences[i]:.2f}\n")
+        # Instance segmentation mask from detection (if available), resized into its ROI of the label buffer
+        masks = batch.detections[i].get_objects_typed(hailo.HAILO_CONF_CLASS_MASK)
+        if len(masks) != 0:
+            user_data.compositor.add(masks[0], batch.bboxes[i].tolist(), int(track_ids[i]))
+    # Add all the mask overlays to the frame in one pass
+    reduced_frame = user_data.compositor.blend(reduced_frame)
 
     # Resize the frame to the WLED size for display
     final_frame = cv2.resize(reduced_frame, (user_data.wled.width, user_data.wled.height))
     user_data.wled.frame_queue.put(final_frame)
 
+    string_to_print += f"Frame skip: {user_data.frame_skip.skip}\n"
     print(string_to_print)
+    user_data.frame_skip.done()
     return Gst.PadProbeReturn.OK
 
 if __name__ == "__main__":
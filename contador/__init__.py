@@ -0,0 +1,6 @@
+"""
+Lógica de conteo de personas usada por contador_personas.py.
+
+Los módulos de este paquete no dependen de GStreamer ni de hailo, de modo que
+se pueden probar y medir en cualquier equipo con Python y NumPy.
+"""
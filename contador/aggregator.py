@@ -0,0 +1,377 @@
+"""
+Agregador de cruces de varios contadores en totales del sitio, sin contar dos veces.
+
+Cada contador_personas.py (uno por Raspberry Pi) manda sus cruces por UDP con
+AggregatorClient: el callback solo encola el cruce y un hilo arma lotes de
+hasta `batch_size` eventos por datagrama, cada `interval` segundos o antes si
+el lote se llena. El proceso agregador (AggregatorServer) recibe los lotes, los
+pasa a un Deduplicator y expone los totales por estadísticas y métricas HTTP.
+
+Dos cámaras que cubren la misma puerta ven pasar a la misma persona: los
+nombres "<dispositivo>/<línea>" de esas cámaras se agrupan en una zona del
+sitio (archivo JSON o YAML, {zona: ["pi1/linea", "pi2/puerta", ...]}). Un
+cruce de una zona en un sentido es duplicado si otro dispositivo de la misma
+zona ya reportó uno en ese sentido a menos de `window` segundos. Los cruces se
+indexan en cubetas de `window` segundos, así que cada evento revisa solo tres
+cubetas; las cubetas se descartan `retention` segundos después de llegar. Los relojes de
+las Pi tienen que estar sincronizados (NTP) mucho mejor que `window`.
+
+    python -m contador.aggregator --port 9500 --doors puertas.json --window 1.0
+    python contador_personas.py --aggregator 192.168.1.10:9500 --device-name pi1
+"""
+import argparse
+import json
+import math
+import socket
+import threading
+import time
+from collections import deque
+
+from basic_pipelines.metrics_server import Metric, COUNTER, sample
+
+DEFAULT_PORT = 9500
+PREFIX = "people_counter_site"
+
+# Tamaño máximo de un datagrama recibido (un lote de 64 cruces ocupa unos 4 KB)
+MAX_DATAGRAM = 65507
+
+
+def parse_address(address, default_port=DEFAULT_PORT):
+    """ "host:puerto" (o solo "host") a (host, puerto)."""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return port, default_port
+    return host, int(port)
+
+
+def load_doors(config):
+    """{zona: [nombres]} (o la ruta de un archivo JSON/YAML) a {"dispositivo/nombre": zona}."""
+    from contador.zones import load_zone_config
+
+    if not isinstance(config, dict):
+        config = load_zone_config(config)
+    return {name: zone for zone, names in config.items() for name in names}
+
+
+class Deduplicator:
+    """
+    Totales del sitio con los cruces repetidos por cámaras que se superponen descartados.
+
+    Args:
+        window: segundos dentro de los que dos cruces de la misma zona y sentido,
+            de dispositivos distintos, son la misma persona.
+        doors: {"dispositivo/nombre": zona}; los nombres que no están son su propia zona.
+        retention: segundos que se guardan los cruces para emparejar eventos que
+            llegan atrasados (lotes de otro dispositivo, red).
+    """
+
+    def __init__(self, window=1.0, doors=None, retention=None):
+        self.window = window
+        self.doors = dict(doors or {})
+        self.retention = retention if retention is not None else max(10 * window, 60.0)
+        # {(zona, sentido, cubeta): [[instante, {dispositivos}], ...]}: cada elemento es una
+        # persona, con los dispositivos que ya la reportaron
+        self._buckets = {}
+        self._order = deque()  # (instante de llegada, clave de cubeta), en orden de creación
+
+        self.totals = {}  # {zona: {sentido: n}} sin duplicados
+        self.devices = {}  # {dispositivo: {sentido: n}} tal como llegaron
+        self.events = 0
+        self.duplicates = 0
+
+    def zone_of(self, device, name):
+        key = f"{device}/{name}"
+        return self.doors.get(key, key)
+
+    def add(self, device, timestamp, name, direction, received=None):
+        """
+        Suma un cruce; devuelve False si es una persona que ya reportó otro dispositivo.
+
+        Args:
+            timestamp: instante del cruce según el dispositivo (segundos epoch).
+            received: instante de llegada (time.monotonic() por defecto); las
+                cubetas vencen por llegada, así un reloj adelantado no borra las
+                de los demás.
+        """
+        if received is None:
+            received = time.monotonic()
+        self._expire(received)
+        self.events += 1
+        counts = self.devices.setdefault(device, {})
+        counts[direction] = counts.get(direction, 0) + 1
+
+        zone = self.zone_of(device, name)
+        window = self.window
+        bucket = int(timestamp // window)
+        buckets = self._buckets
+        best = None
+        best_distance = window
+        for key in ((zone, direction, bucket - 1), (zone, direction, bucket), (zone, direction, bucket + 1)):
+            for person in buckets.get(key, ()):
+                distance = abs(person[0] - timestamp)
+                if distance <= best_distance and device not in person[1]:
+                    best, best_distance = person, distance
+        if best is not None:
+            best[1].add(device)
+            self.duplicates += 1
+            return False
+
+        key = (zone, direction, bucket)
+        people = buckets.get(key)
+        if people is None:
+            people = buckets[key] = []
+            self._order.append((received, key))
+        people.append([timestamp, {device}])
+        totals = self.totals.setdefault(zone, {})
+        totals[direction] = totals.get(direction, 0) + 1
+        return True
+
+    def _expire(self, received):
+        order = self._order
+        limit = received - self.retention
+        while order and order[0][0] < limit:
+            del self._buckets[order.popleft()[1]]
+
+    def site_totals(self):
+        """Entradas y salidas del sitio, sumando todas las zonas."""
+        result = {}
+        for counts in self.totals.values():
+            for direction, n in counts.items():
+                result[direction] = result.get(direction, 0) + n
+        return result
+
+
+class AggregatorServer:
+    """
+    Recibe lotes de cruces por UDP en un hilo propio y los pasa al Deduplicator.
+
+    Cada datagrama es un objeto JSON {"device": nombre, "events": [[instante,
+    tipo, nombre, sentido, track], ...]}. Los datagramas mal formados se cuentan
+    en `bad_datagrams` y se descartan.
+    """
+
+    def __init__(self, deduplicator, host="0.0.0.0", port=DEFAULT_PORT, receive_buffer=4 * 2 ** 20):
+        self.deduplicator = deduplicator
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.2)
+        self.port = self._sock.getsockname()[1]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Estadísticas
+        self.datagrams = 0
+        self.bad_datagrams = 0
+
+    def start(self):
+        """Arranca el hilo receptor."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="aggregator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el hilo y cierra el socket."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._sock.close()
+
+    def _run(self):
+        sock = self._sock
+        while not self._stop.is_set():
+            try:
+                data = sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle(data)
+
+    def handle(self, data):
+        """Procesa un datagrama."""
+        try:
+            message = json.loads(data)
+            device = message["device"]
+            if not isinstance(device, str):
+                raise TypeError("device")
+            # Se convierte todo antes de sumar: un evento inválido descarta el lote entero
+            events = [(float(event[0]), str(event[2]), str(event[3])) for event in message["events"]]
+            if not all(math.isfinite(timestamp) for timestamp, _, _ in events):
+                raise ValueError("timestamp")
+        except (ValueError, KeyError, TypeError, IndexError):
+            self.bad_datagrams += 1
+            return
+        add = self.deduplicator.add
+        with self._lock:
+            for timestamp, name, direction in events:
+                add(device, timestamp, name, direction)
+            self.datagrams += 1
+
+    def stats_snapshot(self):
+        """Valores de la línea de estadísticas (se registra con StatsSink.add_source)."""
+        with self._lock:
+            totals = self.deduplicator.site_totals()
+            return {
+                "Entradas": totals.get("entrada", 0),
+                "Salidas": totals.get("salida", 0),
+                "Eventos": self.deduplicator.events,
+                "Duplicados": self.deduplicator.duplicates,
+                "Dispositivos": len(self.deduplicator.devices),
+            }
+
+    def metrics(self):
+        """Lista de Metric con los totales del sitio y lo recibido de cada dispositivo."""
+        with self._lock:
+            deduplicator = self.deduplicator
+            return [
+                Metric(f"{PREFIX}_crossings_total", COUNTER, "Cruces del sitio por zona y sentido, sin duplicados", [
+                    sample(n, zone=zone, direction=direction)
+                    for zone, counts in deduplicator.totals.items()
+                    for direction, n in counts.items()
+                ]),
+                Metric(f"{PREFIX}_device_crossings_total", COUNTER, "Cruces recibidos por dispositivo y sentido", [
+                    sample(n, device=device, direction=direction)
+                    for device, counts in deduplicator.devices.items()
+                    for direction, n in counts.items()
+                ]),
+                Metric(f"{PREFIX}_duplicates_total", COUNTER, "Cruces descartados por repetir los de otra cámara",
+                       [sample(deduplicator.duplicates)]),
+                Metric(f"{PREFIX}_datagrams_total", COUNTER, "Lotes recibidos", [sample(self.datagrams)]),
+                Metric(f"{PREFIX}_bad_datagrams_total", COUNTER, "Lotes descartados por mal formados",
+                       [sample(self.bad_datagrams)]),
+            ]
+
+
+class AggregatorClient:
+    """
+    Manda los cruces de un contador al agregador por UDP, en lotes, desde un hilo propio.
+
+    `add` tiene la firma de contador.store.CountStore.add: solo encola.
+
+    Args:
+        address: (host, puerto) del agregador.
+        device: nombre de este contador en el sitio.
+        batch_size: cruces por datagrama como máximo.
+        interval: segundos máximos que un cruce espera en la cola.
+        max_queue: cruces en cola como máximo; si el hilo no da abasto, los más
+            viejos se descartan y se cuentan en `dropped`.
+    """
+
+    def __init__(self, address, device, batch_size=64, interval=0.2, max_queue=10000):
+        self.address = address
+        self.device = device
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = deque(maxlen=max_queue)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Estadísticas
+        self.sent = 0
+        self.datagrams = 0
+        self.dropped = 0  # Cruces descartados por cola llena
+        self.lost = 0  # Cruces de lotes que no se pudieron mandar
+        self.send_errors = 0
+
+    def add(self, kind, name, direction, track_id=None, timestamp=None):
+        """Encola un cruce; `timestamp` en segundos epoch (por defecto, ahora)."""
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append((time.time() if timestamp is None else timestamp, kind, name, direction, track_id))
+        if len(queue) >= self.batch_size:
+            self._wake.set()
+
+    def start(self):
+        """Arranca el hilo de envío."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="aggregator-client", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Manda lo que quede en la cola y detiene el hilo."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._sock.close()
+
+    def flush(self):
+        """Manda todos los cruces en cola, en lotes de hasta batch_size; devuelve cuántos."""
+        queue = self._queue
+        total = 0
+        while queue:
+            batch = []
+            while queue and len(batch) < self.batch_size:
+                batch.append(queue.popleft())
+            data = json.dumps({"device": self.device, "events": batch}, separators=(",", ":")).encode()
+            try:
+                self._sock.sendto(data, self.address)
+            except OSError:
+                self.send_errors += 1
+                self.lost += len(batch)
+                continue
+            self.sent += len(batch)
+            self.datagrams += 1
+            total += len(batch)
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+def main():
+    from basic_pipelines.metrics_server import MetricsServer
+    from basic_pipelines.stats_sink import StatsSink, FORMATS
+
+    parser = argparse.ArgumentParser(description='Agregador de cruces de varios contadores del sitio')
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='Dirección donde se reciben los cruces')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Puerto UDP donde se reciben los cruces')
+    parser.add_argument('--doors', type=str, help='Archivo JSON/YAML {zona: ["dispositivo/línea", ...]} con las cámaras que cubren la misma puerta')
+    parser.add_argument('--window', type=float, default=1.0, help='Segundos en que dos cruces de la misma zona y sentido son la misma persona')
+    parser.add_argument('--stats-interval', type=float, default=5.0, help='Segundos entre líneas de estadísticas (0 = no imprimir)')
+    parser.add_argument('--stats-format', choices=FORMATS, default='human', help='Formato de las estadísticas: texto o JSON por línea')
+    parser.add_argument('--metrics-port', type=int, help='Servir métricas HTTP (/metrics Prometheus, /metrics.json) en este puerto')
+    parser.add_argument('--metrics-host', type=str, default='0.0.0.0', help='Dirección donde escucha el servidor de métricas')
+    args = parser.parse_args()
+
+    doors = load_doors(args.doors) if args.doors else None
+    server = AggregatorServer(Deduplicator(args.window, doors), args.host, args.port).start()
+    stats = None
+    if args.stats_interval > 0:
+        stats = StatsSink(args.stats_interval, args.stats_format)
+        stats.add_source(server.stats_snapshot)
+        stats.start()
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(server.metrics, args.metrics_host, args.metrics_port).start()
+    print(f"Agregador escuchando en {args.host}:{server.port}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        if stats is not None:
+            stats.stop()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Callback de conteo de personas, independiente de GStreamer y de hailo.
+
+contador_personas.py conecta counting_callback al pipeline con el backend real
+(módulo hailo y utilidades de buffer de hailo_apps). contador.replay usa el
+mismo callback con objetos equivalentes leídos de un log grabado, así que la
+lógica de conteo se puede probar y medir sin Raspberry Pi ni cámara.
+"""
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from basic_pipelines.detection_batch import LabelIds, extract_detections, NO_TRACK
+from basic_pipelines.stage_timing import StageTimer
+from contador.occupancy import OccupancyWindows
+from contador.recorder import record_detections
+from contador.tracks import TrackTable, ENTRY, EXIT
+from contador.zones import LINE
+
+# Confianza mínima para contar una persona
+MIN_CONFIDENCE = 0.5
+
+# Personas por class id (el id de "person" se aprende en el primer frame que la trae)
+PERSON = LabelIds("person")
+
+# Nombre con que se reportan los cruces de la línea virtual (sin --zones)
+DEFAULT_LINE = "linea"
+
+# Ventana de ocupación cuyo pico se muestra en el overlay
+OVERLAY_WINDOW = "15m"
+
+# Lo que el callback necesita del entorno: módulo hailo (get_roi_from_buffer,
+# HAILO_DETECTION, HAILO_UNIQUE_ID), lectura de caps y del frame, y el valor de
+# retorno del probe
+CallbackBackend = namedtuple('CallbackBackend', ['hailo', 'get_caps_from_pad', 'get_numpy_from_buffer', 'probe_ok'])
+
+# Gst.CLOCK_TIME_NONE: buffer sin PTS
+CLOCK_TIME_NONE = 2 ** 64 - 1
+
+# Etapas del callback medidas con StageTimer (en el orden en que se ejecutan)
+# ("submit" solo se usa con un OverlayRenderer; "overlay" y "convert" solo sin él)
+COUNTER_STAGES = ("record", "decimated", "caps", "frame", "clip", "detections", "counting", "overlay", "convert",
+                  "submit")
+(STAGE_RECORD, STAGE_DECIMATED, STAGE_CAPS, STAGE_FRAME, STAGE_CLIP, STAGE_DETECTIONS, STAGE_COUNTING,
+ STAGE_OVERLAY, STAGE_CONVERT, STAGE_SUBMIT) = range(len(COUNTER_STAGES))
+
+
+class PersonCounterState:
+    """
+    Estado del contador de personas.
+
+    Se combina con una clase que aporte increment, get_count, use_frame y
+    set_frame (app_callback_class en contador_personas.py).
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Contadores
+        self.total_count = 0
+        self.entrada_count = 0
+        self.salida_count = 0
+        
+        # Pico, mínimo, media y flujo neto del último minuto, 15 minutos y hora
+        self.occupancy = OccupancyWindows()
+        
+        # Línea virtual (porcentaje de la altura de la imagen)
+        self.line_position = 0.5  # Mitad de la imagen
+        
+        # Seguimiento de personas: registros preasignados indexados por track id.
+        # Las personas que no se ven durante 150 frames o 10 segundos se olvidan
+        # para que la tabla no crezca sin límite.
+        self.tracked_people = TrackTable(max_age_frames=150, max_age_seconds=10.0)
+        
+        # Motor de varias líneas y zonas (opcional, reemplaza a line_position)
+        self.zone_engine = None
+        
+        # Contar cada N frames; en los frames intermedios solo se guardan las posiciones
+        self.count_every = 1
+        
+        # Grabación de detecciones (contador.recorder.DetectionRecorder, opcional)
+        self.recorder = None
+        
+        # Salida de estadísticas (basic_pipelines.stats_sink.StatsSink, opcional). El
+        # callback solo le pasa los cruces; el resto lo lee el hilo del sink con
+        # stats_snapshot, así que en el frame no se formatea ni se imprime nada.
+        self.stats = None
+        
+        # Almacén persistente de cruces (contador.store.CountStore, opcional)
+        self.store = None
+        
+        # Envío de cruces al agregador del sitio (contador.aggregator.AggregatorClient, opcional)
+        self.aggregator = None
+        
+        # Mapa de calor de permanencia (contador.heatmap.HeatmapAccumulator, opcional)
+        self.heatmap = None
+        
+        # Clips de evidencia en cada cruce (contador.clips.ClipRecorder, opcional). El
+        # callback solo le pasa referencias a los frames; la codificación es de su pool.
+        self.clips = None
+        
+        # Unión de fragmentos de track (contador.stitching.TrackStitcher, opcional)
+        self.stitcher = None
+        
+        # Trayectorias por persona con velocidad, rumbo y permanencia
+        # (contador.trajectories.TrajectoryBuffer, opcional)
+        self.trajectories = None
+        
+        # Cámara de este estado con varias fuentes (contador.multicam): sus cruces
+        # se reportan como "<stream>/<nombre>" en estadísticas y almacén
+        self.stream = None
+        
+        # Latencia por etapa del callback (HAILO_STAGE_TIMING=N imprime un reporte cada N segundos)
+        self.timer = StageTimer.from_env(COUNTER_STAGES)
+        
+        # Render del overlay en un hilo aparte (contador.overlay.OverlayRenderer,
+        # opcional). Sin él, el overlay se dibuja dentro del callback.
+        self.renderer = None
+        
+        # Para visualización
+        self.line_color = (0, 255, 255)  # Amarillo
+        self.line_thickness = 2
+
+    def stats_snapshot(self):
+        """Valores de la línea de estadísticas (se registra con StatsSink.add_source)."""
+        snapshot = {
+            "Frame": self.get_count(),
+            "Total": self.total_count,
+            "Entradas": self.entrada_count,
+            "Salidas": self.salida_count,
+            "Tracks": len(self.tracked_people),
+            "Expulsados": self.tracked_people.evicted,
+        }
+        if self.stitcher is not None:
+            snapshot["Unidos"] = self.stitcher.stitched
+        if self.trajectories is not None:
+            snapshot["Vel media"] = round(self.trajectories.mean_speed, 3)
+            snapshot["Quietos"] = self.trajectories.stationary
+            snapshot["Perm media"] = round(self.trajectories.mean_dwell, 1)
+        for name, summary in self.occupancy.snapshot().items():
+            snapshot[f"Pico {name}"] = summary.peak
+            snapshot[f"Neto {name}"] = summary.net_flow
+        return snapshot
+
+    def restore_counts(self, store):
+        """Retoma las entradas y salidas guardadas en un contador.store.CountStore."""
+        prefix = None if self.stream is None else f"{self.stream}/"
+        for name, counts in store.totals(kind=LINE).items():
+            if prefix is not None and not name.startswith(prefix):
+                continue
+            self.entrada_count += counts.get("entrada", 0)
+            self.salida_count += counts.get("salida", 0)
+
+
+def configure_counter(user_data, settings):
+    """
+    Aplica al estado del contador las opciones de contador_personas.py.
+
+    Args:
+        settings: dict con line_position, zones, count_every, track_ttl_frames,
+            track_ttl_seconds, stitch, stitch_gap, stitch_distance, trajectories
+            y trajectory_history (por ejemplo vars(args)); las que faltan quedan
+            por defecto.
+    """
+    from contador.stitching import TrackStitcher
+    from contador.trajectories import TrajectoryBuffer
+    from contador.zones import ZoneEngine
+
+    user_data.line_position = settings.get("line_position", 0.5)
+    user_data.tracked_people.max_age_frames = settings.get("track_ttl_frames", 150) or None
+    user_data.tracked_people.max_age_seconds = settings.get("track_ttl_seconds", 10.0) or None
+    user_data.count_every = max(settings.get("count_every", 1), 1)
+    user_data.tracked_people.set_history(user_data.count_every)
+    if settings.get("zones"):
+        user_data.zone_engine = ZoneEngine.from_config(settings["zones"])
+    if settings.get("stitch"):
+        user_data.stitcher = TrackStitcher(settings.get("stitch_gap", 1.5), settings.get("stitch_distance", 0.08))
+    if settings.get("trajectories"):
+        user_data.trajectories = TrajectoryBuffer(user_data.tracked_people.capacity,
+                                                  settings.get("trajectory_history", 32))
+    return user_data
+
+
+def person_mask(batch):
+    """Personas detectadas con confianza suficiente en un DetectionBatch."""
+    return PERSON.match(batch) & (batch.confidences > MIN_CONFIDENCE)
+
+
+def report_event(user_data, track_id, kind, name, direction, age=0.0):
+    """
+    Pasa un cruce a la salida de estadísticas, al almacén, al agregador y a los clips, si están configurados.
+
+    `age` son los segundos entre el cruce y el frame actual (modo diezmado).
+    """
+    if user_data.stream is not None:
+        name = f"{user_data.stream}/{name}"
+    timestamp = time.time() - age if age > 0 else None
+    if user_data.stats is not None:
+        user_data.stats.event(ID=track_id, nombre=name, sentido=direction)
+    if user_data.store is not None:
+        user_data.store.add(kind, name, direction, track_id, timestamp)
+    if user_data.aggregator is not None:
+        user_data.aggregator.add(kind, name, direction, track_id, timestamp)
+    if user_data.clips is not None:
+        user_data.clips.trigger(name, direction, track_id, age)
+
+
+def frame_time(buffer):
+    """Instante del frame en segundos: el PTS si existe, si no el reloj monotónico."""
+    pts = getattr(buffer, "pts", CLOCK_TIME_NONE)
+    if pts is None or pts == CLOCK_TIME_NONE:
+        return time.monotonic()
+    return pts / 1e9
+
+
+# Función de callback para procesar cada frame
+def counting_callback(pad, info, user_data, backend):
+    hailo = backend.hailo
+    
+    # Obtener el buffer del frame
+    buffer = info.get_buffer()
+    if buffer is None:
+        return backend.probe_ok
+
+    # Incrementar contador de frames
+    user_data.increment()
+    timer = user_data.timer
+    t = timer.begin()
+    
+    # Olvidar a las personas que dejaron de verse
+    tracked_people = user_data.tracked_people
+    now = frame_time(buffer)
+    tracked_people.tick(user_data.get_count(), now)
+    
+    # Grabar todas las detecciones del frame si está habilitado
+    recorder = user_data.recorder
+    if recorder is not None:
+        _, rec_width, rec_height = backend.get_caps_from_pad(pad)
+        record_detections(recorder, user_data.get_count(), getattr(buffer, "pts", 0), rec_width, rec_height,
+                          hailo.get_roi_from_buffer(buffer).get_objects_typed(hailo.HAILO_DETECTION),
+                          hailo.HAILO_UNIQUE_ID)
+        t = timer.lap(STAGE_RECORD, t)
+    
+    # Modo diezmado: en los frames intermedios solo se guardan las posiciones de
+    # las personas; los cruces se prueban en el próximo frame contado
+    decimated = user_data.count_every > 1
+    if decimated and user_data.get_count() % user_data.count_every != 0:
+        roi = hailo.get_roi_from_buffer(buffer)
+        batch = extract_detections(roi.get_objects_typed(hailo.HAILO_DETECTION), hailo.HAILO_UNIQUE_ID)
+        tracked = np.flatnonzero(person_mask(batch) & (batch.track_ids != NO_TRACK))
+        track_ids = batch.track_ids[tracked].tolist()
+        centers = batch.centers()[tracked]
+        if user_data.stitcher is not None:
+            track_ids = user_data.stitcher.process(track_ids, centers, now)
+        for track_id, (x, y) in zip(track_ids, centers.tolist()):
+            tracked_people.record(track_id, x, y)
+        timer.lap(STAGE_DECIMATED, t)
+        timer.end_frame()
+        return backend.probe_ok
+    
+    # Obtener información del frame
+    format, width, height = backend.get_caps_from_pad(pad)
+    t = timer.lap(STAGE_CAPS, t)
+    
+    # Posición de la línea virtual
+    line_y = int(height * user_data.line_position)
+    zone_engine = user_data.zone_engine
+    
+    # Obtener frame si está habilitado
+    frame = None
+    renderer = user_data.renderer
+    boxes = []
+    if user_data.use_frame and format is not None and width is not None and height is not None:
+        frame = backend.get_numpy_from_buffer(buffer, format, width, height)
+        if renderer is not None:
+            # El frame se dibuja después de que el probe devuelva el buffer
+            if not frame.flags.owndata:
+                frame = frame.copy()
+        # Dibujar línea virtual o las líneas y zonas configuradas
+        elif zone_engine is not None:
+            zone_engine.draw(frame, user_data.line_color, user_data.line_thickness)
+        else:
+            cv2.line(frame, (0, line_y), (width, line_y), user_data.line_color, user_data.line_thickness)
+        t = timer.lap(STAGE_FRAME, t)
+    
+    # Clips de evidencia: solo se encola el buffer; el pool de ClipRecorder lo mapea y lo codifica
+    clips = user_data.clips
+    if clips is not None and format is not None and width is not None and height is not None \
+            and clips.reserve(now):
+        clips.submit_buffer(now, buffer, backend.get_numpy_from_buffer, format, width, height)
+        t = timer.lap(STAGE_CLIP, t)
+    
+    # Obtener detecciones
+    roi = hailo.get_roi_from_buffer(buffer)
+    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+    
+    # Extraer todas las detecciones del frame en columnas y filtrar las personas
+    batch = extract_detections(detections, hailo.HAILO_UNIQUE_ID)
+    people = person_mask(batch)
+    current_count = int(np.count_nonzero(people))
+    reporting = (user_data.stats is not None or user_data.store is not None or user_data.aggregator is not None
+                 or clips is not None)
+    
+    # Personas con ID de seguimiento y el centro de su bounding box
+    tracked = np.flatnonzero(people & (batch.track_ids != NO_TRACK))
+    track_ids = batch.track_ids[tracked].tolist()
+    centers = batch.centers()[tracked]
+    # IDs que el tracker reasignó tras una oclusión: se traducen al ID anterior
+    if user_data.stitcher is not None:
+        track_ids = user_data.stitcher.process(track_ids, centers, now)
+    y_centers = (centers[:, 1].astype(np.float64) * height).tolist()
+    
+    zone_events = ()
+    if decimated:
+        for track_id, (x, y) in zip(track_ids, centers.tolist()):
+            tracked_people.record(track_id, x, y)
+    elif zone_engine is not None:
+        # Con zonas, las posiciones del frame se procesan juntas más abajo
+        zone_slots, zone_fresh = [], []
+        for track_id, y_center in zip(track_ids, y_centers):
+            state = tracked_people.observe(track_id, y_center)
+            zone_slots.append(state.slot)
+            zone_fresh.append(state.fresh)
+    else:
+        for track_id, y_center in zip(track_ids, y_centers):
+            # Actualizar posición y verificar si cruza la línea (solo se cuenta una vez)
+            crossing = tracked_people.update(track_id, y_center, line_y)
+            if crossing == ENTRY:
+                user_data.entrada_count += 1
+                if reporting:
+                    report_event(user_data, track_id, LINE, DEFAULT_LINE, "entrada")
+            elif crossing == EXIT:
+                user_data.salida_count += 1
+                if reporting:
+                    report_event(user_data, track_id, LINE, DEFAULT_LINE, "salida")
+    
+    # Slots de las personas para las trayectorias (antes de que el modo diezmado
+    # borre las marcas de los tracks que acaban de aparecer)
+    trajectories = user_data.trajectories
+    if trajectories is not None:
+        trajectory_slots, trajectory_fresh = tracked_people.slots(track_ids)
+    
+    # Dibujar bounding box e ID de cada persona seguida si el frame está disponible
+    if frame is not None and len(tracked):
+        pixel_boxes = batch.pixel_boxes(width, height)[tracked].tolist()
+        if renderer is not None:
+            boxes = [(x1, y1, x2, y2, track_id) for (x1, y1, x2, y2), track_id in zip(pixel_boxes, track_ids)]
+        else:
+            for (x1, y1, x2, y2), track_id in zip(pixel_boxes, track_ids):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    
+    t = timer.lap(STAGE_DETECTIONS, t)
+    
+    # En modo diezmado, probar cada tramo entre posiciones guardadas desde el último frame contado
+    if decimated:
+        if zone_engine is not None:
+            zone_events = zone_engine.process_pending(tracked_people.pending())
+            tracked_people.clear_pending()
+        else:
+            for crossing in tracked_people.flush(line_y, height):
+                if crossing.direction == ENTRY:
+                    user_data.entrada_count += 1
+                    direction = "entrada"
+                else:
+                    user_data.salida_count += 1
+                    direction = "salida"
+                if reporting:
+                    report_event(user_data, crossing.track_id, LINE, DEFAULT_LINE, direction, now - crossing.time)
+    # Verificar todas las líneas y zonas a la vez
+    elif zone_engine is not None:
+        zone_events = zone_engine.process(zone_slots, track_ids, centers, zone_fresh)
+    
+    for event in zone_events:
+        if reporting:
+            # En modo diezmado el evento lleva el instante de la muestra donde ocurrió
+            age = now - event.time if event.time is not None else 0.0
+            report_event(user_data, event.track_id, event.kind, event.name, event.direction, age)
+        # Los cruces de líneas alimentan los contadores globales
+        if event.kind == LINE:
+            if event.direction == "entrada":
+                user_data.entrada_count += 1
+            elif event.direction == "salida":
+                user_data.salida_count += 1
+    
+    # Actualizar contador total
+    user_data.total_count = max(user_data.total_count, current_count)
+    
+    # Ocupación en ventanas deslizantes
+    occupancy = user_data.occupancy
+    occupancy.update(now, current_count, user_data.entrada_count - user_data.salida_count)
+    
+    # Mapa de calor de permanencia: centros y pies de las personas seguidas
+    heatmap = user_data.heatmap
+    if heatmap is not None:
+        heatmap.add(now, centers, np.column_stack((centers[:, 0], batch.bboxes[tracked, 3])))
+    
+    # Trayectorias: una posición por persona en su anillo y el resumen de flujo del frame
+    if trajectories is not None:
+        trajectories.add(trajectory_slots, trajectory_fresh, centers, now)
+    t = timer.lap(STAGE_COUNTING, t)
+    
+    # Entregar el frame al hilo de render con una foto de las detecciones
+    if frame is not None and renderer is not None:
+        counts = (user_data.total_count, user_data.entrada_count, user_data.salida_count,
+                  occupancy.summary(OVERLAY_WINDOW).peak)
+        renderer.submit(frame, boxes, counts, line_y)
+        timer.lap(STAGE_SUBMIT, t)
+    # Mostrar contadores en el frame
+    elif frame is not None:
+        cv2.putText(frame, f"Total: {user_data.total_count}", (10, 30), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Entradas: {user_data.entrada_count}", (10, 70), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Salidas: {user_data.salida_count}", (10, 110), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame, f"Pico {OVERLAY_WINDOW}: {occupancy.summary(OVERLAY_WINDOW).peak}", (10, 150), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        t = timer.lap(STAGE_OVERLAY, t)
+        
+        # Convertir frame a BGR y guardarlo
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        user_data.set_frame(frame)
+        t = timer.lap(STAGE_CONVERT, t)
+    
+    timer.end_frame()
+    return backend.probe_ok
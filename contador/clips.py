@@ -0,0 +1,247 @@
+"""
+Clips de evidencia alrededor de cada cruce, sin grabar video todo el tiempo.
+
+ClipRecorder guarda en memoria los últimos segundos de video como JPEG chicos
+y, cuando alguien cruza una línea, escribe a disco los `pre_seconds` anteriores
+y los `post_seconds` posteriores al cruce.
+
+El callback solo encola: `reserve` decide si el frame entra (uno de cada
+`frame_step`, y solo si hay lugar en la cola de codificación; si no, se cuenta
+en `dropped`) y `submit_buffer` pasa al pool de hilos una referencia al buffer
+de GStreamer, sin mapearlo ni copiarlo. El pool lo mapea, lo achica, lo
+convierte a BGR y lo codifica (cv2 suelta el GIL mientras tanto). Mientras el
+pool tiene la referencia la memoria del buffer no se libera, y un elemento que
+quiera escribir en él trabaja sobre una copia. `trigger` anota el cruce y
+despierta al hilo de clips.
+
+El anillo de JPEG tiene un tope de bytes (`max_bytes`, 64 MB por defecto) y
+además descarta lo que ya no puede entrar en ningún clip (más viejo que
+pre_seconds + post_seconds), así que la memoria queda fija aunque corra días.
+El hilo de clips espera a que lleguen los frames posteriores al cruce y escribe
+el clip como MJPEG (los JPEG uno tras otro, sin volver a codificar):
+
+    ffmpeg -f mjpeg -framerate 15 -i clip.mjpeg clip.mp4
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# Frames en cola de codificación por cada hilo del pool antes de descartar
+QUEUE_PER_WORKER = 4
+
+
+class ClipRecorder:
+    """
+    Anillo de frames JPEG en memoria que se vuelca a disco en cada cruce.
+
+    Args:
+        directory: carpeta donde se escriben los clips.
+        pre_seconds, post_seconds: segundos de video antes y después del cruce.
+        max_bytes: tope de memoria del anillo de JPEG.
+        scale: factor de tamaño de los frames guardados.
+        quality: calidad JPEG (0-100).
+        frame_step: guardar uno de cada N frames contados.
+        workers: hilos que codifican.
+    """
+
+    def __init__(self, directory, pre_seconds=5.0, post_seconds=5.0, max_bytes=64 * 2 ** 20, scale=0.5,
+                 quality=70, frame_step=1, workers=2):
+        self.directory = directory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_bytes = max_bytes
+        self.scale = scale
+        self.quality = quality
+        self.frame_step = max(frame_step, 1)
+        os.makedirs(directory, exist_ok=True)
+
+        # Anillo de (instante, JPEG) y su tamaño total
+        self._ring = deque()
+        self._ring_bytes = 0
+        self._newest = None
+        self._lock = threading.Lock()
+
+        # Codificación: lugares libres en la cola del pool
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip-encoder")
+        self._slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+
+        # Cruces anotados por el callback y clips esperando sus frames posteriores
+        self.last_time = None
+        self._events = deque()
+        self._pending = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Estadísticas
+        self.frames = 0
+        self.encoded = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.clips = 0
+
+    # -- Lado del callback ---------------------------------------------------------
+
+    def reserve(self, timestamp):
+        """
+        Decide si el frame de `timestamp` se guarda; si devuelve True hay que
+        pasarlo a submit.
+        """
+        self.last_time = timestamp
+        self.frames += 1
+        if self.frames % self.frame_step:
+            return False
+        if not self._slots.acquire(blocking=False):
+            self.dropped += 1
+            return False
+        return True
+
+    def submit(self, timestamp, frame):
+        """Encola un frame RGB reservado con reserve; el callback no debe volver a tocarlo."""
+        self._pool.submit(self._encode, timestamp, frame)
+
+    def submit_buffer(self, timestamp, buffer, read_frame, format, width, height):
+        """
+        Encola el buffer de un frame reservado con reserve; el pool lo lee con
+        read_frame(buffer, format, width, height) (get_numpy_from_buffer).
+        """
+        self._pool.submit(self._encode, timestamp, None, (read_frame, buffer, format, width, height))
+
+    def trigger(self, name, direction, track_id=None, age=0.0):
+        """
+        Anota un cruce ocurrido `age` segundos antes del último frame visto; el
+        clip se escribe desde el hilo de clips.
+        """
+        if self.last_time is None:
+            return
+        self._events.append((self.last_time - age, time.time() - age, name, direction, track_id))
+        self._wake.set()
+
+    # -- Pool de codificación ------------------------------------------------------
+
+    def _encode(self, timestamp, frame, source=None):
+        try:
+            if source is not None:
+                read_frame, buffer, format, width, height = source
+                frame = read_frame(buffer, format, width, height)
+            if self.scale != 1.0:
+                frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            ok, data = cv2.imencode(".jpg", frame, (cv2.IMWRITE_JPEG_QUALITY, self.quality))
+            if ok:
+                self._store(timestamp, data.tobytes())
+        finally:
+            self._slots.release()
+        if self._pending or self._events:
+            self._wake.set()
+
+    def _store(self, timestamp, data):
+        horizon = self.pre_seconds + self.post_seconds
+        with self._lock:
+            ring = self._ring
+            if self._newest is not None and timestamp < self._newest - horizon:
+                # El tiempo retrocedió (PTS reiniciado): lo guardado ya no entra en ningún clip
+                self.evicted += len(ring)
+                ring.clear()
+                self._ring_bytes = 0
+                self._newest = None
+            ring.append((timestamp, data))
+            self._ring_bytes += len(data)
+            if self._newest is None or timestamp > self._newest:
+                self._newest = timestamp
+            limit = self._newest - horizon
+            while ring and (self._ring_bytes > self.max_bytes or ring[0][0] < limit):
+                self._ring_bytes -= len(ring.popleft()[1])
+                self.evicted += 1
+            self.encoded += 1
+
+    # -- Lectura (cualquier hilo) ----------------------------------------------------
+
+    @property
+    def ring_bytes(self):
+        """Bytes de JPEG en el anillo."""
+        return self._ring_bytes
+
+    def frames_between(self, start, end):
+        """JPEG del anillo con instante entre start y end, en orden."""
+        with self._lock:
+            frames = [item for item in self._ring if start <= item[0] <= end]
+        frames.sort(key=lambda item: item[0])
+        return [data for _, data in frames]
+
+    # -- Hilo de clips ---------------------------------------------------------------
+
+    def start(self):
+        """Arranca el hilo que escribe los clips."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="clips", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Termina de codificar, escribe los clips pendientes (con lo que haya) y detiene los hilos."""
+        self._pool.shutdown(wait=True)
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self._flush(final=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(1.0)
+            self._wake.clear()
+            self._flush(final=False)
+
+    def _flush(self, final):
+        """Escribe los clips cuyos frames posteriores ya llegaron (o todos, al terminar)."""
+        while self._events:
+            self._pending.append(self._events.popleft())
+        if not self._pending:
+            return
+        newest = self._newest
+        waiting = []
+        for event in self._pending:
+            timestamp = event[0]
+            end = timestamp + self.post_seconds
+            # Si el tiempo retrocedió (PTS reiniciado) los frames posteriores no van a llegar
+            if final or (newest is not None and (newest >= end or newest < timestamp - self.pre_seconds - self.post_seconds)):
+                self._write(event)
+            else:
+                waiting.append(event)
+        self._pending = waiting
+
+    def _write(self, event):
+        timestamp, wall_time, name, direction, track_id = event
+        frames = self.frames_between(timestamp - self.pre_seconds, timestamp + self.post_seconds)
+        if not frames:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(wall_time))
+        label = re.sub(r"[^\w.-]+", "_", f"{name}_{direction}")
+        suffix = "" if track_id is None else f"_{track_id}"
+        path = os.path.join(self.directory, f"{stamp}_{self.clips + 1:06d}_{label}{suffix}.mjpeg")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            for data in frames:
+                f.write(data)
+        # Quien lea la carpeta nunca ve un clip a medias
+        os.replace(tmp, path)
+        self.clips += 1
+
+    def stats(self):
+        """Contadores del anillo y de los clips."""
+        return {
+            "encoded": self.encoded,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "ring_bytes": self._ring_bytes,
+            "ring_frames": len(self._ring),
+            "clips": self.clips,
+        }
@@ -0,0 +1,384 @@
+"""
+Traspaso de detecciones por memoria compartida a un proceso de conteo aparte.
+
+Con --handoff, el probe de GStreamer ya no cuenta, ni guarda, ni imprime nada:
+copia un registro compacto de cada detección del frame (bbox, track id,
+confianza, etiqueta) junto con el PTS y el tamaño del frame a un anillo en
+memoria compartida, una columna por campo, y vuelve enseguida. Un proceso aparte (otro núcleo, otro
+GIL) lee el anillo y pasa cada frame por contador.callback.counting_callback
+con los objetos de contador.replay, así que la lógica de conteo, el almacén,
+las estadísticas y las métricas son exactamente las mismas.
+
+El anillo es de un productor y un consumidor: el productor solo escribe el
+índice de escritura y el consumidor solo el de lectura, cada uno en su propia
+línea de caché. Las escrituras de numpy en la memoria compartida no ordenan
+nada entre procesos (en los núcleos ARM de la Pi 5 el otro lado podría ver el
+índice nuevo antes que la ranura), así que los índices se publican y se leen
+con un multiprocessing.Lock compartido, cuyo acquire/release hace de barrera:
+el productor llena la ranura y después publica el índice de escritura con el
+lock tomado, y el consumidor copia la ranura y después publica el de lectura.
+Las secciones críticas son solo la escritura o lectura de un entero, y cada
+lado guarda la última copia que vio del índice del otro, así que en el caso
+común push() toma el lock una vez y pop() dos. Si el anillo está lleno el
+frame nuevo se descarta y se cuenta en `overruns` (el probe no espera a que se
+libere lugar), y si un frame trae más detecciones de las que caben en una
+ranura se cortan y se cuenta en `truncated`.
+
+    ring = DetectionRing.create(capacity=256)
+    worker = CountingWorker(ring, settings).start()
+    ...  # probe: handoff_callback(pad, info, ring, BACKEND)
+    worker.stop()
+    ring.close(); ring.unlink()
+
+Los frames de video no pasan por el anillo, así que en este modo no se dibuja
+el overlay.
+"""
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from contador.recorder import RECORD_DTYPE, NO_TRACK
+from contador.replay import (ReplayCounter, ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad,
+                             REPLAY_BACKEND)
+from contador.callback import counting_callback, configure_counter
+
+# Registro de una detección tal como lo devuelve pop(): los campos del log de
+# contador.recorder que no son del frame
+DETECTION_DTYPE = np.dtype([(name, RECORD_DTYPE.fields[name][0]) for name in ('track_id', 'confidence', 'bbox', 'label')])
+
+# Encabezado: 16 uint64 en dos líneas de caché, una por lado del anillo
+HEADER_WORDS = 16
+(CAPACITY, MAX_DETECTIONS, WRITE, OVERRUNS, TRUNCATED) = range(5)  # Los escribe el productor
+READ = 8  # Lo escribe el consumidor
+
+
+def ring_layout(capacity, max_detections):
+    """
+    Columnas del anillo en la memoria compartida, después del encabezado.
+
+    Cada columna es un arreglo (capacity, ...): el productor copia cada lista
+    del frame con una sola asignación por columna, que cuesta mucho menos que
+    armar registros estructurados uno por uno.
+
+    Returns:
+        Lista de (nombre, dtype, forma) en orden.
+    """
+    return [
+        ('pts', np.uint64, (capacity,)),
+        ('track_id', np.int32, (capacity, max_detections)),
+        ('confidence', np.float32, (capacity, max_detections)),
+        ('bbox', np.float32, (capacity, max_detections * 4)),  # xmin, ymin, xmax, ymax seguidos
+        ('label', 'S16', (capacity, max_detections)),
+        ('width', np.uint16, (capacity,)),
+        ('height', np.uint16, (capacity,)),
+        ('count', np.uint16, (capacity,)),
+    ]
+
+
+def _ring_size(capacity, max_detections):
+    size = HEADER_WORDS * 8
+    for _, dtype, shape in ring_layout(capacity, max_detections):
+        size += np.dtype(dtype).itemsize * int(np.prod(shape))
+    return size
+
+
+class DetectionRing:
+    """
+    Anillo de frames de detecciones en memoria compartida (un productor, un consumidor).
+
+    Se crea con create() en el proceso del pipeline y se abre con attach() en el
+    proceso que cuenta, con el nombre y el lock del anillo creado.
+    """
+
+    def __init__(self, shm, lock, owner):
+        self._shm = shm
+        self.lock = lock
+        self._owner = owner
+        self._header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        self.capacity = int(self._header[CAPACITY])
+        self.max_detections = int(self._header[MAX_DETECTIONS])
+        offset = HEADER_WORDS * 8
+        for name, dtype, shape in ring_layout(self.capacity, self.max_detections):
+            column = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            setattr(self, f"_{name}", column)
+            offset += column.nbytes
+        # Copias locales: el índice propio (cada lado es el único que escribe el suyo)
+        # y el último valor visto del índice del otro lado, que solo puede quedarse corto
+        with lock:
+            self._write = self._seen_write = int(self._header[WRITE])
+            self._read = self._seen_read = int(self._header[READ])
+
+    @classmethod
+    def create(cls, capacity=256, max_detections=64, name=None):
+        """Crea el anillo con `capacity` ranuras de hasta `max_detections` detecciones."""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_ring_size(capacity, max_detections))
+        header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        header[:] = 0
+        header[CAPACITY] = capacity
+        header[MAX_DETECTIONS] = max_detections
+        del header
+        return cls(shm, multiprocessing.get_context("spawn").Lock(), owner=True)
+
+    @classmethod
+    def attach(cls, name, lock):
+        """Abre un anillo creado por otro proceso (`lock` es el `lock` de ese anillo, heredado)."""
+        return cls(shared_memory.SharedMemory(name=name), lock, owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    # -- Productor (probe de GStreamer) -------------------------------------------
+
+    def push(self, pts, width, height, track_ids, confidences, bboxes, labels):
+        """
+        Copia un frame al anillo sin esperar nunca.
+
+        Args:
+            pts: PTS del frame en nanosegundos.
+            width, height: tamaño del frame.
+            track_ids, confidences, labels: una entrada por detección.
+            bboxes: xmin, ymin, xmax, ymax de cada detección, seguidos en una sola lista.
+
+        Returns:
+            False si el anillo estaba lleno y el frame se descartó.
+        """
+        header = self._header
+        write = self._write
+        if write - self._seen_read >= self.capacity:
+            with self.lock:
+                self._seen_read = int(header[READ])
+            if write - self._seen_read >= self.capacity:
+                header[OVERRUNS] += 1
+                return False
+        slot = write % self.capacity
+        n = len(track_ids)
+        if n > self.max_detections:
+            header[TRUNCATED] += 1
+            n = self.max_detections
+            track_ids, confidences, labels = track_ids[:n], confidences[:n], labels[:n]
+            bboxes = bboxes[:4 * n]
+        if n:
+            self._track_id[slot, :n] = track_ids
+            self._confidence[slot, :n] = confidences
+            self._bbox[slot, :4 * n] = bboxes
+            self._label[slot, :n] = labels
+        self._pts[slot] = pts
+        self._width[slot] = width
+        self._height[slot] = height
+        self._count[slot] = n
+        # El release del lock deja la ranura visible antes que el índice nuevo
+        write += 1
+        with self.lock:
+            header[WRITE] = write
+        self._write = write
+        return True
+
+    # -- Consumidor (proceso de conteo) -------------------------------------------
+
+    def pop(self):
+        """
+        Saca el frame más viejo del anillo.
+
+        Returns:
+            (pts, width, height, detecciones) con una copia de los registros como
+            arreglo de DETECTION_DTYPE, o None si no hay frames publicados.
+        """
+        read = self._read
+        if read >= self._seen_write:
+            with self.lock:
+                self._seen_write = int(self._header[WRITE])
+            if read >= self._seen_write:
+                return None
+        slot = read % self.capacity
+        n = int(self._count[slot])
+        records = np.empty(n, dtype=DETECTION_DTYPE)
+        records['track_id'] = self._track_id[slot, :n]
+        records['confidence'] = self._confidence[slot, :n]
+        records['bbox'] = self._bbox[slot, :4 * n].reshape(n, 4)
+        records['label'] = self._label[slot, :n]
+        frame = (int(self._pts[slot]), int(self._width[slot]), int(self._height[slot]), records)
+        # La ranura ya está copiada cuando el productor ve que quedó libre
+        read += 1
+        with self.lock:
+            self._header[READ] = read
+        self._read = read
+        return frame
+
+    # -- Estado (cualquier proceso) -------------------------------------------------
+
+    @property
+    def pending(self):
+        """Frames escritos que el consumidor todavía no leyó."""
+        with self.lock:
+            return int(self._header[WRITE]) - int(self._header[READ])
+
+    @property
+    def written(self):
+        return int(self._header[WRITE])
+
+    @property
+    def overruns(self):
+        """Frames descartados porque el anillo estaba lleno."""
+        return int(self._header[OVERRUNS])
+
+    @property
+    def truncated(self):
+        """Frames con más detecciones de las que caben en una ranura."""
+        return int(self._header[TRUNCATED])
+
+    def stats_snapshot(self):
+        """Valores para StatsSink.add_source."""
+        return {"En cola": self.pending, "Desbordes": self.overruns, "Truncados": self.truncated}
+
+    def close(self):
+        """Suelta las vistas y cierra la memoria compartida en este proceso."""
+        self._header = None
+        for name, _, _ in ring_layout(0, 0):
+            setattr(self, f"_{name}", None)
+        self._shm.close()
+
+    def unlink(self):
+        """Borra la memoria compartida (solo el proceso que la creó)."""
+        if self._owner:
+            self._shm.unlink()
+
+
+def handoff_callback(pad, info, ring, backend):
+    """Probe mínimo: copia las detecciones del frame al anillo y vuelve."""
+    buffer = info.get_buffer()
+    if buffer is None:
+        return backend.probe_ok
+    hailo = backend.hailo
+    unique_id_type = hailo.HAILO_UNIQUE_ID
+    _, width, height = backend.get_caps_from_pad(pad)
+    track_ids, confidences, bboxes, labels = [], [], [], []
+    for detection in hailo.get_roi_from_buffer(buffer).get_objects_typed(hailo.HAILO_DETECTION):
+        bbox = detection.get_bbox()
+        track = detection.get_objects_typed(unique_id_type)
+        track_ids.append(track[0].get_id() if len(track) == 1 else NO_TRACK)
+        confidences.append(detection.get_confidence())
+        bboxes += (bbox.xmin(), bbox.ymin(), bbox.xmax(), bbox.ymax())
+        labels.append(detection.get_label())
+    ring.push(buffer.pts, width or 0, height or 0, track_ids, confidences, bboxes, labels)
+    return backend.probe_ok
+
+
+def frame_objects(frame):
+    """(pad, info) de reproducción para un frame sacado del anillo."""
+    pts, width, height, records = frame
+    detections = [
+        ReplayDetection(label.decode(), confidence, ReplayBBox(*bbox), track_id)
+        for track_id, confidence, bbox, label in zip(records['track_id'].tolist(), records['confidence'].tolist(),
+                                                     records['bbox'].tolist(), records['label'].tolist())
+    ]
+    return ReplayPad(width, height), ReplayInfo(ReplayBuffer(pts, detections))
+
+
+def drain(ring, user_data):
+    """Pasa por el callback de conteo todos los frames publicados; devuelve cuántos."""
+    frames = 0
+    while True:
+        frame = ring.pop()
+        if frame is None:
+            return frames
+        pad, info = frame_objects(frame)
+        counting_callback(pad, info, user_data, REPLAY_BACKEND)
+        frames += 1
+
+
+def run_worker(ring_name, ring_lock, settings, stop_event, poll_interval=0.001):
+    """
+    Proceso de conteo: lee el anillo hasta que `stop_event` se activa y el anillo queda vacío.
+
+    Args:
+        ring_name, ring_lock: nombre y lock del anillo de DetectionRing.create.
+        settings: dict con las opciones de contador_personas.py (line_position,
+            zones, count_every, track_ttl_frames, track_ttl_seconds, record,
+            store, aggregator, device_name, heatmap, heatmap_interval,
+            heatmap_half_life, heatmap_cols, heatmap_rows, stats_interval,
+            stats_format, metrics_port, metrics_host).
+        stop_event: multiprocessing.Event para terminar.
+        poll_interval: segundos de espera cuando el anillo está vacío.
+    """
+    from basic_pipelines.metrics_server import MetricsServer
+    from basic_pipelines.stats_sink import StatsSink
+    from contador.aggregator import AggregatorClient, parse_address
+    from contador.metrics import counter_metrics, ring_metrics
+    from contador.recorder import DetectionRecorder
+    from contador.heatmap import HeatmapAccumulator
+    from contador.store import CountStore
+
+    ring = DetectionRing.attach(ring_name, ring_lock)
+    user_data = configure_counter(ReplayCounter(), settings)
+    if settings.get("record"):
+        user_data.recorder = DetectionRecorder(settings["record"])
+    if settings.get("store"):
+        user_data.store = CountStore(settings["store"])
+        user_data.restore_counts(user_data.store)
+        user_data.store.start()
+    if settings.get("aggregator"):
+        user_data.aggregator = AggregatorClient(parse_address(settings["aggregator"]),
+                                                settings.get("device_name", "contador")).start()
+    if settings.get("heatmap"):
+        user_data.heatmap = HeatmapAccumulator(settings.get("heatmap_cols", 64), settings.get("heatmap_rows", 36),
+                                               settings.get("heatmap_half_life") or None)
+        user_data.heatmap.start(settings["heatmap"], settings.get("heatmap_interval", 60.0))
+    if settings.get("stats_interval", 0) > 0:
+        user_data.stats = StatsSink(settings["stats_interval"], settings.get("stats_format", "human"))
+        user_data.stats.add_source(user_data.stats_snapshot)
+        user_data.stats.add_source(ring.stats_snapshot)
+        user_data.stats.start()
+    metrics_server = None
+    if settings.get("metrics_port") is not None:
+        metrics_server = MetricsServer(lambda: counter_metrics(user_data) + ring_metrics(ring),
+                                       settings.get("metrics_host", "0.0.0.0"), settings["metrics_port"]).start()
+    try:
+        while True:
+            if drain(ring, user_data) == 0:
+                if stop_event.is_set() and ring.pending == 0:
+                    break
+                time.sleep(poll_interval)
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        if user_data.stats is not None:
+            user_data.stats.stop()
+        if user_data.recorder is not None:
+            user_data.recorder.close()
+        if user_data.heatmap is not None:
+            user_data.heatmap.stop()
+        if user_data.store is not None:
+            user_data.store.close()
+        if user_data.aggregator is not None:
+            user_data.aggregator.stop()
+        ring.close()
+
+
+class CountingWorker:
+    """
+    Proceso de conteo que consume un DetectionRing (ver run_worker).
+
+    Usa el método spawn, así que el proceso nuevo no hereda los hilos de GStreamer.
+    """
+
+    def __init__(self, ring, settings):
+        context = multiprocessing.get_context("spawn")
+        self._stop = context.Event()
+        self.process = context.Process(target=run_worker, args=(ring.name, ring.lock, settings, self._stop),
+                                       name="contador", daemon=True)
+
+    def start(self):
+        """Arranca el proceso."""
+        self.process.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Pide al proceso que vacíe el anillo y termine; lo fuerza si no termina a tiempo."""
+        self._stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
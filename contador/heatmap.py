@@ -0,0 +1,177 @@
+"""
+Mapa de calor de permanencia: dónde se queda la gente frente a la cámara.
+
+HeatmapAccumulator divide la imagen en una grilla fija (por defecto 64x36) y en
+cada frame contado suma a la celda de cada persona seguida el tiempo desde el
+frame anterior, en dos capas: el centro de la caja y los pies (centro del borde
+inferior, que marca mejor dónde está parada). Las celdas quedan en segundos de
+permanencia. La memoria es la de la grilla, sin importar cuánto tiempo corra.
+
+Con `half_life`, lo viejo se desvanece exponencialmente, sin recorrer la grilla
+en cada frame: los valores se guardan escalados por un factor que crece con el
+tiempo (sumar en el instante t es sumar w * 2^((t - t0) / half_life)) y el
+decaimiento se aplica recién al leer, o cuando el factor se hace grande y hay
+que reescalar la grilla una vez.
+
+Las fotos se escriben desde un hilo propio cada `interval` segundos como PNG
+(capa de los pies coloreada) o .npy (las dos capas en segundos); el callback
+nunca toca el disco.
+
+    heatmap = HeatmapAccumulator(half_life=3600).start("calor.png", interval=60)
+    heatmap.add(frame_time, centros, pies)   # en el callback
+    heatmap.stop()
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+LAYERS = ("center", "foot")
+CENTER, FOOT = range(len(LAYERS))
+
+# Reescalar la grilla cuando el factor de decaimiento pendiente llega a 2^RESCALE_BITS
+RESCALE_BITS = 20
+# Huecos más largos entre frames (pausas, reconexiones) no suman permanencia
+MAX_STEP_SECONDS = 1.0
+
+
+class HeatmapAccumulator:
+    """
+    Grilla de permanencia por celda, con decaimiento exponencial opcional.
+
+    Args:
+        cols, rows: tamaño de la grilla.
+        half_life: segundos en que un valor se reduce a la mitad (None = sin decaimiento).
+        max_step: tope en segundos para lo que suma un frame.
+    """
+
+    def __init__(self, cols=64, rows=36, half_life=None, max_step=MAX_STEP_SECONDS):
+        self.cols = cols
+        self.rows = rows
+        self.half_life = half_life
+        self.max_step = max_step
+        self._scale = np.array([cols, rows], dtype=np.float32)
+        self._last_cell = np.array([cols - 1, rows - 1])
+        self._last_time = None
+        # (grilla escalada, instante de referencia): se reemplaza entera al reescalar,
+        # así el hilo de fotos siempre lee un par consistente
+        self._state = (np.zeros((len(LAYERS), rows, cols), dtype=np.float32), None)
+        self.frames = 0
+        self.points = 0
+
+        self._path = None
+        self._interval = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshots = 0
+
+    # -- Lado del callback ---------------------------------------------------------
+
+    def add(self, timestamp, centers, feet):
+        """
+        Suma un frame.
+
+        Args:
+            timestamp: instante del frame en segundos.
+            centers: (N, 2) centros de las cajas, normalizados 0-1.
+            feet: (N, 2) pies (x del centro, borde inferior), normalizados 0-1.
+        """
+        last = self._last_time
+        self._last_time = timestamp
+        self.frames += 1
+        grid, reference = self._state
+        if last is not None and timestamp < last and reference is not None:
+            # El tiempo retrocedió (PTS reiniciado): se aplica el decaimiento hasta el
+            # último frame y la referencia pasa al instante nuevo
+            self._state = (grid * np.float32(2.0 ** (-(last - reference) / self.half_life)), timestamp)
+        if last is None or timestamp <= last or not len(centers):
+            return
+        weight = min(timestamp - last, self.max_step)
+        if self.half_life is not None:
+            if reference is None:
+                reference = timestamp
+                self._state = (grid, reference)
+            exponent = (timestamp - reference) / self.half_life
+            if exponent >= RESCALE_BITS:
+                grid = grid * np.float32(2.0 ** -exponent)
+                reference = timestamp
+                self._state = (grid, reference)
+                exponent = 0.0
+            weight *= 2.0 ** exponent
+        # Las dos capas en una sola pasada: centros y pies juntos, los pies desplazados una capa
+        n = len(centers)
+        cells = (np.concatenate((centers, feet)) * self._scale).astype(np.intp)
+        np.maximum(cells, 0, out=cells)
+        np.minimum(cells, self._last_cell, out=cells)
+        index = cells[:, 1] * self.cols + cells[:, 0]
+        index[n:] += self.rows * self.cols
+        np.add.at(grid.reshape(-1), index, np.float32(weight))
+        self.points += n
+
+    # -- Lectura (cualquier hilo) ----------------------------------------------------
+
+    def snapshot(self, timestamp=None):
+        """
+        Copia de la grilla en segundos de permanencia, (capas, filas, columnas) float32.
+
+        Args:
+            timestamp: instante al que se aplica el decaimiento (por defecto, el último frame).
+        """
+        grid, reference = self._state
+        grid = grid.copy()
+        if self.half_life is not None and reference is not None:
+            if timestamp is None:
+                timestamp = self._last_time
+            grid *= np.float32(2.0 ** (-(timestamp - reference) / self.half_life))
+        return grid
+
+    def render(self, layer=FOOT, width=640, height=360):
+        """Imagen BGR de una capa, normalizada a su máximo y coloreada (azul = poco, rojo = mucho)."""
+        values = self.snapshot()[layer]
+        peak = float(values.max())
+        scaled = values / peak * 255 if peak > 0 else values
+        image = cv2.applyColorMap(scaled.astype(np.uint8), cv2.COLORMAP_JET)
+        return cv2.resize(image, (width, height), interpolation=cv2.INTER_NEAREST)
+
+    def save(self, path):
+        """Escribe una foto: .npy con las dos capas en segundos, o una imagen (PNG, JPG) de los pies."""
+        tmp = f"{path}.tmp{os.path.splitext(path)[1]}"
+        if path.endswith(".npy"):
+            with open(tmp, "wb") as f:
+                np.save(f, self.snapshot())
+        elif not cv2.imwrite(tmp, self.render()):
+            raise ValueError(f"No se pudo escribir la imagen {path}")
+        # Reemplazo atómico: quien lea el archivo nunca ve una foto a medias
+        os.replace(tmp, path)
+        self.snapshots += 1
+
+    # -- Hilo de fotos ---------------------------------------------------------------
+
+    def start(self, path, interval=60.0):
+        """Arranca el hilo que escribe una foto en `path` cada `interval` segundos."""
+        self._path = path
+        self._interval = interval
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="heatmap", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el hilo y escribe una última foto."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        if self._path is not None:
+            self.save(self._path)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self._interval)
+            if self._stop.is_set():
+                break
+            self.save(self._path)
@@ -0,0 +1,127 @@
+"""
+Métricas del contador de personas para basic_pipelines.metrics_server.
+
+counter_metrics lee los contadores de PersonCounterState tal como están, sin
+locks: son enteros que solo escribe el callback, así que cada lectura es
+consistente por sí misma y un scrape nunca frena al hilo de GStreamer.
+
+    server = MetricsServer(lambda: counter_metrics(user_data), port=9100).start()
+"""
+from basic_pipelines.metrics_server import Metric, COUNTER, GAUGE, sample, stage_timer_metric
+
+PREFIX = "people_counter"
+
+
+def counter_metrics(user_data):
+    """Lista de Metric con el estado actual del contador."""
+    entradas = user_data.entrada_count
+    salidas = user_data.salida_count
+    tracked_people = user_data.tracked_people
+    metrics = [
+        Metric(f"{PREFIX}_entries_total", COUNTER, "Personas que entraron", [sample(entradas)]),
+        Metric(f"{PREFIX}_exits_total", COUNTER, "Personas que salieron", [sample(salidas)]),
+        Metric(f"{PREFIX}_occupancy", GAUGE, "Personas dentro (entradas menos salidas)",
+               [sample(max(entradas - salidas, 0))]),
+        Metric(f"{PREFIX}_max_people_in_frame", GAUGE, "Máximo de personas vistas a la vez en un frame",
+               [sample(user_data.total_count)]),
+        Metric(f"{PREFIX}_frames_total", COUNTER, "Frames procesados por el callback", [sample(user_data.get_count())]),
+        Metric(f"{PREFIX}_active_tracks", GAUGE, "Personas seguidas en este momento", [sample(len(tracked_people))]),
+        Metric(f"{PREFIX}_evicted_tracks_total", COUNTER, "Personas olvidadas por no verse",
+               [sample(tracked_people.evicted)]),
+    ]
+
+    occupancy = user_data.occupancy.snapshot()
+    metrics.append(Metric(f"{PREFIX}_window_people", GAUGE, "Personas por frame en la ventana: pico, mínimo y media", [
+        sample(value, window=name, stat=stat)
+        for name, summary in occupancy.items()
+        for stat, value in (("peak", summary.peak), ("min", summary.minimum), ("mean", summary.mean))
+    ]))
+    metrics.append(Metric(f"{PREFIX}_window_net_flow", GAUGE, "Entradas menos salidas dentro de la ventana",
+                          [sample(summary.net_flow, window=name) for name, summary in occupancy.items()]))
+
+    stitcher = user_data.stitcher
+    if stitcher is not None:
+        metrics.append(Metric(f"{PREFIX}_stitched_tracks_total", COUNTER,
+                              "IDs nuevos del tracker unidos a un track perdido", [sample(stitcher.stitched)]))
+        metrics.append(Metric(f"{PREFIX}_new_tracks_total", COUNTER, "IDs nuevos del tracker",
+                              [sample(stitcher.new_tracks)]))
+
+    trajectories = user_data.trajectories
+    if trajectories is not None:
+        metrics.append(Metric(f"{PREFIX}_walking_speed", GAUGE,
+                              "Velocidad de las personas del último frame (fracción de la imagen por segundo)",
+                              [sample(trajectories.mean_speed, stat="mean"), sample(trajectories.max_speed, stat="max")]))
+        metrics.append(Metric(f"{PREFIX}_dwell_seconds", GAUGE, "Permanencia de las personas del último frame", [
+            sample(trajectories.mean_dwell, stat="mean"), sample(trajectories.max_dwell, stat="max")]))
+        metrics.append(Metric(f"{PREFIX}_stationary_people", GAUGE, "Personas quietas en el último frame",
+                              [sample(trajectories.stationary)]))
+        metrics.append(Metric(f"{PREFIX}_heading_total", COUNTER, "Personas en movimiento por frame y rumbo", [
+            sample(n, heading=heading) for heading, n in trajectories.stats()["headings"].items()]))
+
+    # Solo los descartes del hilo de overlay: los frames que pierde el pipeline de GStreamer no pasan por acá
+    renderer = user_data.renderer
+    if renderer is not None:
+        metrics.append(Metric(f"{PREFIX}_overlay_dropped_frames_total", COUNTER,
+                              "Frames que el hilo de overlay descartó por llegar uno más nuevo",
+                              [sample(renderer.dropped)]))
+
+    aggregator = user_data.aggregator
+    if aggregator is not None:
+        metrics.append(Metric(f"{PREFIX}_aggregator_sent_total", COUNTER, "Cruces mandados al agregador del sitio",
+                              [sample(aggregator.sent)]))
+        metrics.append(Metric(f"{PREFIX}_aggregator_dropped_total", COUNTER,
+                              "Cruces que no se pudieron mandar al agregador", [sample(aggregator.dropped + aggregator.lost)]))
+
+    clips = user_data.clips
+    if clips is not None:
+        metrics.append(Metric(f"{PREFIX}_clips_total", COUNTER, "Clips de evidencia escritos", [sample(clips.clips)]))
+        metrics.append(Metric(f"{PREFIX}_clip_dropped_frames_total", COUNTER,
+                              "Frames que no entraron al anillo de clips por estar ocupado el pool",
+                              [sample(clips.dropped)]))
+        metrics.append(Metric(f"{PREFIX}_clip_ring_bytes", GAUGE, "Bytes de JPEG en el anillo de clips",
+                              [sample(clips.ring_bytes)]))
+
+    zone_engine = user_data.zone_engine
+    if zone_engine is not None:
+        metrics.append(Metric(f"{PREFIX}_zone_crossings_total", COUNTER, "Cruces por línea o zona y sentido", [
+            sample(n, name=name, direction=direction)
+            for name, counts in zone_engine.counts.items()
+            for direction, n in counts.items()
+        ]))
+
+    store = user_data.store
+    if store is not None:
+        metrics.append(Metric(f"{PREFIX}_store_pending_events", GAUGE, "Cruces en cola sin escribir en el almacén",
+                              [sample(store.pending)]))
+
+    metrics.append(stage_timer_metric(f"{PREFIX}_callback_seconds", user_data.timer,
+                                      help="Duración de cada etapa del callback en segundos"))
+    return metrics
+
+
+def ring_metrics(ring):
+    """Lista de Metric del anillo de contador.handoff.DetectionRing."""
+    return [
+        Metric(f"{PREFIX}_handoff_pending_frames", GAUGE, "Frames en el anillo sin contar todavía", [sample(ring.pending)]),
+        Metric(f"{PREFIX}_handoff_overruns_total", COUNTER, "Frames descartados porque el anillo estaba lleno",
+               [sample(ring.overruns)]),
+        Metric(f"{PREFIX}_handoff_truncated_total", COUNTER, "Frames con más detecciones de las que caben en una ranura",
+               [sample(ring.truncated)]),
+    ]
+
+
+def merge_stream_metrics(per_stream):
+    """
+    Une las métricas de varias cámaras ({nombre: [Metric]}) en una lista, con la
+    etiqueta stream en cada muestra. Los totales del sitio se obtienen sumando
+    por esa etiqueta (sum without (stream) en Prometheus).
+    """
+    merged = {}
+    for stream, metrics in per_stream.items():
+        for metric in metrics:
+            family = merged.get(metric.name)
+            if family is None:
+                family = merged[metric.name] = Metric(metric.name, metric.kind, metric.help, [])
+            family.samples.extend((suffix, {"stream": stream, **labels}, value)
+                                  for suffix, labels, value in metric.samples)
+    return list(merged.values())
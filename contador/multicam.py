@@ -0,0 +1,131 @@
+"""
+Varias cámaras en un solo proceso, con estado de conteo por cámara.
+
+Con una instancia de contador_personas.py por cámara, cada proceso carga su
+propio HEF, su runtime de Python y su pipeline. En modo multicámara todas las
+fuentes entran a un solo pipeline: hailoroundrobin intercala sus frames hacia
+un único elemento de inferencia y hailostreamrouter los devuelve a una rama por
+cámara, con su propio tracker y su propio probe.
+
+Cada rama tiene un StreamCounter: un PersonCounterState completo (línea o
+zonas, tabla de seguimiento, contadores y ventanas de ocupación) que el probe
+recibe como user_data, así que counting_callback no cambia y el estado de una
+cámara nunca se mezcla con el de otra. MultiStreamCounter agrupa los estados
+por nombre de cámara y suma los totales.
+
+    counter = MultiStreamCounter.from_settings(["puerta1", "puerta2"], settings)
+    pad.add_probe(Gst.PadProbeType.BUFFER, app_callback, counter["puerta1"])
+"""
+from contador.callback import PersonCounterState, configure_counter
+from contador.metrics import counter_metrics, merge_stream_metrics
+
+
+def stream_values(values, num_streams, default, option):
+    """
+    Reparte los valores de una opción repetible entre las cámaras.
+
+    Sin valores, todas usan `default`; con uno, todas usan ese; si no, tiene que
+    haber uno por cámara.
+
+    Raises:
+        ValueError: si la cantidad de valores no coincide con la de cámaras.
+    """
+    if not values:
+        return [default] * num_streams
+    if len(values) == 1:
+        return list(values) * num_streams
+    if len(values) != num_streams:
+        raise ValueError(f"{option}: se esperaban 1 o {num_streams} valores, hay {len(values)}")
+    return list(values)
+
+
+class StreamCounter(PersonCounterState):
+    """
+    Estado de conteo de una cámara, con su propio contador de frames.
+
+    Aporta lo que counting_callback usa de app_callback_class. No comparte el
+    frame con la ventana de la aplicación: en modo multicámara no hay overlay.
+    """
+
+    def __init__(self, name):
+        super().__init__()
+        self.stream = name
+        self.frame_count = 0
+        self.use_frame = False
+
+    def increment(self):
+        self.frame_count += 1
+
+    def get_count(self):
+        return self.frame_count
+
+    def set_frame(self, frame):
+        pass
+
+
+class MultiStreamCounter:
+    """Estados de conteo de varias cámaras, por nombre y en el orden de las fuentes."""
+
+    def __init__(self, names):
+        if len(set(names)) != len(names):
+            raise ValueError("Los nombres de las cámaras tienen que ser distintos")
+        self.streams = [StreamCounter(name) for name in names]
+        self._by_name = {stream.stream: stream for stream in self.streams}
+
+    @classmethod
+    def from_settings(cls, names, settings, line_positions=None, zones=None):
+        """
+        Crea y configura un estado por cámara con configure_counter.
+
+        Args:
+            names: nombre de cada cámara.
+            settings: opciones comunes (como en configure_counter).
+            line_positions, zones: valor por cámara de esas opciones (None = el de settings).
+        """
+        counter = cls(names)
+        for i, stream in enumerate(counter.streams):
+            stream_settings = dict(settings)
+            if line_positions is not None:
+                stream_settings["line_position"] = line_positions[i]
+            if zones is not None:
+                stream_settings["zones"] = zones[i]
+            configure_counter(stream, stream_settings)
+        return counter
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __iter__(self):
+        return iter(self.streams)
+
+    def __len__(self):
+        return len(self.streams)
+
+    def totals(self):
+        """Entradas, salidas y frames de todas las cámaras juntas."""
+        return {
+            "Entradas": sum(stream.entrada_count for stream in self.streams),
+            "Salidas": sum(stream.salida_count for stream in self.streams),
+            "Frame": sum(stream.get_count() for stream in self.streams),
+        }
+
+    def stats_snapshot(self):
+        """Totales y "entradas/salidas" de cada cámara (se registra con StatsSink.add_source)."""
+        snapshot = self.totals()
+        for stream in self.streams:
+            snapshot[stream.stream] = f"{stream.entrada_count}/{stream.salida_count}"
+        return snapshot
+
+    def restore_counts(self, store):
+        """Retoma en cada cámara sus propios cruces guardados en el almacén."""
+        for stream in self.streams:
+            stream.restore_counts(store)
+
+    def metrics(self):
+        """Métricas de todas las cámaras, cada muestra con la etiqueta stream."""
+        return merge_stream_metrics({stream.stream: counter_metrics(stream) for stream in self.streams})
+
+    def set_component(self, attribute, value):
+        """Comparte un componente (stats, store) entre todas las cámaras."""
+        for stream in self.streams:
+            setattr(stream, attribute, value)
@@ -0,0 +1,136 @@
+"""
+Ocupación en ventanas deslizantes: pico, mínimo, media y flujo neto.
+
+total_count es el máximo de personas en un frame desde que arrancó el
+programa, así que después de la primera hora con mucha gente deja de decir
+algo útil. OccupancyWindows mantiene, para el último minuto, los últimos 15
+minutos y la última hora, el pico, el mínimo y la media de personas por frame
+y el flujo neto (entradas menos salidas) de esa ventana.
+
+Cada ventana usa dos colas monotónicas (para el máximo y el mínimo) y una suma
+corrida (para la media), así que agregar un frame cuesta O(1) amortizado sin
+importar el largo de la ventana. Las tres ventanas comparten las mismas tuplas
+de muestra: la memoria es una tupla por frame contado de la ventana más larga.
+
+El callback llama a update() una vez por frame contado; al final de update()
+cada ventana deja su resumen en un WindowSummary inmutable, que el overlay, el
+sink de estadísticas y el endpoint de métricas leen sin locks.
+
+    occupancy = OccupancyWindows()
+    occupancy.update(frame_time, personas_en_el_frame, entradas - salidas)
+    occupancy.summary("15m").peak
+"""
+from collections import deque, namedtuple
+
+# Ventanas por defecto: (nombre, segundos)
+WINDOWS = (("1m", 60), ("15m", 900), ("1h", 3600))
+
+# Resumen de una ventana; net_flow son las entradas menos las salidas dentro de la ventana
+WindowSummary = namedtuple("WindowSummary", ["peak", "minimum", "mean", "net_flow", "samples"])
+EMPTY_SUMMARY = WindowSummary(0, 0, 0.0, 0, 0)
+
+# Campos de cada muestra: (instante, personas en el frame, entradas - salidas acumuladas)
+_TIME, _COUNT, _NET = range(3)
+
+
+class SlidingWindow:
+    """
+    Pico, mínimo, media y flujo neto de las muestras de los últimos `seconds` segundos.
+
+    Args:
+        seconds: largo de la ventana; una muestra sale cuando tiene `seconds` o más de antigüedad.
+    """
+    __slots__ = ("seconds", "summary", "_samples", "_max", "_min", "_sum", "_base_net")
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.reset()
+
+    def reset(self):
+        """Vacía la ventana."""
+        self.summary = EMPTY_SUMMARY
+        self._samples = deque()
+        # Colas monotónicas: _max decreciente y _min creciente en cantidad de personas
+        self._max = deque()
+        self._min = deque()
+        self._sum = 0
+        # Flujo neto acumulado justo antes de la primera muestra de la ventana
+        self._base_net = None
+
+    def add(self, sample):
+        """Agrega una muestra (instante, personas, neto acumulado) con instante no decreciente."""
+        samples = self._samples
+        timestamp, count, net = sample
+        if self._base_net is None:
+            self._base_net = net
+        samples.append(sample)
+        self._sum += count
+
+        peaks = self._max
+        while peaks and peaks[-1][_COUNT] <= count:
+            peaks.pop()
+        peaks.append(sample)
+        lows = self._min
+        while lows and lows[-1][_COUNT] >= count:
+            lows.pop()
+        lows.append(sample)
+
+        # Sacar lo que quedó fuera de la ventana (la muestra recién agregada siempre queda)
+        start = timestamp - self.seconds
+        while samples[0][_TIME] <= start:
+            old = samples.popleft()
+            self._sum -= old[_COUNT]
+            self._base_net = old[_NET]
+        while peaks[0][_TIME] <= start:
+            peaks.popleft()
+        while lows[0][_TIME] <= start:
+            lows.popleft()
+
+        self.summary = WindowSummary(peaks[0][_COUNT], lows[0][_COUNT], self._sum / len(samples),
+                                     net - self._base_net, len(samples))
+
+    @property
+    def last_time(self):
+        """Instante de la última muestra (None si la ventana está vacía)."""
+        samples = self._samples
+        return samples[-1][_TIME] if samples else None
+
+
+class OccupancyWindows:
+    """
+    Varias ventanas deslizantes de ocupación alimentadas por el callback.
+
+    Args:
+        windows: secuencia de (nombre, segundos).
+    """
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = {name: SlidingWindow(seconds) for name, seconds in windows}
+        self._windows = tuple(self.windows.values())
+
+    def update(self, timestamp, count, net):
+        """
+        Agrega un frame contado.
+
+        Args:
+            timestamp: instante del frame en segundos (PTS o reloj monotónico).
+            count: personas en el frame.
+            net: entradas menos salidas acumuladas hasta este frame.
+        """
+        windows = self._windows
+        # Si el tiempo retrocede (el PTS se reinició), las ventanas empiezan de nuevo
+        last = windows[0].last_time
+        if last is not None and timestamp < last:
+            for window in windows:
+                window.reset()
+        sample = (timestamp, count, net)
+        for window in windows:
+            window.add(sample)
+
+    def summary(self, name):
+        """WindowSummary actual de una ventana."""
+        return self.windows[name].summary
+
+    def snapshot(self):
+        """{nombre: WindowSummary} de todas las ventanas."""
+        return {name: window.summary for name, window in self.windows.items()}
@@ -0,0 +1,171 @@
+"""
+Render del overlay del contador fuera del hilo de GStreamer.
+
+Con use_frame, dibujar la línea, cada caja, las etiquetas de ID y los
+contadores y luego convertir el frame completo a BGR dentro del probe le resta
+muchos cuadros por segundo al pipeline en 1080p. OverlayRenderer recibe del
+callback el frame más reciente y una foto pequeña de las detecciones, y hace
+todo el dibujo en un hilo propio.
+
+La política es "gana el último": si llega un frame nuevo antes de que el
+anterior se haya dibujado, el anterior se descarta (se cuenta en `dropped`), así
+que nunca se acumula trabajo atrasado.
+
+Lo estático (la línea o las líneas y zonas configuradas y el fondo de los
+textos) se dibuja una sola vez en una capa en caché. En cada frame se copian
+solo los píxeles opacos de la capa y los fondos se mezclan con alfa solo dentro
+de su rectángulo; encima se dibuja lo dinámico (cajas, IDs y números).
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Textos de los contadores, en el orden de la tupla `counts` de submit
+COUNT_LABELS = ("Total", "Entradas", "Salidas", "Pico 15m")
+TEXT_ORIGIN_X = 10
+TEXT_FIRST_Y = 30
+TEXT_STEP_Y = 40
+# Fondo semitransparente detrás de los contadores
+TEXT_BOX = (0, 0, 280, 165)
+
+
+class OverlayRenderer:
+    """
+    Dibuja el overlay del contador en un hilo aparte y entrega el frame BGR.
+
+    Args:
+        set_frame: función que recibe el frame terminado (user_data.set_frame).
+        line_color: color RGB de la línea, las líneas y las zonas.
+        line_thickness: grosor de la línea.
+        zone_engine: contador.zones.ZoneEngine a dibujar en vez de la línea (opcional).
+        text_color: color RGB de cajas, IDs y contadores.
+        background_alpha: opacidad del fondo de los contadores (0 = sin fondo).
+    """
+
+    def __init__(self, set_frame, line_color=(0, 255, 255), line_thickness=2, zone_engine=None,
+                 text_color=(0, 255, 0), background_alpha=0.5):
+        self.set_frame = set_frame
+        self.line_color = line_color
+        self.line_thickness = line_thickness
+        self.zone_engine = zone_engine
+        self.text_color = text_color
+        self.background_alpha = background_alpha
+
+        # Último frame recibido y todavía no dibujado
+        self._latest = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Capa estática en caché: píxeles opacos (índices y colores) y rectángulos
+        # semitransparentes (x1, y1, x2, y2, alfa, fondo)
+        self._layer_key = None
+        self._layer_index = None
+        self._layer_pixels = None
+        self._layer_boxes = []
+
+        # Estadísticas
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.render_seconds = 0.0
+
+    def start(self):
+        """Arranca el hilo de render."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="overlay-renderer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el hilo de render; el frame pendiente, si hay, se descarta."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._ready.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            if self._latest is not None:
+                self._latest = None
+                self.dropped += 1
+
+    def submit(self, frame, boxes, counts, line_y):
+        """
+        Entrega un frame para dibujar (lo llama el callback; no dibuja nada).
+
+        Args:
+            frame: frame RGB; el renderer pasa a ser su dueño.
+            boxes: lista de (x1, y1, x2, y2, track_id) en píxeles.
+            counts: (total, entradas, salidas, pico de los últimos 15 minutos).
+            line_y: posición de la línea en píxeles.
+        """
+        with self._lock:
+            if self._latest is not None:
+                self.dropped += 1
+            self._latest = (frame, boxes, counts, line_y)
+        self.submitted += 1
+        self._ready.set()
+
+    def _run(self):
+        while True:
+            self._ready.wait()
+            self._ready.clear()
+            if self._stop.is_set():
+                return
+            with self._lock:
+                item, self._latest = self._latest, None
+            if item is None:
+                continue
+            start = time.perf_counter()
+            frame = self.render(*item)
+            self.render_seconds += time.perf_counter() - start
+            self.rendered += 1
+            self.set_frame(frame)
+
+    def render(self, frame, boxes, counts, line_y):
+        """Dibuja el overlay sobre `frame` (RGB) y devuelve el frame convertido a BGR."""
+        frame = np.ascontiguousarray(frame)
+        height, width = frame.shape[:2]
+        self._blend_static(frame, width, height, line_y)
+        color = self.text_color
+        for x1, y1, x2, y2, track_id in boxes:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        for i, (label, value) in enumerate(zip(COUNT_LABELS, counts)):
+            cv2.putText(frame, f"{label}: {value}", (TEXT_ORIGIN_X, TEXT_FIRST_Y + TEXT_STEP_Y * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+    def _blend_static(self, frame, width, height, line_y):
+        """Mezcla la capa estática sobre el frame, armándola si cambió el tamaño o la línea."""
+        key = (width, height, line_y)
+        if key != self._layer_key:
+            self._build_layer(width, height, line_y)
+            self._layer_key = key
+        # Fondos semitransparentes: mezcla por rectángulo, sin tocar el resto del frame
+        for x1, y1, x2, y2, alpha, background in self._layer_boxes:
+            roi = frame[y1:y2, x1:x2]
+            cv2.addWeighted(roi, 1.0 - alpha, background, alpha, 0.0, dst=roi)
+        # Trazos opacos (línea, zonas): copia directa de los píxeles que ocupan
+        frame.reshape(-1, 3)[self._layer_index] = self._layer_pixels
+
+    def _build_layer(self, width, height, line_y):
+        layer = np.zeros((height, width, 3), dtype=np.uint8)
+        if self.zone_engine is not None:
+            self.zone_engine.draw(layer, self.line_color, self.line_thickness)
+        else:
+            cv2.line(layer, (0, line_y), (width, line_y), self.line_color, self.line_thickness)
+        index = np.flatnonzero(layer.any(axis=2))
+        self._layer_index = index
+        self._layer_pixels = layer.reshape(-1, 3)[index]
+        self._layer_boxes = []
+        if self.background_alpha > 0:
+            x1, y1, x2, y2 = TEXT_BOX
+            x2, y2 = min(x2, width), min(y2, height)
+            background = np.zeros((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+            self._layer_boxes.append((x1, y1, x2, y2, self.background_alpha, background))
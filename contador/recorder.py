@@ -0,0 +1,121 @@
+"""
+Grabación de las detecciones que recibe el callback de conteo.
+
+El log es un archivo binario de registros de tamaño fijo (RECORD_DTYPE), uno
+por detección, precedido por un encabezado de 16 bytes. Los frames sin
+detecciones se guardan como un registro con label vacío, para que al
+reproducir se respete el conteo de frames. Se lee con np.memmap sin copiar el
+archivo a memoria (ver read_log) y se reproduce con contador.replay.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"PCDL"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")  # magic, versión, tamaño de registro, reservado
+
+RECORD_DTYPE = np.dtype([
+    ('frame', '<u8'),        # Número de frame (user_data.get_count())
+    ('pts', '<u8'),          # PTS del buffer de GStreamer en nanosegundos
+    ('width', '<u2'),        # Tamaño del frame
+    ('height', '<u2'),
+    ('track_id', '<i4'),     # -1 si la detección no tiene HAILO_UNIQUE_ID
+    ('confidence', '<f4'),
+    ('bbox', '<f4', (4,)),   # xmin, ymin, xmax, ymax normalizados
+    ('label', 'S16'),        # Vacío en los registros de frames sin detecciones
+])
+
+NO_TRACK = -1
+
+
+class DetectionRecorder:
+    """
+    Escribe detecciones en un log binario en bloques de registros preasignados.
+
+    Args:
+        path: archivo de salida (se sobrescribe).
+        chunk_size: registros acumulados en memoria antes de escribir al disco.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, 0))
+        self._chunk = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self._n = 0
+        self._frame_start = 0
+        self.frames = 0
+        self.records = 0
+        # Datos del frame actual
+        self._frame = 0
+        self._pts = 0
+        self._width = 0
+        self._height = 0
+
+    def begin_frame(self, frame, pts, width, height):
+        """Empieza un frame; si termina sin detecciones se guarda un registro vacío."""
+        self._end_frame()
+        self._frame = frame
+        self._pts = pts
+        self._width = width or 0
+        self._height = height or 0
+        self._frame_start = self.records
+        self.frames += 1
+
+    def add(self, label, confidence, xmin, ymin, xmax, ymax, track_id=NO_TRACK):
+        """Agrega una detección al frame actual."""
+        if self._n == len(self._chunk):
+            self._write_chunk()
+        self._chunk[self._n] = (self._frame, self._pts, self._width, self._height, track_id,
+                                confidence, (xmin, ymin, xmax, ymax), label.encode())
+        self._n += 1
+        self.records += 1
+
+    def _end_frame(self):
+        if self.frames and self.records == self._frame_start:
+            self.add("", 0.0, 0.0, 0.0, 0.0, 0.0)
+
+    def _write_chunk(self):
+        self._file.write(self._chunk[:self._n].tobytes())
+        self._n = 0
+
+    def close(self):
+        """Cierra el frame actual y vacía lo pendiente al disco."""
+        if self._file.closed:
+            return
+        self._end_frame()
+        self._write_chunk()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def record_detections(recorder, frame, pts, width, height, detections, unique_id_type):
+    """Guarda en el recorder todas las detecciones (objetos de hailo o equivalentes) de un frame."""
+    recorder.begin_frame(frame, pts, width, height)
+    for detection in detections:
+        bbox = detection.get_bbox()
+        track = detection.get_objects_typed(unique_id_type)
+        track_id = track[0].get_id() if len(track) == 1 else NO_TRACK
+        recorder.add(detection.get_label(), detection.get_confidence(),
+                     bbox.xmin(), bbox.ymin(), bbox.xmax(), bbox.ymax(), track_id)
+
+
+def read_log(path):
+    """Abre un log como arreglo de RECORD_DTYPE mapeado en memoria."""
+    with open(path, "rb") as f:
+        magic, version, record_size, _ = HEADER.unpack(f.read(HEADER.size))
+        f.seek(0, 2)
+        size = f.tell()
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a detection log")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported detection log version {version} in {path}")
+    if size == HEADER.size:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size)
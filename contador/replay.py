@@ -0,0 +1,326 @@
+"""
+Reproducción de logs de detecciones a través del callback de conteo.
+
+Lee un log grabado con `contador_personas.py --record` (ver contador.recorder)
+y lo pasa frame a frame por contador.callback.counting_callback usando objetos
+livianos con la misma interfaz que los de hailo (ROI, detección, bbox, unique
+id). No necesita GStreamer, hailo ni cámara, así que sirve para medir,
+perfilar y probar la lógica de conteo en cualquier equipo:
+
+    python -m contador.replay grabacion.pcdl
+    python -m contador.replay grabacion.pcdl --count-every 3 --zones local_resources/zonas_ejemplo.json
+    python -m contador.replay grabacion.pcdl --profile
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from basic_pipelines.stage_timing import print_summary
+from basic_pipelines.stats_sink import StatsSink, FORMATS
+from contador.callback import PersonCounterState, CallbackBackend, counting_callback, configure_counter
+from contador.heatmap import HeatmapAccumulator
+from contador.overlay import OverlayRenderer
+from contador.recorder import read_log, NO_TRACK
+
+PROBE_OK = 0
+
+# El log no guarda el class id: se deduce de la etiqueta (COCO con base 1, como
+# hailo), y las etiquetas que no están en la tabla quedan con 0
+CLASS_IDS = {"person": 1, "bicycle": 2, "car": 3, "motorcycle": 4, "bus": 6, "truck": 8, "stop sign": 12}
+
+
+class ReplayBBox:
+    __slots__ = ('_xmin', '_ymin', '_xmax', '_ymax')
+
+    def __init__(self, xmin, ymin, xmax, ymax):
+        self._xmin = xmin
+        self._ymin = ymin
+        self._xmax = xmax
+        self._ymax = ymax
+
+    def xmin(self):
+        return self._xmin
+
+    def ymin(self):
+        return self._ymin
+
+    def xmax(self):
+        return self._xmax
+
+    def ymax(self):
+        return self._ymax
+
+    def width(self):
+        return self._xmax - self._xmin
+
+    def height(self):
+        return self._ymax - self._ymin
+
+
+class ReplayUniqueId:
+    __slots__ = ('_id',)
+
+    def __init__(self, track_id):
+        self._id = track_id
+
+    def get_id(self):
+        return self._id
+
+
+class ReplayDetection:
+    """Equivalente a hailo.HailoDetection con los campos que guarda el log."""
+    __slots__ = ('_label', '_class_id', '_confidence', '_bbox', '_unique_ids')
+
+    def __init__(self, label, confidence, bbox, track_id=NO_TRACK):
+        self._label = label
+        self._class_id = CLASS_IDS.get(label, 0)
+        self._confidence = confidence
+        self._bbox = bbox
+        self._unique_ids = [ReplayUniqueId(track_id)] if track_id != NO_TRACK else []
+
+    def get_label(self):
+        return self._label
+
+    def get_class_id(self):
+        return self._class_id
+
+    def get_confidence(self):
+        return self._confidence
+
+    def get_bbox(self):
+        return self._bbox
+
+    def get_objects_typed(self, object_type):
+        if object_type == ReplayHailo.HAILO_UNIQUE_ID:
+            return self._unique_ids
+        return []
+
+
+class ReplayBuffer:
+    """Buffer de un frame: PTS y ROI con sus detecciones."""
+    __slots__ = ('pts', 'detections')
+
+    def __init__(self, pts, detections):
+        self.pts = pts
+        self.detections = detections
+
+    def get_objects_typed(self, object_type):
+        if object_type == ReplayHailo.HAILO_DETECTION:
+            return self.detections
+        return []
+
+
+class ReplayPad:
+    __slots__ = ('caps',)
+
+    def __init__(self, width, height):
+        self.caps = ("RGB", width, height)
+
+
+class ReplayInfo:
+    __slots__ = ('buffer',)
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def get_buffer(self):
+        return self.buffer
+
+
+# Sustituto del módulo hailo: el buffer de reproducción es también su ROI
+ReplayHailo = SimpleNamespace(
+    HAILO_DETECTION="detection",
+    HAILO_UNIQUE_ID="unique_id",
+    get_roi_from_buffer=lambda buffer: buffer,
+)
+
+
+def _blank_frame(buffer, format, width, height):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+REPLAY_BACKEND = CallbackBackend(ReplayHailo, lambda pad: pad.caps, _blank_frame, PROBE_OK)
+
+
+class ReplayCallbackClass:
+    """Lo mínimo de app_callback_class que usa el callback de conteo."""
+
+    def __init__(self):
+        self.frame_count = 0
+        self.use_frame = False
+        self.last_frame = None
+
+    def increment(self):
+        self.frame_count += 1
+
+    def get_count(self):
+        return self.frame_count
+
+    def set_frame(self, frame):
+        self.last_frame = frame
+
+
+class ReplayCounter(PersonCounterState, ReplayCallbackClass):
+    """PersonCounterCallback sin hailo_apps, para reproducir logs."""
+
+    pass
+
+
+def iter_frames(log, pts_offset=0):
+    """
+    Convierte un log en (pad, info) por frame, con objetos de reproducción.
+
+    Las columnas se pasan a listas de Python por bloques, así que armar los
+    objetos cuesta poco comparado con el callback.
+    """
+    if len(log) == 0:
+        return
+    frames = np.asarray(log['frame'])
+    starts = np.flatnonzero(np.r_[True, frames[1:] != frames[:-1]])
+    ends = np.r_[starts[1:], len(log)]
+    block = 65536
+    for block_start in range(0, len(starts), block):
+        block_starts = starts[block_start:block_start + block]
+        block_ends = ends[block_start:block_start + block]
+        lo, hi = int(block_starts[0]), int(block_ends[-1])
+        chunk = log[lo:hi]
+        labels = [label.decode() for label in chunk['label'].tolist()]
+        confidences = chunk['confidence'].tolist()
+        bboxes = chunk['bbox'].tolist()
+        track_ids = chunk['track_id'].tolist()
+        pts = chunk['pts'].tolist()
+        widths = chunk['width'].tolist()
+        heights = chunk['height'].tolist()
+        for start, end in zip(block_starts.tolist(), block_ends.tolist()):
+            start -= lo
+            end -= lo
+            detections = [
+                ReplayDetection(labels[i], confidences[i], ReplayBBox(*bboxes[i]), track_ids[i])
+                for i in range(start, end) if labels[i]
+            ]
+            buffer = ReplayBuffer(pts[start] + pts_offset, detections)
+            yield ReplayPad(widths[start], heights[start]), ReplayInfo(buffer)
+
+
+def replay(log, user_data=None, repeat=1):
+    """
+    Pasa un log por el callback de conteo lo más rápido posible.
+
+    Args:
+        log: arreglo de contador.recorder.RECORD_DTYPE o ruta de un log.
+        user_data: estado del contador (por defecto un ReplayCounter nuevo).
+        repeat: veces que se reproduce el log (el PTS sigue avanzando).
+
+    Returns:
+        Diccionario con el estado final y las medidas de velocidad.
+    """
+    if not isinstance(log, np.ndarray):
+        log = read_log(log)
+    if user_data is None:
+        user_data = ReplayCounter()
+
+    pts = np.asarray(log['pts']) if len(log) else np.zeros(1, dtype=np.uint64)
+    span = int(pts.max()) - int(pts.min())
+    frames = 0
+    callback_seconds = 0.0
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        offset = i * (span + 1)
+        for pad, info in iter_frames(log, offset):
+            start = time.perf_counter()
+            counting_callback(pad, info, user_data, REPLAY_BACKEND)
+            callback_seconds += time.perf_counter() - start
+            frames += 1
+    elapsed = time.perf_counter() - t0
+
+    recorded_seconds = span / 1e9 * repeat
+    return {
+        "user_data": user_data,
+        "frames": frames,
+        "detections": int(np.count_nonzero(np.asarray(log['label']) != b"")) * repeat,
+        "entradas": user_data.entrada_count,
+        "salidas": user_data.salida_count,
+        "elapsed_seconds": elapsed,
+        "callback_seconds": callback_seconds,
+        "fps": frames / elapsed if elapsed else float("inf"),
+        "callback_us_per_frame": callback_seconds / frames * 1e6 if frames else 0.0,
+        "realtime_factor": recorded_seconds / elapsed if elapsed else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproducir un log de detecciones por el callback de conteo')
+    parser.add_argument('log', type=str, help='Log grabado con contador_personas.py --record')
+    parser.add_argument('--line-position', type=float, default=0.5, help='Posición de la línea virtual (0-1, porcentaje de la altura)')
+    parser.add_argument('--zones', type=str, help='Archivo JSON/YAML con líneas y zonas de conteo')
+    parser.add_argument('--count-every', type=int, default=1, help='Contar cada N frames')
+    parser.add_argument('--stitch', action='store_true', help='Unir los tracks a los que el tracker les cambia el ID')
+    parser.add_argument('--trajectories', action='store_true', help='Guardar trayectorias y mostrar velocidad, rumbo y permanencia al terminar')
+    parser.add_argument('--repeat', type=int, default=1, help='Veces que se reproduce el log')
+    parser.add_argument('--use-frame', action='store_true', help='Dibujar sobre frames en negro para medir también el render')
+    parser.add_argument('--render-thread', action='store_true', help='Con --use-frame, dibujar el overlay en un hilo aparte (OverlayRenderer)')
+    parser.add_argument('--heatmap', type=str, help='Guardar el mapa de calor de permanencia al terminar (.png o .npy)')
+    parser.add_argument('--verbose', action='store_true', help='Imprimir estadísticas y cruces durante la reproducción')
+    parser.add_argument('--stats-interval', type=float, default=1.0, help='Segundos entre líneas de estadísticas (con --verbose)')
+    parser.add_argument('--stats-format', choices=FORMATS, default='human', help='Formato de las estadísticas: texto o JSON por línea')
+    parser.add_argument('--profile', action='store_true', help='Perfilar la reproducción con cProfile')
+    parser.add_argument('--timing', action='store_true', help='Mostrar la latencia por etapa del callback al terminar')
+    args = parser.parse_args()
+
+    user_data = configure_counter(ReplayCounter(), vars(args))
+    user_data.use_frame = args.use_frame
+    if args.verbose:
+        user_data.stats = StatsSink(args.stats_interval, args.stats_format)
+        user_data.stats.add_source(user_data.stats_snapshot)
+        user_data.stats.start()
+    if args.heatmap:
+        user_data.heatmap = HeatmapAccumulator()
+    if args.render_thread:
+        user_data.renderer = OverlayRenderer(user_data.set_frame, user_data.line_color, user_data.line_thickness,
+                                             user_data.zone_engine).start()
+
+    log = read_log(args.log)
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        result = profiler.runcall(replay, log, user_data, args.repeat)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    else:
+        result = replay(log, user_data, args.repeat)
+    if user_data.stats is not None:
+        user_data.stats.stop()
+    if user_data.renderer is not None:
+        user_data.renderer.stop()
+    if user_data.heatmap is not None:
+        user_data.heatmap.save(args.heatmap)
+
+    print(f"Frames: {result['frames']} | Detecciones: {result['detections']} | "
+          f"Entradas: {result['entradas']} | Salidas: {result['salidas']}")
+    print(f"Tiempo: {result['elapsed_seconds']:.3f} s | {result['fps']:.0f} fps | "
+          f"callback: {result['callback_us_per_frame']:.1f} us/frame | "
+          f"{result['realtime_factor']:.0f}x tiempo real")
+    if user_data.stitcher is not None:
+        stats = user_data.stitcher.stats()
+        print(f"Tracks nuevos: {stats['new_tracks']} | unidos: {stats['stitched']} ({stats['stitch_rate']:.1%})")
+    if user_data.trajectories is not None:
+        stats = user_data.trajectories.stats()
+        headings = ", ".join(f"{heading}: {n}" for heading, n in stats["headings"].items())
+        print(f"Último frame: {stats['active']} personas | {stats['stationary']} quietas | "
+              f"velocidad media {stats['mean_speed']:.3f}/s | permanencia media {stats['mean_dwell']:.1f} s")
+        print(f"Rumbos: {headings}")
+    if user_data.zone_engine is not None:
+        for name, counts in user_data.zone_engine.counts.items():
+            print(f"{name}: {counts}")
+    renderer = user_data.renderer
+    if renderer is not None:
+        print(f"Render: {renderer.rendered} dibujados | {renderer.dropped} descartados | "
+              f"{renderer.render_seconds / max(renderer.rendered, 1) * 1e6:.1f} us/frame en el hilo de render")
+    if args.timing:
+        print_summary(user_data.timer.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Unión de fragmentos de track cuando el tracker le cambia el ID a una persona.
+
+Si una persona queda tapada unos frames, el tracker de Hailo suele darle un
+HAILO_UNIQUE_ID nuevo al reaparecer. Para el contador es otra persona: puede
+contarla de nuevo, o no contarla si cruzó la línea mientras estaba tapada (un
+track nuevo parte de su propia posición).
+
+TrackStitcher traduce los IDs del tracker a IDs canónicos antes de que lleguen
+a la tabla de seguimiento. Los tracks que dejan de verse se guardan un rato
+(`max_gap` segundos) en una grilla espacial indexada por su última posición,
+con su velocidad. Cuando aparece un ID nuevo, se buscan en las celdas vecinas
+los tracks perdidos cuya posición predicha (última posición más velocidad por
+tiempo perdido) quede a menos de `max_distance`; el más cercano le presta su
+ID. Así el ID nuevo hereda el registro de la tabla: si ya se contó, su última
+posición y su historial.
+
+El costo por frame es un par de operaciones de conjuntos y una actualización de
+posición por persona; la búsqueda revisa 3x3 celdas, así que es O(1) esperado
+aunque pasen cientos de tracks por minuto. Los tracks perdidos vencen en orden
+de llegada, así que la memoria depende de los tracks activos y de los perdidos
+en los últimos `max_gap` segundos.
+"""
+from collections import deque
+
+
+class TrackStitcher:
+    """
+    Traduce IDs del tracker a IDs canónicos, uniendo los fragmentos de una misma persona.
+
+    Args:
+        max_gap: segundos que un track perdido puede esperar a que lo continúen.
+        max_distance: distancia máxima (normalizada) entre la posición predicha
+            del track perdido y la del track nuevo.
+        cell_size: lado de las celdas de la grilla (normalizado). Se revisan las
+            3x3 celdas alrededor del track nuevo, así que debe cubrir max_distance
+            más lo que una persona avanza en max_prediction segundos.
+        max_prediction: segundos máximos de extrapolación con la velocidad.
+    """
+
+    def __init__(self, max_gap=1.5, max_distance=0.08, cell_size=0.2, max_prediction=0.5):
+        if cell_size < max_distance:
+            raise ValueError("cell_size debe ser al menos max_distance")
+        self.max_gap = max_gap
+        self.max_distance = max_distance
+        self.cell_size = cell_size
+        self.max_prediction = max_prediction
+
+        self._alias = {}  # {ID del tracker: ID canónico}, solo los IDs unidos
+        self._aliases_of = {}  # {ID canónico: [IDs del tracker unidos a él]}
+        self._motion = {}  # {ID canónico: (x, y, vx, vy, instante)}
+        self._previous = set()  # IDs canónicos vistos en el frame anterior
+        self._grid = {}  # {(celda x, celda y): {ID canónico perdido: (x, y, vx, vy, instante)}}
+        self._lost = {}  # {ID canónico perdido: celda}
+        self._expiry = deque()  # (instante en que se perdió, ID canónico), en orden
+
+        # Estadísticas
+        self.new_tracks = 0
+        self.stitched = 0
+        self.expired = 0
+
+    @property
+    def stitch_rate(self):
+        """Fracción de los IDs nuevos que resultaron ser continuación de un track perdido."""
+        return self.stitched / self.new_tracks if self.new_tracks else 0.0
+
+    def __len__(self):
+        """Tracks perdidos que todavía se pueden continuar."""
+        return len(self._lost)
+
+    def _cell(self, x, y):
+        size = self.cell_size
+        return int(x // size), int(y // size)
+
+    def process(self, track_ids, points, now):
+        """
+        Traduce los IDs de un frame.
+
+        Args:
+            track_ids: lista de IDs del tracker de las personas del frame.
+            points: (N, 2) posiciones normalizadas (centros de las cajas).
+            now: instante del frame en segundos.
+
+        Returns:
+            Lista de IDs canónicos, en el mismo orden.
+        """
+        self._expire(now)
+        alias = self._alias
+        ids = [alias.get(track_id, track_id) for track_id in track_ids]
+        points = points.tolist() if hasattr(points, "tolist") else list(points)
+        current = set(ids)
+        previous = self._previous
+        motion = self._motion
+
+        if current != previous:
+            lost = self._lost
+            # Tracks que dejaron de verse: a la grilla con su último movimiento. Va
+            # primero para que un ID nuevo pueda continuar a uno perdido en este frame.
+            grid = self._grid
+            for track_id in previous - current:
+                state = motion.get(track_id)
+                if state is None:
+                    continue
+                cell = self._cell(state[0], state[1])
+                grid.setdefault(cell, {})[track_id] = state
+                lost[track_id] = cell
+                self._expiry.append((state[4], track_id))
+            # Tracks que reaparecen o que son nuevos
+            for i, track_id in enumerate(ids):
+                if track_id in previous:
+                    continue
+                if track_id in lost:
+                    self._remove_lost(track_id)
+                elif track_id not in motion:
+                    self.new_tracks += 1
+                    match = self._match(points[i], now)
+                    if match is not None:
+                        self._remove_lost(match)
+                        alias[track_id] = match
+                        self._aliases_of.setdefault(match, []).append(track_id)
+                        ids[i] = match
+                        current.discard(track_id)
+                        current.add(match)
+                        self.stitched += 1
+
+        # Actualizar posición y velocidad de los tracks del frame
+        for track_id, (x, y) in zip(ids, points):
+            state = motion.get(track_id)
+            if state is not None and now > state[4]:
+                dt = now - state[4]
+                motion[track_id] = (x, y, (x - state[0]) / dt, (y - state[1]) / dt, now)
+            elif state is None:
+                motion[track_id] = (x, y, 0.0, 0.0, now)
+        self._previous = current
+        return ids
+
+    def _match(self, point, now):
+        """ID canónico del track perdido que mejor continúa en `point`, o None."""
+        x, y = point
+        cx, cy = self._cell(x, y)
+        grid = self._grid
+        best = None
+        best_distance = self.max_distance * self.max_distance
+        max_prediction = self.max_prediction
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = grid.get((gx, gy))
+                if not bucket:
+                    continue
+                for track_id, (lx, ly, vx, vy, lost_time) in bucket.items():
+                    dt = min(now - lost_time, max_prediction)
+                    dx = lx + vx * dt - x
+                    dy = ly + vy * dt - y
+                    distance = dx * dx + dy * dy
+                    if distance <= best_distance:
+                        best, best_distance = track_id, distance
+        return best
+
+    def _remove_lost(self, track_id):
+        cell = self._lost.pop(track_id)
+        bucket = self._grid[cell]
+        del bucket[track_id]
+        if not bucket:
+            del self._grid[cell]
+
+    def _expire(self, now):
+        """Olvida los tracks perdidos hace más de max_gap segundos."""
+        expiry = self._expiry
+        limit = now - self.max_gap
+        while expiry and expiry[0][0] < limit:
+            lost_time, track_id = expiry.popleft()
+            if track_id not in self._lost or self._motion[track_id][4] != lost_time:
+                continue  # Reapareció (y quizás se volvió a perder más tarde)
+            self._remove_lost(track_id)
+            del self._motion[track_id]
+            for raw_id in self._aliases_of.pop(track_id, ()):
+                del self._alias[raw_id]
+            self.expired += 1
+
+    def stats(self):
+        """Contadores de unión de fragmentos."""
+        return {
+            "new_tracks": self.new_tracks,
+            "stitched": self.stitched,
+            "stitch_rate": self.stitch_rate,
+            "lost_tracks": len(self._lost),
+            "expired": self.expired,
+        }
@@ -0,0 +1,229 @@
+"""
+Almacén persistente de cruces con agregados por minuto y por hora.
+
+Los contadores de PersonCounterState viven en memoria y se pierden al
+reiniciar. CountStore guarda cada cruce (línea o zona) en una base SQLite en
+modo WAL y mantiene tablas de agregados por minuto y por hora, de modo que el
+historial se puede consultar sin recorrer todos los eventos.
+
+El callback solo agrega el evento a una cola en memoria con add(); un hilo
+aparte escribe la cola en lotes, una transacción por lote, cada
+`flush_interval` segundos o cuando la cola llega a `batch_size` eventos. El
+callback nunca toca el disco.
+
+    store = CountStore("conteos.db").start()
+    store.add("line", "puerta", "entrada", track_id=7)
+    ...
+    store.flush()
+    store.rollup("hour", start=time.time() - 86400)
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Resoluciones de los agregados (segundos). "day" se arma con los agregados por hora.
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    time REAL NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    track_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE TABLE IF NOT EXISTS buckets (
+    resolution INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (resolution, start, kind, name, direction)
+) WITHOUT ROWID;
+"""
+
+UPSERT_BUCKET = """
+INSERT INTO buckets (resolution, start, kind, name, direction, count) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, start, kind, name, direction) DO UPDATE SET count = count + excluded.count
+"""
+
+
+class CountStore:
+    """
+    Cola de cruces en memoria escrita por lotes en SQLite desde un hilo propio.
+
+    Args:
+        path: archivo de la base (":memory:" sirve para pruebas sin hilo).
+        flush_interval: segundos máximos que un evento espera en la cola.
+        batch_size: eventos en cola que adelantan la escritura.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Una sola conexión, compartida entre el hilo de escritura y las consultas
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Estadísticas
+        self.written = 0
+        self.batches = 0
+        self.max_pending = 0
+
+    # -- Lado del callback: sin E/S ------------------------------------------------
+
+    def add(self, kind, name, direction, track_id=None, timestamp=None):
+        """Encola un cruce; `timestamp` en segundos epoch (por defecto, ahora)."""
+        queue = self._queue
+        queue.append((time.time() if timestamp is None else timestamp, kind, name, direction, track_id))
+        if len(queue) >= self.batch_size:
+            self._wake.set()
+
+    @property
+    def pending(self):
+        """Eventos encolados que todavía no se escribieron."""
+        return len(self._queue)
+
+    # -- Hilo de escritura -------------------------------------------------------
+
+    def start(self):
+        """Arranca el hilo de escritura."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="count-store", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Escribe lo pendiente y detiene el hilo."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def close(self):
+        """Detiene el hilo y cierra la base."""
+        self.stop()
+        with self._db_lock:
+            self._db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe en una transacción todo lo encolado hasta ahora.
+
+        Returns:
+            Número de eventos escritos.
+        """
+        queue = self._queue
+        with self._db_lock:
+            n = len(queue)
+            if n == 0:
+                return 0
+            if n > self.max_pending:
+                self.max_pending = n
+            batch = [queue.popleft() for _ in range(n)]
+            buckets = {}
+            for timestamp, kind, name, direction, _ in batch:
+                for resolution in RESOLUTIONS.values():
+                    key = (resolution, int(timestamp // resolution) * resolution, kind, name, direction)
+                    buckets[key] = buckets.get(key, 0) + 1
+            with self._db:
+                self._db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", batch)
+                self._db.executemany(UPSERT_BUCKET, [key + (count,) for key, count in buckets.items()])
+            self.written += n
+            self.batches += 1
+        return n
+
+    # -- Consultas -----------------------------------------------------------------
+    # Solo ven lo ya escrito; llamar a flush() antes si hace falta lo más reciente.
+
+    def _query(self, sql, params):
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filters(column, start, end, name, kind=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{column} < ?")
+            params.append(end)
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        return clauses, params
+
+    def events(self, start=None, end=None, name=None):
+        """Cruces en [start, end) como (time, kind, name, direction, track_id), en orden."""
+        clauses, params = self._filters("time", start, end, name)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT time, kind, name, direction, track_id FROM events {where} ORDER BY time", params)
+
+    def rollup(self, resolution="minute", start=None, end=None, name=None):
+        """
+        Cruces agregados por intervalo.
+
+        Args:
+            resolution: "minute", "hour" o "day" (días UTC).
+            start, end: rango [start, end) en segundos epoch; se incluyen los
+                intervalos que empiezan dentro del rango.
+            name: solo esta línea o zona.
+
+        Returns:
+            Lista de (inicio del intervalo, kind, name, direction, count).
+        """
+        if resolution == "day":
+            source, bucket = RESOLUTIONS["hour"], f"start - start % {DAY}"
+        elif resolution in RESOLUTIONS:
+            source, bucket = RESOLUTIONS[resolution], "start"
+        else:
+            raise ValueError(f"Resolución desconocida '{resolution}', se esperaba minute, hour o day")
+        clauses, params = self._filters("start", start, end, name)
+        return self._query(
+            f"SELECT {bucket} AS bucket, kind, name, direction, SUM(count) FROM buckets "
+            f"WHERE {' AND '.join(['resolution = ?'] + clauses)} "
+            f"GROUP BY bucket, kind, name, direction ORDER BY bucket, kind, name, direction",
+            [source] + params)
+
+    def totals(self, start=None, end=None, kind=None):
+        """Cruces por nombre y sentido, {name: {direction: n}}, con precisión de un minuto."""
+        clauses, params = self._filters("start", start, end, None, kind)
+        totals = {}
+        for name, direction, count in self._query(
+                f"SELECT name, direction, SUM(count) FROM buckets "
+                f"WHERE {' AND '.join(['resolution = ?'] + clauses)} GROUP BY name, direction",
+                [RESOLUTIONS["minute"]] + params):
+            totals.setdefault(name, {})[direction] = count
+        return totals
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,150 @@
+"""
+Multitudes sintéticas para probar y medir la lógica de conteo sin cámara.
+
+CrowdSimulator mueve una cantidad fija de personas por la imagen y arma, por
+frame, las detecciones de reproducción de contador.replay (las mismas que usa
+el callback con un log grabado). Cada persona camina en línea recta a su
+propia velocidad; al salir de la imagen entra otra por un borde, así que la
+densidad se mantiene. Se pueden configurar:
+
+- `occlusion`: probabilidad por persona y frame de quedar tapada unos frames
+  (no se detecta).
+- `id_switch`: probabilidad por persona y frame de que el tracker le asigne un
+  ID nuevo.
+- `clutter`: detecciones que no son personas por frame.
+
+Lleva además la cuenta real de cruces de la línea horizontal `line_position`
+(de arriba hacia abajo = entrada), para comparar con lo que cuenta el callback.
+
+    crowd = CrowdSimulator(people=200, occlusion=0.01, id_switch=0.002)
+    for pad, info in crowd.frames(900):
+        counting_callback(pad, info, user_data, REPLAY_BACKEND)
+    print(crowd.entries, crowd.exits)
+"""
+import numpy as np
+
+from contador.replay import ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad
+
+# Etiquetas de las detecciones que no son personas
+CLUTTER_LABELS = ("chair", "bicycle", "car", "backpack")
+
+
+class CrowdSimulator:
+    """
+    Personas que cruzan la imagen, como detecciones de reproducción frame a frame.
+
+    Args:
+        people: personas en la imagen a la vez.
+        speed: (mínima, máxima) velocidad en fracción de la altura por frame.
+        occlusion: probabilidad por persona y frame de empezar a estar tapada.
+        occlusion_frames: (mínimo, máximo) de frames que dura una oclusión.
+        id_switch: probabilidad por persona y frame de cambiar de track ID.
+        clutter: detecciones de otras clases por frame.
+        box_size: (ancho, alto) de las cajas, normalizados.
+        width, height: tamaño del frame que informa el pad.
+        fps: frames por segundo (para el PTS).
+        line_position: línea horizontal de la cuenta real.
+        seed: semilla del generador aleatorio.
+    """
+
+    def __init__(self, people=50, speed=(0.003, 0.012), occlusion=0.0, occlusion_frames=(3, 15), id_switch=0.0,
+                 clutter=0, box_size=(0.05, 0.15), width=1280, height=720, fps=30.0, line_position=0.5, seed=0):
+        self.people = people
+        self.speed = speed
+        self.occlusion = occlusion
+        self.occlusion_frames = occlusion_frames
+        self.id_switch = id_switch
+        self.clutter = clutter
+        self.box_size = box_size
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.line_position = line_position
+        self._rng = np.random.default_rng(seed)
+
+        self.frame = 0
+        self._next_id = 1
+        self.x = np.zeros(people)
+        self.y = np.zeros(people)
+        self.vx = np.zeros(people)
+        self.vy = np.zeros(people)
+        self.track_ids = np.zeros(people, dtype=np.int64)
+        self.hidden = np.zeros(people, dtype=np.int64)  # Frames de oclusión que quedan
+        self._spawn(np.arange(people), anywhere=True)
+
+        # Cuenta real
+        self.entries = 0
+        self.exits = 0
+        self.switches = 0
+        self.occlusions = 0
+
+    def _new_ids(self, n):
+        ids = np.arange(self._next_id, self._next_id + n)
+        self._next_id += n
+        return ids
+
+    def _spawn(self, index, anywhere=False):
+        """Personas nuevas en `index`: entran por arriba o por abajo (o en cualquier lado, al empezar)."""
+        n = len(index)
+        if not n:
+            return
+        rng = self._rng
+        down = rng.random(n) < 0.5
+        speed = rng.uniform(self.speed[0], self.speed[1], n)
+        self.vy[index] = np.where(down, speed, -speed)
+        self.vx[index] = rng.uniform(-0.3, 0.3, n) * speed
+        self.x[index] = rng.uniform(0.05, 0.95, n)
+        self.y[index] = rng.uniform(0.0, 1.0, n) if anywhere else np.where(down, 0.0, 1.0)
+        self.track_ids[index] = self._new_ids(n)
+        self.hidden[index] = 0
+
+    def step(self):
+        """Avanza un frame y devuelve sus detecciones."""
+        rng = self._rng
+        n = self.people
+        self.frame += 1
+
+        # Movimiento y cuenta real de cruces de la línea
+        previous = self.y
+        self.x = self.x + self.vx
+        self.y = previous + self.vy
+        line = self.line_position
+        self.entries += int(np.count_nonzero((previous < line) & (self.y >= line)))
+        self.exits += int(np.count_nonzero((previous > line) & (self.y <= line)))
+
+        # Las que salieron de la imagen se reemplazan por personas nuevas
+        self._spawn(np.flatnonzero((self.y < 0.0) | (self.y > 1.0) | (self.x < 0.0) | (self.x > 1.0)))
+
+        # Oclusiones y cambios de ID
+        np.maximum(self.hidden - 1, 0, out=self.hidden)
+        if self.occlusion:
+            start = (self.hidden == 0) & (rng.random(n) < self.occlusion)
+            count = int(np.count_nonzero(start))
+            self.hidden[start] = rng.integers(self.occlusion_frames[0], self.occlusion_frames[1] + 1, count)
+            self.occlusions += count
+        if self.id_switch:
+            switch = rng.random(n) < self.id_switch
+            count = int(np.count_nonzero(switch))
+            self.track_ids[switch] = self._new_ids(count)
+            self.switches += count
+
+        visible = np.flatnonzero(self.hidden == 0)
+        half_w, half_h = self.box_size[0] / 2, self.box_size[1] / 2
+        x, y = self.x[visible], self.y[visible]
+        boxes = np.column_stack((x - half_w, y - half_h, x + half_w, y + half_h)).tolist()
+        confidences = rng.uniform(0.6, 0.99, len(visible)).tolist()
+        detections = [ReplayDetection("person", confidence, ReplayBBox(*box), track_id)
+                      for box, confidence, track_id in zip(boxes, confidences, self.track_ids[visible].tolist())]
+        if self.clutter:
+            centers = rng.uniform(0.1, 0.9, (self.clutter, 2)).tolist()
+            detections += [ReplayDetection(CLUTTER_LABELS[i % len(CLUTTER_LABELS)], 0.8,
+                                           ReplayBBox(cx - 0.05, cy - 0.05, cx + 0.05, cy + 0.05))
+                           for i, (cx, cy) in enumerate(centers)]
+        return detections
+
+    def frames(self, num_frames):
+        """(pad, info) de los próximos `num_frames` frames, como contador.replay.iter_frames."""
+        pad = ReplayPad(self.width, self.height)
+        for _ in range(num_frames):
+            detections = self.step()
+            yield pad, ReplayInfo(ReplayBuffer(int(self.frame * 1e9 / self.fps), detections))
@@ -0,0 +1,350 @@
+"""
+Tabla de seguimiento de personas con registros preasignados.
+
+Cada track id del tracker de Hailo se asigna a un slot fijo mediante un
+diccionario {track_id: TrackState}. Los registros TrackState usan __slots__ y
+se crean una sola vez al construir la tabla (o al ampliarla); después se
+reutilizan, de modo que en cada frame no se crean diccionarios ni objetos
+nuevos: la actualización, la prueba de cruce y el reinicio solo modifican
+atributos de registros ya existentes.
+
+En modo diezmado (contar cada N frames) las posiciones de los frames
+intermedios se guardan en un historial corto por persona con record() y los
+cruces se prueban en flush() sobre cada tramo entre muestras consecutivas, con
+el mismo resultado que probar la línea en todos los frames.
+
+Los tracks que el tracker ya abandonó se expulsan con un barrido circular
+sobre el pool (como la manecilla de un reloj): en cada frame se revisa un
+número fijo de slots, de modo que el costo por frame es constante, update no
+paga nada extra y la memoria se mantiene estable aunque la cámara funcione
+durante días.
+"""
+from collections import namedtuple
+
+# Resultado de TrackTable.update
+NO_CROSSING = 0
+ENTRY = 1  # Cruce de arriba hacia abajo
+EXIT = -1  # Cruce de abajo hacia arriba
+
+# Cruce encontrado por flush: sentido (ENTRY o EXIT), índice de la muestra del
+# historial que quedó al otro lado de la línea e instante (segundos) de esa muestra
+Crossing = namedtuple('Crossing', ['track_id', 'direction', 'index', 'time'])
+
+
+class TrackState:
+    """Estado de una persona seguida. `slot` es fijo y sirve como índice en arreglos auxiliares."""
+    __slots__ = ('slot', 'track_id', 'last_y', 'counted', 'last_frame', 'last_time', 'fresh',
+                 'hist_x', 'hist_y', 'hist_t', 'hist_len')
+
+    def __init__(self, slot, history=0):
+        self.slot = slot
+        self.track_id = 0
+        self.last_y = 0.0
+        self.counted = False
+        self.last_frame = 0  # Último frame en que se vio
+        self.last_time = 0.0  # Último instante (segundos) en que se vio
+        self.fresh = True  # True solo en el frame en que el track aparece
+        # Historial de posiciones normalizadas pendientes de procesar (modo diezmado)
+        self.hist_x = [0.0] * history
+        self.hist_y = [0.0] * history
+        self.hist_t = [0.0] * history  # Instante del frame de cada posición
+        self.hist_len = 0
+
+
+class TrackTable:
+    """
+    Estado por persona indexado por track id, sobre un pool de registros reutilizables.
+
+    Args:
+        capacity: registros a preasignar; el pool se duplica si se llena.
+        max_age_frames: frames sin ver a una persona antes de olvidarla (None = sin límite).
+        max_age_seconds: segundos sin ver a una persona antes de olvidarla (None = sin límite).
+        history: posiciones por persona guardadas entre llamadas a flush (modo diezmado).
+
+    Un track caducado se expulsa, como mucho, una vuelta de barrido después de
+    caducar (max_age_frames frames, o SWEEP_FRAMES si solo hay límite de tiempo).
+    """
+
+    SWEEP_FRAMES = 30
+
+    def __init__(self, capacity=256, max_age_frames=None, max_age_seconds=None, history=0):
+        self.capacity = 0
+        self.max_age_frames = max_age_frames
+        self.max_age_seconds = max_age_seconds
+        self.history = history
+        self._records = []  # Pool de registros, indexado por slot
+        self._free = []  # Pila de slots libres
+        self._tracks = {}  # {track_id: TrackState}
+        self._pending = []  # Registros con historial pendiente de flush
+        self._sweep = 0  # Próximo slot a revisar en el barrido de expulsión
+        self._grow(max(int(capacity), 1))
+
+        # Reloj del frame actual (ver tick)
+        self.frame = 0
+        self.now = 0.0
+
+        # Estadísticas de expulsión
+        self.evicted_by_frames = 0
+        self.evicted_by_time = 0
+        self.peak_size = 0
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, track_id):
+        return track_id in self._tracks
+
+    def __iter__(self):
+        return iter(self._tracks.values())
+
+    def _grow(self, capacity):
+        """Amplía el pool de registros; solo ocurre cuando la tabla se llena."""
+        old = self.capacity
+        self._records.extend(TrackState(slot, self.history) for slot in range(old, capacity))
+        # Los slots nuevos se apilan de forma que se entregue primero el menor
+        self._free[:0] = range(capacity - 1, old - 1, -1)
+        self.capacity = capacity
+
+    def set_history(self, history):
+        """Cambia el largo del historial por persona (descarta lo pendiente)."""
+        self.history = history
+        for state in self._records:
+            state.hist_x = [0.0] * history
+            state.hist_y = [0.0] * history
+            state.hist_t = [0.0] * history
+            state.hist_len = 0
+        self._pending.clear()
+
+    def get(self, track_id):
+        """Devuelve el registro de un track id o None si no se está siguiendo."""
+        return self._tracks.get(track_id)
+
+    def acquire(self, track_id, y):
+        """Reserva un registro para un track id nuevo con posición inicial y."""
+        if not self._free:
+            self._grow(self.capacity * 2)
+        state = self._records[self._free.pop()]
+        state.track_id = track_id
+        state.last_y = y
+        state.counted = False
+        state.last_frame = self.frame
+        state.last_time = self.now
+        state.fresh = True
+        self._tracks[track_id] = state
+        if len(self._tracks) > self.peak_size:
+            self.peak_size = len(self._tracks)
+        return state
+
+    def release(self, track_id):
+        """Devuelve al pool el registro de un track id. Devuelve False si no existía."""
+        state = self._tracks.pop(track_id, None)
+        if state is None:
+            return False
+        if state.hist_len:
+            self._pending.remove(state)
+            state.hist_len = 0
+        self._free.append(state.slot)
+        return True
+
+    def reset(self):
+        """Olvida todas las personas conservando el pool de registros."""
+        for state in self._tracks.values():
+            state.hist_len = 0
+            self._free.append(state.slot)
+        self._tracks.clear()
+        self._pending.clear()
+
+    def tick(self, frame, now):
+        """
+        Avanza el reloj de la tabla al frame actual y expulsa tracks caducados.
+
+        Debe llamarse una vez por frame, antes de update. Cada llamada revisa
+        ceil(capacity / max_age_frames) slots del pool, así que el pool completo
+        se recorre una vez cada max_age_frames frames con costo constante por frame.
+
+        Returns:
+            Número de tracks expulsados en esta llamada.
+        """
+        self.frame = frame
+        self.now = now
+        max_age_frames = self.max_age_frames
+        max_age_seconds = self.max_age_seconds
+        if max_age_frames is None and max_age_seconds is None:
+            return 0
+
+        capacity = self.capacity
+        sweep_frames = max_age_frames or self.SWEEP_FRAMES
+        step = min(-(-capacity // sweep_frames), capacity)
+        records = self._records
+        tracks = self._tracks
+        cursor = self._sweep
+        evicted = 0
+        for _ in range(step):
+            state = records[cursor]
+            cursor += 1
+            if cursor == capacity:
+                cursor = 0
+            if tracks.get(state.track_id) is not state or state.hist_len:
+                continue  # Slot libre o con historial pendiente de flush
+            if max_age_frames is not None and frame - state.last_frame > max_age_frames:
+                self.evicted_by_frames += 1
+            elif max_age_seconds is not None and now - state.last_time > max_age_seconds:
+                self.evicted_by_time += 1
+            else:
+                continue
+            del tracks[state.track_id]
+            self._free.append(state.slot)
+            evicted += 1
+        self._sweep = cursor
+        return evicted
+
+    @property
+    def evicted(self):
+        return self.evicted_by_frames + self.evicted_by_time
+
+    def stats(self):
+        """Tamaño de la tabla y contadores de expulsión."""
+        return {
+            "active_tracks": len(self._tracks),
+            "peak_tracks": self.peak_size,
+            "capacity": self.capacity,
+            "evicted": self.evicted,
+            "evicted_by_frames": self.evicted_by_frames,
+            "evicted_by_time": self.evicted_by_time,
+        }
+
+    def slots(self, track_ids):
+        """
+        Slots y marcas de aparición de personas ya registradas en el frame actual.
+
+        Returns:
+            (slots, fresh): listas con el slot de cada track id y si el track
+            apareció en este frame.
+        """
+        tracks = self._tracks
+        states = [tracks[track_id] for track_id in track_ids]
+        return [state.slot for state in states], [state.fresh for state in states]
+
+    def observe(self, track_id, y):
+        """
+        Registra que una persona se vio en el frame actual, sin probar la línea.
+
+        Lo usan los motores de conteo que guardan su propio estado por slot
+        (ver contador.zones); state.fresh indica si el track acaba de aparecer.
+
+        Returns:
+            El TrackState de la persona.
+        """
+        state = self._tracks.get(track_id)
+        if state is None:
+            return self.acquire(track_id, y)
+        state.last_frame = self.frame
+        state.last_time = self.now
+        state.last_y = y
+        state.fresh = False
+        return state
+
+    def update(self, track_id, y, line_y):
+        """
+        Registra la posición vertical (en píxeles) de una persona y prueba el cruce de la línea.
+
+        Una persona solo se cuenta una vez; una persona nueva parte de su propia
+        posición, así que no puede cruzar en el frame en que aparece.
+
+        Returns:
+            ENTRY, EXIT o NO_CROSSING.
+        """
+        state = self._tracks.get(track_id)
+        if state is None:
+            self.acquire(track_id, y)
+            return NO_CROSSING
+        state.last_frame = self.frame
+        state.last_time = self.now
+        state.fresh = False
+        last_y = state.last_y
+        state.last_y = y
+        if state.counted:
+            return NO_CROSSING
+        if last_y < line_y <= y:
+            state.counted = True
+            return ENTRY
+        if last_y > line_y >= y:
+            state.counted = True
+            return EXIT
+        return NO_CROSSING
+
+    def record(self, track_id, x, y):
+        """
+        Guarda la posición normalizada (x, y) de una persona para procesarla en flush.
+
+        Es el camino liviano del modo diezmado: no prueba la línea. Si el
+        historial se llena (un mismo track repetido en un frame), la última
+        posición se sobrescribe.
+
+        Returns:
+            El TrackState de la persona.
+        """
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self.acquire(track_id, None)
+        else:
+            state.last_frame = self.frame
+            state.last_time = self.now
+        n = state.hist_len
+        if n == 0:
+            self._pending.append(state)
+        elif n == len(state.hist_y):
+            n -= 1
+        state.hist_x[n] = x
+        state.hist_y[n] = y
+        state.hist_t[n] = self.now
+        state.hist_len = n + 1
+        return state
+
+    def pending(self):
+        """Registros con historial pendiente, en el orden en que aparecieron."""
+        return self._pending
+
+    def flush(self, line_y, height):
+        """
+        Prueba la línea en cada tramo del historial pendiente y lo vacía.
+
+        Args:
+            line_y: posición de la línea en píxeles.
+            height: alto del frame, para pasar las posiciones guardadas a píxeles.
+
+        Returns:
+            Lista de Crossing desde el flush anterior, por persona y en orden.
+        """
+        crossings = []
+        for state in self._pending:
+            n = state.hist_len
+            hist_y = state.hist_y
+            last_y = state.last_y
+            start = 0
+            if last_y is None:
+                # Persona nueva: parte de su primera posición
+                last_y = hist_y[0] * height
+                start = 1
+            counted = state.counted
+            for i in range(start, n):
+                y = hist_y[i] * height
+                if not counted:
+                    if last_y < line_y <= y:
+                        counted = True
+                        crossings.append(Crossing(state.track_id, ENTRY, i, state.hist_t[i]))
+                    elif last_y > line_y >= y:
+                        counted = True
+                        crossings.append(Crossing(state.track_id, EXIT, i, state.hist_t[i]))
+                last_y = y
+            state.last_y = last_y
+            state.counted = counted
+        self.clear_pending()
+        return crossings
+
+    def clear_pending(self):
+        """Vacía el historial pendiente (lo llaman flush y los motores que lo procesan por su cuenta)."""
+        for state in self._pending:
+            state.hist_len = 0
+            state.fresh = False
+        self._pending.clear()
@@ -0,0 +1,181 @@
+"""
+Trayectorias por persona en anillos de tamaño fijo, con velocidad, rumbo y permanencia.
+
+TrackTable solo guarda la última posición de cada persona. TrajectoryBuffer
+guarda las últimas `history` posiciones (centros normalizados) de cada track en
+un arreglo preasignado (capacidad x history x 2) float32 indexado por el slot
+del TrackState, usado como anillo: cada frame escribe una columna por persona
+con una sola asignación vectorizada, sin listas que crezcan.
+
+Por frame, para todas las personas del frame a la vez:
+
+- velocidad: desplazamiento desde la muestra más vieja del anillo dividido por
+  el tiempo transcurrido (fracciones del ancho y alto de la imagen por segundo);
+- rumbo: ángulo de ese desplazamiento (0 = derecha, 90° = abajo);
+- permanencia: segundos desde que apareció el track.
+
+Solo se lee la muestra más nueva y la más vieja de cada anillo, así que el
+costo por frame depende de las personas, no del largo del historial. Con esto
+se resumen el flujo (velocidad media, personas quietas, como en una fila, y la
+permanencia) y se acumula un histograma de rumbos de las personas en movimiento.
+"""
+import math
+
+import numpy as np
+
+# Sectores del histograma de rumbos, centrados en cada dirección (coordenadas de imagen)
+HEADINGS = ("derecha", "abajo-derecha", "abajo", "abajo-izquierda", "izquierda", "arriba-izquierda", "arriba",
+            "arriba-derecha")
+
+
+class TrajectoryBuffer:
+    """
+    Anillos de posiciones por slot de TrackTable y resumen de flujo por frame.
+
+    Args:
+        capacity: slots a preasignar (crece como la tabla si hace falta).
+        history: posiciones por track.
+        stationary_speed: velocidad por debajo de la cual una persona cuenta como quieta.
+        moving_speed: velocidad mínima para sumar al histograma de rumbos.
+    """
+
+    def __init__(self, capacity=256, history=32, stationary_speed=0.02, moving_speed=0.05):
+        if history < 2:
+            raise ValueError("history debe ser al menos 2")
+        self.history = history
+        self.stationary_speed = stationary_speed
+        self.moving_speed = moving_speed
+        self.capacity = 0
+        self.points = np.zeros((0, history, 2), dtype=np.float32)
+        self.times = np.zeros((0, history), dtype=np.float64)
+        self.head = np.zeros(0, dtype=np.intp)  # Próxima posición a escribir de cada anillo
+        self.length = np.zeros(0, dtype=np.intp)  # Muestras válidas de cada anillo
+        self.first_time = np.zeros(0, dtype=np.float64)  # Instante en que apareció el track
+        self._grow(max(int(capacity), 1))
+
+        # Personas en movimiento por sector de rumbo, acumuladas frame a frame
+        self.heading_counts = np.zeros(len(HEADINGS), dtype=np.int64)
+
+        # Velocidad, permanencia y largo del anillo de cada persona del último frame;
+        # el resumen se calcula recién al leerlo (hilo de estadísticas o de métricas)
+        self._last = (np.zeros(0, dtype=np.float32), np.zeros(0), np.zeros(0, dtype=np.intp))
+        self.frames = 0
+
+    def _grow(self, capacity):
+        """Amplía los anillos; solo ocurre cuando la tabla de seguimiento crece."""
+        extra = capacity - self.capacity
+        self.points = np.concatenate((self.points, np.zeros((extra, self.history, 2), dtype=np.float32)))
+        self.times = np.concatenate((self.times, np.zeros((extra, self.history))))
+        self.head = np.concatenate((self.head, np.zeros(extra, dtype=np.intp)))
+        self.length = np.concatenate((self.length, np.zeros(extra, dtype=np.intp)))
+        self.first_time = np.concatenate((self.first_time, np.zeros(extra)))
+        # Vistas planas: una muestra es un índice slot * history + posición
+        self._flat_points = self.points.reshape(-1, 2)
+        self._flat_times = self.times.reshape(-1)
+        self.capacity = capacity
+
+    def add(self, slots, fresh, points, now):
+        """
+        Suma las posiciones de un frame.
+
+        Args:
+            slots: slot de TrackTable de cada persona.
+            fresh: True para los tracks que aparecen en este frame (su anillo se vacía).
+            points: (N, 2) centros normalizados.
+            now: instante del frame en segundos.
+
+        Returns:
+            (velocidad, rumbo en radianes, permanencia en segundos), un valor por persona.
+        """
+        self.frames += 1
+        if not len(slots):
+            self._last = (np.zeros(0, dtype=np.float32), np.zeros(0), np.zeros(0, dtype=np.intp))
+            return self._last[0], self._last[0], self._last[1]
+        slots = np.asarray(slots, dtype=np.intp)
+        top = int(slots.max())
+        if top >= self.capacity:
+            self._grow(max(self.capacity * 2, top + 1))
+        if True in fresh:
+            new = slots[np.asarray(fresh, dtype=bool)]
+            self.head[new] = 0
+            self.length[new] = 0
+            self.first_time[new] = now
+
+        history = self.history
+        head = self.head[slots]
+        length = self.length[slots] + 1
+        np.minimum(length, history, out=length)
+        base = slots * history
+        newest = base + head
+        oldest = base + (head + 1 - length) % history
+        self._flat_points[newest] = points
+        self._flat_times[newest] = now
+        self.length[slots] = length
+        head += 1
+        head %= history
+        self.head[slots] = head
+
+        # Desplazamiento desde la muestra más vieja del anillo: una lectura por persona
+        delta = np.asarray(points, dtype=np.float32) - self._flat_points[oldest]
+        elapsed = now - self._flat_times[oldest]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        speed = np.divide(distance, elapsed, out=np.zeros_like(distance), where=elapsed > 0)
+        heading = np.arctan2(delta[:, 1], delta[:, 0])
+        dwell = now - self.first_time[slots]
+
+        moving = heading[speed >= self.moving_speed]
+        if len(moving):
+            sectors = np.rint(moving * (len(HEADINGS) / (2 * math.pi))).astype(np.intp) % len(HEADINGS)
+            self.heading_counts += np.bincount(sectors, minlength=len(HEADINGS))
+        self._last = (speed, dwell, length)
+        return speed, heading, dwell
+
+    # -- Resumen del último frame (cualquier hilo) -----------------------------------
+
+    @property
+    def active(self):
+        return len(self._last[0])
+
+    @property
+    def stationary(self):
+        """Personas quietas (con al menos dos posiciones guardadas)."""
+        speed, _, length = self._last
+        return int(np.count_nonzero((speed < self.stationary_speed) & (length > 1)))
+
+    @property
+    def mean_speed(self):
+        speed = self._last[0]
+        return float(speed.mean()) if len(speed) else 0.0
+
+    @property
+    def max_speed(self):
+        speed = self._last[0]
+        return float(speed.max()) if len(speed) else 0.0
+
+    @property
+    def mean_dwell(self):
+        dwell = self._last[1]
+        return float(dwell.mean()) if len(dwell) else 0.0
+
+    @property
+    def max_dwell(self):
+        dwell = self._last[1]
+        return float(dwell.max()) if len(dwell) else 0.0
+
+    def trajectory(self, slot):
+        """Posiciones guardadas de un slot, de la más vieja a la más nueva, (n, 2)."""
+        n = int(self.length[slot])
+        order = (int(self.head[slot]) - n + np.arange(n)) % self.history
+        return self.points[slot, order].copy()
+
+    def stats(self):
+        """Resumen de flujo del último frame y el histograma de rumbos acumulado."""
+        return {
+            "active": self.active,
+            "stationary": self.stationary,
+            "mean_speed": self.mean_speed,
+            "max_speed": self.max_speed,
+            "mean_dwell": self.mean_dwell,
+            "max_dwell": self.max_dwell,
+            "headings": dict(zip(HEADINGS, self.heading_counts.tolist())),
+        }
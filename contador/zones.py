@@ -0,0 +1,297 @@
+"""
+Motor de conteo con varias líneas y zonas poligonales.
+
+Todas las posiciones de un frame se procesan juntas como un arreglo (N, 2) en
+coordenadas normalizadas (0-1, igual que los bounding boxes de Hailo):
+
+- Líneas: segmentos con cualquier ángulo. El cruce se detecta con el signo del
+  producto cruz de cada movimiento contra todas las líneas a la vez (N x L).
+  Cada persona se cuenta como mucho una vez por línea.
+- Zonas: polígonos rasterizados una sola vez en una grilla de bits
+  (bit i = zona i), así que saber en qué zonas está cada persona es una sola
+  búsqueda en la grilla sin importar cuántas zonas haya. Entrar o salir de una
+  zona genera un evento cada vez.
+
+El estado por persona vive en arreglos indexados por TrackState.slot.
+
+Ejemplo de archivo de configuración (JSON, o YAML si PyYAML está instalado):
+
+    {
+      "grid": [320, 180],
+      "lines": [
+        {"name": "puerta", "start": [0.0, 0.5], "end": [1.0, 0.5],
+         "positive": "entrada", "negative": "salida"}
+      ],
+      "zones": [
+        {"name": "caja", "polygon": [[0.6, 0.6], [0.9, 0.6], [0.9, 0.9], [0.6, 0.9]]}
+      ]
+    }
+
+Para una línea de start a end, "positive" es el cruce de izquierda a derecha
+mirando en el sentido de la línea; en la línea del ejemplo equivale a cruzar de
+arriba hacia abajo, igual que la entrada de contador_personas.py.
+"""
+import json
+from collections import namedtuple
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Máximo de líneas y de zonas (cada una ocupa un bit de un uint32)
+MAX_LINES = 32
+MAX_ZONES = 32
+
+LINE = "line"
+ZONE = "zone"
+
+# Un cruce de línea o una entrada/salida de zona; `time` es el instante (segundos)
+# de la muestra donde ocurrió, o None si ocurrió en el frame procesado
+ZoneEvent = namedtuple('ZoneEvent', ['track_id', 'kind', 'name', 'direction', 'time'])
+
+CountingLine = namedtuple('CountingLine', ['name', 'start', 'end', 'positive', 'negative'])
+CountingZone = namedtuple('CountingZone', ['name', 'polygon', 'enter', 'exit'])
+
+
+def load_zone_config(path):
+    """Lee un archivo de zonas (JSON o YAML) y devuelve el diccionario de configuración."""
+    path = Path(path)
+    with open(path, "r") as f:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class ZoneEngine:
+    """
+    Detecta cruces de líneas y entradas/salidas de zonas para todas las personas de un frame.
+
+    Args:
+        lines: lista de CountingLine.
+        zones: lista de CountingZone.
+        grid_size: (ancho, alto) de la grilla donde se rasterizan las zonas.
+        capacity: slots de personas a preasignar (crece si hace falta).
+    """
+
+    def __init__(self, lines=(), zones=(), grid_size=(320, 180), capacity=256):
+        self.lines = list(lines)
+        self.zones = list(zones)
+        if len(self.lines) > MAX_LINES:
+            raise ValueError(f"At most {MAX_LINES} counting lines are supported")
+        if len(self.zones) > MAX_ZONES:
+            raise ValueError(f"At most {MAX_ZONES} counting zones are supported")
+
+        # Geometría de las líneas: punto inicial A (L, 2) y dirección B - A (L, 2)
+        starts = np.array([line.start for line in self.lines], dtype=np.float32).reshape(-1, 2)
+        ends = np.array([line.end for line in self.lines], dtype=np.float32).reshape(-1, 2)
+        self._line_a = starts
+        self._line_b = ends
+        self._line_d = ends - starts
+        self._line_bits = (np.uint32(1) << np.arange(len(self.lines), dtype=np.uint32))
+
+        # Grilla de zonas: cada celda guarda los bits de las zonas que la cubren
+        self.grid_size = (int(grid_size[0]), int(grid_size[1]))
+        self.grid = self._rasterize(self.zones, self.grid_size)
+
+        # Estado por slot
+        self.capacity = 0
+        self._prev_xy = np.zeros((0, 2), dtype=np.float32)
+        self._prev_zones = np.zeros(0, dtype=np.uint32)
+        self._lines_counted = np.zeros(0, dtype=np.uint32)
+        self._grow(max(int(capacity), 1))
+
+        # Conteos por línea/zona y sentido: {name: {direction: n}}
+        self.counts = {}
+        for line in self.lines:
+            self.counts[line.name] = {line.positive: 0, line.negative: 0}
+        for zone in self.zones:
+            self.counts[zone.name] = {zone.enter: 0, zone.exit: 0}
+
+    @classmethod
+    def from_config(cls, config, capacity=256):
+        """Crea el motor desde un diccionario de configuración o la ruta de un archivo."""
+        if not isinstance(config, dict):
+            config = load_zone_config(config)
+        lines = [
+            CountingLine(
+                name=line.get("name", f"line{i}"),
+                start=tuple(line["start"]),
+                end=tuple(line["end"]),
+                positive=line.get("positive", "entrada"),
+                negative=line.get("negative", "salida"),
+            )
+            for i, line in enumerate(config.get("lines", []))
+        ]
+        zones = [
+            CountingZone(
+                name=zone.get("name", f"zone{i}"),
+                polygon=[tuple(point) for point in zone["polygon"]],
+                enter=zone.get("enter", "entrada"),
+                exit=zone.get("exit", "salida"),
+            )
+            for i, zone in enumerate(config.get("zones", []))
+        ]
+        return cls(lines, zones, grid_size=config.get("grid", (320, 180)), capacity=capacity)
+
+    @staticmethod
+    def _rasterize(zones, grid_size):
+        grid_w, grid_h = grid_size
+        grid = np.zeros((grid_h, grid_w), dtype=np.uint32)
+        layer = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        scale = np.array([grid_w, grid_h], dtype=np.float32)
+        for i, zone in enumerate(zones):
+            layer[:] = 0
+            polygon = np.round(np.asarray(zone.polygon, dtype=np.float32) * scale).astype(np.int32)
+            cv2.fillPoly(layer, [polygon], 1)
+            grid[layer > 0] |= np.uint32(1 << i)
+        return grid
+
+    def _grow(self, capacity):
+        old = self.capacity
+        self._prev_xy = np.resize(self._prev_xy, (capacity, 2))
+        self._prev_zones = np.resize(self._prev_zones, capacity)
+        self._lines_counted = np.resize(self._lines_counted, capacity)
+        self._prev_xy[old:] = 0
+        self._prev_zones[old:] = 0
+        self._lines_counted[old:] = 0
+        self.capacity = capacity
+
+    def zone_bits(self, points):
+        """Bits de zona para cada punto (N, 2) normalizado, con una búsqueda en la grilla."""
+        grid_w, grid_h = self.grid_size
+        ix = np.clip((points[:, 0] * grid_w).astype(np.intp), 0, grid_w - 1)
+        iy = np.clip((points[:, 1] * grid_h).astype(np.intp), 0, grid_h - 1)
+        return self.grid[iy, ix]
+
+    def process(self, slots, track_ids, points, fresh, times=None):
+        """
+        Procesa todas las personas de un frame.
+
+        Args:
+            slots: (N,) slots de TrackTable de cada persona.
+            track_ids: (N,) track ids (solo se usan para los eventos).
+            points: (N, 2) posiciones normalizadas (x, y).
+            fresh: (N,) bool, True para personas que aparecen en este frame.
+            times: (N,) instante de cada posición para ZoneEvent.time (None = el frame actual).
+
+        Returns:
+            Lista de ZoneEvent (vacía en la mayoría de los frames).
+        """
+        events = []
+        n = len(slots)
+        if n == 0:
+            return events
+        slots = np.asarray(slots, dtype=np.intp)
+        points = np.asarray(points, dtype=np.float32).reshape(n, 2)
+        fresh = np.asarray(fresh, dtype=bool)
+        max_slot = int(slots.max())
+        if max_slot >= self.capacity:
+            self._grow(max(self.capacity * 2, max_slot + 1))
+
+        # Las personas nuevas parten de su posición actual y sin líneas contadas
+        # (el slot puede venir de una persona expulsada)
+        prev = self._prev_xy[slots]
+        prev[fresh] = points[fresh]
+        if fresh.any():
+            self._lines_counted[slots[fresh]] = 0
+
+        if self.lines:
+            self._cross_lines(slots, track_ids, prev, points, times, events)
+
+        if self.zones:
+            current = self.zone_bits(points)
+            previous = self._prev_zones[slots]
+            previous[fresh] = current[fresh]
+            changed = np.nonzero(current != previous)[0]
+            for i in changed:
+                time = times[i] if times is not None else None
+                self._emit_zone_bits(events, track_ids[i], int(current[i] & ~previous[i]), True, time)
+                self._emit_zone_bits(events, track_ids[i], int(previous[i] & ~current[i]), False, time)
+            self._prev_zones[slots] = current
+
+        self._prev_xy[slots] = points
+        return events
+
+    def process_pending(self, states):
+        """
+        Procesa el historial del modo diezmado (ver TrackTable.record).
+
+        La k-ésima posición guardada de cada persona se procesa en la k-ésima
+        llamada a process, así que cada tramo entre muestras consecutivas se
+        prueba igual que si se hubiera contado en todos los frames.
+
+        Args:
+            states: TrackState con historial pendiente (TrackTable.pending()).
+
+        Returns:
+            Lista de ZoneEvent, con el instante de la muestra donde ocurrió cada uno.
+        """
+        events = []
+        longest = max((state.hist_len for state in states), default=0)
+        for k in range(longest):
+            active = [state for state in states if state.hist_len > k]
+            events.extend(self.process(
+                [state.slot for state in active],
+                [state.track_id for state in active],
+                [(state.hist_x[k], state.hist_y[k]) for state in active],
+                [k == 0 and state.fresh for state in active],
+                [state.hist_t[k] for state in active],
+            ))
+        return events
+
+    def _cross_lines(self, slots, track_ids, prev, points, times, events):
+        a = self._line_a
+        d = self._line_d
+        # Lado de cada punto respecto a cada línea: (N, L)
+        side_prev = d[:, 0] * (prev[:, 1:2] - a[:, 1]) - d[:, 1] * (prev[:, 0:1] - a[:, 0])
+        side_cur = d[:, 0] * (points[:, 1:2] - a[:, 1]) - d[:, 1] * (points[:, 0:1] - a[:, 0])
+        positive = (side_prev < 0) & (side_cur >= 0)
+        negative = (side_prev > 0) & (side_cur <= 0)
+        crossed = positive | negative
+        if not crossed.any():
+            return
+
+        # El movimiento debe cortar el segmento, no solo la recta: los extremos
+        # de la línea tienen que quedar a lados distintos del movimiento
+        move = points - prev
+        side_a = move[:, 0:1] * (a[:, 1] - prev[:, 1:2]) - move[:, 1:2] * (a[:, 0] - prev[:, 0:1])
+        side_b = move[:, 0:1] * (self._line_b[:, 1] - prev[:, 1:2]) - move[:, 1:2] * (self._line_b[:, 0] - prev[:, 0:1])
+        crossed &= (side_a * side_b) <= 0
+
+        # Cada persona se cuenta una sola vez por línea
+        counted = self._lines_counted[slots]
+        crossed &= (counted[:, None] & self._line_bits) == 0
+        rows, cols = np.nonzero(crossed)
+        for i, l in zip(rows, cols):
+            line = self.lines[l]
+            direction = line.positive if positive[i, l] else line.negative
+            self._emit(events, track_ids[i], LINE, line.name, direction, times[i] if times is not None else None)
+            counted[i] |= self._line_bits[l]
+        self._lines_counted[slots] = counted
+
+    def _emit_zone_bits(self, events, track_id, bits, entered, time):
+        # Recorre solo los bits encendidos
+        while bits:
+            bit = bits & -bits
+            zone = self.zones[bit.bit_length() - 1]
+            self._emit(events, track_id, ZONE, zone.name, zone.enter if entered else zone.exit, time)
+            bits ^= bit
+
+    def _emit(self, events, track_id, kind, name, direction, time):
+        self.counts[name][direction] += 1
+        events.append(ZoneEvent(int(track_id), kind, name, direction, time))
+
+    def draw(self, frame, color=(0, 255, 255), thickness=2):
+        """Dibuja líneas y zonas sobre un frame RGB."""
+        height, width = frame.shape[:2]
+        scale = np.array([width, height], dtype=np.float32)
+        for line in self.lines:
+            p1 = tuple(int(v) for v in np.asarray(line.start) * scale)
+            p2 = tuple(int(v) for v in np.asarray(line.end) * scale)
+            cv2.line(frame, p1, p2, color, thickness)
+            cv2.putText(frame, line.name, p1, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        for zone in self.zones:
+            polygon = np.round(np.asarray(zone.polygon, dtype=np.float32) * scale).astype(np.int32)
+            cv2.polylines(frame, [polygon], True, color, thickness)
+            cv2.putText(frame, zone.name, tuple(int(v) for v in polygon[0]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
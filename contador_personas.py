@@ -7,137 +7,184 @@ import numpy as np
 import cv2
 import hailo
 import argparse
+import socket
 
 from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_pad, get_numpy_from_buffer
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.detection.detection_pipeline import GStreamerDetectionApp
+from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_helper_pipelines import SOURCE_PIPELINE, INFERENCE_PIPELINE, \
+    INFERENCE_PIPELINE_WRAPPER, TRACKER_PIPELINE, USER_CALLBACK_PIPELINE, DISPLAY_PIPELINE
 
-# Clase para el conteo de personas
-class PersonCounterCallback(app_callback_class):
-    def __init__(self):
-        super().__init__()
-        # Contadores
-        self.total_count = 0
-        self.entrada_count = 0
-        self.salida_count = 0
-        
-        # Línea virtual (porcentaje de la altura de la imagen)
-        self.line_position = 0.5  # Mitad de la imagen
-        
-        # Seguimiento de personas
-        self.tracked_people = {}  # {track_id: {"last_y": y_position, "counted": False}}
-        
-        # Para visualización
-        self.line_color = (0, 255, 255)  # Amarillo
-        self.line_thickness = 2
+from basic_pipelines.metrics_server import MetricsServer
+from basic_pipelines.stats_sink import StatsSink, FORMATS
+from contador.callback import PersonCounterState, CallbackBackend, counting_callback, configure_counter
+from contador.handoff import DetectionRing, CountingWorker, handoff_callback
+from contador.aggregator import AggregatorClient, parse_address
+from contador.clips import ClipRecorder
+from contador.heatmap import HeatmapAccumulator
+from contador.metrics import counter_metrics
+from contador.multicam import MultiStreamCounter, stream_values
+from contador.overlay import OverlayRenderer
+from contador.recorder import DetectionRecorder
+from contador.store import CountStore
+
+# Clase para el conteo de personas: el estado de conteo vive en contador.callback
+class PersonCounterCallback(PersonCounterState, app_callback_class):
+    pass
+
+# Acceso al pipeline real para el callback de conteo
+BACKEND = CallbackBackend(hailo, get_caps_from_pad, get_numpy_from_buffer, Gst.PadProbeReturn.OK)
 
 # Función de callback para procesar cada frame
 def app_callback(pad, info, user_data):
-    # Obtener el buffer del frame
-    buffer = info.get_buffer()
-    if buffer is None:
-        return Gst.PadProbeReturn.OK
+    return counting_callback(pad, info, user_data, BACKEND)
 
-    # Incrementar contador de frames
-    user_data.increment()
-    
-    # Obtener información del frame
-    format, width, height = get_caps_from_pad(pad)
-    
-    # Posición de la línea virtual
-    line_y = int(height * user_data.line_position)
-    
-    # Obtener frame si está habilitado
-    frame = None
-    if user_data.use_frame and format is not None and width is not None and height is not None:
-        frame = get_numpy_from_buffer(buffer, format, width, height)
-        # Dibujar línea virtual
-        cv2.line(frame, (0, line_y), (width, line_y), user_data.line_color, user_data.line_thickness)
-    
-    # Obtener detecciones
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-    
-    # Contar personas detectadas en este frame
-    current_count = 0
-    
-    # Procesar cada detección
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        
-        # Solo procesar personas
-        if label == "person" and confidence > 0.5:
-            current_count += 1
-            
-            # Obtener ID de seguimiento
-            track_id = 0
-            track = detection.get_objects_typed(hailo.HAILO_UNIQUE_ID)
-            if len(track) == 1:
-                track_id = track[0].get_id()
-                
-                # Calcular centro del bounding box
-                y_center = (bbox.ymin() + bbox.ymax()) * height / 2
-                
-                # Verificar si ya estamos siguiendo a esta persona
-                if track_id in user_data.tracked_people:
-                    last_y = user_data.tracked_people[track_id]["last_y"]
-                    counted = user_data.tracked_people[track_id]["counted"]
-                    
-                    # Si no ha sido contada y cruza la línea
-                    if not counted:
-                        if last_y < line_y and y_center >= line_y:
-                            # Cruce de arriba hacia abajo (entrada)
-                            user_data.entrada_count += 1
-                            user_data.tracked_people[track_id]["counted"] = True
-                        elif last_y > line_y and y_center <= line_y:
-                            # Cruce de abajo hacia arriba (salida)
-                            user_data.salida_count += 1
-                            user_data.tracked_people[track_id]["counted"] = True
-                
-                # Actualizar posición
-                user_data.tracked_people[track_id] = {
-                    "last_y": y_center,
-                    "counted": user_data.tracked_people.get(track_id, {}).get("counted", False)
-                }
-                
-                # Dibujar bounding box y ID si el frame está disponible
-                if user_data.use_frame:
-                    x1, y1 = int(bbox.xmin() * width), int(bbox.ymin() * height)
-                    x2, y2 = int(bbox.xmax() * width), int(bbox.ymax() * height)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(frame, f"ID: {track_id}", (x1, y1 - 10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    
-    # Actualizar contador total
-    user_data.total_count = max(user_data.total_count, current_count)
-    
-    # Mostrar contadores en el frame
-    if user_data.use_frame:
-        cv2.putText(frame, f"Total: {user_data.total_count}", (10, 30), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, f"Entradas: {user_data.entrada_count}", (10, 70), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, f"Salidas: {user_data.salida_count}", (10, 110), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        
-        # Convertir frame a BGR y guardarlo
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        user_data.set_frame(frame)
-    
-    # Imprimir estadísticas
-    print(f"Frame: {user_data.get_count()} | Total: {user_data.total_count} | Entradas: {user_data.entrada_count} | Salidas: {user_data.salida_count}")
-    
+# Con --handoff, el probe solo copia las detecciones al anillo del proceso de conteo
+def handoff_app_callback(pad, info, user_data):
+    return handoff_callback(pad, info, user_data.ring, BACKEND)
+
+# En modo multicámara el probe común (antes del router) solo deja pasar el buffer;
+# se cuenta en el probe de cada cámara
+def passthrough_callback(pad, info, user_data):
     return Gst.PadProbeReturn.OK
 
+# Varias cámaras en un solo pipeline con una sola inferencia
+class GStreamerMultiCameraApp(GStreamerDetectionApp):
+    """
+    hailoroundrobin intercala los frames de todas las fuentes hacia un único
+    elemento de inferencia y hailostreamrouter los separa de nuevo; cada cámara
+    sigue en su rama con su propio tracker y un probe que cuenta con su propio
+    estado (contador.multicam.StreamCounter).
+    """
+
+    def __init__(self, sources, counter, user_data):
+        self.sources = sources
+        self.counter = counter
+        super().__init__(passthrough_callback, user_data)
+        for i, stream in enumerate(counter):
+            identity = self.pipeline.get_by_name(f"identity_callback_{i}")
+            identity.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, app_callback, stream)
+
+    def get_pipeline_string(self):
+        sources = " ".join(
+            f"{SOURCE_PIPELINE(video_source=source, video_width=self.video_width, video_height=self.video_height, frame_rate=self.frame_rate, sync=self.sync, name=f'source_{i}')} ! robin.sink_{i}"
+            for i, source in enumerate(self.sources))
+        detection = INFERENCE_PIPELINE_WRAPPER(INFERENCE_PIPELINE(
+            hef_path=self.hef_path,
+            post_process_so=self.post_process_so,
+            post_function_name=self.post_function_name,
+            batch_size=self.batch_size,
+            config_json=self.labels_json,
+            additional_params=self.thresholds_str))
+        routes = " ".join(f'src_{i}::input-streams="<sink_{i}>"' for i in range(len(self.sources)))
+        branches = " ".join(
+            f"router.src_{i} ! {TRACKER_PIPELINE(class_id=1, name=f'hailo_tracker_{i}')} ! "
+            f"{USER_CALLBACK_PIPELINE(name=f'identity_callback_{i}')} ! "
+            f"{DISPLAY_PIPELINE(video_sink=self.video_sink, sync=self.sync, show_fps=self.show_fps, name=f'hailo_display_{i}')}"
+            for i in range(len(self.sources)))
+        return (f"{sources} hailoroundrobin mode=0 name=robin ! {detection} ! {USER_CALLBACK_PIPELINE()} ! "
+                f"hailostreamrouter name=router {routes} {branches}")
+
+def run_multicam(args, user_data, names, line_positions, zones):
+    """Cuenta en varias cámaras a la vez; estadísticas, almacén y métricas son comunes."""
+    counter = MultiStreamCounter.from_settings(names, vars(args), line_positions, zones)
+    
+    # Un solo almacén: cada cámara reporta sus cruces como "<cámara>/<línea>"
+    store = None
+    if args.store:
+        store = CountStore(args.store)
+        counter.set_component("store", store)
+        counter.restore_counts(store)
+        store.start()
+    
+    # Cruces al agregador del sitio, con el nombre de cada cámara delante
+    aggregator = None
+    if args.aggregator:
+        aggregator = AggregatorClient(parse_address(args.aggregator), args.device_name).start()
+        counter.set_component("aggregator", aggregator)
+    
+    # Una línea de estadísticas con los totales y las entradas/salidas de cada cámara
+    stats = None
+    if args.stats_interval > 0:
+        stats = StatsSink(args.stats_interval, args.stats_format)
+        counter.set_component("stats", stats)
+        stats.add_source(counter.stats_snapshot)
+        stats.start()
+    
+    app = GStreamerMultiCameraApp(args.rtsp, counter, user_data)
+    
+    # Métricas con la etiqueta stream por cámara
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(counter.metrics, args.metrics_host, args.metrics_port).start()
+    try:
+        app.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        if stats is not None:
+            stats.stop()
+        if store is not None:
+            store.close()
+        if aggregator is not None:
+            aggregator.stop()
+
 if __name__ == "__main__":
     # Parsear argumentos
     parser = argparse.ArgumentParser(description='Contador de personas con RTSP')
-    parser.add_argument('--rtsp', type=str, help='URL del stream RTSP (ej: rtsp://usuario:contraseña@ip:puerto/stream)')
-    parser.add_argument('--line-position', type=float, default=0.5, help='Posición de la línea virtual (0-1, porcentaje de la altura)')
+    parser.add_argument('--rtsp', type=str, action='append', help='URL del stream RTSP (ej: rtsp://usuario:contraseña@ip:puerto/stream); repetir para contar varias cámaras en un solo pipeline')
+    parser.add_argument('--stream-name', type=str, action='append', help='Nombre de cada cámara con varios --rtsp (por defecto cam1, cam2, ...)')
+    parser.add_argument('--line-position', type=float, action='append', help='Posición de la línea virtual (0-1, porcentaje de la altura); una para todas las cámaras o una por --rtsp')
+    parser.add_argument('--zones', type=str, action='append', help='Archivo JSON/YAML con líneas y zonas de conteo (reemplaza a --line-position); uno para todas las cámaras o uno por --rtsp')
+    parser.add_argument('--count-every', type=int, default=1, help='Contar cada N frames; los cruces intermedios se recuperan del historial de posiciones')
+    parser.add_argument('--record', type=str, help='Grabar las detecciones de cada frame en este archivo (ver contador/replay.py)')
+    parser.add_argument('--track-ttl-frames', type=int, default=150, help='Frames sin ver a una persona antes de olvidarla (0 = sin límite)')
+    parser.add_argument('--track-ttl-seconds', type=float, default=10.0, help='Segundos sin ver a una persona antes de olvidarla (0 = sin límite)')
+    parser.add_argument('--stitch', action='store_true', help='Unir los tracks a los que el tracker les cambia el ID tras una oclusión')
+    parser.add_argument('--stitch-gap', type=float, default=1.5, help='Segundos que un track perdido espera a que lo continúe otro ID')
+    parser.add_argument('--stitch-distance', type=float, default=0.08, help='Distancia máxima (0-1) entre la posición predicha del track perdido y el nuevo')
+    parser.add_argument('--trajectories', action='store_true', help='Guardar la trayectoria de cada persona y reportar velocidad, rumbo y permanencia')
+    parser.add_argument('--trajectory-history', type=int, default=32, help='Posiciones por persona en su trayectoria')
+    parser.add_argument('--store', type=str, help='Base SQLite donde guardar los cruces; los contadores se retoman al reiniciar')
+    parser.add_argument('--aggregator', type=str, help='Mandar los cruces al agregador del sitio en HOST:PUERTO (python -m contador.aggregator)')
+    parser.add_argument('--device-name', type=str, default=socket.gethostname(), help='Nombre de este contador ante el agregador')
+    parser.add_argument('--stats-interval', type=float, default=1.0, help='Segundos entre líneas de estadísticas (0 = no imprimir)')
+    parser.add_argument('--stats-format', choices=FORMATS, default='human', help='Formato de las estadísticas: texto o JSON por línea')
+    parser.add_argument('--metrics-port', type=int, help='Servir métricas HTTP (/metrics Prometheus, /metrics.json) en este puerto')
+    parser.add_argument('--metrics-host', type=str, default='0.0.0.0', help='Dirección donde escucha el servidor de métricas')
+    parser.add_argument('--inline-overlay', action='store_true', help='Con --use-frame, dibujar el overlay dentro del callback en vez de en un hilo aparte')
+    parser.add_argument('--heatmap', type=str, help='Guardar el mapa de calor de permanencia en este archivo (.png o .npy)')
+    parser.add_argument('--heatmap-interval', type=float, default=60.0, help='Segundos entre fotos del mapa de calor')
+    parser.add_argument('--heatmap-half-life', type=float, default=0.0, help='Segundos en que el mapa de calor se desvanece a la mitad (0 = acumular siempre)')
+    parser.add_argument('--heatmap-cols', type=int, default=64, help='Columnas de la grilla del mapa de calor')
+    parser.add_argument('--heatmap-rows', type=int, default=36, help='Filas de la grilla del mapa de calor')
+    parser.add_argument('--clips', type=str, help='Carpeta donde guardar un clip de video alrededor de cada cruce')
+    parser.add_argument('--clip-pre', type=float, default=5.0, help='Segundos de video antes del cruce')
+    parser.add_argument('--clip-post', type=float, default=5.0, help='Segundos de video después del cruce')
+    parser.add_argument('--clip-memory-mb', type=float, default=64.0, help='Memoria máxima del anillo de frames JPEG de los clips')
+    parser.add_argument('--clip-scale', type=float, default=0.5, help='Factor de tamaño de los frames de los clips')
+    parser.add_argument('--clip-step', type=int, default=1, help='Guardar en los clips uno de cada N frames contados')
+    parser.add_argument('--handoff', action='store_true', help='Contar en un proceso aparte que lee las detecciones de memoria compartida (sin overlay)')
+    parser.add_argument('--handoff-slots', type=int, default=256, help='Frames que caben en el anillo de --handoff antes de descartar')
     args = parser.parse_args()
     
+    # Con varios --rtsp, cada cámara lleva su propia línea o zonas
+    sources = args.rtsp or []
+    num_streams = max(len(sources), 1)
+    try:
+        line_positions = stream_values(args.line_position, num_streams, 0.5, '--line-position')
+        zones = stream_values(args.zones, num_streams, None, '--zones')
+        names = args.stream_name or [f"cam{i + 1}" for i in range(num_streams)]
+        if len(names) != num_streams:
+            raise ValueError(f"--stream-name: se esperaban {num_streams} nombres, hay {len(names)}")
+    except ValueError as e:
+        parser.error(str(e))
+    args.line_position, args.zones = line_positions[0], zones[0]
+    if len(sources) > 1 and (args.handoff or args.record or args.heatmap or args.clips):
+        parser.error("--handoff, --record, --heatmap y --clips son de una sola cámara")
+    if args.handoff and args.clips:
+        parser.error("--clips necesita los frames, que con --handoff no se copian")
+    
     # Configurar variables de entorno
     project_root = Path(__file__).resolve().parent
     env_file = project_root / ".env"
@@ -146,12 +193,92 @@ if __name__ == "__main__":
     
     # Si se proporciona una URL RTSP, configurarla
     if args.rtsp:
-        os.environ["HAILO_SOURCE"] = args.rtsp
+        os.environ["HAILO_SOURCE"] = args.rtsp[0]
     
     # Crear instancia del contador
     user_data = PersonCounterCallback()
-    user_data.line_position = args.line_position
+    
+    # Varias cámaras: un solo proceso y una sola inferencia, con el conteo separado por cámara
+    if len(sources) > 1:
+        run_multicam(args, user_data, names, line_positions, zones)
+        raise SystemExit(0)
+    
+    # Con --handoff todo lo que sigue (conteo, grabación, almacén, estadísticas y
+    # métricas) corre en el proceso de conteo; aquí solo queda el pipeline
+    if args.handoff:
+        user_data.ring = DetectionRing.create(capacity=args.handoff_slots)
+        worker = CountingWorker(user_data.ring, vars(args)).start()
+        app = GStreamerDetectionApp(handoff_app_callback, user_data)
+        try:
+            app.run()
+        finally:
+            worker.stop()
+            print(f"Anillo: {user_data.ring.written} frames | {user_data.ring.overruns} descartados | "
+                  f"{user_data.ring.truncated} truncados")
+            user_data.ring.close()
+            user_data.ring.unlink()
+        raise SystemExit(0)
+    
+    configure_counter(user_data, vars(args))
+    
+    if args.record:
+        user_data.recorder = DetectionRecorder(args.record)
+    
+    # Cruces persistentes: se escriben por lotes desde un hilo aparte
+    if args.store:
+        user_data.store = CountStore(args.store)
+        user_data.restore_counts(user_data.store)
+        user_data.store.start()
+    
+    # Cruces al agregador del sitio: se mandan por lotes desde un hilo aparte
+    if args.aggregator:
+        user_data.aggregator = AggregatorClient(parse_address(args.aggregator), args.device_name).start()
+    
+    # Mapa de calor: el callback suma a una grilla fija y un hilo aparte escribe las fotos
+    if args.heatmap:
+        user_data.heatmap = HeatmapAccumulator(args.heatmap_cols, args.heatmap_rows, args.heatmap_half_life or None)
+        user_data.heatmap.start(args.heatmap, args.heatmap_interval)
+    
+    # Clips de evidencia: frames JPEG en memoria que se vuelcan a disco en cada cruce
+    if args.clips:
+        user_data.clips = ClipRecorder(args.clips, args.clip_pre, args.clip_post, int(args.clip_memory_mb * 2 ** 20),
+                                       args.clip_scale, frame_step=args.clip_step).start()
+    
+    # Estadísticas: un hilo aparte las imprime cada --stats-interval segundos y
+    # al instante cuando alguien cruza una línea
+    if args.stats_interval > 0:
+        user_data.stats = StatsSink(args.stats_interval, args.stats_format)
+        user_data.stats.add_source(user_data.stats_snapshot)
+        user_data.stats.start()
     
     # Iniciar aplicación
     app = GStreamerDetectionApp(app_callback, user_data)
-    app.run()
+    
+    # Con --use-frame, el overlay se dibuja en un hilo aparte para no frenar el pipeline
+    if user_data.use_frame and not args.inline_overlay:
+        user_data.renderer = OverlayRenderer(user_data.set_frame, user_data.line_color, user_data.line_thickness,
+                                             user_data.zone_engine).start()
+    
+    # Métricas HTTP en un hilo propio; cada scrape lee los contadores sin bloquear el callback
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(lambda: counter_metrics(user_data), args.metrics_host, args.metrics_port).start()
+    try:
+        app.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        if user_data.stats is not None:
+            user_data.stats.stop()
+        if user_data.renderer is not None:
+            user_data.renderer.stop()
+        if user_data.recorder is not None:
+            user_data.recorder.close()
+        if user_data.heatmap is not None:
+            user_data.heatmap.stop()
+        if user_data.clips is not None:
+            user_data.clips.stop()
+        if user_data.store is not None:
+            user_data.store.close()
+        if user_data.aggregator is not None:
+            user_data.aggregator.stop()
@@ -0,0 +1,94 @@
+import socket
+import time
+import unittest
+
+from contador.aggregator import Deduplicator, AggregatorServer, AggregatorClient, load_doors, parse_address
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Tiempo de espera agotado")
+        time.sleep(0.01)
+
+
+class TestDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        doors = load_doors({"norte": ["pi1/linea", "pi2/linea"]})
+        self.dedup = Deduplicator(window=1.0, doors=doors)
+
+    def test_overlapping_cameras_count_once(self):
+        add = self.dedup.add
+        self.assertTrue(add("pi1", 100.0, "linea", "entrada"))
+        self.assertFalse(add("pi2", 100.4, "linea", "entrada"))
+        # Otro sentido, o fuera de la ventana: otra persona
+        self.assertTrue(add("pi2", 100.5, "linea", "salida"))
+        self.assertTrue(add("pi2", 102.0, "linea", "entrada"))
+        self.assertEqual(self.dedup.totals, {"norte": {"entrada": 2, "salida": 1}})
+        self.assertEqual(self.dedup.devices["pi2"], {"entrada": 2, "salida": 1})
+        self.assertEqual(self.dedup.duplicates, 1)
+
+    def test_same_device_is_never_a_duplicate(self):
+        # Dos personas juntas vistas por las dos cámaras: cuatro eventos, dos personas
+        for device in ("pi1", "pi2"):
+            for t in (50.0, 50.1):
+                self.dedup.add(device, t, "linea", "entrada")
+        self.assertEqual(self.dedup.site_totals(), {"entrada": 2})
+        self.assertEqual(self.dedup.duplicates, 2)
+
+    def test_unmapped_lines_are_separate(self):
+        self.assertTrue(self.dedup.add("pi3", 10.0, "linea", "entrada"))
+        self.assertTrue(self.dedup.add("pi4", 10.0, "linea", "entrada"))
+        self.assertEqual(set(self.dedup.totals), {"pi3/linea", "pi4/linea"})
+
+    def test_bucket_boundaries_and_expiry(self):
+        self.dedup.add("pi1", 9.9, "linea", "entrada", received=0.0)
+        self.assertFalse(self.dedup.add("pi2", 10.6, "linea", "entrada", received=0.0))
+        for t in range(100):
+            self.dedup.add("pi1", 20.0 + t * 3, "linea", "entrada", received=t * 3.0)
+        # Solo quedan las cubetas que llegaron en el último minuto
+        self.assertLessEqual(len(self.dedup._buckets), 21)
+
+
+class TestAggregatorOverUdp(unittest.TestCase):
+
+    def test_clients_on_localhost(self):
+        server = AggregatorServer(Deduplicator(0.2, load_doors({"norte": ["pi1/linea", "pi2/linea"]})),
+                                  host="127.0.0.1", port=0).start()
+        clients = [AggregatorClient(("127.0.0.1", server.port), device, batch_size=16, interval=0.05).start()
+                   for device in ("pi1", "pi2")]
+        try:
+            # Bien formado pero con un instante no numérico: se descarta sin matar el hilo receptor
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(b'{"device":"a","events":[["x","line","l","entrada",1]]}', ("127.0.0.1", server.port))
+            wait_for(lambda: server.bad_datagrams == 1)
+            for i in range(100):
+                for client in clients:
+                    client.add("line", "linea", "entrada", i, timestamp=1000.0 + i * 0.5)
+            for client in clients:
+                client.stop()
+            wait_for(lambda: server.deduplicator.events == 200)
+            server.handle(b"no es json")
+            server.handle(b'{"device":"a","events":[[NaN,"line","l","entrada",1]]}')
+            server.handle(b'{"device":["a"],"events":[]}')
+        finally:
+            server.stop()
+        self.assertEqual(server.stats_snapshot()["Entradas"], 100)
+        self.assertEqual(server.deduplicator.duplicates, 100)
+        self.assertEqual(server.bad_datagrams, 4)
+        self.assertEqual(clients[0].sent, 100)
+        # Lotes de 16 cruces
+        self.assertLess(server.datagrams, 20)
+        metrics = {metric.name: metric for metric in server.metrics()}
+        self.assertIn(("", {"zone": "norte", "direction": "entrada"}, 100),
+                      metrics["people_counter_site_crossings_total"].samples)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("10.0.0.1:9600"), ("10.0.0.1", 9600))
+        self.assertEqual(parse_address("agregador"), ("agregador", 9500))
+
+
+if __name__ == '__main__':
+    unittest.main()
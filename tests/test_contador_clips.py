@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from contador.callback import counting_callback
+from contador.clips import ClipRecorder
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad, \
+    REPLAY_BACKEND
+
+
+def frame(value, width=64, height=48):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def split_jpegs(data):
+    """Separa un MJPEG en sus JPEG (cada uno termina en FF D9)."""
+    return [part + b"\xff\xd9" for part in data.split(b"\xff\xd9") if part]
+
+
+class TestClipRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def feed(self, clips, times):
+        """Pasa un frame por instante, esperando al pool para que ninguno se descarte."""
+        for t in times:
+            while not clips.reserve(t):
+                time.sleep(0.001)
+            clips.submit(t, frame(int(t * 10) % 256))
+
+    def test_clip_has_frames_before_and_after(self):
+        clips = ClipRecorder(self.tmp.name, pre_seconds=0.95, post_seconds=0.45, scale=1.0, workers=1).start()
+        self.feed(clips, [i * 0.1 for i in range(30)])
+        clips.trigger("linea", "entrada", 7)
+        self.feed(clips, [3.0 + i * 0.1 for i in range(10)])
+        clips.stop()
+        names = os.listdir(self.tmp.name)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith("_linea_entrada_7.mjpeg"))
+        with open(os.path.join(self.tmp.name, names[0]), "rb") as f:
+            jpegs = split_jpegs(f.read())
+        # El cruce fue en t=2.9: de 2.0 a 3.3 hay 14 frames, en orden
+        self.assertEqual(len(jpegs), 14)
+        values = [int(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)[0, 0, 0]) for data in jpegs]
+        self.assertEqual(values, sorted(values))
+        first = cv2.imdecode(np.frombuffer(jpegs[0], np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(first.shape, (48, 64, 3))
+        self.assertEqual(clips.stats()["clips"], 1)
+
+    def test_memory_is_bounded(self):
+        clips = ClipRecorder(self.tmp.name, pre_seconds=100.0, post_seconds=0.0, max_bytes=4000, scale=1.0, workers=1)
+        self.feed(clips, [i * 0.1 for i in range(200)])
+        clips.stop()
+        self.assertLessEqual(clips.ring_bytes, 4000)
+        self.assertGreater(clips.evicted, 0)
+        self.assertEqual(clips.encoded, 200)
+
+    def test_old_frames_leave_the_ring(self):
+        clips = ClipRecorder(self.tmp.name, pre_seconds=1.0, post_seconds=1.0, scale=1.0, workers=1)
+        self.feed(clips, [i * 0.1 for i in range(100)])
+        clips.stop()
+        # Solo lo que entra en un clip: los últimos 2 s
+        self.assertLessEqual(clips.stats()["ring_frames"], 21)
+
+    def test_frame_step(self):
+        clips = ClipRecorder(self.tmp.name, frame_step=3, workers=1)
+        self.assertEqual([clips.reserve(t) for t in range(6)], [False, False, True, False, False, True])
+        clips.stop()
+
+
+class TestCallbackClips(unittest.TestCase):
+
+    def test_crossing_writes_clip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            user_data = ReplayCounter()
+            user_data.clips = ClipRecorder(tmp, pre_seconds=0.5, post_seconds=0.5, workers=1).start()
+            for i in range(40):
+                y = 0.2 + 0.015 * i
+                detections = [ReplayDetection("person", 0.9, ReplayBBox(0.45, y - 0.1, 0.55, y + 0.1), 1)]
+                info = ReplayInfo(ReplayBuffer(i * 33_333_333, detections))
+                counting_callback(ReplayPad(320, 240), info, user_data, REPLAY_BACKEND)
+            user_data.clips.stop()
+            self.assertEqual(user_data.entrada_count, 1)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+    def test_frames_are_read_in_the_pool(self):
+        threads = []
+
+        def read_frame(buffer, format, width, height):
+            threads.append(threading.current_thread().name)
+            return REPLAY_BACKEND.get_numpy_from_buffer(buffer, format, width, height)
+
+        backend = REPLAY_BACKEND._replace(get_numpy_from_buffer=read_frame)
+        with tempfile.TemporaryDirectory() as tmp:
+            user_data = ReplayCounter()
+            user_data.clips = ClipRecorder(tmp, workers=1)
+            for i in range(3):  # Menos frames que lugares en la cola: no se descarta ninguno
+                counting_callback(ReplayPad(320, 240), ReplayInfo(ReplayBuffer(i * 10**9, [])), user_data, backend)
+            user_data.clips.stop()
+        # El callback solo encoló los buffers: cada frame lo leyó un hilo del pool
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith("clip-encoder") for name in threads))
+        self.assertEqual(user_data.clips.encoded, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
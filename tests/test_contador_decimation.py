@@ -0,0 +1,171 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from contador.callback import counting_callback, configure_counter
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad, \
+    REPLAY_BACKEND
+from contador.store import CountStore
+from contador.tracks import TrackTable, Crossing, ENTRY, EXIT
+from contador.zones import ZoneEngine, CountingLine, CountingZone
+
+HEIGHT = 720
+LINE_Y = 360
+
+
+def make_frames(num_frames=600, seed=0):
+    """Personas que aparecen, caminan rápido y desaparecen; algunas viven solo 2-3 frames."""
+    rng = np.random.default_rng(seed)
+    people = []
+    for track_id in range(1, 200):
+        start = int(rng.integers(0, num_frames))
+        life = int(rng.integers(2, 40))
+        y0 = rng.uniform(0.2, 0.8)
+        x0 = rng.uniform(0.0, 1.0)
+        vy = rng.uniform(-0.08, 0.08)
+        vx = rng.uniform(-0.03, 0.03)
+        people.append((track_id, start, life, x0, y0, vx, vy))
+    frames = []
+    for frame in range(num_frames):
+        detections = []
+        for track_id, start, life, x0, y0, vx, vy in people:
+            if start <= frame < start + life:
+                t = frame - start
+                detections.append((track_id, x0 + vx * t, y0 + vy * t))
+        frames.append(detections)
+    return frames
+
+
+class TestDecimatedCounting(unittest.TestCase):
+
+    def every_frame_counts(self, frames):
+        table = TrackTable(max_age_frames=30)
+        counts = [0, 0]
+        for frame, detections in enumerate(frames, start=1):
+            table.tick(frame, frame / 30)
+            for track_id, x, y in detections:
+                crossing = table.update(track_id, y * HEIGHT, LINE_Y)
+                if crossing == ENTRY:
+                    counts[0] += 1
+                elif crossing == EXIT:
+                    counts[1] += 1
+        return counts
+
+    def decimated_counts(self, frames, count_every):
+        table = TrackTable(max_age_frames=30, history=count_every)
+        counts = [0, 0]
+        for frame, detections in enumerate(frames, start=1):
+            table.tick(frame, frame / 30)
+            for track_id, x, y in detections:
+                table.record(track_id, x, y)
+            if frame % count_every == 0:
+                crossings = table.flush(LINE_Y, HEIGHT)
+                counts[0] += sum(c.direction == ENTRY for c in crossings)
+                counts[1] += sum(c.direction == EXIT for c in crossings)
+        crossings = table.flush(LINE_Y, HEIGHT)
+        return [counts[0] + sum(c.direction == ENTRY for c in crossings),
+                counts[1] + sum(c.direction == EXIT for c in crossings)]
+
+    def test_matches_every_frame_mode(self):
+        frames = make_frames()
+        expected = self.every_frame_counts(frames)
+        self.assertGreater(sum(expected), 0)
+        for count_every in (2, 3, 5, 8):
+            self.assertEqual(self.decimated_counts(frames, count_every), expected)
+
+    def test_short_lived_track_inside_interval(self):
+        table = TrackTable(history=4)
+        table.tick(1, 10.0)
+        table.record(7, 0.5, 0.45)
+        table.tick(2, 10.5)
+        table.record(7, 0.5, 0.55)
+        # El track desaparece antes del frame contado
+        table.tick(3, 11.0)
+        table.tick(4, 11.5)
+        self.assertEqual(table.flush(LINE_Y, HEIGHT), [Crossing(7, ENTRY, 1, 10.5)])
+        self.assertEqual(table.flush(LINE_Y, HEIGHT), [])
+
+    def test_crossings_keep_track_and_sample(self):
+        table = TrackTable(history=4)
+        for frame, (y3, y8) in enumerate([(0.40, 0.60), (0.45, 0.55), (0.52, 0.45), (0.60, 0.40)], start=1):
+            table.tick(frame, frame * 0.1)
+            table.record(3, 0.5, y3)
+            table.record(8, 0.5, y8)
+        crossings = table.flush(LINE_Y, HEIGHT)
+        self.assertEqual([(c.track_id, c.direction, c.index) for c in crossings], [(3, ENTRY, 2), (8, EXIT, 2)])
+        self.assertAlmostEqual(crossings[0].time, 0.3)
+
+
+class TestDecimatedZones(unittest.TestCase):
+
+    def make_engine(self):
+        return ZoneEngine(
+            [CountingLine("puerta", (0.0, 0.5), (1.0, 0.5), "entrada", "salida")],
+            [CountingZone("caja", [(0.3, 0.3), (0.7, 0.3), (0.7, 0.7), (0.3, 0.7)], "entrada", "salida")],
+        )
+
+    def test_matches_every_frame_mode(self):
+        frames = make_frames(seed=1)
+
+        engine = self.make_engine()
+        table = TrackTable(max_age_frames=30)
+        for frame, detections in enumerate(frames, start=1):
+            table.tick(frame, frame / 30)
+            states = [table.observe(track_id, y) for track_id, x, y in detections]
+            engine.process([s.slot for s in states], [s.track_id for s in states],
+                           [(x, y) for _, x, y in detections], [s.fresh for s in states])
+        expected = engine.counts
+
+        for count_every in (2, 4, 7):
+            engine = self.make_engine()
+            table = TrackTable(max_age_frames=30, history=count_every)
+            for frame, detections in enumerate(frames, start=1):
+                table.tick(frame, frame / 30)
+                for track_id, x, y in detections:
+                    table.record(track_id, x, y)
+                if frame % count_every == 0:
+                    engine.process_pending(table.pending())
+                    table.clear_pending()
+            engine.process_pending(table.pending())
+            self.assertEqual(engine.counts, expected)
+
+    def test_events_keep_sample_time(self):
+        engine = self.make_engine()
+        table = TrackTable(history=4)
+        for frame, y in enumerate([0.40, 0.45, 0.52, 0.60], start=1):
+            table.tick(frame, frame * 0.1)
+            table.record(3, 0.5, y)
+        events = engine.process_pending(table.pending())
+        self.assertEqual([(e.track_id, e.kind, e.name, e.direction) for e in events],
+                         [(3, "line", "puerta", "entrada")])
+        self.assertAlmostEqual(events[0].time, 0.3)
+
+    def test_stored_timestamp_is_the_crossing_sample(self):
+        zones = {
+            "lines": [{"name": "puerta", "start": [0.0, 0.5], "end": [1.0, 0.5]}],
+            "zones": [{"name": "caja", "polygon": [[0.3, 0.55], [0.7, 0.55], [0.7, 0.9], [0.3, 0.9]]}],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            user_data = configure_counter(ReplayCounter(), {"count_every": 4, "zones": zones})
+            user_data.store = CountStore(os.path.join(tmp, "conteos.db"))
+            # Un frame por segundo: la persona cruza la línea y entra a la zona en el frame 3
+            # y los eventos se prueban en el frame 4, un segundo después
+            for frame, y in enumerate([0.30, 0.40, 0.60, 0.65], start=1):
+                detection = ReplayDetection("person", 0.9, ReplayBBox(0.45, y - 0.05, 0.55, y + 0.05), 5)
+                counting_callback(ReplayPad(640, 480), ReplayInfo(ReplayBuffer(frame * 10**9, [detection])),
+                                  user_data, REPLAY_BACKEND)
+            reported = time.time()
+            user_data.store.flush()
+            events = user_data.store.events()
+            user_data.store.close()
+        self.assertEqual(sorted((kind, name, direction) for _, kind, name, direction, _ in events),
+                         [("line", "puerta", "entrada"), ("zone", "caja", "entrada")])
+        for timestamp, _, _, _, _ in events:
+            self.assertAlmostEqual(timestamp, reported - 1.0, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
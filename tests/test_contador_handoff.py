@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from contador.handoff import DetectionRing, CountingWorker, handoff_callback, drain
+from contador.recorder import read_log
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad, \
+    REPLAY_BACKEND, iter_frames, replay
+from contador.store import CountStore
+from tests.test_contador_replay import write_log
+
+
+def synthetic_frames(path):
+    """Productor sintético: los frames de un log de prueba como (pad, info)."""
+    return list(iter_frames(read_log(path)))
+
+
+def numbered_frame(i, max_detections):
+    """Frame i del productor de stress: todos sus campos se derivan de i."""
+    n = i % (max_detections + 1)
+    return i, i % 1000, i % 700, [i] * n, [float(i)] * n, [float(i)] * (4 * n), [f"p{i % 1000}"] * n
+
+
+def produce(name, lock, frames, max_detections):
+    """Proceso productor: empuja `frames` frames numerados, reintentando si el anillo está lleno."""
+    ring = DetectionRing.attach(name, lock)
+    try:
+        i = 0
+        while i < frames:
+            if ring.push(*numbered_frame(i, max_detections)):
+                i += 1
+            else:
+                time.sleep(0)
+    finally:
+        ring.close()
+
+
+class TestDetectionRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = DetectionRing.create(capacity=4, max_detections=2)
+
+    def tearDown(self):
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_round_trip(self):
+        detections = [ReplayDetection("person", 0.75, ReplayBBox(0.1, 0.2, 0.3, 0.4), 7),
+                      ReplayDetection("chair", 0.5, ReplayBBox(0.5, 0.5, 0.6, 0.6))]
+        handoff_callback(ReplayPad(640, 480), ReplayInfo(ReplayBuffer(123, detections)), self.ring, REPLAY_BACKEND)
+        pts, width, height, records = self.ring.pop()
+        self.assertEqual((pts, width, height), (123, 640, 480))
+        self.assertEqual(records['track_id'].tolist(), [7, -1])
+        self.assertEqual(records['label'].tolist(), [b"person", b"chair"])
+        self.assertAlmostEqual(float(records['bbox'][0][3]), 0.4, places=6)
+        self.assertIsNone(self.ring.pop())
+
+    def test_overruns_and_truncation(self):
+        for i in range(6):
+            self.ring.push(i, 10, 10, [1] * 3, [0.9] * 3, [0, 0, 1, 1] * 3, ["person"] * 3)
+        self.assertEqual(self.ring.pending, 4)
+        self.assertEqual(self.ring.overruns, 2)
+        self.assertEqual(self.ring.truncated, 4)
+        # El consumidor ve los frames más viejos; los descartados son los últimos
+        self.assertEqual([self.ring.pop()[0] for _ in range(4)], [0, 1, 2, 3])
+        self.assertTrue(self.ring.push(9, 10, 10, [], [], [], []))
+        self.assertEqual(len(self.ring.pop()[3]), 0)
+
+    def test_attach_sees_producer(self):
+        other = DetectionRing.attach(self.ring.name, self.ring.lock)
+        try:
+            self.ring.push(5, 10, 10, [], [], [], [])
+            self.assertEqual(other.pending, 1)
+            self.assertEqual(other.pop()[0], 5)
+            self.assertEqual(self.ring.pending, 0)
+        finally:
+            other.close()
+
+    def test_producer_in_another_process(self):
+        frames, max_detections = 5000, 3
+        ring = DetectionRing.create(capacity=8, max_detections=max_detections)
+        context = multiprocessing.get_context("spawn")
+        producer = context.Process(target=produce, args=(ring.name, ring.lock, frames, max_detections), daemon=True)
+        try:
+            producer.start()
+            deadline = time.monotonic() + 60
+            i = 0
+            while i < frames and time.monotonic() < deadline:
+                frame = ring.pop()
+                if frame is None:
+                    time.sleep(0)
+                    continue
+                # Cada frame llega completo y en orden, nunca mezclado con el que ocupó la ranura antes
+                pts, width, height, track_ids, confidences, bboxes, labels = numbered_frame(i, max_detections)
+                self.assertEqual(frame[:3], (pts, width, height))
+                records = frame[3]
+                self.assertEqual(records['track_id'].tolist(), track_ids)
+                self.assertEqual(records['confidence'].tolist(), confidences)
+                self.assertEqual(records['bbox'].ravel().tolist(), bboxes)
+                self.assertEqual([label.decode() for label in records['label'].tolist()], labels)
+                i += 1
+            producer.join(10)
+            self.assertEqual((i, producer.exitcode), (frames, 0))
+            self.assertIsNone(ring.pop())
+        finally:
+            if producer.is_alive():
+                producer.terminate()
+            ring.close()
+            ring.unlink()
+
+
+class TestHandoffCounting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log.pcdl")
+        write_log(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_counts_as_callback(self):
+        expected = replay(self.path)
+        ring = DetectionRing.create(capacity=16)
+        user_data = ReplayCounter()
+        try:
+            for pad, info in synthetic_frames(self.path):
+                handoff_callback(pad, info, ring, REPLAY_BACKEND)
+                if ring.pending == ring.capacity:
+                    drain(ring, user_data)
+            drain(ring, user_data)
+            self.assertEqual(ring.overruns, 0)
+        finally:
+            ring.close()
+            ring.unlink()
+        self.assertEqual(user_data.get_count(), 300)
+        self.assertEqual((user_data.entrada_count, user_data.salida_count), (expected["entradas"], expected["salidas"]))
+
+    def test_worker_process(self):
+        expected = replay(self.path)
+        store_path = os.path.join(self.tmp.name, "conteos.db")
+        ring = DetectionRing.create(capacity=512)
+        try:
+            worker = CountingWorker(ring, {"store": store_path, "stats_interval": 0}).start()
+            for pad, info in synthetic_frames(self.path):
+                handoff_callback(pad, info, ring, REPLAY_BACKEND)
+            worker.stop()
+            self.assertEqual(worker.process.exitcode, 0)
+            self.assertEqual(ring.pending, 0)
+        finally:
+            ring.close()
+            ring.unlink()
+        store = CountStore(store_path)
+        totals = store.totals()
+        store.close()
+        line = totals.get("linea", {})
+        self.assertEqual((line.get("entrada", 0), line.get("salida", 0)), (expected["entradas"], expected["salidas"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
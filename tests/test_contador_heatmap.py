@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from contador.heatmap import HeatmapAccumulator, CENTER, FOOT
+from contador.replay import ReplayCounter, replay
+from tests.test_contador_replay import write_log
+
+
+class TestHeatmapAccumulator(unittest.TestCase):
+
+    def test_dwell_seconds_per_cell(self):
+        heatmap = HeatmapAccumulator(cols=4, rows=2)
+        centers = np.array([[0.1, 0.2], [0.1, 0.2], [0.9, 0.6]])
+        feet = np.array([[0.1, 0.4], [0.1, 0.4], [0.9, 0.99]])
+        for t in (10.0, 10.5, 11.0):
+            heatmap.add(t, centers, feet)
+        grid = heatmap.snapshot()
+        # El primer frame solo fija el tiempo; los dos siguientes suman 0.5 s por persona
+        self.assertAlmostEqual(float(grid[CENTER, 0, 0]), 2.0)
+        self.assertAlmostEqual(float(grid[CENTER, 1, 3]), 1.0)
+        self.assertAlmostEqual(float(grid[FOOT, 0, 0]), 2.0)
+        self.assertAlmostEqual(float(grid[FOOT, 1, 3]), 1.0)
+        self.assertAlmostEqual(float(grid.sum()), 6.0)
+
+    def test_lazy_decay_matches_eager(self):
+        rng = np.random.default_rng(1)
+        heatmap = HeatmapAccumulator(cols=8, rows=4, half_life=5.0)
+        expected = np.zeros((2, 4, 8))
+        t = 0.0
+        for _ in range(3000):
+            step = 0.2
+            t += step
+            points = rng.uniform(0, 1, (3, 2))
+            expected *= 2.0 ** (-step / 5.0)
+            if heatmap.frames:
+                for x, y in points:
+                    expected[:, int(y * 4), int(x * 8)] += step
+            heatmap.add(t, points, points)
+        # 600 s de tiempo con vida media de 5 s: la grilla se reescaló varias veces
+        np.testing.assert_allclose(heatmap.snapshot(), expected, rtol=1e-3, atol=1e-6)
+
+    def test_long_gaps_are_capped(self):
+        heatmap = HeatmapAccumulator(cols=2, rows=2, max_step=1.0)
+        heatmap.add(0.0, [[0.1, 0.1]], [[0.1, 0.1]])
+        heatmap.add(100.0, [[0.1, 0.1]], [[0.1, 0.1]])
+        self.assertAlmostEqual(float(heatmap.snapshot()[CENTER, 0, 0]), 1.0)
+
+    def test_snapshots(self):
+        heatmap = HeatmapAccumulator(cols=4, rows=2)
+        heatmap.add(0.0, [[0.5, 0.5]], [[0.5, 0.9]])
+        heatmap.add(1.0, [[0.5, 0.5]], [[0.5, 0.9]])
+        with tempfile.TemporaryDirectory() as tmp:
+            npy = os.path.join(tmp, "calor.npy")
+            png = os.path.join(tmp, "calor.png")
+            heatmap.start(npy, interval=60.0)
+            heatmap.stop()
+            heatmap.save(png)
+            self.assertEqual(np.load(npy).shape, (2, 2, 4))
+            self.assertEqual(cv2.imread(png).shape, (360, 640, 3))
+            self.assertEqual(sorted(os.listdir(tmp)), ["calor.npy", "calor.png"])
+
+
+class TestReplayHeatmap(unittest.TestCase):
+
+    def test_replay_fills_heatmap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.pcdl")
+            write_log(path)
+            user_data = ReplayCounter()
+            user_data.heatmap = HeatmapAccumulator()
+            replay(path, user_data)
+        grid = user_data.heatmap.snapshot()
+        self.assertGreater(float(grid[FOOT].sum()), 0.0)
+        self.assertAlmostEqual(float(grid[FOOT].sum()), float(grid[CENTER].sum()), places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
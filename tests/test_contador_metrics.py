@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from types import SimpleNamespace
+
+from basic_pipelines.metrics_server import MetricsServer
+from contador.metrics import counter_metrics
+from contador.replay import ReplayCounter, replay
+from contador.zones import ZoneEngine
+from tests.test_contador_replay import write_log
+
+
+class TestCounterMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log.pcdl")
+        write_log(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scrape_after_replay(self):
+        user_data = ReplayCounter()
+        user_data.zone_engine = ZoneEngine.from_config({"lines": [{"name": "puerta", "start": [0, 0.5], "end": [1, 0.5]}]})
+        server = MetricsServer(lambda: counter_metrics(user_data), host="127.0.0.1", port=0).start()
+        try:
+            result = replay(self.path, user_data)
+            url = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(url + "/metrics.json", timeout=5) as response:
+                metrics = json.loads(response.read())
+            with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+                text = response.read().decode()
+        finally:
+            server.stop()
+        self.assertEqual(metrics["people_counter_frames_total"], 300)
+        self.assertEqual(metrics["people_counter_entries_total"], result["entradas"])
+        self.assertEqual(metrics["people_counter_exits_total"], result["salidas"])
+        self.assertEqual(metrics["people_counter_occupancy"], max(result["entradas"] - result["salidas"], 0))
+        self.assertEqual(metrics["people_counter_callback_seconds"]["total"]["count"], 300)
+        self.assertIn('people_counter_zone_crossings_total{name="puerta",direction="entrada"}', text)
+        self.assertIn({"labels": {"window": "1h"}, "value": result["entradas"] - result["salidas"]},
+                      metrics["people_counter_window_net_flow"])
+        # Sin hilo de overlay no hay descartes que informar
+        self.assertNotIn("people_counter_overlay_dropped_frames_total", metrics)
+        user_data.renderer = SimpleNamespace(dropped=3)
+        metrics = {metric.name: metric for metric in counter_metrics(user_data)}
+        self.assertEqual(metrics["people_counter_overlay_dropped_frames_total"].samples[0][2], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from basic_pipelines.metrics_server import render_prometheus
+from contador.callback import counting_callback
+from contador.multicam import MultiStreamCounter, stream_values
+from contador.replay import ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad, REPLAY_BACKEND
+from contador.store import CountStore
+
+
+def cross(stream, track_id, start_y, end_y, frames=20):
+    """Una persona que va de start_y a end_y en una cámara."""
+    for i in range(frames):
+        y = start_y + (end_y - start_y) * i / (frames - 1)
+        detections = [ReplayDetection("person", 0.9, ReplayBBox(0.45, y - 0.1, 0.55, y + 0.1), track_id)]
+        info = ReplayInfo(ReplayBuffer(i * 33_333_333, detections))
+        counting_callback(ReplayPad(1280, 720), info, stream, REPLAY_BACKEND)
+
+
+class TestMultiStreamCounter(unittest.TestCase):
+
+    def test_streams_keep_their_own_state(self):
+        counter = MultiStreamCounter.from_settings(["puerta1", "puerta2"], {}, line_positions=[0.3, 0.7])
+        # El mismo track id y el mismo recorrido en las dos cámaras: solo cruza la línea de puerta1
+        cross(counter["puerta1"], 1, 0.2, 0.5)
+        cross(counter["puerta2"], 1, 0.2, 0.5)
+        cross(counter["puerta2"], 2, 0.9, 0.5)
+        self.assertEqual((counter["puerta1"].entrada_count, counter["puerta1"].salida_count), (1, 0))
+        self.assertEqual((counter["puerta2"].entrada_count, counter["puerta2"].salida_count), (0, 1))
+        self.assertEqual(counter["puerta1"].line_position, 0.3)
+        snapshot = counter.stats_snapshot()
+        self.assertEqual((snapshot["Entradas"], snapshot["Salidas"], snapshot["Frame"]), (1, 1, 60))
+        self.assertEqual((snapshot["puerta1"], snapshot["puerta2"]), ("1/0", "0/1"))
+
+    def test_store_keeps_streams_apart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "conteos.db")
+            counter = MultiStreamCounter(["a", "b"])
+            store = CountStore(path)
+            counter.set_component("store", store)
+            cross(counter["a"], 1, 0.2, 0.8)
+            cross(counter["b"], 1, 0.8, 0.2)
+            cross(counter["b"], 2, 0.8, 0.2)
+            store.close()
+            store = CountStore(path)
+            self.assertEqual(store.totals(kind="line"), {"a/linea": {"entrada": 1}, "b/linea": {"salida": 2}})
+            restored = MultiStreamCounter(["a", "b"])
+            restored.restore_counts(store)
+            store.close()
+        self.assertEqual((restored["a"].entrada_count, restored["a"].salida_count), (1, 0))
+        self.assertEqual((restored["b"].entrada_count, restored["b"].salida_count), (0, 2))
+
+    def test_metrics_are_labeled_by_stream(self):
+        counter = MultiStreamCounter(["a", "b"])
+        cross(counter["b"], 1, 0.2, 0.8)
+        metrics = {metric.name: metric for metric in counter.metrics()}
+        entries = metrics["people_counter_entries_total"].samples
+        self.assertEqual(entries, [("", {"stream": "a"}, 0), ("", {"stream": "b"}, 1)])
+        text = render_prometheus(counter.metrics())
+        self.assertIn('people_counter_entries_total{stream="b"} 1', text)
+        self.assertEqual(text.count("# TYPE people_counter_entries_total"), 1)
+
+    def test_stream_values(self):
+        self.assertEqual(stream_values(None, 3, 0.5, "--line-position"), [0.5, 0.5, 0.5])
+        self.assertEqual(stream_values([0.4], 2, 0.5, "--line-position"), [0.4, 0.4])
+        self.assertEqual(stream_values([0.4, 0.6], 2, 0.5, "--line-position"), [0.4, 0.6])
+        with self.assertRaises(ValueError):
+            stream_values([0.4, 0.6], 3, 0.5, "--line-position")
+        with self.assertRaises(ValueError):
+            MultiStreamCounter(["a", "a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import random
+import tempfile
+import unittest
+
+from contador.occupancy import OccupancyWindows, SlidingWindow
+from contador.replay import ReplayCounter, replay
+from tests.test_contador_replay import write_log
+
+
+class TestSlidingWindow(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        window = SlidingWindow(10)
+        samples = []
+        t, net = 0.0, 0
+        for _ in range(2000):
+            t += rng.uniform(0.05, 1.5)
+            net += rng.choice((-1, 0, 0, 1))
+            count = rng.randint(0, 20)
+            window.add((t, count, net))
+            samples.append((t, count, net))
+            inside = [s for s in samples if s[0] > t - 10]
+            before = [s for s in samples if s[0] <= t - 10]
+            base = before[-1][2] if before else samples[0][2]
+            summary = window.summary
+            self.assertEqual(summary.peak, max(s[1] for s in inside))
+            self.assertEqual(summary.minimum, min(s[1] for s in inside))
+            self.assertAlmostEqual(summary.mean, sum(s[1] for s in inside) / len(inside))
+            self.assertEqual(summary.net_flow, net - base)
+            self.assertEqual(summary.samples, len(inside))
+
+    def test_expiry(self):
+        windows = OccupancyWindows((("corta", 5), ("larga", 60)))
+        windows.update(0.0, 9, 0)
+        windows.update(1.0, 2, 3)
+        windows.update(6.0, 4, 5)
+        self.assertEqual(windows.summary("corta").peak, 4)
+        self.assertEqual(windows.summary("corta").net_flow, 2)
+        self.assertEqual(windows.summary("larga").peak, 9)
+        self.assertEqual(windows.summary("larga").minimum, 2)
+        self.assertEqual(windows.summary("larga").net_flow, 5)
+
+    def test_reset_when_time_goes_back(self):
+        windows = OccupancyWindows((("1m", 60),))
+        windows.update(100.0, 7, 0)
+        windows.update(0.5, 1, 0)
+        self.assertEqual(windows.summary("1m").peak, 1)
+        self.assertEqual(windows.summary("1m").samples, 1)
+
+
+class TestReplayOccupancy(unittest.TestCase):
+
+    def test_replay_feeds_windows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.pcdl")
+            write_log(path)
+            user_data = ReplayCounter()
+            result = replay(path, user_data)
+        summary = user_data.occupancy.summary("1m")
+        self.assertEqual(summary.samples, 300)
+        self.assertEqual(summary.peak, user_data.total_count)
+        self.assertEqual(summary.net_flow, result["entradas"] - result["salidas"])
+        self.assertIn("Pico 15m", user_data.stats_snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
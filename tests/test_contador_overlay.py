@@ -0,0 +1,52 @@
+import threading
+import unittest
+
+import numpy as np
+
+from contador.overlay import OverlayRenderer, TEXT_BOX
+
+WIDTH, HEIGHT = 320, 240
+
+
+class TestOverlayRenderer(unittest.TestCase):
+
+    def test_static_layer(self):
+        renderer = OverlayRenderer(lambda frame: None, line_color=(0, 255, 255), background_alpha=0.5)
+        frame = np.full((HEIGHT, WIDTH, 3), 200, dtype=np.uint8)
+        out = renderer.render(frame, [], (0, 0, 0), 120)
+        # Línea opaca (RGB amarillo -> BGR)
+        self.assertEqual(out[120, 300].tolist(), [255, 255, 0])
+        # Fondo de los contadores mezclado al 50 %, fuera del texto
+        x2, y2 = TEXT_BOX[2], TEXT_BOX[3]
+        self.assertEqual(out[y2 - 2, x2 - 2].tolist(), [100, 100, 100])
+        # El resto del frame no cambia
+        self.assertEqual(out[200, 300].tolist(), [200, 200, 200])
+
+    def test_layer_cached_until_line_moves(self):
+        renderer = OverlayRenderer(lambda frame: None)
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        renderer.render(frame, [], (0, 0, 0), 120)
+        index = renderer._layer_index
+        renderer.render(frame, [], (0, 0, 0), 120)
+        self.assertIs(renderer._layer_index, index)
+        renderer.render(frame, [], (0, 0, 0), 60)
+        self.assertIsNot(renderer._layer_index, index)
+
+    def test_latest_wins(self):
+        rendered = []
+        done = threading.Event()
+        renderer = OverlayRenderer(lambda frame: (rendered.append(frame), done.set()))
+        frames = [np.full((HEIGHT, WIDTH, 3), i, dtype=np.uint8) for i in range(5)]
+        # Sin hilo todavía: cada submit reemplaza al anterior
+        for frame in frames:
+            renderer.submit(frame, [(10, 10, 50, 50, 1)], (1, 0, 0), 120)
+        self.assertEqual(renderer.dropped, 4)
+        renderer.start()
+        self.assertTrue(done.wait(5.0))
+        renderer.stop()
+        self.assertEqual(renderer.rendered, 1)
+        self.assertEqual(rendered[0][200, 300].tolist(), [4, 4, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from basic_pipelines.stats_sink import StatsSink
+from contador.overlay import OverlayRenderer
+from contador.recorder import DetectionRecorder, read_log, record_detections
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayHailo, replay, iter_frames
+from contador.store import CountStore
+
+WIDTH, HEIGHT = 1280, 720
+
+
+def write_log(path, num_frames=300, seed=0):
+    """Personas que cruzan la mitad de la imagen, más detecciones que no son personas."""
+    rng = np.random.default_rng(seed)
+    people = [(track_id, int(rng.integers(0, num_frames)), int(rng.integers(3, 40)),
+               rng.uniform(0.1, 0.9), rng.uniform(0.2, 0.8), rng.uniform(-0.05, 0.05))
+              for track_id in range(1, 80)]
+    with DetectionRecorder(path, chunk_size=64) as recorder:
+        for frame in range(1, num_frames + 1):
+            detections = [ReplayDetection("chair", 0.9, ReplayBBox(0.1, 0.1, 0.2, 0.2))]
+            for track_id, start, life, x, y, vy in people:
+                if start <= frame < start + life:
+                    yc = y + vy * (frame - start)
+                    detections.append(ReplayDetection("person", 0.8, ReplayBBox(x - 0.05, yc - 0.1, x + 0.05, yc + 0.1), track_id))
+            if frame % 50 == 0:
+                detections = []
+            record_detections(recorder, frame, frame * 33_333_333, WIDTH, HEIGHT, detections, ReplayHailo.HAILO_UNIQUE_ID)
+
+
+class TestRecorderReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "log.pcdl")
+        write_log(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        log = read_log(self.path)
+        frames = list(iter_frames(log))
+        self.assertEqual(len(frames), 300)
+        pad, info = frames[49]
+        self.assertEqual(pad.caps, ("RGB", WIDTH, HEIGHT))
+        # El frame 50 se grabó sin detecciones
+        self.assertEqual(info.get_buffer().detections, [])
+        pad, info = frames[0]
+        labels = [d.get_label() for d in info.get_buffer().detections]
+        self.assertEqual(labels[0], "chair")
+
+    def test_replay_counts(self):
+        result = replay(self.path)
+        self.assertEqual(result["frames"], 300)
+        self.assertGreater(result["entradas"] + result["salidas"], 0)
+        self.assertEqual(result["user_data"].get_count(), 300)
+
+    def test_decimated_replay_matches(self):
+        expected = replay(self.path)
+        for count_every in (2, 3, 5):
+            user_data = ReplayCounter()
+            user_data.count_every = count_every
+            user_data.tracked_people.set_history(count_every)
+            result = replay(self.path, user_data)
+            self.assertEqual((result["entradas"], result["salidas"]), (expected["entradas"], expected["salidas"]))
+
+    def test_replay_with_rendering(self):
+        user_data = ReplayCounter()
+        user_data.use_frame = True
+        replay(self.path, user_data)
+        self.assertEqual(user_data.last_frame.shape, (HEIGHT, WIDTH, 3))
+
+    def test_replay_with_render_thread(self):
+        user_data = ReplayCounter()
+        user_data.use_frame = True
+        user_data.renderer = OverlayRenderer(user_data.set_frame).start()
+        result = replay(self.path, user_data)
+        user_data.renderer.stop()
+        self.assertEqual(user_data.renderer.submitted, 300)
+        self.assertEqual(user_data.renderer.rendered + user_data.renderer.dropped, 300)
+        expected = replay(self.path)
+        self.assertEqual((result["entradas"], result["salidas"]), (expected["entradas"], expected["salidas"]))
+
+    def test_crossings_reported_to_stats_sink(self):
+        stream = io.StringIO()
+        user_data = ReplayCounter()
+        user_data.stats = StatsSink(stream=stream)
+        user_data.stats.add_source(user_data.stats_snapshot)
+        result = replay(self.path, user_data)
+        user_data.stats.flush()
+        lines = stream.getvalue().splitlines()
+        # Un evento por cruce y una sola línea de estadísticas, no una por frame
+        self.assertEqual(len(lines) - 1, result["entradas"] + result["salidas"])
+        self.assertTrue(lines[-1].startswith("Frame: 300 | "))
+
+    def test_crossings_stored(self):
+        user_data = ReplayCounter()
+        user_data.store = CountStore(os.path.join(self.tmp.name, "conteos.db"))
+        result = replay(self.path, user_data)
+        user_data.store.flush()
+        restored = ReplayCounter()
+        restored.restore_counts(user_data.store)
+        self.assertEqual((restored.entrada_count, restored.salida_count), (result["entradas"], result["salidas"]))
+        user_data.store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
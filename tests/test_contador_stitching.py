@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+from contador.callback import counting_callback
+from contador.replay import ReplayCounter, ReplayDetection, ReplayBBox, ReplayBuffer, ReplayInfo, ReplayPad, \
+    REPLAY_BACKEND
+from contador.stitching import TrackStitcher
+
+DT = 1 / 30
+
+
+def walk(stitcher, track_id, start_frame, frames, x, y, vy):
+    """Una persona que baja a velocidad vy por frame; devuelve los IDs canónicos."""
+    ids = []
+    for i in range(frames):
+        frame = start_frame + i
+        ids += stitcher.process([track_id], np.array([[x, y + vy * i]]), frame * DT)
+    return ids
+
+
+class TestTrackStitcher(unittest.TestCase):
+
+    def test_id_switch_in_the_same_frame(self):
+        stitcher = TrackStitcher()
+        walk(stitcher, 1, 0, 10, 0.5, 0.2, 0.01)
+        ids = walk(stitcher, 2, 10, 5, 0.5, 0.3, 0.01)
+        self.assertEqual(ids, [1] * 5)
+        self.assertEqual(stitcher.stats()["stitched"], 1)
+
+    def test_gap_uses_velocity(self):
+        stitcher = TrackStitcher()
+        walk(stitcher, 1, 0, 10, 0.5, 0.2, 0.01)
+        # Tapado 10 frames: reaparece donde lo lleva su velocidad
+        self.assertEqual(walk(stitcher, 2, 20, 1, 0.5, 0.39, 0.01), [1])
+        # Lejos de la posición predicha: es otra persona
+        walk(stitcher, 3, 21, 10, 0.1, 0.8, 0.0)
+        self.assertEqual(walk(stitcher, 4, 40, 1, 0.9, 0.1, 0.0), [4])
+        self.assertEqual((stitcher.stats()["new_tracks"], stitcher.stats()["stitched"]), (4, 1))
+
+    def test_lost_tracks_expire(self):
+        stitcher = TrackStitcher(max_gap=1.0)
+        walk(stitcher, 1, 0, 5, 0.5, 0.5, 0.0)
+        stitcher.process([], np.zeros((0, 2)), 5 * DT)
+        self.assertEqual(len(stitcher), 1)
+        # Pasado max_gap el track perdido se olvida y el ID nuevo queda como está
+        self.assertEqual(stitcher.process([2], np.array([[0.5, 0.5]]), 2.0), [2])
+        self.assertEqual(len(stitcher), 0)
+        self.assertEqual(stitcher.stats()["expired"], 1)
+
+    def test_same_id_back_is_not_new(self):
+        stitcher = TrackStitcher()
+        walk(stitcher, 1, 0, 5, 0.5, 0.5, 0.0)
+        stitcher.process([], np.zeros((0, 2)), 5 * DT)
+        self.assertEqual(walk(stitcher, 1, 6, 2, 0.5, 0.5, 0.0), [1, 1])
+        self.assertEqual(len(stitcher), 0)
+        self.assertEqual(stitcher.stats()["new_tracks"], 1)
+
+
+class TestStitchedCounting(unittest.TestCase):
+
+    def count(self, stitcher):
+        """Una persona baja y queda tapada justo cuando cruza la línea; vuelve con otro ID."""
+        user_data = ReplayCounter()
+        user_data.stitcher = stitcher
+        for frame in range(60):
+            y = 0.2 + 0.01 * frame
+            if 25 <= frame < 35:
+                detections = []
+            else:
+                track_id = 1 if frame < 25 else 2
+                detections = [ReplayDetection("person", 0.9, ReplayBBox(0.45, y - 0.1, 0.55, y + 0.1), track_id)]
+            info = ReplayInfo(ReplayBuffer(int(frame * DT * 1e9), detections))
+            counting_callback(ReplayPad(1280, 720), info, user_data, REPLAY_BACKEND)
+        return user_data.entrada_count, user_data.salida_count
+
+    def test_crossing_while_occluded(self):
+        self.assertEqual(self.count(None), (0, 0))
+        self.assertEqual(self.count(TrackStitcher()), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
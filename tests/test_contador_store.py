@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+import unittest
+
+from contador.store import CountStore
+
+# 2024-01-01 00:00:00 UTC
+T0 = 1704067200
+
+
+class TestCountStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "conteos.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fill(self, store):
+        # 3 entradas en el minuto 0, 1 salida en el minuto 1, 2 entradas en la hora 1
+        for ts in (T0 + 1, T0 + 2, T0 + 59):
+            store.add("line", "puerta", "entrada", 1, timestamp=ts)
+        store.add("line", "puerta", "salida", 2, timestamp=T0 + 61)
+        store.add("zone", "caja", "entrada", 3, timestamp=T0 + 3600)
+        store.add("line", "puerta", "entrada", 4, timestamp=T0 + 3601)
+
+    def test_rollups(self):
+        store = CountStore(self.path)
+        self.fill(store)
+        self.assertEqual(store.flush(), 6)
+        self.assertEqual(store.rollup("minute", end=T0 + 120), [
+            (T0, "line", "puerta", "entrada", 3),
+            (T0 + 60, "line", "puerta", "salida", 1),
+        ])
+        self.assertEqual(store.rollup("hour", name="puerta"), [
+            (T0, "line", "puerta", "entrada", 3),
+            (T0, "line", "puerta", "salida", 1),
+            (T0 + 3600, "line", "puerta", "entrada", 1),
+        ])
+        self.assertEqual(store.rollup("day"), [
+            (T0, "line", "puerta", "entrada", 4),
+            (T0, "line", "puerta", "salida", 1),
+            (T0, "zone", "caja", "entrada", 1),
+        ])
+        self.assertEqual(store.totals(kind="line"), {"puerta": {"entrada": 4, "salida": 1}})
+        self.assertEqual(len(store.events(start=T0 + 60, end=T0 + 3601)), 2)
+        with self.assertRaises(ValueError):
+            store.rollup("week")
+        store.close()
+
+    def test_buckets_accumulate_across_batches_and_restarts(self):
+        store = CountStore(self.path)
+        store.add("line", "puerta", "entrada", timestamp=T0)
+        store.flush()
+        store.add("line", "puerta", "entrada", timestamp=T0 + 10)
+        store.close()
+        store = CountStore(self.path)
+        self.assertEqual(store.rollup("minute"), [(T0, "line", "puerta", "entrada", 2)])
+        store.close()
+
+    def test_background_writes(self):
+        store = CountStore(self.path, flush_interval=0.01).start()
+        self.fill(store)
+        deadline = time.monotonic() + 5.0
+        while store.written < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(store.written, 6)
+        store.close()
+
+    def test_load(self):
+        # 5000 eventos por segundo durante 2 s simulados, en lotes de 50 cada 10 ms
+        store = CountStore(self.path, flush_interval=0.05).start()
+        start = time.perf_counter()
+        for i in range(10000):
+            store.add("line", "puerta", "entrada" if i % 2 else "salida", i, timestamp=T0 + i / 5000)
+            if i % 50 == 49:
+                time.sleep(0.001)
+        store.stop()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(store.written, 10000)
+        self.assertEqual(store.totals(), {"puerta": {"entrada": 5000, "salida": 5000}})
+        # El hilo de escritura no se atrasa: la cola nunca supera un par de intervalos
+        self.assertLess(store.max_pending, 10000)
+        self.assertLess(elapsed, 10.0)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
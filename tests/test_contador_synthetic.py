@@ -0,0 +1,48 @@
+import unittest
+
+from contador.callback import counting_callback
+from contador.replay import ReplayCounter, REPLAY_BACKEND
+from contador.synthetic import CrowdSimulator
+
+
+def ids_per_frame(crowd, frames):
+    return [[d.get_objects_typed("unique_id")[0].get_id() for d in info.get_buffer().detections
+             if d.get_label() == "person"] for _, info in crowd.frames(frames)]
+
+
+class TestCrowdSimulator(unittest.TestCase):
+
+    def test_same_seed_same_crowd(self):
+        self.assertEqual(ids_per_frame(CrowdSimulator(30, seed=4), 50), ids_per_frame(CrowdSimulator(30, seed=4), 50))
+
+    def test_density_occlusion_and_clutter(self):
+        crowd = CrowdSimulator(100, occlusion=0.05, clutter=3)
+        counts = []
+        for _, info in crowd.frames(100):
+            detections = info.get_buffer().detections
+            counts.append(sum(d.get_label() == "person" for d in detections))
+            self.assertEqual(sum(d.get_label() != "person" for d in detections), 3)
+        self.assertTrue(all(n <= 100 for n in counts))
+        self.assertLess(min(counts), 100)
+        self.assertGreater(crowd.occlusions, 0)
+
+    def test_id_switches(self):
+        crowd = CrowdSimulator(50, id_switch=0.02)
+        ids = set()
+        for frame in ids_per_frame(crowd, 100):
+            ids.update(frame)
+        self.assertGreater(crowd.switches, 0)
+        self.assertGreaterEqual(len(ids), 50 + crowd.switches)
+
+    def test_counter_matches_ground_truth(self):
+        crowd = CrowdSimulator(20, seed=2)
+        user_data = ReplayCounter()
+        for pad, info in crowd.frames(600):
+            counting_callback(pad, info, user_data, REPLAY_BACKEND)
+        self.assertGreater(crowd.entries + crowd.exits, 20)
+        self.assertAlmostEqual(user_data.entrada_count, crowd.entries, delta=1)
+        self.assertAlmostEqual(user_data.salida_count, crowd.exits, delta=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
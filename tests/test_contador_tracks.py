@@ -0,0 +1,95 @@
+import unittest
+
+from contador.tracks import TrackTable, ENTRY, EXIT, NO_CROSSING
+
+
+class TestTrackTable(unittest.TestCase):
+
+    def test_new_track_does_not_cross(self):
+        table = TrackTable()
+        self.assertEqual(table.update(1, 600.0, 540), NO_CROSSING)
+        self.assertIn(1, table)
+        self.assertEqual(len(table), 1)
+
+    def test_entry_and_exit_counted_once(self):
+        table = TrackTable()
+        table.update(1, 500.0, 540)
+        self.assertEqual(table.update(1, 560.0, 540), ENTRY)
+        # Volver a cruzar no cuenta de nuevo
+        table.update(1, 500.0, 540)
+        self.assertEqual(table.update(1, 560.0, 540), NO_CROSSING)
+
+        table.update(2, 600.0, 540)
+        self.assertEqual(table.update(2, 540.0, 540), EXIT)
+
+    def test_records_are_reused(self):
+        table = TrackTable(capacity=2)
+        table.update(1, 0.0, 540)
+        first = table.get(1)
+        table.release(1)
+        table.update(7, 0.0, 540)
+        self.assertIs(table.get(7), first)
+        self.assertFalse(table.get(7).counted)
+
+    def test_grows_when_full(self):
+        table = TrackTable(capacity=2)
+        for track_id in range(10):
+            table.update(track_id, 0.0, 540)
+        self.assertEqual(len(table), 10)
+        self.assertGreaterEqual(table.capacity, 10)
+        self.assertEqual(len({state.slot for state in table}), 10)
+
+    def test_reset_keeps_pool(self):
+        table = TrackTable(capacity=4)
+        for track_id in range(4):
+            table.update(track_id, 0.0, 540)
+        table.reset()
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.capacity, 4)
+        self.assertEqual(table.update(0, 0.0, 540), NO_CROSSING)
+
+
+class TestTrackEviction(unittest.TestCase):
+
+    def test_evicts_by_frames(self):
+        table = TrackTable(max_age_frames=3)
+        table.tick(1, 0.0)
+        table.update(1, 0.0, 540)
+        table.update(2, 0.0, 540)
+        for frame in range(2, 5):
+            table.tick(frame, 0.0)
+            table.update(2, 0.0, 540)
+        self.assertIn(1, table)
+        # Se expulsa como mucho una vuelta de barrido después de caducar
+        for frame in range(5, 8):
+            table.tick(frame, 0.0)
+            table.update(2, 0.0, 540)
+        self.assertNotIn(1, table)
+        self.assertIn(2, table)
+        self.assertEqual(table.stats()["evicted_by_frames"], 1)
+
+    def test_evicts_by_time(self):
+        table = TrackTable(max_age_seconds=2.0)
+        table.tick(1, 10.0)
+        table.update(1, 0.0, 540)
+        for frame in range(2, 2 + TrackTable.SWEEP_FRAMES):
+            table.tick(frame, 11.5)
+        self.assertIn(1, table)
+        for frame in range(100, 100 + TrackTable.SWEEP_FRAMES):
+            table.tick(frame, 12.5)
+        self.assertNotIn(1, table)
+        self.assertEqual(table.stats()["evicted_by_time"], 1)
+
+    def test_memory_stays_flat(self):
+        table = TrackTable(capacity=16, max_age_frames=5)
+        # Un track nuevo por frame, como en una entrada con flujo continuo
+        for frame in range(10000):
+            table.tick(frame, frame / 30)
+            table.update(frame, 0.0, 540)
+        self.assertLessEqual(len(table), 12)
+        self.assertEqual(table.capacity, 16)
+        self.assertEqual(table.evicted, 10000 - len(table))
+
+
+if __name__ == '__main__':
+    unittest.main()
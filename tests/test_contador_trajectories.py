@@ -0,0 +1,67 @@
+import math
+import unittest
+
+import numpy as np
+
+from contador.callback import counting_callback, configure_counter
+from contador.replay import ReplayCounter, REPLAY_BACKEND
+from contador.synthetic import CrowdSimulator
+from contador.trajectories import TrajectoryBuffer, HEADINGS
+
+
+class TestTrajectoryBuffer(unittest.TestCase):
+
+    def test_ring_keeps_last_positions_in_order(self):
+        buffer = TrajectoryBuffer(capacity=4, history=4)
+        for i in range(6):
+            buffer.add([2], [i == 0], np.array([[0.1 * i, 0.5]]), i * 0.5)
+        np.testing.assert_allclose(buffer.trajectory(2)[:, 0], [0.2, 0.3, 0.4, 0.5], rtol=1e-6)
+
+    def test_speed_heading_and_dwell(self):
+        buffer = TrajectoryBuffer(capacity=4, history=8)
+        for i in range(5):
+            # Slot 0 baja 0.1 por segundo; slot 1 queda quieto
+            speed, heading, dwell = buffer.add([0, 1], [i == 0, i == 0], np.array([[0.5, 0.1 * i], [0.2, 0.2]]), float(i))
+        np.testing.assert_allclose(speed, [0.1, 0.0], atol=1e-6)
+        self.assertAlmostEqual(float(heading[0]), math.pi / 2, places=5)
+        np.testing.assert_allclose(dwell, [4.0, 4.0])
+        self.assertEqual(buffer.stationary, 1)
+        self.assertEqual(buffer.stats()["headings"]["abajo"], 4)
+        self.assertEqual(sum(buffer.stats()["headings"].values()), 4)
+        self.assertEqual(len(HEADINGS), 8)
+
+    def test_reused_slot_starts_empty(self):
+        buffer = TrajectoryBuffer(capacity=2, history=4)
+        buffer.add([0], [True], np.array([[0.9, 0.9]]), 0.0)
+        buffer.add([0], [False], np.array([[0.8, 0.9]]), 1.0)
+        speed, _, dwell = buffer.add([0], [True], np.array([[0.1, 0.1]]), 5.0)
+        self.assertEqual(len(buffer.trajectory(0)), 1)
+        self.assertEqual((float(speed[0]), float(dwell[0])), (0.0, 0.0))
+
+    def test_grows_with_the_track_table(self):
+        buffer = TrajectoryBuffer(capacity=2, history=4)
+        buffer.add([5], [True], np.array([[0.5, 0.5]]), 0.0)
+        self.assertGreaterEqual(buffer.capacity, 6)
+        self.assertEqual(buffer.add([], [], np.zeros((0, 2)), 1.0)[0].shape, (0,))
+        self.assertEqual(buffer.active, 0)
+
+
+class TestCallbackTrajectories(unittest.TestCase):
+
+    def test_crowd_flow(self):
+        for count_every in (1, 3):
+            user_data = configure_counter(ReplayCounter(), {"trajectories": True, "count_every": count_every})
+            crowd = CrowdSimulator(30, speed=(0.004, 0.004), seed=1)
+            for pad, info in crowd.frames(200):
+                counting_callback(pad, info, user_data, REPLAY_BACKEND)
+            trajectories = user_data.trajectories
+            # Todos caminan a 0.004 de la altura por frame: 0.12 por segundo a 30 fps, algo más con el desvío en x
+            self.assertGreater(trajectories.mean_speed, 0.11)
+            self.assertLess(trajectories.mean_speed, 0.14)
+            headings = trajectories.stats()["headings"]
+            self.assertGreater(headings["abajo"] + headings["arriba"], 0.9 * sum(headings.values()))
+            self.assertIn("Vel media", user_data.stats_snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
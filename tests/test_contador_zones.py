@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+from contador.zones import ZoneEngine, CountingLine, CountingZone, LINE, ZONE
+
+
+def horizontal_line(y=0.5, name="puerta"):
+    return CountingLine(name, (0.0, y), (1.0, y), "entrada", "salida")
+
+
+class TestZoneEngineLines(unittest.TestCase):
+
+    def step(self, engine, points, fresh=None, slots=None):
+        n = len(points)
+        slots = list(range(n)) if slots is None else slots
+        fresh = [False] * n if fresh is None else fresh
+        return engine.process(slots, [s + 100 for s in slots], points, fresh)
+
+    def test_horizontal_line_matches_legacy_direction(self):
+        engine = ZoneEngine([horizontal_line()])
+        self.step(engine, [(0.5, 0.4), (0.5, 0.6)], fresh=[True, True])
+        events = self.step(engine, [(0.5, 0.55), (0.5, 0.45)])
+        self.assertEqual(sorted(e.direction for e in events), ["entrada", "salida"])
+        self.assertTrue(all(e.kind == LINE for e in events))
+        self.assertEqual(engine.counts["puerta"], {"entrada": 1, "salida": 1})
+
+    def test_counted_once_per_line(self):
+        engine = ZoneEngine([horizontal_line()])
+        self.step(engine, [(0.5, 0.4)], fresh=[True])
+        self.assertEqual(len(self.step(engine, [(0.5, 0.6)])), 1)
+        self.step(engine, [(0.5, 0.4)])
+        self.assertEqual(len(self.step(engine, [(0.5, 0.6)])), 0)
+        # Un slot reutilizado por una persona nueva vuelve a contar
+        self.step(engine, [(0.5, 0.4)], fresh=[True])
+        self.assertEqual(len(self.step(engine, [(0.5, 0.6)])), 1)
+
+    def test_segment_bounds_and_angle(self):
+        diagonal = CountingLine("diagonal", (0.2, 0.2), (0.4, 0.4), "a", "b")
+        engine = ZoneEngine([diagonal])
+        # Cruza la recta pero fuera del segmento
+        self.step(engine, [(0.8, 0.7), (0.35, 0.25)], fresh=[True, True])
+        events = self.step(engine, [(0.7, 0.8), (0.25, 0.35)])
+        self.assertEqual([(e.track_id, e.direction) for e in events], [(101, "a")])
+
+    def test_many_lines_at_once(self):
+        lines = [horizontal_line(y, f"l{i}") for i, y in enumerate(np.linspace(0.1, 0.9, 9))]
+        engine = ZoneEngine(lines)
+        self.step(engine, [(0.5, 0.0)], fresh=[True])
+        events = self.step(engine, [(0.5, 1.0)])
+        self.assertEqual(len(events), 9)
+
+
+class TestZoneEnginePolygons(unittest.TestCase):
+
+    def test_enter_and_exit_zone(self):
+        square = CountingZone("caja", [(0.25, 0.25), (0.75, 0.25), (0.75, 0.75), (0.25, 0.75)], "entrada", "salida")
+        engine = ZoneEngine(zones=[square])
+        engine.process([0], [5], [(0.1, 0.1)], [True])
+        events = engine.process([0], [5], [(0.5, 0.5)], [False])
+        self.assertEqual(events, [(5, ZONE, "caja", "entrada", None)])
+        events = engine.process([0], [5], [(0.9, 0.5)], [False])
+        self.assertEqual(events, [(5, ZONE, "caja", "salida", None)])
+
+    def test_appearing_inside_zone_is_not_an_entry(self):
+        square = CountingZone("caja", [(0.25, 0.25), (0.75, 0.25), (0.75, 0.75), (0.25, 0.75)], "entrada", "salida")
+        engine = ZoneEngine(zones=[square])
+        self.assertEqual(engine.process([0], [5], [(0.5, 0.5)], [True]), [])
+
+    def test_overlapping_zones(self):
+        a = CountingZone("a", [(0.0, 0.0), (0.6, 0.0), (0.6, 1.0), (0.0, 1.0)], "in", "out")
+        b = CountingZone("b", [(0.4, 0.0), (1.0, 0.0), (1.0, 1.0), (0.4, 1.0)], "in", "out")
+        engine = ZoneEngine(zones=[a, b])
+        bits = engine.zone_bits(np.array([[0.1, 0.5], [0.5, 0.5], [0.9, 0.5]], dtype=np.float32))
+        self.assertEqual(bits.tolist(), [1, 3, 2])
+
+    def test_from_config(self):
+        engine = ZoneEngine.from_config({
+            "lines": [{"start": [0, 0.5], "end": [1, 0.5]}],
+            "zones": [{"name": "z", "polygon": [[0, 0], [1, 0], [1, 1]]}],
+        })
+        self.assertEqual(engine.lines[0].positive, "entrada")
+        self.assertIn("z", engine.counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
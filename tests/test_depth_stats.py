@@ -0,0 +1,63 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from basic_pipelines.depth_stats import DepthStats, DepthGrid
+
+
+def calculate_average_depth(depth_mat):
+    """The np.percentile version depth.py and detection_cropper used."""
+    depth_values = np.array(depth_mat).flatten()
+    m_depth_values = depth_values[depth_values <= np.percentile(depth_values, 95)]
+    return np.mean(m_depth_values) if len(m_depth_values) > 0 else 0
+
+
+class TestDepthStats(unittest.TestCase):
+
+    def test_trimmed_mean_matches_percentile_version(self):
+        stats = DepthStats()
+        rng = np.random.default_rng(0)
+        for n in (1, 2, 6, 21, 1000, 20001):
+            values = rng.gamma(2.0, 1.5, n).astype(np.float32)
+            self.assertAlmostEqual(stats.trimmed_mean(values), float(calculate_average_depth(values)), places=4)
+        self.assertAlmostEqual(stats.trimmed_mean([1, 2, 3, 4, 5, 100]), 3.0)
+        ties = np.array([1, 1, 1, 2, 2, 2, 2, 2, 2, 9], dtype=np.float32)
+        self.assertAlmostEqual(stats.trimmed_mean(ties), float(calculate_average_depth(ties)), places=6)
+        self.assertEqual(stats.trimmed_mean([]), 0.0)
+
+    def test_quantiles_and_input_untouched(self):
+        stats = DepthStats()
+        values = np.random.default_rng(1).random(999).astype(np.float32)
+        original = values.copy()
+        np.testing.assert_allclose(stats.quantiles(values, (0.0, 0.1, 0.5, 0.9, 1.0)),
+                                   np.quantile(values, (0.0, 0.1, 0.5, 0.9, 1.0)), rtol=1e-6)
+        self.assertEqual(stats.median([3, 1, 2]), 2.0)
+        np.testing.assert_array_equal(values, original)
+
+
+class TestDepthGrid(unittest.TestCase):
+
+    def test_cells_match_per_cell_quantiles(self):
+        depth = np.random.default_rng(2).random((61, 83)).astype(np.float32)
+        grid = DepthGrid(3, 4, quantiles=(0.1, 0.5))
+        near, median = grid.reduce(depth)
+        self.assertEqual(near.shape, (3, 4))
+        cell = depth[20:40, 40:60]  # Row 1, column 2 (cells are 20x20, the remainder is ignored)
+        self.assertAlmostEqual(near[1, 2], np.quantile(cell, 0.1), places=6)
+        self.assertAlmostEqual(median[1, 2], np.median(cell), places=6)
+        np.testing.assert_allclose(grid.reduce(depth.ravel(), 83, 61), grid.reduce(depth))
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {"HAILO_DEPTH_GRID": "2x5"}):
+            grid = DepthGrid.from_env()
+        self.assertEqual((grid.rows, grid.cols), (2, 5))
+        with mock.patch.dict(os.environ, {"HAILO_DEPTH_GRID": ""}):
+            self.assertIsNone(DepthGrid.from_env())
+        with self.assertRaises(ValueError):
+            DepthGrid(4, 4).reduce(np.zeros((2, 8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
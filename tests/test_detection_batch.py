@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+from basic_pipelines.detection_batch import extract_detections, empty_batch, LabelIds, NO_TRACK
+from contador.replay import ReplayDetection, ReplayBBox, ReplayHailo
+
+UNIQUE_ID = ReplayHailo.HAILO_UNIQUE_ID
+
+
+class TwoTracks(ReplayDetection):
+    """A detection carrying two HAILO_UNIQUE_ID objects."""
+
+    def get_objects_typed(self, object_type):
+        return super().get_objects_typed(object_type) * 2
+
+
+def detections():
+    return [
+        ReplayDetection("person", 0.9, ReplayBBox(0.1, 0.2, 0.3, 0.6), 7),
+        ReplayDetection("chair", 0.8, ReplayBBox(0.5, 0.5, 0.7, 0.9), 8),
+        ReplayDetection("person", 0.4, ReplayBBox(0.0, 0.0, 0.5, 0.5)),
+    ]
+
+
+class TestDetectionBatch(unittest.TestCase):
+
+    def test_columns(self):
+        batch = extract_detections(detections(), UNIQUE_ID)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual((batch.labels == "person").tolist(), [True, False, True])
+        self.assertEqual(batch.class_ids.tolist(), [1, 0, 1])
+        np.testing.assert_allclose(batch.confidences, [0.9, 0.8, 0.4], rtol=1e-6)
+        np.testing.assert_allclose(batch.bboxes[0], [0.1, 0.2, 0.3, 0.6], rtol=1e-6)
+        self.assertEqual(batch.track_ids.tolist(), [7, 8, NO_TRACK])
+
+    def test_geometry(self):
+        batch = extract_detections(detections(), UNIQUE_ID)
+        np.testing.assert_allclose(batch.centers()[0], [0.2, 0.4], rtol=1e-6)
+        self.assertEqual(batch.pixel_boxes(100, 50)[1].tolist(), [50, 25, 70, 45])
+
+    def test_pixel_boxes_truncate_like_int(self):
+        # Hailo bboxes are C floats: 0.3875 arrives as 0.38749998..., which x 640 is 247 in float64 but 248 in float32
+        coords = [float(np.float32(c)) for c in (0.3875, 0.7984375, 0.5, 0.9)]
+        batch = extract_detections([ReplayDetection("person", 0.9, ReplayBBox(*coords))], UNIQUE_ID)
+        for width, height in ((640, 480), (1920, 1080)):
+            xmin, ymin, xmax, ymax = coords
+            expected = [int(xmin * width), int(ymin * height), int(xmax * width), int(ymax * height)]
+            self.assertEqual(batch.pixel_boxes(width, height)[0].tolist(), expected)
+
+    def test_several_unique_ids_mean_no_track(self):
+        batch = extract_detections([TwoTracks("person", 0.9, ReplayBBox(0.1, 0.2, 0.3, 0.6), 7)], UNIQUE_ID)
+        self.assertEqual(batch.track_ids.tolist(), [NO_TRACK])
+
+    def test_select(self):
+        source = detections()
+        batch = extract_detections(source, UNIQUE_ID)
+        people = batch.select(batch.labels == "person")
+        self.assertEqual(len(people), 2)
+        self.assertIs(people.detections[1], source[2])
+        self.assertEqual(people.track_ids.tolist(), [7, NO_TRACK])
+        self.assertEqual(batch.select([1]).track_ids.tolist(), [8])
+
+    def test_label_ids(self):
+        person = LabelIds("person")
+        chairs = extract_detections([ReplayDetection("chair", 0.8, ReplayBBox(0.5, 0.5, 0.7, 0.9))], UNIQUE_ID)
+        self.assertEqual(person.match(chairs).tolist(), [False])
+        self.assertEqual(person.class_ids, {})
+        batch = extract_detections(detections(), UNIQUE_ID)
+        self.assertEqual(person.match(batch).tolist(), [True, False, True])
+        self.assertEqual(person.class_ids, {"person": 1})
+        # Once the id is known only class_ids is compared
+        batch.labels[:] = "?"
+        self.assertEqual(person.match(batch).tolist(), [True, False, True])
+        self.assertEqual(LabelIds("person", "chair").match(extract_detections(detections(), UNIQUE_ID)).tolist(),
+                         [True, True, True])
+        self.assertEqual(person.match(empty_batch()).tolist(), [])
+
+    def test_empty(self):
+        for batch in (extract_detections([], UNIQUE_ID), empty_batch()):
+            self.assertEqual(len(batch), 0)
+            self.assertEqual(batch.bboxes.shape, (0, 4))
+            self.assertEqual(batch.centers().shape, (0, 2))
+            self.assertEqual((batch.labels == "person").tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
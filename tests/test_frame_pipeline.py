@@ -0,0 +1,183 @@
+import contextlib
+import io
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from basic_pipelines.frame_pipeline import (FramePipeline, Stage, FILTER, ANALYTICS, RENDER, DETECTIONS, FRAME, MASKS,
+                                            LANDMARKS, skip_frames, keep_labels, publish_frame)
+from basic_pipelines.detection_batch import extract_detections
+from basic_pipelines.pose_keypoints import WRISTS, extract_keypoints
+from contador.replay import (ReplayDetection, ReplayBBox, ReplayBuffer, ReplayPad, ReplayInfo, ReplayCallbackClass,
+                             ReplayHailo, REPLAY_BACKEND, PROBE_OK)
+from tests.test_pose_keypoints import LANDMARKS as LANDMARKS_TYPE, PoseDetection, pose
+
+
+def frame_inputs():
+    buffer = ReplayBuffer(0, [
+        ReplayDetection("person", 0.9, ReplayBBox(0.1, 0.2, 0.3, 0.6), 7),
+        ReplayDetection("chair", 0.8, ReplayBBox(0.5, 0.5, 0.7, 0.9), 8),
+        ReplayDetection("person", 0.6, ReplayBBox(0.0, 0.0, 0.5, 0.5), 9),
+    ])
+    return ReplayPad(64, 48), ReplayInfo(buffer)
+
+
+def broken(ctx):
+    raise RuntimeError("boom")
+
+
+POSE_HAILO = SimpleNamespace(**vars(ReplayHailo), HAILO_LANDMARKS=LANDMARKS_TYPE)
+
+
+class CountingBackend:
+    """REPLAY_BACKEND that counts the frames it maps."""
+
+    def __init__(self):
+        self.hailo = REPLAY_BACKEND.hailo
+        self.probe_ok = PROBE_OK
+        self.get_caps_from_pad = REPLAY_BACKEND.get_caps_from_pad
+        self.mapped = 0
+
+    def get_numpy_from_buffer(self, buffer, format, width, height):
+        self.mapped += 1
+        return REPLAY_BACKEND.get_numpy_from_buffer(buffer, format, width, height)
+
+
+class TestFramePipeline(unittest.TestCase):
+
+    def test_stages_run_by_kind_with_filtered_detections(self):
+        calls = []
+        pipeline = FramePipeline([
+            Stage("render", lambda ctx: calls.append("render"), RENDER),
+            Stage("tracks", lambda ctx: calls.append(ctx.batch.track_ids.tolist()), ANALYTICS, needs=(DETECTIONS,)),
+            keep_labels("person", min_confidence=0.7),
+        ], REPLAY_BACKEND)
+        user_data = ReplayCallbackClass()
+        self.assertEqual(pipeline.callback(*frame_inputs(), user_data), PROBE_OK)
+        self.assertEqual(calls, [[7], "render"])
+        self.assertEqual(user_data.get_count(), 1)
+        self.assertEqual(pipeline.timer.summary()["tracks"]["count"], 1)
+
+    def test_frame_is_only_mapped_when_needed_and_enabled(self):
+        backend = CountingBackend()
+        pipeline = FramePipeline([publish_frame()], backend)
+        user_data = ReplayCallbackClass()
+        pipeline.callback(*frame_inputs(), user_data)
+        self.assertEqual((backend.mapped, user_data.last_frame), (0, None))
+        user_data.use_frame = True
+        pipeline.callback(*frame_inputs(), user_data)
+        self.assertEqual(backend.mapped, 1)
+        self.assertEqual(user_data.last_frame.shape, (48, 64, 3))
+
+        # Without a stage that needs the frame nothing is mapped, even with use_frame
+        backend = CountingBackend()
+        FramePipeline([Stage("count", lambda ctx: None, needs=(DETECTIONS,))], backend).callback(
+            *frame_inputs(), user_data)
+        self.assertEqual(backend.mapped, 0)
+
+    def test_filters_stop_the_frame(self):
+        seen = []
+        pipeline = FramePipeline([
+            skip_frames(2),
+            Stage("empty", lambda ctx: len(ctx.batch) > 0, FILTER, needs=(DETECTIONS,)),
+            Stage("seen", lambda ctx: seen.append(ctx.count)),
+        ], REPLAY_BACKEND)
+        user_data = ReplayCallbackClass()
+        for _ in range(4):
+            pipeline.callback(*frame_inputs(), user_data)
+        pipeline.callback(ReplayPad(64, 48), ReplayInfo(ReplayBuffer(0, [])), user_data)
+        pipeline.callback(*frame_inputs(), user_data)
+        self.assertEqual(seen, [2, 4, 6])
+
+    def test_worker_stages_run_off_the_callback(self):
+        done = threading.Event()
+        results = []
+
+        def slow(ctx):
+            results.append((ctx.count, ctx.frame.shape, ctx.buffer))
+            done.set()
+
+        pipeline = FramePipeline([Stage("slow", slow, ANALYTICS, needs=(FRAME,), worker=True)], REPLAY_BACKEND,
+                                 workers=1)
+        user_data = ReplayCallbackClass()
+        user_data.use_frame = True
+        pipeline.callback(*frame_inputs(), user_data)
+        self.assertTrue(done.wait(5))
+        pipeline.close()
+        self.assertEqual(results, [(1, (48, 64, 3), None)])
+        self.assertNotIn("slow", pipeline.timer.stages)
+        self.assertEqual(pipeline.worker_timer.summary()["slow"]["count"], 1)
+
+    def test_worker_failures_are_counted(self):
+        pipeline = FramePipeline([Stage("broken", broken, ANALYTICS, worker=True)], REPLAY_BACKEND, workers=1,
+                                 max_pending=1)
+        user_data = ReplayCallbackClass()
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            for _ in range(3):
+                pipeline.callback(*frame_inputs(), user_data)
+                pipeline._pending.acquire(timeout=5)  # Wait for the worker to free the slot
+                pipeline._pending.release()
+            pipeline.close()
+        self.assertEqual((pipeline.failures, pipeline.dropped), (3, 0))
+        self.assertIsInstance(pipeline.last_error, RuntimeError)
+        self.assertEqual(stderr.getvalue().count("RuntimeError: boom"), 1)
+
+    def test_worker_stage_gets_decoded_landmarks(self):
+        done = threading.Event()
+        results = []
+
+        def read(ctx):
+            try:
+                results.append((ctx.keypoints(), ctx.keypoints(WRISTS, return_present=True),
+                                ctx.batch.track_ids.tolist()))
+                ctx.roi
+            except RuntimeError as error:
+                results.append(error)
+            finally:
+                done.set()
+
+        backend = REPLAY_BACKEND._replace(hailo=POSE_HAILO)
+        detections = [PoseDetection(ReplayBBox(0.1, 0.2, 0.3, 0.6), pose(), 4)]
+        pipeline = FramePipeline([Stage("read", read, ANALYTICS, needs=(LANDMARKS,), worker=True)], backend, workers=1)
+        pipeline.callback(ReplayPad(64, 48), ReplayInfo(ReplayBuffer(0, detections)), ReplayCallbackClass())
+        self.assertTrue(done.wait(5))
+        pipeline.close()
+        self.assertEqual(pipeline.failures, 0)
+        (keypoints, wrists, track_ids), roi_error = results
+        self.assertIn("worker stages", str(roi_error))
+        batch = extract_detections(detections, POSE_HAILO.HAILO_UNIQUE_ID)
+        np.testing.assert_array_equal(keypoints, extract_keypoints(detections, batch.bboxes, LANDMARKS_TYPE, 64, 48))
+        np.testing.assert_array_equal(wrists[0], keypoints[:, WRISTS])
+        self.assertEqual(wrists[1].tolist(), [True])
+        self.assertEqual(track_ids, [4])
+
+    def test_worker_stages_run_inline_in_kind_order_without_workers(self):
+        calls = []
+        pipeline = FramePipeline([
+            Stage("late", lambda ctx: calls.append("analytics"), ANALYTICS, worker=True),
+            Stage("draw", lambda ctx: calls.append("render"), RENDER),
+        ], REPLAY_BACKEND)
+        pipeline.callback(*frame_inputs(), ReplayCallbackClass())
+        self.assertEqual(calls, ["analytics", "render"])
+        with self.assertRaises(RuntimeError):
+            FramePipeline([Stage("broken", broken, worker=True)], REPLAY_BACKEND).callback(
+                *frame_inputs(), ReplayCallbackClass())
+
+    def test_invalid_stages(self):
+        with self.assertRaises(ValueError):
+            Stage("x", print, "draw")
+        with self.assertRaises(ValueError):
+            Stage("x", print, needs=("pixels",))
+        with self.assertRaises(ValueError):
+            Stage("x", print, FILTER, worker=True)
+        with self.assertRaises(ValueError):
+            Stage("x", print, needs=(MASKS,), worker=True)
+        with self.assertRaises(ValueError):
+            FramePipeline([Stage("frame", print)], REPLAY_BACKEND)
+        self.assertIn(DETECTIONS, Stage("x", print, needs=(MASKS,)).needs)
+
+
+if __name__ == "__main__":
+    unittest.main()
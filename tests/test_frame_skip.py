@@ -0,0 +1,92 @@
+import unittest
+from types import SimpleNamespace
+
+from basic_pipelines.frame_pipeline import FramePipeline, Stage
+from basic_pipelines.frame_skip import AdaptiveFrameSkip, pad_framerate
+from basic_pipelines.metrics_server import render_json
+from contador.replay import ReplayBuffer, ReplayPad, ReplayInfo, ReplayCallbackClass, REPLAY_BACKEND
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(skip, clock, frames, cost, interval=0.1):
+    """Feed frames `interval` apart, processing the admitted ones for `cost` seconds; returns the admitted indices."""
+    admitted = []
+    for i in range(frames):
+        if skip.tick():
+            admitted.append(i)
+            clock.now += cost
+            skip.done()
+        clock.now += interval
+    return admitted
+
+
+def caps_pad(numerator, denominator):
+    structure = SimpleNamespace(get_fraction=lambda name: (True, numerator, denominator))
+    caps = SimpleNamespace(get_size=lambda: 1, get_structure=lambda index: structure)
+    return SimpleNamespace(get_current_caps=lambda: caps)
+
+
+class TestAdaptiveFrameSkip(unittest.TestCase):
+
+    def test_raises_under_load_and_lowers_with_hysteresis(self):
+        clock = FakeClock()
+        skip = AdaptiveFrameSkip(skip=1, max_skip=8, fps=10, clock=clock)
+        # 0.25 s per frame at 10 fps needs 0.25 / (0.8 * 0.1) -> 4 frames per processed frame
+        run(skip, clock, 40, 0.25)
+        self.assertEqual(skip.skip, 4)
+        self.assertGreater(skip.skipped, 0)
+        changes = skip.changes
+
+        # 0.075 s fits in 0.8 x 0.1 x 1 but not 0.7 x 0.8 x 0.1: the level above is kept (hysteresis)
+        run(skip, clock, 200, 0.075)
+        self.assertEqual(skip.skip, 2)
+        run(skip, clock, 200, 0.075)
+        self.assertEqual(skip.skip, 2)
+
+        run(skip, clock, 200, 0.01)
+        self.assertEqual(skip.skip, 1)
+        self.assertGreater(skip.changes, changes)
+
+    def test_bounds_and_admission_phase(self):
+        clock = FakeClock()
+        skip = AdaptiveFrameSkip(skip=3, min_skip=2, max_skip=5, fps=10, clock=clock)
+        self.assertEqual(run(skip, clock, 9, 0.0), [2, 5, 8])
+        run(skip, clock, 200, 0.0)
+        self.assertEqual(skip.skip, 2)
+        run(skip, clock, 200, 10.0)
+        self.assertEqual(skip.skip, 5)
+
+    def test_framerate_from_caps_and_metrics(self):
+        self.assertEqual(pad_framerate(caps_pad(30, 1)), 30)
+        self.assertIsNone(pad_framerate(caps_pad(0, 1)))
+        self.assertIsNone(pad_framerate(ReplayPad(64, 48)))
+        skip = AdaptiveFrameSkip(clock=FakeClock())
+        skip.tick(caps_pad(15, 1))
+        self.assertAlmostEqual(skip.frame_interval, 1 / 15)
+        metrics = render_json(skip.metrics())
+        self.assertEqual(metrics["frame_skip_decimation"], 1)
+        self.assertEqual(metrics["frame_skip_frames_total"][0]["value"], 1)
+
+    def test_pipeline_counts_every_frame(self):
+        clock = FakeClock()
+        seen = []
+        skip = AdaptiveFrameSkip(skip=2, fps=10, clock=clock)
+        pipeline = FramePipeline([Stage("seen", lambda ctx: seen.append(ctx.count))], REPLAY_BACKEND, skip=skip)
+        user_data = ReplayCallbackClass()
+        for _ in range(6):
+            pipeline.callback(ReplayPad(64, 48), ReplayInfo(ReplayBuffer(0, [])), user_data)
+        self.assertEqual(user_data.get_count(), 6)
+        self.assertEqual(seen, [2, 4, 6])
+        self.assertEqual((skip.processed, skip.skipped), (3, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from basic_pipelines.mask_compositor import MaskCompositor
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+
+class Mask:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32)
+
+    def get_height(self):
+        return self.data.shape[0]
+
+    def get_width(self):
+        return self.data.shape[1]
+
+    def get_data(self):
+        return self.data.ravel().tolist()  # Like a binding that returns a list
+
+
+def per_mask(frame, mask, bbox, track_id):
+    """The loop the segmentation callbacks used to run for each person."""
+    frame_height, frame_width = frame.shape[:2]
+    xmin, ymin, xmax, ymax = bbox
+    data = np.array(mask.get_data()).reshape((mask.get_height(), mask.get_width()))
+    roi_width = int((xmax - xmin) * frame_width)
+    roi_height = int((ymax - ymin) * frame_height)
+    resized = cv2.resize(data, (roi_width, roi_height), interpolation=cv2.INTER_LINEAR)
+    x_min, y_min = int(xmin * frame_width), int(ymin * frame_height)
+    x_max, y_max = min(x_min + roi_width, frame_width), min(y_min + roi_height, frame_height)
+    overlay = np.zeros_like(frame)
+    overlay[y_min:y_max, x_min:x_max] = (resized[:y_max - y_min, :x_max - x_min, np.newaxis] > 0.5) * COLORS[track_id % 3]
+    return cv2.addWeighted(frame, 1, overlay, 0.5, 0)
+
+
+class TestMaskCompositor(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frame = rng.integers(0, 255, (90, 160, 3), dtype=np.uint8)
+        self.masks = [Mask(rng.random((16, 16))) for _ in range(3)]
+        self.bboxes = [(0.05, 0.1, 0.3, 0.6), (0.4, 0.2, 0.6, 0.9), (0.7, 0.0, 0.95, 0.5)]
+
+    def test_matches_per_mask_blending(self):
+        compositor = MaskCompositor(COLORS)
+        expected = self.frame.copy()
+        compositor.begin(160, 90)
+        for track_id, (mask, bbox) in enumerate(zip(self.masks, self.bboxes)):
+            expected = per_mask(expected, mask, bbox, track_id)
+            self.assertTrue(compositor.add(mask, bbox, track_id))
+        frame = self.frame.copy()
+        self.assertIs(compositor.blend(frame), frame)
+        np.testing.assert_array_equal(frame, expected)
+
+    def test_overlapping_masks_match_per_mask_blending(self):
+        compositor = MaskCompositor(COLORS)
+        ones = Mask(np.ones((8, 8)))
+        bboxes = [(0.1, 0.1, 0.6, 0.6), (0.3, 0.3, 0.9, 0.9), (0.2, 0.0, 0.5, 0.8)]
+        track_ids = [0, 3, 1]  # 0 and 3 share a colour, so their overlap saturates
+        expected = self.frame.copy()
+        compositor.begin(160, 90)
+        for bbox, track_id in zip(bboxes, track_ids):
+            expected = per_mask(expected, ones, bbox, track_id)
+            compositor.add(ones, bbox, track_id)
+        np.testing.assert_array_equal(compositor.blend(self.frame.copy()), expected)
+
+    def test_buffers_reused_and_cleared(self):
+        compositor = MaskCompositor(COLORS)
+        compositor.begin(160, 90)
+        compositor.add(self.masks[0], self.bboxes[0], 1)
+        compositor.blend(self.frame.copy())
+        overlay = compositor.overlay
+        compositor.begin(160, 90)
+        self.assertIs(compositor.overlay, overlay)
+        self.assertEqual(compositor.masks, 0)
+        frame = self.frame.copy()
+        np.testing.assert_array_equal(compositor.blend(frame), self.frame)  # Nothing added
+        compositor.begin(80, 45)
+        self.assertEqual(compositor.shape, (45, 80))
+
+    def test_roi_clipped_to_frame(self):
+        compositor = MaskCompositor(COLORS)
+        compositor.begin(160, 90)
+        ones = Mask(np.ones((8, 8)))
+        self.assertTrue(compositor.add(ones, (-0.1, 0.8, 0.2, 1.2), 0))
+        self.assertFalse(compositor.add(ones, (1.1, 0.2, 1.3, 0.4), 0))
+        self.assertFalse(compositor.add(ones, (0.5, 0.5, 0.5, 0.7), 0))
+        compositor.blend(self.frame.copy())
+        touched = compositor.overlay[..., 0] > 0
+        self.assertTrue(touched[89, 0])
+        self.assertFalse(touched[:72].any())
+        self.assertEqual(compositor.masks, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+from basic_pipelines.metrics_server import (MetricsServer, Metric, COUNTER, GAUGE, sample, stage_timer_metric,
+                                            render_prometheus, render_json)
+from basic_pipelines.stage_timing import StageTimer
+
+
+def make_timer():
+    timer = StageTimer(["caps"])
+    for us in (50, 200, 200, 3000):
+        timer.record(0, us * 1000)
+        timer.record(timer.total_index, us * 1000)
+    return timer
+
+
+class TestRender(unittest.TestCase):
+
+    def test_prometheus_text(self):
+        metrics = [
+            Metric("frames_total", COUNTER, "Frames", [sample(10)]),
+            Metric("zone_total", COUNTER, "Per zone", [sample(2, name='a"b'), sample(3, name="c")]),
+        ]
+        text = render_prometheus(metrics)
+        self.assertIn("# TYPE frames_total counter\nframes_total 10\n", text)
+        self.assertIn('zone_total{name="a\\"b"} 2\n', text)
+
+    def test_histogram(self):
+        metric = stage_timer_metric("latency_seconds", make_timer(), bounds_us=(100, 1000, 10000))
+        text = render_prometheus([metric])
+        self.assertIn('latency_seconds_bucket{stage="caps",le="0.0001"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{stage="caps",le="0.001"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{stage="caps",le="+Inf"} 4\n', text)
+        self.assertIn('latency_seconds_count{stage="caps"} 4\n', text)
+        series = render_json([metric])["latency_seconds"]["caps"]
+        self.assertEqual(series["count"], 4)
+        self.assertAlmostEqual(series["sum"], 0.00345)
+        self.assertEqual(series["buckets"]["0.01"], 4)
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.value = 0
+        collect = lambda: [Metric("frames_total", COUNTER, "Frames", [sample(self.value)]),
+                           Metric("tracks", GAUGE, "Tracks", [sample(1.5)])]
+        self.server = MetricsServer(collect, host="127.0.0.1", port=0).start()
+        self.url = f"http://127.0.0.1:{self.server.port}"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.headers["Content-Type"], response.read().decode()
+
+    def test_endpoints(self):
+        self.value = 7
+        content_type, body = self.get("/metrics")
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn("frames_total 7\n", body)
+        self.value = 8
+        content_type, body = self.get("/metrics.json")
+        self.assertEqual(content_type, "application/json")
+        self.assertEqual(json.loads(body), {"frames_total": 8, "tracks": 1.5})
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.get("/nope")
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+
+from basic_pipelines.detection_batch import extract_detections
+from basic_pipelines.pose_keypoints import (extract_keypoints, KEYPOINTS, KEYPOINT_NAMES, NUM_KEYPOINTS, WRISTS,
+                                            EYES, FLIP, CONFIDENCE)
+from contador.replay import ReplayDetection, ReplayBBox, ReplayHailo
+
+LANDMARKS = "landmarks"
+
+
+class Point:
+    def __init__(self, x, y, confidence):
+        self._x, self._y, self._confidence = x, y, confidence
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+    def confidence(self):
+        return self._confidence
+
+
+class Landmarks:
+    def __init__(self, points):
+        self._points = points
+
+    def get_points(self):
+        return self._points
+
+
+class PoseDetection(ReplayDetection):
+    def __init__(self, bbox, points=None, track_id=1):
+        super().__init__("person", 0.9, bbox, track_id)
+        self.landmarks = [] if points is None else [Landmarks(points)]
+
+    def get_objects_typed(self, object_type):
+        if object_type == LANDMARKS:
+            return self.landmarks
+        return super().get_objects_typed(object_type)
+
+
+def pose(n=NUM_KEYPOINTS):
+    return [Point(i / 20, 1 - i / 20, 0.1 + i / 20) for i in range(n)]
+
+
+def per_point(detection, width, height):
+    """The scalar conversion the pose callbacks used to do."""
+    bbox = detection.get_bbox()
+    return [(int((p.x() * bbox.width() + bbox.xmin()) * width), int((p.y() * bbox.height() + bbox.ymin()) * height))
+            for p in detection.get_objects_typed(LANDMARKS)[0].get_points()]
+
+
+class TestPoseKeypoints(unittest.TestCase):
+
+    def test_tables(self):
+        self.assertEqual(len(KEYPOINT_NAMES), 17)
+        self.assertEqual(WRISTS.tolist(), [KEYPOINTS['left_wrist'], KEYPOINTS['right_wrist']])
+        self.assertEqual(EYES.tolist(), [1, 2])
+        self.assertEqual(FLIP[KEYPOINTS['left_hip']], KEYPOINTS['right_hip'])
+        self.assertEqual(FLIP[KEYPOINTS['nose']], KEYPOINTS['nose'])
+        self.assertEqual(FLIP[FLIP].tolist(), list(range(NUM_KEYPOINTS)))
+
+    def test_matches_per_point_conversion(self):
+        detections = [PoseDetection(ReplayBBox(0.1, 0.2, 0.4, 0.9), pose()),
+                      PoseDetection(ReplayBBox(0.5, 0.0, 0.7, 0.5), pose())]
+        batch = extract_detections(detections, ReplayHailo.HAILO_UNIQUE_ID)
+        keypoints = extract_keypoints(batch.detections, batch.bboxes, LANDMARKS, 640, 480)
+        self.assertEqual(keypoints.shape, (2, NUM_KEYPOINTS, 3))
+        self.assertEqual(keypoints.dtype, np.float32)
+        for row, detection in enumerate(detections):
+            expected = np.array(per_point(detection, 640, 480))
+            np.testing.assert_allclose(keypoints[row, :, :2].astype(np.int32), expected, atol=1)
+        np.testing.assert_allclose(keypoints[0, :, CONFIDENCE], [0.1 + i / 20 for i in range(NUM_KEYPOINTS)],
+                                   rtol=1e-6)
+
+    def test_selected_joints_and_missing_landmarks(self):
+        detections = [PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0), pose()),
+                      PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0)),
+                      PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0), pose(10))]
+        batch = extract_detections(detections, ReplayHailo.HAILO_UNIQUE_ID)
+        full = extract_keypoints(batch.detections, batch.bboxes, LANDMARKS)
+        wrists = extract_keypoints(batch.detections, batch.bboxes, LANDMARKS, joints=WRISTS)
+        self.assertEqual(wrists.shape, (3, 2, 3))
+        np.testing.assert_array_equal(wrists[0], full[0, WRISTS])
+        self.assertFalse(wrists[1].any())  # No landmarks
+        self.assertGreater(wrists[2, 0, CONFIDENCE], 0)  # Index 9 exists with 10 points
+        self.assertEqual(wrists[2, 1, CONFIDENCE], 0)  # Index 10 does not
+
+    def test_present_mask(self):
+        unsure = [Point(0.5, 0.5, 0.0) for _ in range(NUM_KEYPOINTS)]  # Landmarks whose points all have confidence 0
+        detections = [PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0), unsure),
+                      PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0)),
+                      PoseDetection(ReplayBBox(0.0, 0.0, 1.0, 1.0), pose())]
+        batch = extract_detections(detections, ReplayHailo.HAILO_UNIQUE_ID)
+        for joints in (None, EYES):  # Broadcasted and scalar paths
+            keypoints, present = extract_keypoints(batch.detections, batch.bboxes, LANDMARKS, joints=joints,
+                                                   return_present=True)
+            self.assertEqual(present.tolist(), [True, False, True])
+            self.assertFalse(keypoints[0, :, CONFIDENCE].any())
+
+    def test_empty(self):
+        self.assertEqual(extract_keypoints([], np.zeros((0, 4)), LANDMARKS).shape, (0, NUM_KEYPOINTS, 3))
+        self.assertEqual(extract_keypoints([], np.zeros((0, 4)), LANDMARKS, joints=EYES).shape, (0, 2, 3))
+        keypoints, present = extract_keypoints([], np.zeros((0, 4)), LANDMARKS, return_present=True)
+        self.assertEqual(present.shape, (0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
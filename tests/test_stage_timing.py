@@ -0,0 +1,55 @@
+import unittest
+
+from basic_pipelines.stage_timing import StageTimer, bucket_of, bucket_bounds, NUM_BUCKETS
+
+
+class TestBuckets(unittest.TestCase):
+
+    def test_bounds_contain_value(self):
+        for ns in [0, 1, 7, 15, 16, 17, 31, 32, 999, 1000, 123456, 10 ** 9]:
+            low, high = bucket_bounds(bucket_of(ns))
+            self.assertLessEqual(low, ns)
+            self.assertLess(ns, high)
+            # Relative error is bounded by the 8 sub-buckets per power of two
+            self.assertLessEqual(high - low, max(1, low / 8))
+
+    def test_huge_values_saturate(self):
+        self.assertEqual(bucket_of(2 ** 60), NUM_BUCKETS - 1)
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def test_percentiles(self):
+        timer = StageTimer(["a"])
+        for ns in range(1, 1001):
+            timer.record(0, ns * 1000)  # 1..1000 us
+        stats = timer.summary()["a"]
+        self.assertEqual(stats["count"], 1000)
+        self.assertAlmostEqual(stats["mean_us"], 500.5, places=3)
+        self.assertAlmostEqual(stats["p50_us"], 500, delta=500 * 0.125)
+        self.assertAlmostEqual(stats["p95_us"], 950, delta=950 * 0.125)
+        self.assertAlmostEqual(stats["p99_us"], 990, delta=990 * 0.125)
+        self.assertEqual(stats["max_us"], 1000)
+
+    def test_laps_and_periodic_report(self):
+        reports = []
+        timer = StageTimer(["caps", "draw"], report_every=0.0, report_fn=reports.append)
+        for _ in range(3):
+            t = timer.begin()
+            t = timer.lap(0, t)
+            timer.lap(1, t)
+            timer.end_frame()
+        summary = timer.summary()
+        self.assertEqual(list(summary), ["caps", "draw", "total"])
+        self.assertEqual(summary["total"]["count"], 3)
+        self.assertEqual(len(reports), 2)
+
+    def test_reset(self):
+        timer = StageTimer(["a"])
+        timer.record(0, 100)
+        timer.reset()
+        self.assertEqual(timer.summary()["a"]["count"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import json
+import time
+import unittest
+
+from basic_pipelines.stats_sink import StatsSink
+
+
+class TestStatsSink(unittest.TestCase):
+
+    def test_nothing_written_until_started(self):
+        stream = io.StringIO()
+        sink = StatsSink(interval=0.01, stream=stream)
+        sink.add("detections", 3)
+        sink.event(track_id=1)
+        time.sleep(0.05)
+        self.assertEqual(stream.getvalue(), "")
+
+    def test_human_flush(self):
+        stream = io.StringIO()
+        sink = StatsSink(stream=stream)
+        sink.add_source(lambda: {"Frame": 10})
+        sink.add("Detections", 2)
+        sink.add("Detections", 3)
+        sink.set("Persons", 1)
+        sink.event(ID=7, sentido="entrada")
+        sink.flush()
+        self.assertEqual(stream.getvalue().splitlines(),
+                         ["Event: ID: 7 | sentido: entrada", "Frame: 10 | Persons: 1 | Detections: 5"])
+
+    def test_json_lines(self):
+        stream = io.StringIO()
+        sink = StatsSink(fmt="json", stream=stream)
+        sink.set("Persons", 2)
+        sink.event(ID=1)
+        sink.flush()
+        event, stats = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual((event["type"], event["ID"]), ("event", 1))
+        self.assertEqual((stats["type"], stats["Persons"]), ("stats", 2))
+
+    def test_event_flushes_before_interval(self):
+        stream = io.StringIO()
+        with StatsSink(interval=60.0, stream=stream) as sink:
+            sink.event(ID=3)
+            deadline = time.monotonic() + 2.0
+            while "ID: 3" not in stream.getvalue() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(stream.getvalue(), "Event: ID: 3\n")
+        # stop() writes a final statistics line
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+    def test_periodic_and_dropped_events(self):
+        stream = io.StringIO()
+        sink = StatsSink(interval=0.01, stream=stream, flush_on_event=False, max_events=2)
+        for i in range(5):
+            sink.event(ID=i)
+        self.assertEqual(sink.dropped_events, 3)
+        sink.start()
+        time.sleep(0.05)
+        sink.stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:2], ["Event: ID: 3", "Event: ID: 4"])
+        self.assertGreaterEqual(len(lines), 3)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            StatsSink(fmt="xml")
+
+
+if __name__ == '__main__':
+    unittest.main()